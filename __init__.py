@@ -13,23 +13,42 @@ bl_info = {
 # Initialize the libraries module.
 from . import lib
 
-# Import all submodules.
-from .menu import topbar_dropdown
-from .menu.import_export import halo1_model
-from .menu.import_export import halo1_anim
+def get_modules():
+	'''
+	Imports and returns the submodules that need to be registered.
+
+	They are imported here instead of at the top, so importing the addon
+	package doesn't import bpy. This keeps the core package usable outside
+	of Blender.
+	'''
+	from . import preferences
+	from .menu import library_browser
+	from .menu import object_tools
+	from .menu import topbar_dropdown
+	from .menu.import_export import halo1_model
+	from .menu.import_export import halo1_anim
+	from .menu.import_export import halo1_bsp
+	from .menu.import_export import halo1_collision
+	from .menu.import_export import halo1_scenario
 
-modules = [
-	halo1_model,
-	halo1_anim,
-	topbar_dropdown,
-]
+	return [
+		preferences,
+		halo1_model,
+		halo1_anim,
+		halo1_bsp,
+		halo1_collision,
+		halo1_scenario,
+		object_tools,
+		library_browser,
+		topbar_dropdown,
+	]
 
 def register():
 	'''
 	Registers classes on load by calling the
 	register functions in their respective modules.
 	'''
-	for module in modules:
+	for module in get_modules():
 		module.register()
 
 def unregister():
@@ -38,7 +57,7 @@ def unregister():
 	unregister functions in their respective modules.
 	'''
 	#Unregister classes in reverse order to avoid any dependency problems.
-	for module in reversed(modules):
+	for module in reversed(get_modules()):
 		module.unregister()
 
 if __name__ == "__main__":
@@ -18,3 +18,23 @@ NODE_NAME_PREFIX   = "@"
 MARKER_NAME_PREFIX = "#"
 FAKE_NODE_PREFIX   = "$" # like PHP, FAKE
 VERY_SMALL_NUMBER = 0.01
+
+# Single object imports keep the region of every face in this integer face
+# attribute, and the region names in this custom property of the mesh.
+REGION_ATTRIBUTE = "region"
+REGION_NAMES_PROPERTY = "krieg_regions"
+
+# Meshes imported with mesh sharing on keep the hash of their geometry in
+# this custom property, see core.hashing, and the amounts of their vertices,
+# edges, loops and polygons in the other, to notice when they were edited.
+GEOMETRY_HASH_PROPERTY = "krieg_geometry_hash"
+GEOMETRY_COUNTS_PROPERTY = "krieg_geometry_counts"
+
+# The name of the second uv layer of bsps, which holds the lightmap uvs.
+LIGHTMAP_UV_LAYER = "lightmap"
+
+# Collision materials get this in front of their name, so they don't mix
+# with the shaders of the render model. The surface flags of collision
+# faces are kept in an integer face attribute.
+COLLISION_MATERIAL_PREFIX = "coll:"
+COLLISION_FLAGS_ATTRIBUTE = "collision_flags"
@@ -0,0 +1,10 @@
+'''
+The Blender independent core of Blendkrieg.
+
+Everything in here turns Halo data into plain arrays and must not import bpy
+or mathutils. Besides the standard library it uses NumPy, and reclaimer to
+read the tags and jms files. That way it can be used
+from worker processes, offline tools and tests that run without Blender.
+The modules in halo1/ are the adapters that turn these arrays into Blender
+data.
+'''
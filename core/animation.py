@@ -0,0 +1,37 @@
+'''
+Turns jma animations into compact animation arrays.
+'''
+import itertools
+
+import numpy as np
+
+from .arrays import AnimationArrays
+
+# Amount of values unpacked per JmaNodeState by animation_arrays_from_jma.
+_STATE_FIELDS = 8
+
+def animation_arrays_from_jma(jma):
+	'''
+	Unpacks the frames of a JmaAnimation into an AnimationArrays.
+
+	The root node info should already be applied to the frames.
+	'''
+	frame_count = len(jma.frames)
+	node_count = len(jma.nodes)
+	flat = np.fromiter(
+		itertools.chain.from_iterable(
+			(s.rot_i, s.rot_j, s.rot_k, s.rot_w,
+			 s.pos_x, s.pos_y, s.pos_z, s.scale)
+			for frame in jma.frames for s in frame),
+		np.float64, frame_count * node_count * _STATE_FIELDS,
+	).reshape(frame_count, node_count, _STATE_FIELDS)
+
+	return AnimationArrays(
+		name=jma.name,
+		ext=jma.ext,
+		frame_rate=jma.frame_rate,
+		node_names=[node.name for node in jma.nodes],
+		rotations=np.ascontiguousarray(flat[:, :, 0:4]),
+		translations=np.ascontiguousarray(flat[:, :, 4:7]),
+		scales=np.ascontiguousarray(flat[:, :, 7]),
+	)
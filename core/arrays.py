@@ -0,0 +1,274 @@
+'''
+Containers for the compact array representation of Halo 1 models and
+animations.
+
+These hold nothing but NumPy arrays, strings and lists of strings, so they
+pickle cheaply and can be sent between processes.
+'''
+import numpy as np
+
+class NodeArrays:
+	'''
+	The nodes of a model.
+
+	rotations are (i, j, k, w) quaternions like in a jms, and translations
+	are relative to the parent node. parents holds -1 for root nodes.
+	'''
+	__slots__ = ('names', 'parents', 'rotations', 'translations')
+
+	def __init__(self, names=(), parents=None, rotations=None, translations=None):
+		count = len(names)
+		self.names = list(names)
+		self.parents = (np.full(count, -1, np.int32)
+			if parents is None else parents)
+		self.rotations = (np.zeros((count, 4), np.float64)
+			if rotations is None else rotations)
+		self.translations = (np.zeros((count, 3), np.float64)
+			if translations is None else translations)
+
+	def __len__(self):
+		return len(self.names)
+
+
+class MarkerArrays:
+	'''
+	The markers of a model.
+
+	Like with nodes, rotations are (i, j, k, w) quaternions and translations
+	are relative to the parent node.
+	'''
+	__slots__ = ('names', 'permutations', 'regions', 'parents',
+		'rotations', 'translations', 'radii')
+
+	def __init__(self, names=(), permutations=(), regions=None, parents=None,
+			rotations=None, translations=None, radii=None):
+		count = len(names)
+		self.names = list(names)
+		self.permutations = list(permutations) or [''] * count
+		self.regions = (np.zeros(count, np.int32)
+			if regions is None else regions)
+		self.parents = (np.zeros(count, np.int32)
+			if parents is None else parents)
+		self.rotations = (np.zeros((count, 4), np.float64)
+			if rotations is None else rotations)
+		self.translations = (np.zeros((count, 3), np.float64)
+			if translations is None else translations)
+		self.radii = (np.zeros(count, np.float64)
+			if radii is None else radii)
+
+	def __len__(self):
+		return len(self.names)
+
+
+class RegionMesh:
+	'''
+	The ready to import geometry of one (or more) regions of a model.
+
+	positions     (V, 3) float32   vertex positions, already scaled.
+	triangles     (T, 3) int32     indices into positions.
+	materials     (T,)   int32     material index of each triangle.
+	loop_normals  (T*3, 3) float32 normal of each triangle corner.
+	loop_uvs      (T*3, 2) float32 uv of each triangle corner.
+	vertex_map    (V,)   int32     index of each vertex in the source jms.
+	skin_nodes    (V, 2) int32     up to two node indices per vertex, -1 for none.
+	skin_weights  (V, 2) float32   the weight of each of those nodes.
+	loop_lightmap_uvs (T*3, 2) float32 lightmap uv of each triangle corner,
+	                               or None. Only bsps have these.
+
+	validated is True when the arrays went through
+	core.validation.validate_geometry, so the mesh made out of them doesn't
+	need mesh.validate().
+	'''
+	__slots__ = ('name', 'positions', 'triangles', 'materials',
+		'loop_normals', 'loop_uvs', 'vertex_map', 'skin_nodes', 'skin_weights',
+		'validated', 'loop_lightmap_uvs')
+
+	def __init__(self, name, positions, triangles, materials, loop_normals,
+			loop_uvs, vertex_map, skin_nodes, skin_weights, validated=False,
+			loop_lightmap_uvs=None):
+		self.name = name
+		self.positions = positions
+		self.triangles = triangles
+		self.materials = materials
+		self.loop_normals = loop_normals
+		self.loop_uvs = loop_uvs
+		self.vertex_map = vertex_map
+		self.skin_nodes = skin_nodes
+		self.skin_weights = skin_weights
+		self.validated = validated
+		self.loop_lightmap_uvs = loop_lightmap_uvs
+
+	@property
+	def vertex_count(self):
+		return len(self.positions)
+
+	@property
+	def triangle_count(self):
+		return len(self.triangles)
+
+
+class ModelArrays:
+	'''
+	Everything needed to import a single jms worth of model into a scene.
+
+	meshes holds one RegionMesh per region, in the order of regions.
+	problems holds the amount of every problem that was fixed in the
+	geometry, see core.validation.
+	'''
+	__slots__ = ('name', 'perm_name', 'lod_level', 'nodes', 'markers',
+		'materials', 'regions', 'meshes', 'problems')
+
+	def __init__(self, name="", perm_name="", lod_level="superhigh",
+			nodes=None, markers=None, materials=(), regions=(), meshes=(),
+			problems=None):
+		self.name = name
+		self.perm_name = perm_name
+		self.lod_level = lod_level
+		self.nodes = nodes if nodes is not None else NodeArrays()
+		self.markers = markers if markers is not None else MarkerArrays()
+		self.materials = list(materials)
+		self.regions = list(regions)
+		self.meshes = list(meshes)
+		self.problems = dict(problems or {})
+
+
+class BspArrays:
+	'''
+	The render geometry of a scenario_structure_bsp.
+
+	materials holds the shader names the material indices of the chunks
+	refer to. chunks holds RegionMeshes of a bounded size, see core.bsp,
+	or an iterator of them when the bsp was read lazily. chunk_count is how
+	many there are, or about how many in the lazy case. problems holds the
+	amount of every problem that was fixed in the geometry, like in
+	ModelArrays.
+	'''
+	__slots__ = ('name', 'materials', 'chunks', 'chunk_count', 'problems')
+
+	def __init__(self, name="", materials=(), chunks=(), problems=None,
+			chunk_count=None):
+		self.name = name
+		self.materials = list(materials)
+		self.chunks = list(chunks)
+		self.chunk_count = (len(self.chunks)
+			if chunk_count is None else chunk_count)
+		self.problems = dict(problems or {})
+
+
+class CollisionMesh:
+	'''
+	The polygons of one permutation of one node of a collision model.
+
+	positions     (V, 3) float32   vertex positions relative to the node.
+	loop_vertices (L,)   int32     the vertex of every polygon corner.
+	loop_starts   (P,)   int32     the first loop of every polygon.
+	loop_totals   (P,)   int32     the amount of loops of every polygon.
+	materials     (P,)   int32     collision material index of each polygon.
+	flags         (P,)   int32     the surface flags of each polygon.
+	'''
+	__slots__ = ('name', 'node', 'permutation', 'positions', 'loop_vertices',
+		'loop_starts', 'loop_totals', 'materials', 'flags')
+
+	def __init__(self, name, node, permutation, positions, loop_vertices,
+			loop_starts, loop_totals, materials, flags):
+		self.name = name
+		self.node = node
+		self.permutation = permutation
+		self.positions = positions
+		self.loop_vertices = loop_vertices
+		self.loop_starts = loop_starts
+		self.loop_totals = loop_totals
+		self.materials = materials
+		self.flags = flags
+
+	@property
+	def vertex_count(self):
+		return len(self.positions)
+
+	@property
+	def polygon_count(self):
+		return len(self.loop_totals)
+
+
+class CollisionArrays:
+	'''
+	The geometry of a model_collision_geometry tag.
+
+	materials holds the names of the collision materials, node_names the
+	names of the nodes the meshes belong to. meshes holds a CollisionMesh
+	for every permutation of every node that has geometry.
+	'''
+	__slots__ = ('name', 'materials', 'node_names', 'meshes', 'problems')
+
+	def __init__(self, name="", materials=(), node_names=(), meshes=(),
+			problems=None):
+		self.name = name
+		self.materials = list(materials)
+		self.node_names = list(node_names)
+		self.meshes = list(meshes)
+		self.problems = dict(problems or {})
+
+
+class ScenarioArrays:
+	'''
+	The objects placed in a scenario.
+
+	models holds the file paths of the model tags the objects use, objects
+	the names of the object tags, object_models the index into models of
+	every object, or -1 when it has no model. missing holds the tag paths
+	that could not be loaded.
+
+	object_indices (N,)   int32    the object of every placement.
+	positions      (N, 3) float64  placement positions in jms units.
+	rotations      (N, 3) float64  yaw, pitch and roll in radians.
+	'''
+	__slots__ = ('name', 'models', 'objects', 'object_models', 'missing',
+		'object_indices', 'positions', 'rotations')
+
+	def __init__(self, name="", models=(), objects=(), object_models=None,
+			missing=(), object_indices=None, positions=None, rotations=None):
+		self.name = name
+		self.models = list(models)
+		self.objects = list(objects)
+		self.object_models = (np.zeros(0, np.int32)
+			if object_models is None else object_models)
+		self.missing = list(missing)
+		self.object_indices = (np.zeros(0, np.int32)
+			if object_indices is None else object_indices)
+		self.positions = (np.zeros((0, 3), np.float64)
+			if positions is None else positions)
+		self.rotations = (np.zeros((0, 3), np.float64)
+			if rotations is None else rotations)
+
+	def __len__(self):
+		return len(self.object_indices)
+
+
+class AnimationArrays:
+	'''
+	A single animation of a model.
+
+	rotations are (frames, nodes, 4) (i, j, k, w) quaternions, translations
+	are (frames, nodes, 3) and relative to the parent node, like in a jma.
+	scales holds the uniform scale of every node in every frame.
+	'''
+	__slots__ = ('name', 'ext', 'frame_rate', 'node_names',
+		'rotations', 'translations', 'scales')
+
+	def __init__(self, name="", ext=".jma", frame_rate=30, node_names=(),
+			rotations=None, translations=None, scales=None):
+		count = len(node_names)
+		self.name = name
+		self.ext = ext
+		self.frame_rate = frame_rate
+		self.node_names = list(node_names)
+		self.rotations = (np.zeros((0, count, 4), np.float64)
+			if rotations is None else rotations)
+		self.translations = (np.zeros((0, count, 3), np.float64)
+			if translations is None else translations)
+		self.scales = (np.ones((0, count), np.float64)
+			if scales is None else scales)
+
+	@property
+	def frame_count(self):
+		return len(self.rotations)
@@ -0,0 +1,81 @@
+'''
+Parsing many model files at once in a pool of worker processes.
+
+Reclaimer parsing is pure Python and holds the GIL the whole time, so
+threads don't help. Each worker parses a file and sends back the compact
+ModelArrays, which are cheap to pickle compared to the tag or jms objects.
+'''
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .parsing import MODEL_EXTENSIONS, read_halo1model_arrays
+
+def find_model_files(directory, *, recursive=False):
+	'''Returns the sorted paths of all model files in a directory.'''
+	filepaths = []
+	for root, dirs, files in os.walk(directory):
+		for filename in files:
+			if filename.lower().endswith(MODEL_EXTENSIONS):
+				filepaths.append(os.path.join(root, filename))
+		if not recursive:
+			break
+	return sorted(filepaths)
+
+def parse_model_file(filepath):
+	'''
+	Parses a single model file into a list of ModelArrays.
+
+	This is what runs inside of the worker processes.
+	'''
+	return read_halo1model_arrays(filepath)
+
+def iter_parsed_models(filepaths, *, max_workers=None, python_executable=None):
+	'''
+	Parses all filepaths in a process pool and yields a
+	(filepath, models, exception) tuple for every file as soon as it is done.
+
+	Either models or exception is None. One broken file doesn't stop the
+	rest from being parsed. Closing the generator cancels the files that
+	haven't been started on yet.
+
+	python_executable is the Python the workers should run on. Inside of
+	Blender sys.executable may be Blender itself, which can't be used for
+	workers.
+	'''
+	context = multiprocessing.get_context('spawn')
+	if python_executable:
+		context.set_executable(python_executable)
+
+	if max_workers is None or max_workers < 1:
+		max_workers = os.cpu_count() or 1
+	max_workers = min(max_workers, max(1, len(filepaths)))
+
+	pool = ProcessPoolExecutor(max_workers, mp_context=context)
+	futures = {}
+	try:
+		futures = {
+			pool.submit(parse_model_file, filepath): filepath
+			for filepath in filepaths
+		}
+		for future in as_completed(futures):
+			filepath = futures[future]
+			try:
+				yield filepath, future.result(), None
+			except Exception as e:
+				yield filepath, None, e
+	finally:
+		# Closing the generator early, like when an import is cancelled,
+		# drops all files that haven't started parsing yet. Only the ones
+		# that are being parsed right now still finish.
+		for future in futures:
+			future.cancel()
+		shutdown_pool(pool)
+
+def shutdown_pool(pool):
+	'''Shuts down pool without waiting for its workers to finish.'''
+	try:
+		pool.shutdown(wait=False, cancel_futures=True)
+	except TypeError:
+		# cancel_futures only exists since Python 3.9.
+		pool.shutdown(wait=False)
@@ -0,0 +1,241 @@
+'''
+Turns scenario_structure_bsp render geometry into mesh arrays.
+
+The render geometry of a bsp is split up by lightmap, and every lightmap
+by material. Each of those materials has its own block of vertices and a
+run of triangles in the surfaces of the bsp. Those blocks are read
+straight from the tag's raw data with NumPy, and then joined into chunks
+of a bounded amount of triangles, so a whole level doesn't end up as one
+enormous mesh, nor as thousands of tiny ones. Read lazily, only one chunk
+is built at a time, right when the importer gets to it.
+'''
+import numpy as np
+
+from .arrays import BspArrays, RegionMesh
+from .validation import GeometryReport, find_valid_triangles
+
+# The most triangles a chunk gets, unless a single material has more.
+CHUNK_TRIANGLES = 100000
+
+# Bsps are in world units, jms files and the rest of the importer in
+# hundredths of those.
+WORLD_UNITS_TO_JMS = 100.0
+
+# The vertex layouts of the uncompressed_vertices raw data. Unlike the rest
+# of the tag these are little endian. The lightmap vertices of a material
+# come right after its render vertices.
+RENDER_VERTEX = np.dtype([
+	('position', '<f4', 3),
+	('normal', '<f4', 3),
+	('binormal', '<f4', 3),
+	('tangent', '<f4', 3),
+	('uv', '<f4', 2),
+])
+LIGHTMAP_VERTEX = np.dtype([
+	('normal', '<f4', 3),
+	('uv', '<f4', 2),
+])
+# The surfaces are three big endian shorts each.
+SURFACE = np.dtype('>i2')
+
+def flip_uvs(uvs):
+	'''Halo's v runs top to bottom, Blender's bottom to top.'''
+	uvs = np.array(uvs, np.float32)
+	uvs[:, 1] = 1.0 - uvs[:, 1]
+	return uvs
+
+def surface_array(tagdata):
+	'''
+	Returns the (S, 3) int32 surfaces of a bsp, from either the raw data of
+	a fast_sbsp_def tag or the parsed surfaces of an sbsp_def one.
+	'''
+	# fast_sbsp_def calls them surface.
+	surfaces = getattr(tagdata, 'surfaces', None) or tagdata.surface
+	data = surfaces.STEPTREE
+	if isinstance(data, (bytes, bytearray)):
+		return np.frombuffer(data, SURFACE).reshape(-1, 3).astype(np.int32)
+	return np.array([(s.a, s.b, s.c) for s in data], np.int32).reshape(-1, 3)
+
+def section_arrays(material, surfaces, report=None):
+	'''
+	Unpacks the vertices and triangles of one lightmap material.
+
+	surfaces are all surfaces of the bsp, as surface_array returns them.
+	Returns a dict with the positions, normals, uvs, lightmap_uvs and
+	triangles of the material, or None if its vertex data is missing. The
+	triangles index the vertices of the material itself. lightmap_uvs is
+	None when the material has no lightmap vertices.
+	'''
+	vertex_count = material.vertices_count
+	lightmap_count = material.lightmap_vertices_count
+	# A view, copying the raw data of a whole level adds up.
+	raw = memoryview(material.uncompressed_vertices.STEPTREE).cast('B')
+
+	render_size = vertex_count * RENDER_VERTEX.itemsize
+	if len(raw) < render_size:
+		# Xbox bsps only have compressed vertices.
+		if report is not None:
+			report.add('missing_vertex_data', 1)
+		return None
+	vertices = np.frombuffer(raw, RENDER_VERTEX, vertex_count)
+
+	lightmap_uvs = None
+	if (lightmap_count == vertex_count and len(raw)
+			>= render_size + lightmap_count * LIGHTMAP_VERTEX.itemsize):
+		lightmap_uvs = flip_uvs(np.frombuffer(raw, LIGHTMAP_VERTEX,
+			lightmap_count, offset=render_size)['uv'])
+
+	start = material.surfaces
+	# Halo winds its triangles the other way around.
+	triangles = surfaces[start:start + material.surface_count, ::-1]
+	keep = find_valid_triangles(triangles, vertex_count, report)
+
+	positions = vertices['position'] * np.float32(WORLD_UNITS_TO_JMS)
+	return {
+		'positions': np.nan_to_num(positions),
+		'normals': np.nan_to_num(vertices['normal']),
+		'uvs': flip_uvs(np.nan_to_num(vertices['uv'])),
+		'lightmap_uvs': lightmap_uvs,
+		'triangles': np.ascontiguousarray(triangles[keep], np.int32),
+	}
+
+def iter_bsp_sections(tagdata, report=None):
+	'''
+	Yields a (material index, section_arrays dict) pair for every material
+	of every lightmap of a bsp, in the order they are stored in. The
+	material index refers to the shader names bsp_shader_names returns.
+	'''
+	surfaces = surface_array(tagdata)
+	shader_indices = {
+		path: i for i, path in enumerate(bsp_shader_paths(tagdata))}
+	for lightmap in tagdata.lightmaps.STEPTREE:
+		for material in lightmap.materials.STEPTREE:
+			section = section_arrays(material, surfaces, report)
+			if section is not None:
+				yield shader_indices[material.shader.filepath], section
+
+def bsp_shader_paths(tagdata):
+	'''Returns the tag paths of the shaders of a bsp, in order of first use.'''
+	paths = {}
+	for lightmap in tagdata.lightmaps.STEPTREE:
+		for material in lightmap.materials.STEPTREE:
+			paths.setdefault(material.shader.filepath, None)
+	return list(paths)
+
+def bsp_shader_names(tagdata):
+	'''
+	Returns the names of the shaders of a bsp, in order of first use.
+	Only the last part of their tag path is used, like in jms files.
+	'''
+	return [path.replace('\\', '/').split('/')[-1]
+		for path in bsp_shader_paths(tagdata)]
+
+def join_sections(sections, *, name=""):
+	'''
+	Joins a list of (material index, section_arrays dict) pairs into a
+	single unskinned RegionMesh.
+	'''
+	offsets = np.cumsum([0] + [len(s['positions']) for i, s in sections])
+	vertex_count = int(offsets[-1])
+
+	def loops(section, attribute):
+		return section[attribute][section['triangles']].reshape(-1,
+			section[attribute].shape[1])
+
+	loop_lightmap_uvs = None
+	if any(section['lightmap_uvs'] is not None for i, section in sections):
+		loop_lightmap_uvs = np.concatenate([
+			loops(section, 'lightmap_uvs')
+			if section['lightmap_uvs'] is not None
+			else np.zeros((section['triangles'].size, 2), np.float32)
+			for i, section in sections
+		])
+
+	return RegionMesh(
+		name=name,
+		positions=np.concatenate([s['positions'] for i, s in sections]),
+		triangles=np.concatenate([
+			s['triangles'] + np.int32(offset)
+			for (i, s), offset in zip(sections, offsets)
+		]).astype(np.int32).reshape(-1, 3),
+		materials=np.concatenate([
+			np.full(len(s['triangles']), i, np.int32) for i, s in sections]),
+		loop_normals=np.concatenate([loops(s, 'normals') for i, s in sections]),
+		loop_uvs=np.concatenate([loops(s, 'uvs') for i, s in sections]),
+		vertex_map=np.arange(vertex_count, dtype=np.int32),
+		skin_nodes=np.full((vertex_count, 2), -1, np.int32),
+		skin_weights=np.zeros((vertex_count, 2), np.float32),
+		validated=True,
+		loop_lightmap_uvs=loop_lightmap_uvs,
+	)
+
+def iter_bsp_chunks(sections, *, name="", chunk_triangles=CHUNK_TRIANGLES):
+	'''
+	Joins the sections iter_bsp_sections yields into RegionMeshes of at most
+	chunk_triangles triangles each. Neighbouring sections end up in the
+	same chunk, and sections are never split, so a section with more
+	triangles than that gets a chunk of its own.
+
+	The chunks are named name:0, name:1 and so on.
+	'''
+	pending = []
+	pending_triangles = 0
+	index = 0
+	for section in sections:
+		triangle_count = len(section[1]['triangles'])
+		if pending and pending_triangles + triangle_count > chunk_triangles:
+			yield join_sections(pending, name='%s:%d' % (name, index))
+			index += 1
+			pending = []
+			pending_triangles = 0
+		pending.append(section)
+		pending_triangles += triangle_count
+
+	if pending:
+		yield join_sections(pending, name='%s:%d' % (name, index))
+
+def count_bsp_chunks(tagdata, *, chunk_triangles=CHUNK_TRIANGLES):
+	'''
+	Returns how many chunks iter_bsp_chunks makes of a bsp, going by the
+	triangle counts of its materials alone. Materials without vertex data
+	and invalid triangles are only found while building the chunks, so
+	there can end up being fewer.
+	'''
+	count = 0
+	pending_triangles = 0
+	for lightmap in tagdata.lightmaps.STEPTREE:
+		for material in lightmap.materials.STEPTREE:
+			triangle_count = material.surface_count
+			if pending_triangles and (pending_triangles + triangle_count
+					> chunk_triangles):
+				count += 1
+				pending_triangles = 0
+			pending_triangles += triangle_count
+	return count + bool(pending_triangles)
+
+def bsp_arrays_from_tag(tagdata, *, name="", chunk_triangles=CHUNK_TRIANGLES,
+		lazy=False):
+	'''
+	Converts the render geometry of a bsp tag into BspArrays. The triangles
+	are validated on the way, like those of models.
+
+	With lazy set, the chunks of the BspArrays are an iterator that builds
+	them one at a time, and its problems only fill up as they are built.
+	'''
+	report = GeometryReport()
+	chunks = iter_bsp_chunks(iter_bsp_sections(tagdata, report),
+		name=name, chunk_triangles=chunk_triangles)
+	if not lazy:
+		return BspArrays(
+			name=name,
+			materials=bsp_shader_names(tagdata),
+			chunks=chunks,
+			problems=report.counts)
+
+	bsp = BspArrays(
+		name=name,
+		materials=bsp_shader_names(tagdata),
+		chunk_count=count_bsp_chunks(tagdata, chunk_triangles=chunk_triangles))
+	bsp.chunks = chunks
+	bsp.problems = report.counts
+	return bsp
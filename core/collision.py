@@ -0,0 +1,174 @@
+'''
+Turns the bsps of model_collision_geometry tags into polygon arrays.
+
+Collision bsps store their surfaces as a winged edge structure: every
+surface only knows its first edge, and every edge knows the surfaces on
+both of its sides and the next edge around each of them. Getting the
+corners of a surface means walking around it edge by edge.
+
+Instead of walking one surface at a time, surface_polygons takes one step
+around all surfaces at once, for as many steps as the largest surface
+has sides. That keeps the Python loop as short as the longest polygon,
+no matter how many surfaces there are.
+'''
+import numpy as np
+
+from .arrays import CollisionArrays, CollisionMesh
+from .validation import GeometryReport
+
+# The most sides a surface can have before it counts as not closing.
+MAX_SIDES = 256
+
+# Collision models are in world units, like bsps.
+WORLD_UNITS_TO_JMS = 100.0
+
+# The layouts of the raw reflexives of fast_coll_def, all big endian.
+SURFACE = np.dtype([
+	('plane', '>i4'),
+	('first_edge', '>i4'),
+	('flags', 'u1'),
+	('breakable_surface', 'i1'),
+	('material', '>i2'),
+])
+EDGE = np.dtype([
+	('start_vertex', '>i4'),
+	('end_vertex', '>i4'),
+	('forward_edge', '>i4'),
+	('reverse_edge', '>i4'),
+	('left_surface', '>i4'),
+	('right_surface', '>i4'),
+])
+VERTEX = np.dtype([
+	('position', '>f4', 3),
+	('first_edge', '>i4'),
+])
+
+def raw_array(reflexive, dtype):
+	'''Returns the raw data of a raw reflexive as a structured array.'''
+	data = reflexive.STEPTREE
+	return np.frombuffer(data, dtype, len(data) // dtype.itemsize)
+
+def surface_polygons(surfaces, edges, vertex_count, report=None):
+	'''
+	Walks the edges of every surface to find its corners.
+
+	surfaces and edges are structured arrays like those of SURFACE and
+	EDGE. On the left side of an edge the walk goes on with its forward
+	edge and the corner is its start vertex, on the right side with its
+	reverse edge and its end vertex.
+
+	Returns the corners of all polygons after one another, the amount of
+	corners of every polygon, and a mask of the surfaces they belong to.
+	Surfaces that don't close within MAX_SIDES steps, or that run into
+	edges or vertices that don't exist, are left out and counted as open
+	surfaces in report if one is given.
+	'''
+	surface_count = len(surfaces)
+	edge_count = len(edges)
+	index = np.arange(surface_count)
+
+	first = surfaces['first_edge'].astype(np.int64)
+	current = first.copy()
+	active = (first >= 0) & (first < edge_count)
+	broken = ~active
+	closed = np.zeros(surface_count, bool)
+
+	starts = edges['start_vertex'].astype(np.int64)
+	ends = edges['end_vertex'].astype(np.int64)
+	forward = edges['forward_edge'].astype(np.int64)
+	reverse = edges['reverse_edge'].astype(np.int64)
+	left = edges['left_surface'].astype(np.int64)
+	right = edges['right_surface'].astype(np.int64)
+
+	corners = []
+	for step in range(MAX_SIDES):
+		if not active.any():
+			break
+		edge = np.where(active, current, 0)
+		on_left = left[edge] == index
+		on_right = right[edge] == index
+		vertex = np.where(on_left, starts[edge], ends[edge])
+		following = np.where(on_left, forward[edge], reverse[edge])
+
+		# Edges that don't border the surface at all, or lead nowhere.
+		wrong = active & (~(on_left | on_right)
+			| (vertex < 0) | (vertex >= vertex_count)
+			| (following < 0) | (following >= edge_count))
+		broken |= wrong
+		active &= ~wrong
+
+		corners.append(np.where(active, vertex, -1))
+		done = active & (following == first)
+		closed |= done
+		active &= ~done
+		current = following
+
+	corners = (np.stack(corners, axis=1) if corners
+		else np.empty((surface_count, 0), np.int64))
+	totals = np.count_nonzero(corners >= 0, axis=1)
+	keep = closed & ~broken & (totals >= 3)
+
+	if report is not None:
+		report.add('open_surfaces', surface_count - np.count_nonzero(keep))
+
+	# Row by row, so every polygon's corners stay together and in order.
+	kept = corners[keep]
+	return (kept[kept >= 0].astype(np.int32), totals[keep].astype(np.int32),
+		keep)
+
+def collision_mesh(bsp, *, name="", node=0, permutation="", report=None):
+	'''
+	Converts one permutation bsp of a fast_coll_def node into a
+	CollisionMesh, with only the vertices its polygons use.
+	'''
+	surfaces = raw_array(bsp.surfaces, SURFACE)
+	edges = raw_array(bsp.edges, EDGE)
+	vertices = raw_array(bsp.vertices, VERTEX)
+
+	loop_vertices, loop_totals, keep = surface_polygons(surfaces, edges,
+		len(vertices), report)
+	used, loop_vertices = np.unique(loop_vertices, return_inverse=True)
+
+	positions = vertices['position'][used] * np.float32(WORLD_UNITS_TO_JMS)
+	return CollisionMesh(
+		name=name,
+		node=node,
+		permutation=permutation,
+		positions=np.nan_to_num(positions).astype(np.float32),
+		loop_vertices=loop_vertices.astype(np.int32).ravel(),
+		loop_starts=(np.cumsum(loop_totals) - loop_totals).astype(np.int32),
+		loop_totals=loop_totals,
+		materials=surfaces['material'][keep].astype(np.int32),
+		flags=surfaces['flags'][keep].astype(np.int32),
+	)
+
+def collision_arrays_from_tag(tagdata, *, name=""):
+	'''
+	Converts every permutation of every node of a fast_coll_def tag into
+	CollisionArrays. The meshes are named name:node:permutation.
+	'''
+	report = GeometryReport()
+	regions = tagdata.regions.STEPTREE
+	nodes = tagdata.nodes.STEPTREE
+
+	meshes = []
+	for node_index, node in enumerate(nodes):
+		permutations = ()
+		if 0 <= node.region < len(regions):
+			permutations = regions[node.region].permutations.STEPTREE
+
+		for i, bsp in enumerate(node.bsps.STEPTREE):
+			permutation = (permutations[i].name
+				if i < len(permutations) else str(i))
+			mesh = collision_mesh(bsp,
+				name='%s:%s:%s' % (name, node.name, permutation),
+				node=node_index, permutation=permutation, report=report)
+			if mesh.polygon_count:
+				meshes.append(mesh)
+
+	return CollisionArrays(
+		name=name,
+		materials=[material.name for material in tagdata.materials.STEPTREE],
+		node_names=[node.name for node in nodes],
+		meshes=meshes,
+		problems=report.counts)
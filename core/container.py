@@ -0,0 +1,255 @@
+'''
+A binary container for ModelArrays and AnimationArrays that loads without
+parsing anything.
+
+Reading a tag or a jms means building a lot of Python objects, only to turn
+them into arrays in the end. A container stores those arrays as they are,
+so read_container only has to map the file into memory and point NumPy
+arrays at it. Nothing is copied until it is used, and the arrays can go
+straight into foreach_set.
+
+scripts/containers.py converts whole tag trees to containers, which the
+importers and scripts/convert.py then read instead of the tags.
+
+Layout of a container, everything little-endian:
+
+	offset 0     header, 32 bytes
+	               8s  MAGIC
+	               I   VERSION of the format
+	               I   reserved, 0
+	               Q   offset of the table of contents
+	               Q   size of the table of contents in bytes
+	offset 64    the data of every array, each one starting at a multiple
+	             of ALIGNMENT bytes, C-contiguous
+	toc          the table of contents as UTF-8 JSON
+
+The table of contents is an object with:
+
+	kind         'model' or 'animations'.
+	arrays       [offset, dtype, shape] of every array, like
+	             [64, "<f4", [120, 3]].
+	objects      the list of ModelArrays or AnimationArrays. Every object
+	             of core.arrays is {"class": name, "fields": {slot: value}},
+	             an array is {"array": index into arrays}, a dict is
+	             {"dict": {key: value}}, and lists, strings, numbers and
+	             null are themselves.
+'''
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from . import arrays
+
+MAGIC = b'KRIEGARR'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQ')
+# Where the array data starts, and what every array is aligned to. 64 bytes
+# is a cache line, and enough for any SIMD load.
+ALIGNMENT = 64
+
+CONTAINER_EXTENSION = '.krieg'
+KINDS = ('model', 'animations')
+
+# The classes a container may hold, by name.
+ARRAY_CLASSES = {cls.__name__: cls for cls in (
+	arrays.NodeArrays,
+	arrays.MarkerArrays,
+	arrays.RegionMesh,
+	arrays.ModelArrays,
+	arrays.AnimationArrays,
+)}
+
+def aligned(offset):
+	return -(-offset // ALIGNMENT) * ALIGNMENT
+
+class _Encoder:
+	'''Turns objects into the table of contents and collects their arrays.'''
+
+	def __init__(self):
+		self.arrays = []
+		self.entries = []
+		self.size = ALIGNMENT
+
+	def encode(self, value):
+		if isinstance(value, np.ndarray):
+			return {'array': self.add_array(value)}
+		if ARRAY_CLASSES.get(type(value).__name__) is type(value):
+			return {'class': type(value).__name__, 'fields': {
+				slot: self.encode(getattr(value, slot))
+				for slot in type(value).__slots__
+			}}
+		if isinstance(value, dict):
+			return {'dict': {str(key): self.encode(item)
+				for key, item in value.items()}}
+		if isinstance(value, (list, tuple)):
+			return [self.encode(item) for item in value]
+		if isinstance(value, np.generic):
+			return value.item()
+		if value is None or isinstance(value, (str, int, float, bool)):
+			return value
+		raise TypeError('Can\'t store %s in a container.'
+			% type(value).__name__)
+
+	def add_array(self, array):
+		if array.dtype.hasobject:
+			raise TypeError('Can\'t store object arrays in a container.')
+		array = np.ascontiguousarray(
+			array.astype(array.dtype.newbyteorder('<'), copy=False))
+		offset = aligned(self.size)
+		self.arrays.append((offset, array))
+		self.entries.append([offset, array.dtype.str, list(array.shape)])
+		self.size = offset + array.nbytes
+		return len(self.entries) - 1
+
+
+def write_container(filepath, kind, objects):
+	'''
+	Writes the list of ModelArrays or AnimationArrays objects to a
+	container at filepath. kind is 'model' or 'animations'.
+
+	The container is written next to filepath first and then moved there,
+	so a reader never sees half of one.
+	'''
+	if kind not in KINDS:
+		raise ValueError('Unknown container kind %r.' % kind)
+
+	encoder = _Encoder()
+	toc = json.dumps({
+		'kind': kind,
+		'objects': encoder.encode(list(objects)),
+		'arrays': encoder.entries,
+	}, separators=(',', ':')).encode('utf-8')
+	toc_offset = aligned(encoder.size)
+
+	temp_path = filepath + '.tmp'
+	with open(temp_path, 'wb') as container:
+		container.write(HEADER.pack(MAGIC, VERSION, 0, toc_offset, len(toc)))
+		for offset, array in encoder.arrays:
+			if array.size:
+				container.seek(offset)
+				container.write(memoryview(array).cast('B'))
+		container.seek(toc_offset)
+		container.write(toc)
+	os.replace(temp_path, filepath)
+
+def read_container(filepath):
+	'''
+	Reads a container and returns its kind and its list of objects.
+
+	The arrays of the objects are views into a copy-on-write memory map of
+	the file, so nothing is read until it is used, and changing them never
+	changes the file. The map stays open for as long as any of the arrays
+	is alive.
+	'''
+	with open(filepath, 'rb') as container:
+		header = container.read(HEADER.size)
+		if len(header) < HEADER.size:
+			raise ValueError('Not a Blendkrieg container: ' + filepath)
+		magic, version, reserved, toc_offset, toc_size = HEADER.unpack(header)
+		if magic != MAGIC:
+			raise ValueError('Not a Blendkrieg container: ' + filepath)
+		if version > VERSION:
+			raise ValueError('Container version %d is newer than this '
+				'Blendkrieg can read: %s' % (version, filepath))
+
+		container.seek(toc_offset)
+		toc = json.loads(container.read(toc_size).decode('utf-8'))
+		data = mmap.mmap(container.fileno(), 0, access=mmap.ACCESS_COPY)
+
+	views = [
+		np.frombuffer(data, np.dtype(dtype),
+			count=int(np.prod(shape, dtype=np.int64)), offset=offset
+		).reshape(shape)
+		if np.prod(shape) else np.zeros(shape, np.dtype(dtype))
+		for offset, dtype, shape in toc['arrays']
+	]
+	return toc['kind'], _decode(toc['objects'], views)
+
+def _decode(value, views):
+	if isinstance(value, list):
+		return [_decode(item, views) for item in value]
+	if not isinstance(value, dict):
+		return value
+	if 'array' in value:
+		return views[value['array']]
+	if 'dict' in value:
+		return {key: _decode(item, views)
+			for key, item in value['dict'].items()}
+
+	cls = ARRAY_CLASSES[value['class']]
+	obj = cls.__new__(cls)
+	for slot in cls.__slots__:
+		setattr(obj, slot, _decode(value['fields'].get(slot), views))
+	return obj
+
+def read_container_objects(filepath, kind):
+	'''
+	Returns the objects of a container, and raises a ValueError if it
+	doesn't hold the kind that is expected.
+	'''
+	found, objects = read_container(filepath)
+	if found != kind:
+		raise ValueError('%s holds %s, not %s.' % (filepath, found, kind))
+	return objects
+
+def container_source_path(filepath):
+	'''
+	Returns the path of the file a container was converted from, going by
+	its name, like foo.gbxmodel for foo.gbxmodel.krieg.
+	'''
+	if filepath.lower().endswith(CONTAINER_EXTENSION):
+		return filepath[:-len(CONTAINER_EXTENSION)]
+	return filepath
+
+def convert_to_container(filepath, output=None, *, loader=None):
+	'''
+	Reads a gbxmodel, model, jms, model_animations or jma file and writes
+	its arrays to a container at output, or next to it. Returns the path
+	of the container.
+
+	The container next to it keeps the extension of the file, like
+	foo.gbxmodel.krieg, so a model and its animations don't end up with
+	the same container.
+	'''
+	from .parsing import (MODEL_EXTENSIONS, read_halo1anim_arrays,
+		read_halo1model_arrays)
+
+	if filepath.lower().endswith(MODEL_EXTENSIONS):
+		kind = 'model'
+		objects = read_halo1model_arrays(filepath, loader=loader)
+	else:
+		kind = 'animations'
+		objects = read_halo1anim_arrays(filepath, loader=loader)
+
+	if output is None:
+		output = filepath + CONTAINER_EXTENSION
+	write_container(output, kind, objects)
+	return output
+
+def find_stale_containers(paths, output_directory=None, *, force=False):
+	'''
+	Returns (filepath, container path) pairs of the models and animations
+	in paths, which are files or directories, that have no container yet,
+	or one that is older than them. With force set, all of them.
+
+	The containers go next to the files, or into output_directory under
+	the same relative paths.
+	'''
+	from .scheduler import find_convert_files
+
+	stale = []
+	for filepath, relative_path in find_convert_files(paths):
+		if filepath.lower().endswith(CONTAINER_EXTENSION):
+			continue
+		if output_directory is None:
+			output = filepath + CONTAINER_EXTENSION
+		else:
+			output = os.path.join(output_directory,
+				relative_path + CONTAINER_EXTENSION)
+		if (force or not os.path.isfile(output)
+				or os.path.getmtime(output) < os.path.getmtime(filepath)):
+			stale.append((filepath, output))
+	return stale
@@ -0,0 +1,253 @@
+'''
+A long lived helper process for parsing Halo 1 files.
+
+Building reclaimer's tag definitions takes a while, and every fresh process
+has to do it again. The parse daemon builds them once and then keeps
+parsing files for as long as it is used. It sends back the compact arrays
+through shared memory, so only a small message goes through the pipe.
+
+The daemon is started on first use and quits by itself after it has been
+idle for a while. It is a daemonic child process, so it never outlives the
+process that started it.
+'''
+import multiprocessing
+import pickle
+import threading
+
+try:
+	from multiprocessing import shared_memory
+except ImportError:
+	# Shared memory only exists since Python 3.8.
+	shared_memory = None
+
+from .parsing import (read_halo1anim_arrays, read_halo1bsp_arrays,
+	read_halo1collision_arrays, read_halo1model_arrays)
+
+# Seconds the daemon waits for a request before it quits.
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+# The requests the daemon understands.
+PARSERS = {
+	'model': read_halo1model_arrays,
+	'animations': read_halo1anim_arrays,
+	'bsp': read_halo1bsp_arrays,
+	'collision': read_halo1collision_arrays,
+}
+
+def is_supported():
+	'''Returns whether this Python can run the parse daemon.'''
+	return shared_memory is not None
+
+def dump_to_shared_memory(obj):
+	'''
+	Pickles obj with all of its array data in a new shared memory block.
+
+	Returns the block and the message that load_from_shared_memory needs
+	to rebuild obj. The block is None when obj has no array data.
+	The caller owns the block, and has to close and unlink it once the
+	message has been loaded.
+	'''
+	buffers = []
+	data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+	buffers = [buffer.raw() for buffer in buffers]
+
+	spans = []
+	offset = 0
+	for buffer in buffers:
+		spans.append((offset, buffer.nbytes))
+		offset += buffer.nbytes
+
+	if not offset:
+		return None, (data, None, [bytes(buffer) for buffer in buffers])
+
+	block = shared_memory.SharedMemory(create=True, size=offset)
+	for buffer, (start, size) in zip(buffers, spans):
+		block.buf[start:start + size] = buffer
+	return block, (data, block.name, spans)
+
+def load_from_shared_memory(message):
+	'''
+	Rebuilds an object from a message made by dump_to_shared_memory.
+
+	The arrays are copied out of shared memory, so the block can be
+	released as soon as this returns.
+	'''
+	data, name, spans = message
+	if name is None:
+		return pickle.loads(data, buffers=spans)
+
+	# The daemon shares our resource tracker, so attaching here doesn't take
+	# ownership of the block away from it.
+	block = shared_memory.SharedMemory(name=name)
+	try:
+		buffers = [
+			bytearray(block.buf[start:start + size]) for start, size in spans
+		]
+		return pickle.loads(data, buffers=buffers)
+	finally:
+		block.close()
+
+def serve(connection, idle_timeout):
+	'''
+	The main loop of the daemon process.
+
+	Each request is a (kind, filepath) tuple. The reply is ('ok', message)
+	or ('error', exception). After an ok reply the daemon waits for the
+	client to say it is done with the shared memory before it frees it.
+	'''
+	# Warm up everything the parsers need.
+	from reclaimer.hek.defs.mod2 import mod2_def
+	from reclaimer.hek.defs.mode import mode_def
+	from reclaimer.hek.defs.antr import antr_def
+	from reclaimer.model.model_decompilation import extract_model
+	from reclaimer.animation.animation_decompilation import extract_model_animations
+
+	while connection.poll(idle_timeout):
+		try:
+			kind, filepath = connection.recv()
+		except EOFError:
+			# Whoever started us is gone.
+			break
+
+		try:
+			result = PARSERS[kind](filepath)
+			block, message = dump_to_shared_memory(result)
+		except Exception as e:
+			send_error(connection, e)
+			continue
+
+		try:
+			connection.send(('ok', message))
+			# Wait until the client has copied the arrays.
+			connection.recv()
+		except (EOFError, OSError):
+			break
+		finally:
+			if block is not None:
+				block.close()
+				block.unlink()
+
+	connection.close()
+
+def send_error(connection, exception):
+	'''Sends an exception to the client, even one that doesn't pickle.'''
+	try:
+		connection.send(('error', exception))
+	except Exception:
+		connection.send(('error', RuntimeError(repr(exception))))
+
+
+class ParseDaemon:
+	'''
+	The client side of a parse daemon.
+
+	The process is started when the first file is parsed, and started again
+	if it idled out in the meantime. This can be used from multiple threads.
+	'''
+	def __init__(self, *, python_executable=None,
+			idle_timeout=DEFAULT_IDLE_TIMEOUT):
+		self.python_executable = python_executable
+		self.idle_timeout = idle_timeout
+		self._process = None
+		self._connection = None
+		self._lock = threading.Lock()
+
+	@property
+	def is_alive(self):
+		return self._process is not None and self._process.is_alive()
+
+	def start(self):
+		'''Starts the daemon process if it isn't running.'''
+		if self.is_alive:
+			return
+		self._stop()
+
+		context = multiprocessing.get_context('spawn')
+		if self.python_executable:
+			context.set_executable(self.python_executable)
+
+		self._connection, child_connection = context.Pipe()
+		self._process = context.Process(
+			target=serve, args=(child_connection, self.idle_timeout),
+			name='blendkrieg-parse-daemon', daemon=True)
+		self._process.start()
+		child_connection.close()
+
+	def parse_model(self, filepath):
+		'''Returns read_halo1model_arrays(filepath), parsed by the daemon.'''
+		return self.request('model', filepath)
+
+	def parse_animations(self, filepath):
+		'''Returns read_halo1anim_arrays(filepath), parsed by the daemon.'''
+		return self.request('animations', filepath)
+
+	def parse_bsp(self, filepath):
+		'''Returns read_halo1bsp_arrays(filepath), parsed by the daemon.'''
+		return self.request('bsp', filepath)
+
+	def parse_collision(self, filepath):
+		'''Returns read_halo1collision_arrays(filepath), parsed by the daemon.'''
+		return self.request('collision', filepath)
+
+	def request(self, kind, filepath):
+		with self._lock:
+			try:
+				reply = self._request(kind, filepath)
+			except (EOFError, OSError):
+				# The daemon idled out right as we asked, try once more.
+				self._stop()
+				reply = self._request(kind, filepath)
+
+		status, value = reply
+		if status == 'error':
+			raise value
+		return value
+
+	def _request(self, kind, filepath):
+		self.start()
+		self._connection.send((kind, filepath))
+		status, value = self._connection.recv()
+		if status != 'ok':
+			return status, value
+
+		try:
+			return status, load_from_shared_memory(value)
+		finally:
+			self._connection.send('done')
+
+	def close(self):
+		'''Stops the daemon process.'''
+		with self._lock:
+			self._stop()
+
+	def _stop(self):
+		if self._connection is not None:
+			self._connection.close()
+			self._connection = None
+		if self._process is not None:
+			self._process.join(1.0)
+			if self._process.is_alive():
+				self._process.terminate()
+			self._process = None
+
+
+# The daemon shared by everything in this process.
+_daemon = None
+
+def get_daemon(*, python_executable=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+	'''
+	Returns the shared ParseDaemon, applying the given settings.
+
+	Changed settings only take effect once the daemon process restarts.
+	'''
+	global _daemon
+	if _daemon is None:
+		_daemon = ParseDaemon()
+	_daemon.python_executable = python_executable
+	_daemon.idle_timeout = idle_timeout
+	return _daemon
+
+def shutdown_daemon():
+	'''Stops the shared daemon, if it is running.'''
+	if _daemon is not None:
+		_daemon.close()
@@ -0,0 +1,313 @@
+'''
+Turns jms geometry into compact mesh arrays.
+
+All of the arrays made here are unscaled jms units. Scaling is left to
+whatever builds the final mesh, so the same arrays can be imported at any
+scale.
+'''
+import itertools
+
+import numpy as np
+
+from .arrays import MarkerArrays, ModelArrays, NodeArrays, RegionMesh
+from .validation import find_valid_triangles, validate_geometry
+
+# Amount of values unpacked per JmsVertex by vertex_arrays.
+_VERTEX_FIELDS = 11
+
+def vertex_arrays(verts):
+	'''
+	Unpacks a list of JmsVertex objects into arrays.
+
+	Returns a dict with the positions, normals, uvs, skin_nodes and
+	skin_weights of all vertices.
+	'''
+	count = len(verts)
+	flat = np.fromiter(
+		itertools.chain.from_iterable(
+			(v.pos_x, v.pos_y, v.pos_z,
+			 v.norm_i, v.norm_j, v.norm_k,
+			 v.tex_u, v.tex_v,
+			 v.node_0, v.node_1, v.node_1_weight)
+			for v in verts
+		),
+		np.float64, count * _VERTEX_FIELDS
+	).reshape(count, _VERTEX_FIELDS)
+
+	skin_nodes, skin_weights = skin_arrays(
+		flat[:, 8].astype(np.int32),
+		flat[:, 9].astype(np.int32),
+		flat[:, 10])
+
+	return {
+		'positions': flat[:, 0:3].astype(np.float32),
+		'normals': flat[:, 3:6].astype(np.float32),
+		'uvs': flat[:, 6:8].astype(np.float32),
+		'skin_nodes': skin_nodes,
+		'skin_weights': skin_weights,
+	}
+
+def skin_arrays(node_0, node_1, node_1_weight):
+	'''
+	Turns the jms skinning data into pairs of nodes and weights per vertex.
+
+	The first node has no weight of its own in jms files. It gets whatever
+	weight is left after the second node, which is all of it when there is
+	no second node. Nodes of -1 get a weight of 0.
+	'''
+	weight_1 = np.where(node_1 != -1, node_1_weight, 0.0)
+	weight_0 = np.where(node_0 != -1, 1.0 - weight_1, 0.0)
+
+	skin_nodes = np.stack((node_0, node_1), axis=1).astype(np.int32)
+	skin_weights = np.stack((weight_0, weight_1), axis=1).astype(np.float32)
+	return skin_nodes, skin_weights
+
+def triangle_arrays(tris):
+	'''
+	Unpacks a list of JmsTriangle objects into arrays.
+
+	Returns a dict with the vertex indices, regions and shaders of all
+	triangles.
+	'''
+	count = len(tris)
+	flat = np.fromiter(
+		itertools.chain.from_iterable(
+			(t.v0, t.v1, t.v2, t.region, t.shader) for t in tris
+		),
+		np.int32, count * 5
+	).reshape(count, 5)
+
+	return {
+		'indices': flat[:, 0:3].copy(),
+		'regions': flat[:, 3].copy(),
+		'shaders': flat[:, 4].copy(),
+	}
+
+def compact_vertices(triangles):
+	'''
+	Finds the vertices used by the triangles and renumbers the triangles to
+	reference a list of only those vertices.
+
+	This is the array version of scene.util.reduce_vertices. The vertices
+	keep the order they had in the source list.
+
+	Returns the source indices of the used vertices and the new triangles.
+	'''
+	triangles = np.asarray(triangles, np.int32).reshape(-1, 3)
+	used, inverse = np.unique(triangles, return_inverse=True)
+	return (used.astype(np.int32),
+		inverse.reshape(triangles.shape).astype(np.int32))
+
+def geometry_arrays_from_jms(jms):
+	'''
+	Unpacks the vertices and triangles of a jms and fixes any problems in
+	them with core.validation.validate_geometry.
+
+	Returns the vertices, the triangles and the GeometryReport.
+	'''
+	return validate_geometry(
+		vertex_arrays(jms.verts), triangle_arrays(jms.tris),
+		material_count=len(jms.materials), node_count=len(jms.nodes))
+
+def region_mesh(vertices, triangles, *, region_filter=(), name="",
+		validated=False):
+	'''
+	Makes a RegionMesh out of the triangles in the regions in region_filter.
+
+	vertices and triangles are the dicts made by vertex_arrays and
+	triangle_arrays. An empty region_filter means all regions. validated
+	says whether they went through validate_geometry.
+	'''
+	indices = triangles['indices']
+	shaders = triangles['shaders']
+	if len(region_filter):
+		mask = np.isin(triangles['regions'], np.asarray(region_filter))
+		indices = indices[mask]
+		shaders = shaders[mask]
+
+	# Loops are the corners of the triangles, so we can look these up
+	# before the vertices get renumbered.
+	corners = indices.ravel()
+	loop_normals = vertices['normals'][corners]
+	loop_uvs = vertices['uvs'][corners]
+
+	vertex_map, new_indices = compact_vertices(indices)
+
+	return RegionMesh(
+		name=name,
+		positions=vertices['positions'][vertex_map],
+		triangles=new_indices,
+		materials=shaders.astype(np.int32),
+		loop_normals=loop_normals,
+		loop_uvs=loop_uvs,
+		vertex_map=vertex_map,
+		skin_nodes=vertices['skin_nodes'][vertex_map],
+		skin_weights=vertices['skin_weights'][vertex_map],
+		validated=validated,
+	)
+
+def region_mesh_from_jms(jms, *, region_filter=(), name=""):
+	'''
+	Makes a validated RegionMesh out of the regions in region_filter of a
+	jms.
+	'''
+	vertices, triangles, report = geometry_arrays_from_jms(jms)
+	return region_mesh(vertices, triangles,
+		region_filter=region_filter, name=name, validated=True)
+
+def combine_region_meshes(regions, *, name=""):
+	'''
+	Joins the RegionMeshes of the regions of one jms into a single one.
+
+	Vertices the regions share in the jms are shared in the result too,
+	found through their vertex_map. Triangles that are a copy of one in an
+	earlier region are dropped, like mesh.validate() would.
+
+	Returns the RegionMesh and the (T,) int32 index into regions of every
+	one of its triangles.
+	'''
+	vertex_maps = [region.vertex_map for region in regions]
+	vertex_map, inverse = np.unique(np.concatenate(vertex_maps),
+		return_inverse=True)
+	inverse = inverse.ravel()
+
+	# Where each vertex is found in the concatenated per region arrays.
+	# Shared vertices have the same data in every region, any copy will do.
+	source = np.empty(len(vertex_map), np.int64)
+	source[inverse] = np.arange(len(inverse))
+
+	offsets = np.cumsum([0] + [len(v) for v in vertex_maps])
+	triangles = np.concatenate([
+		inverse[offset + region.triangles]
+		for offset, region in zip(offsets, regions)
+	]).astype(np.int32).reshape(-1, 3)
+	face_regions = np.concatenate([
+		np.full(region.triangle_count, i, np.int32)
+		for i, region in enumerate(regions)
+	])
+
+	def joined(attribute):
+		return np.concatenate([getattr(region, attribute) for region in regions])
+
+	keep = find_valid_triangles(triangles, len(vertex_map))
+	loop_keep = np.repeat(keep, 3)
+
+	combined = RegionMesh(
+		name=name,
+		positions=joined('positions')[source],
+		triangles=triangles[keep],
+		materials=joined('materials')[keep],
+		loop_normals=joined('loop_normals')[loop_keep],
+		loop_uvs=joined('loop_uvs')[loop_keep],
+		vertex_map=vertex_map.astype(np.int32),
+		skin_nodes=joined('skin_nodes')[source],
+		skin_weights=joined('skin_weights')[source],
+		validated=all(region.validated for region in regions),
+	)
+	return combined, face_regions[keep]
+
+def weld_region_mesh(region):
+	'''
+	Merges the vertices of a RegionMesh that have the same position and
+	skinning.
+
+	Jms files split vertices wherever the normals or uvs change, but those
+	are per loop in a RegionMesh anyway. Welding the copies back together
+	turns the seams into edges, which can then be marked sharp instead.
+
+	The first copy of each vertex is kept, in the original order. Returns
+	the region itself when there is nothing to weld, or when welding would
+	collapse or duplicate triangles, like those of double sided faces.
+	'''
+	keys = np.concatenate((
+		np.ascontiguousarray(region.positions, np.float32).view(np.int32),
+		region.skin_nodes.astype(np.int32),
+		np.ascontiguousarray(region.skin_weights, np.float32).view(np.int32),
+	), axis=1)
+	unique, first, inverse = np.unique(keys, axis=0,
+		return_index=True, return_inverse=True)
+	if len(first) == region.vertex_count:
+		return region
+
+	# np.unique sorts the keys, put the vertices back in their first order.
+	order = np.argsort(first)
+	rank = np.empty_like(order)
+	rank[order] = np.arange(len(order))
+	kept = first[order]
+	triangles = rank[inverse.ravel()][region.triangles].astype(np.int32)
+
+	if not find_valid_triangles(triangles, len(kept)).all():
+		return region
+
+	return RegionMesh(
+		name=region.name,
+		positions=region.positions[kept],
+		triangles=triangles,
+		materials=region.materials,
+		loop_normals=region.loop_normals,
+		loop_uvs=region.loop_uvs,
+		vertex_map=region.vertex_map[kept],
+		skin_nodes=region.skin_nodes[kept],
+		skin_weights=region.skin_weights[kept],
+		validated=region.validated,
+		loop_lightmap_uvs=region.loop_lightmap_uvs,
+	)
+
+def node_arrays(jms_nodes):
+	'''Unpacks a list of JmsNode objects into NodeArrays.'''
+	return NodeArrays(
+		names=[node.name for node in jms_nodes],
+		parents=np.array(
+			[node.parent_index for node in jms_nodes], np.int32),
+		rotations=np.array(
+			[(node.rot_i, node.rot_j, node.rot_k, node.rot_w)
+			 for node in jms_nodes], np.float64).reshape(-1, 4),
+		translations=np.array(
+			[(node.pos_x, node.pos_y, node.pos_z)
+			 for node in jms_nodes], np.float64).reshape(-1, 3),
+	)
+
+def marker_arrays(jms_markers):
+	'''Unpacks a list of JmsMarker objects into MarkerArrays.'''
+	return MarkerArrays(
+		names=[marker.name for marker in jms_markers],
+		permutations=[marker.permutation for marker in jms_markers],
+		regions=np.array(
+			[marker.region for marker in jms_markers], np.int32),
+		parents=np.array(
+			[marker.parent for marker in jms_markers], np.int32),
+		rotations=np.array(
+			[(marker.rot_i, marker.rot_j, marker.rot_k, marker.rot_w)
+			 for marker in jms_markers], np.float64).reshape(-1, 4),
+		translations=np.array(
+			[(marker.pos_x, marker.pos_y, marker.pos_z)
+			 for marker in jms_markers], np.float64).reshape(-1, 3),
+		radii=np.array(
+			[marker.radius for marker in jms_markers], np.float64),
+	)
+
+def model_arrays_from_jms(jms):
+	'''
+	Converts a whole JmsModel into ModelArrays with one RegionMesh per
+	region. The geometry is validated on the way, and the problems that got
+	fixed are kept in the problems of the ModelArrays.
+	'''
+	vertices, triangles, report = geometry_arrays_from_jms(jms)
+
+	meshes = [
+		region_mesh(vertices, triangles, region_filter=(i,), name=region,
+			validated=True)
+		for i, region in enumerate(jms.regions)
+	]
+
+	return ModelArrays(
+		name=jms.name,
+		perm_name=jms.perm_name,
+		lod_level=jms.lod_level,
+		nodes=node_arrays(jms.nodes),
+		markers=marker_arrays(jms.markers),
+		materials=[mat.name for mat in jms.materials],
+		regions=list(jms.regions),
+		meshes=meshes,
+		problems=report.counts,
+	)
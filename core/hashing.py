@@ -0,0 +1,69 @@
+'''
+Content hashes of region geometry, so identical meshes can be shared.
+
+Permutations and lods often reuse regions as they are, and importing a
+model twice gives the exact same regions again. The importer hashes every
+region before building it and links the mesh it already has for a hash
+instead of building a new one.
+
+Floats are quantized before they are hashed, so values that only differ
+by float noise from a different export still hash the same.
+'''
+import hashlib
+
+import numpy as np
+
+# Bump this when what goes into the hash changes, so meshes stored in old
+# .blend files are not reused for geometry they no longer match.
+HASH_VERSION = 1
+
+# Quantization steps. Positions are in jms units, before scaling.
+POSITION_STEP = 1e-4
+NORMAL_STEP = 1e-4
+UV_STEP = 1e-5
+WEIGHT_STEP = 1e-4
+
+def quantize(values, step):
+	'''Rounds floats to the nearest multiple of step, as int64.'''
+	return np.rint(np.asarray(values, np.float64) / step).astype('<i8')
+
+def region_hash(region, *, scale=1.0, materials=(), node_names=(),
+		options=()):
+	'''
+	Returns a hex digest of everything in a RegionMesh that ends up in the
+	mesh datablock made from it.
+
+	That includes the skin weights, because Blender keeps those in the
+	mesh, and the names of the materials and nodes they refer to. options
+	are any other values that change how the mesh gets built, like the
+	normal tolerance. Arrays among them are hashed by their contents.
+	'''
+	digest = hashlib.blake2b(digest_size=16)
+
+	def update(array):
+		array = np.ascontiguousarray(array)
+		digest.update(repr(array.shape).encode())
+		digest.update(array.tobytes())
+
+	def update_strings(strings):
+		digest.update(repr(list(strings)).encode())
+
+	update_strings((HASH_VERSION, float(scale)))
+	for option in options:
+		if isinstance(option, np.ndarray):
+			update(option)
+		else:
+			update_strings((option,))
+	update(quantize(region.positions, POSITION_STEP))
+	update(np.asarray(region.triangles, '<i4'))
+	update(np.asarray(region.materials, '<i4'))
+	update(quantize(region.loop_normals, NORMAL_STEP))
+	update(quantize(region.loop_uvs, UV_STEP))
+	update(np.asarray(region.skin_nodes, '<i4'))
+	update(quantize(region.skin_weights, WEIGHT_STEP))
+	if region.loop_lightmap_uvs is not None:
+		update(quantize(region.loop_lightmap_uvs, UV_STEP))
+	update_strings(materials)
+	update_strings(node_names)
+
+	return digest.hexdigest()
@@ -0,0 +1,578 @@
+'''
+An index of the tags in a tags directory, kept in a SQLite database.
+
+Finding the right model or animation in a tags directory of tens of
+thousands of files shouldn't take an import of each of them. The indexer
+reads the header of every tag to find out what it is, and for models,
+animations, collision and objects it builds the tag to note down what is
+inside: the nodes, regions, permutations, markers, animations, bounds and
+the tags it refers to. That goes into a SQLite database next to the
+modification time of the file, so the next scan only has to look at the
+files that changed.
+
+Tags are built with lean versions of their definitions, see
+summary_definition, so blocks like frame data, collision bsps and vertices
+are only read as bytes.
+
+Nothing in here may depend on Blender.
+'''
+import importlib
+import json
+import os
+import sqlite3
+import struct
+
+import numpy as np
+
+from .tags import TagLoader
+
+# Bump this when the tables change. Older databases are scanned again from
+# scratch.
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tags (
+	path TEXT PRIMARY KEY,
+	fourcc TEXT NOT NULL,
+	mtime_ns INTEGER NOT NULL,
+	size INTEGER NOT NULL,
+	node_count INTEGER,
+	regions TEXT,
+	permutations TEXT,
+	markers TEXT,
+	animations TEXT,
+	bounds TEXT,
+	error TEXT
+);
+CREATE TABLE IF NOT EXISTS dependencies (
+	path TEXT NOT NULL,
+	dependency TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dependencies_by_path ON dependencies (path);
+CREATE INDEX IF NOT EXISTS dependencies_by_dependency
+	ON dependencies (dependency);
+'''
+
+# The first 64 bytes of every tag file. The tag class and the engine id are
+# all the indexer needs from it.
+TAG_HEADER = struct.Struct('>36x4s20x4s')
+ENGINE_ID = b'blam'
+
+# Groups of tag classes, for searching.
+MODEL_FOURCCS = ('mod2', 'mode')
+ANIMATION_FOURCCS = ('antr',)
+COLLISION_FOURCCS = ('coll',)
+# Objects only get their dependencies recorded.
+OBJECT_FOURCCS = ('scen', 'bipd', 'vehi', 'eqip', 'weap', 'mach', 'ctrl',
+	'lifi', 'garb', 'proj', 'ssce', 'plac')
+
+# The definitions summary_definition starts from, when they aren't the
+# usual <fourcc>_def. The fast ones keep the vertex data raw.
+SUMMARY_DEFINITIONS = {
+	'mod2': ('mod2', 'fast_mod2_def'),
+	'mode': ('mode', 'fast_mode_def'),
+	'coll': ('coll', 'fast_coll_def'),
+}
+
+# The sizes of uncompressed and compressed model vertices. Both start with
+# their position as three big endian floats.
+MODEL_VERTEX_SIZES = {'uncompressed_vertices': 68, 'compressed_vertices': 32}
+
+# Bounds and other positions are in world units in tags and jms units here.
+WORLD_UNITS_TO_JMS = 100.0
+
+def read_tag_header(filepath):
+	'''
+	Returns the tag class of a tag file as a string, like 'mod2', or None if
+	the file isn't a Halo 1 tag.
+	'''
+	with open(filepath, 'rb') as tag_file:
+		header = tag_file.read(TAG_HEADER.size)
+	if len(header) < TAG_HEADER.size:
+		return None
+	fourcc, engine_id = TAG_HEADER.unpack(header)
+	if engine_id != ENGINE_ID:
+		return None
+	return fourcc.decode('latin-1')
+
+def library_path(filepath, tags_directory):
+	'''Returns the path of a file relative to the tags directory, / separated.'''
+	return os.path.relpath(filepath, tags_directory).replace(os.sep, '/')
+
+def iter_dependencies(block):
+	'''Yields every tag reference in a tag block and the blocks inside of it.'''
+	from supyr_struct.blocks.block import Block
+
+	stack = [block]
+	while stack:
+		block = stack.pop()
+		names = getattr(block, 'NAME_MAP', None)
+		if names is not None and 'tag_class' in names and 'filepath' in names:
+			yield block
+			continue
+		if isinstance(block, list):
+			stack.extend(child for child in block if isinstance(child, Block))
+		if 'STEPTREE' in block.desc and isinstance(block.STEPTREE, Block):
+			stack.append(block.STEPTREE)
+
+def dependency_paths(tagdata):
+	'''
+	Returns the sorted, distinct paths of the tags a tag refers to, with
+	their extension and / separated, like library_path returns them.
+	'''
+	paths = set()
+	for dependency in iter_dependencies(tagdata):
+		extension = dependency.tag_class.enum_name
+		if dependency.filepath and extension != 'NONE':
+			paths.add(dependency.filepath.replace('\\', '/') + '.' + extension)
+	return sorted(paths)
+
+def unique(names):
+	'''Returns names without repeats, in order of first appearance.'''
+	return list(dict.fromkeys(names))
+
+def model_bounds(tagdata):
+	'''
+	Returns the ((min x, y, z), (max x, y, z)) bounds of all vertices of a
+	model built with a fast definition, in jms units, or None if it has no
+	vertices.
+	'''
+	lows = []
+	highs = []
+	for geometry in tagdata.geometries.STEPTREE:
+		for part in geometry.parts.STEPTREE:
+			for name, size in MODEL_VERTEX_SIZES.items():
+				raw = getattr(part, name).STEPTREE
+				if not isinstance(raw, (bytes, bytearray)) or len(raw) < size:
+					continue
+				vertices = np.frombuffer(raw, np.uint8,
+					len(raw) // size * size).reshape(-1, size)
+				positions = np.ascontiguousarray(vertices[:, :12]).view('>f4')
+				lows.append(positions.min(axis=0))
+				highs.append(positions.max(axis=0))
+				break
+
+	if not lows:
+		return None
+	return (
+		(np.min(lows, axis=0) * WORLD_UNITS_TO_JMS).tolist(),
+		(np.max(highs, axis=0) * WORLD_UNITS_TO_JMS).tolist())
+
+def field_values(reflexive, name):
+	'''
+	Returns the value of the field name of every entry of a reflexive,
+	whether summary_definition made it read raw or not. Raw entries only
+	have their strings and numbers read.
+	'''
+	entries = reflexive.STEPTREE
+	if not isinstance(entries, (bytes, bytearray)):
+		return [entry[name] for entry in entries]
+
+	from supyr_struct.defs.constants import ATTR_OFFS, NAME_MAP, SIZE, TYPE
+
+	entry_desc = reflexive.desc['STEPTREE']['SUB_STRUCT']
+	index = entry_desc[NAME_MAP][name]
+	field = entry_desc[index]
+	starts = range(entry_desc[ATTR_OFFS][index],
+		reflexive.size * entry_desc[SIZE], entry_desc[SIZE])
+	if field[TYPE].is_str:
+		return [bytes(entries[start:start + field[SIZE]]).split(b'\0', 1)[0]
+			.decode(field[TYPE].enc) for start in starts]
+	unpack = struct.Struct(field[TYPE].enc).unpack_from
+	return [unpack(entries, start)[0] for start in starts]
+
+def model_summary(tagdata):
+	'''The summary fields of a gbxmodel or model tag.'''
+	regions = tagdata.regions.STEPTREE
+	permutations = [perm for region in regions
+		for perm in region.permutations.STEPTREE]
+	markers = [marker.name for marker in tagdata.markers.STEPTREE]
+	for perm in permutations:
+		if hasattr(perm, 'local_markers'):
+			markers.extend(field_values(perm.local_markers, 'name'))
+	return {
+		'node_count': tagdata.nodes.size,
+		'regions': [region.name for region in regions],
+		'permutations': unique(perm.name for perm in permutations),
+		'markers': unique(markers),
+		'bounds': model_bounds(tagdata),
+	}
+
+def animation_summary(tagdata):
+	'''The summary fields of a model_animations tag.'''
+	return {
+		'node_count': tagdata.nodes.size,
+		'animations': list(zip(field_values(tagdata.animations, 'name'),
+			field_values(tagdata.animations, 'frame_count'))),
+	}
+
+def collision_summary(tagdata):
+	'''The summary fields of a model_collision_geometry tag.'''
+	regions = tagdata.regions.STEPTREE
+	return {
+		'node_count': tagdata.nodes.size,
+		'regions': [region.name for region in regions],
+		'permutations': unique(name for region in regions
+			for name in field_values(region.permutations, 'name')),
+	}
+
+SUMMARIES = {
+	'mod2': model_summary,
+	'mode': model_summary,
+	'antr': animation_summary,
+	'coll': collision_summary,
+}
+
+def has_children(desc):
+	'''
+	Returns whether a field description reads more than its own bytes,
+	like the entries of a reflexive, tag reference paths and rawdata.
+	'''
+	from supyr_struct.defs.constants import ENTRIES, STEPTREE, TYPE
+
+	if not isinstance(desc, dict) or TYPE not in desc or desc[TYPE].is_data:
+		return False
+	return STEPTREE in desc or any(has_children(desc[index])
+		for index in range(desc.get(ENTRIES, 0)))
+
+def has_dependencies(desc):
+	'''Returns whether there is a tag reference anywhere in a field description.'''
+	from reclaimer.field_types import TagRef
+	from supyr_struct.defs.constants import ENTRIES, STEPTREE, SUB_STRUCT, TYPE
+
+	if not isinstance(desc, dict) or TYPE not in desc or desc[TYPE].is_data:
+		return False
+	if desc[TYPE] is TagRef:
+		return True
+	if STEPTREE in desc and has_dependencies(desc[STEPTREE]):
+		return True
+	return (has_dependencies(desc.get(SUB_STRUCT))
+		or any(has_dependencies(desc[index])
+			for index in range(desc.get(ENTRIES, 0))))
+
+def raw_reflexive_desc(desc):
+	'''A copy of a reflexive description that reads its entries as bytes.'''
+	from reclaimer.common_descs import raw_reflexive
+	from supyr_struct.defs.constants import MAX, NAME, STEPTREE, SUB_STRUCT
+
+	return raw_reflexive(desc[NAME], dict(desc[STEPTREE][SUB_STRUCT]),
+		desc[STEPTREE][MAX])
+
+def lean_desc(desc):
+	'''
+	Returns a copy of a field description where every reflexive whose
+	entries don't have children is read raw. Their entries are one block of
+	bytes then, instead of a built block for every one of them.
+	'''
+	from reclaimer.field_types import Reflexive
+	from supyr_struct.defs.constants import ENTRIES, STEPTREE, SUB_STRUCT, TYPE
+
+	if not isinstance(desc, dict) or TYPE not in desc:
+		return desc
+	if desc[TYPE] is Reflexive:
+		if not has_children(desc[STEPTREE][SUB_STRUCT]):
+			return raw_reflexive_desc(desc)
+		desc = dict(desc)
+		desc[STEPTREE] = dict(desc[STEPTREE])
+		desc[STEPTREE][SUB_STRUCT] = lean_desc(desc[STEPTREE][SUB_STRUCT])
+		return desc
+	if desc[TYPE].is_block and ENTRIES in desc:
+		desc = dict(desc)
+		for index in range(desc[ENTRIES]):
+			desc[index] = lean_desc(desc[index])
+	return desc
+
+def lean_tagdata_desc(desc):
+	'''
+	lean_desc for the tagdata of a tag. The last reflexive with children is
+	read raw as well if there are no tag references in it. Nothing after it
+	has to line up anymore, so its children, like the frame data of
+	animations or the bsps of collision, aren't even read.
+	'''
+	from reclaimer.field_types import Reflexive
+	from supyr_struct.defs.constants import ENTRIES, TYPE
+
+	desc = lean_desc(desc)
+	last = max((index for index in range(desc[ENTRIES])
+		if has_children(desc[index])), default=None)
+	if (last is not None and desc[last][TYPE] is Reflexive
+			and not has_dependencies(desc[last])):
+		desc = dict(desc)
+		desc[last] = raw_reflexive_desc(desc[last])
+	return desc
+
+# summary_definition by tag class. Building the definitions is slow.
+_summary_definitions = {}
+
+def summary_definition(fourcc):
+	'''
+	Returns the tag definition the indexer builds tags of fourcc with. It
+	reads the tagdata of lean_tagdata_desc, the summaries have to be fine
+	with reflexives read raw, see field_values.
+	'''
+	definition = _summary_definitions.get(fourcc)
+	if definition is not None:
+		return definition
+
+	from supyr_struct.defs.tag_def import TagDef
+
+	module, name = SUMMARY_DEFINITIONS.get(fourcc, (fourcc, fourcc + '_def'))
+	full = getattr(importlib.import_module('reclaimer.hek.defs.' + module), name)
+	definition = TagDef(full.def_id, full.descriptor[0],
+		lean_tagdata_desc(full.descriptor[1]), ext=full.ext,
+		endian=full.endian, tag_cls=full.tag_cls)
+	_summary_definitions[fourcc] = definition
+	return definition
+
+def summarize_tag(filepath, fourcc, loader):
+	'''
+	Returns the summary fields and the dependencies of a tag file. Tags
+	that aren't summarized only get their tag class recorded.
+	'''
+	if fourcc not in SUMMARIES and fourcc not in OBJECT_FOURCCS:
+		return {}, []
+
+	tag = loader.load(filepath, definition=summary_definition(fourcc))
+	tagdata = tag.data.tagdata
+	summary = SUMMARIES[fourcc](tagdata) if fourcc in SUMMARIES else {}
+	return summary, dependency_paths(tagdata)
+
+
+class TagSummary:
+	'''
+	What the index knows about a single tag.
+
+	path is relative to the tags directory, with its extension. Fields that
+	don't apply to the type of tag are None, or empty for lists.
+	animations holds a (name, frame count) pair for every animation, bounds
+	the ((min x, y, z), (max x, y, z)) of a model in jms units. error holds
+	why the tag couldn't be summarized, if it couldn't.
+	'''
+	__slots__ = ('path', 'fourcc', 'node_count', 'regions', 'permutations',
+		'markers', 'animations', 'bounds', 'error')
+
+	def __init__(self, path, fourcc, node_count=None, regions=(),
+			permutations=(), markers=(), animations=(), bounds=None,
+			error=None):
+		self.path = path
+		self.fourcc = fourcc
+		self.node_count = node_count
+		self.regions = list(regions)
+		self.permutations = list(permutations)
+		self.markers = list(markers)
+		self.animations = [tuple(animation) for animation in animations]
+		self.bounds = bounds
+		self.error = error
+
+	@classmethod
+	def from_row(cls, row):
+		def load(value):
+			return json.loads(value) if value else ()
+
+		path, fourcc, node_count, regions, permutations, markers, \
+			animations, bounds, error = row
+		return cls(path, fourcc, node_count, load(regions),
+			load(permutations), load(markers), load(animations),
+			json.loads(bounds) if bounds else None, error)
+
+	@property
+	def name(self):
+		return os.path.splitext(self.path.split('/')[-1])[0]
+
+	@property
+	def extension(self):
+		return os.path.splitext(self.path)[1]
+
+
+class TagLibrary:
+	'''
+	The index of a tags directory, in the SQLite database at database_path.
+
+	Use scan to bring it up to date and search to find tags in it. A
+	TagLibrary can be used as a context manager, which closes it.
+	'''
+	def __init__(self, database_path, tags_directory):
+		self.database_path = database_path
+		self.tags_directory = tags_directory
+		self.connection = sqlite3.connect(database_path)
+		version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+		if version != SCHEMA_VERSION:
+			self.connection.executescript(
+				'DROP TABLE IF EXISTS tags; DROP TABLE IF EXISTS dependencies;')
+		self.connection.executescript(SCHEMA)
+		self.connection.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+		self.connection.commit()
+
+	def close(self):
+		self.connection.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def scan(self, *, batch_size=200):
+		'''
+		Brings the index up to date with the tags directory, only reading
+		the tags that are new or changed since the last scan.
+
+		Returns the amount of 'added', 'updated', 'removed', 'unchanged'
+		and 'failed' tags as a dict.
+		'''
+		steps = self.iter_scan(batch_size=batch_size)
+		while True:
+			try:
+				next(steps)
+			except StopIteration as stop:
+				return stop.value
+
+	def iter_scan(self, *, batch_size=200):
+		'''
+		Step by step version of scan.
+
+		Yields a (done, total) tuple after every batch of changed tags, and
+		returns the same dict as scan.
+		'''
+		known = dict((path, (mtime_ns, size)) for path, mtime_ns, size
+			in self.connection.execute('SELECT path, mtime_ns, size FROM tags'))
+		# The database can be in the tags directory itself.
+		database = os.path.normcase(os.path.abspath(self.database_path))
+		found = {}
+		for filepath, stat in iter_files(self.tags_directory):
+			if os.path.normcase(os.path.abspath(filepath)).startswith(database):
+				continue
+			found[library_path(filepath, self.tags_directory)] = (
+				filepath, stat.st_mtime_ns, stat.st_size)
+
+		counts = dict(added=0, updated=0, removed=0, unchanged=0, failed=0)
+		removed = [path for path in known if path not in found]
+		self.forget(removed)
+		counts['removed'] = len(removed)
+
+		changed = []
+		for path, (filepath, mtime_ns, size) in found.items():
+			if known.get(path) == (mtime_ns, size):
+				counts['unchanged'] += 1
+			else:
+				changed.append(path)
+
+		# Tags are only built once each, no need to keep them around.
+		loader = TagLoader(self.tags_directory, max_size=0)
+		for start in range(0, len(changed), batch_size):
+			for path in changed[start:start + batch_size]:
+				filepath, mtime_ns, size = found[path]
+				if not self.index_tag(path, filepath, mtime_ns, size, loader):
+					counts['failed'] += 1
+				elif path in known:
+					counts['updated'] += 1
+				else:
+					counts['added'] += 1
+			self.connection.commit()
+			yield min(start + batch_size, len(changed)), len(changed)
+
+		self.connection.commit()
+		return counts
+
+	def index_tag(self, path, filepath, mtime_ns, size, loader):
+		'''
+		Reads a single tag into the index. Returns False if it couldn't be
+		summarized, which is noted in its error column, so it isn't read
+		again until it changes.
+		'''
+		fourcc = None
+		summary = {}
+		dependencies = []
+		error = None
+		try:
+			fourcc = read_tag_header(filepath)
+			if fourcc is not None:
+				summary, dependencies = summarize_tag(filepath, fourcc, loader)
+		except Exception as e:
+			error = '%s: %s' % (type(e).__name__, e)
+
+		def dump(name):
+			value = summary.get(name)
+			return None if value is None else json.dumps(value)
+
+		self.connection.execute('DELETE FROM dependencies WHERE path = ?',
+			(path,))
+		self.connection.execute(
+			'INSERT OR REPLACE INTO tags VALUES (?,?,?,?,?,?,?,?,?,?,?)', (
+				# Files that aren't tags are kept with an empty tag class,
+				# so they aren't read again either.
+				path, fourcc or '', mtime_ns, size, summary.get('node_count'),
+				dump('regions'), dump('permutations'), dump('markers'),
+				dump('animations'), dump('bounds'), error))
+		self.connection.executemany(
+			'INSERT INTO dependencies VALUES (?, ?)',
+			[(path, dependency) for dependency in dependencies])
+		return error is None
+
+	def forget(self, paths):
+		'''Removes tags from the index.'''
+		rows = [(path,) for path in paths]
+		self.connection.executemany('DELETE FROM tags WHERE path = ?', rows)
+		self.connection.executemany(
+			'DELETE FROM dependencies WHERE path = ?', rows)
+
+	def search(self, text="", *, fourccs=(), limit=500):
+		'''
+		Returns the TagSummaries of the tags whose path, regions,
+		permutations, markers or animation names contain text, ignoring
+		case. Only tags of the tag classes in fourccs are returned, unless
+		it is empty. Sorted by path.
+		'''
+		query = ('SELECT path, fourcc, node_count, regions, permutations, '
+			'markers, animations, bounds, error FROM tags WHERE fourcc != \'\'')
+		arguments = []
+		if text:
+			pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%'
+				).replace('_', '\\_') + '%'
+			columns = ('path', 'regions', 'permutations', 'markers',
+				'animations')
+			query += ' AND (%s)' % ' OR '.join(
+				"%s LIKE ? ESCAPE '\\'" % column for column in columns)
+			arguments += [pattern] * len(columns)
+		if fourccs:
+			query += ' AND fourcc IN (%s)' % ','.join('?' * len(fourccs))
+			arguments += list(fourccs)
+		query += ' ORDER BY path LIMIT ?'
+		arguments.append(limit)
+		return [TagSummary.from_row(row)
+			for row in self.connection.execute(query, arguments)]
+
+	def get(self, path):
+		'''Returns the TagSummary of a tag, or None if it isn't indexed.'''
+		row = self.connection.execute(
+			'SELECT path, fourcc, node_count, regions, permutations, '
+			'markers, animations, bounds, error FROM tags WHERE path = ?',
+			(path,)).fetchone()
+		return None if row is None else TagSummary.from_row(row)
+
+	def dependencies(self, path):
+		'''Returns the sorted paths of the tags a tag refers to.'''
+		return [row[0] for row in self.connection.execute(
+			'SELECT dependency FROM dependencies WHERE path = ? '
+			'ORDER BY dependency', (path,))]
+
+	def users(self, path):
+		'''Returns the sorted paths of the tags that refer to a tag.'''
+		return [row[0] for row in self.connection.execute(
+			'SELECT path FROM dependencies WHERE dependency = ? '
+			'ORDER BY path', (path,))]
+
+	def __len__(self):
+		return self.connection.execute('SELECT COUNT(*) FROM tags').fetchone()[0]
+
+
+def iter_files(directory):
+	'''Yields a (file path, os.stat_result) pair for every file under directory.'''
+	stack = [directory]
+	while stack:
+		with os.scandir(stack.pop()) as entries:
+			for entry in entries:
+				if entry.is_dir(follow_symlinks=False):
+					stack.append(entry.path)
+				elif entry.is_file():
+					yield entry.path, entry.stat()
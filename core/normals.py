@@ -0,0 +1,188 @@
+'''
+Works out where a mesh needs sharp edges and whether it needs custom
+normals at all.
+
+Jms files store a normal for every vertex of every triangle. The importer
+used to write all of them as custom split normals, which Blender has to
+carry around and evaluate in the viewport and in every modifier. Most
+models only use their normals for hard and soft edges though, and Blender
+can show those with sharp edges alone.
+
+analyze_normals compares the jms normals of the two triangles on every
+edge to find the hard ones, then computes the normals Blender would give
+the mesh with those edges marked sharp. Only when those don't match the
+jms normals are custom normals still needed.
+'''
+import math
+
+import numpy as np
+
+# How far the normals Blender computes may be off from the jms normals
+# before custom normals get written anyway, in radians.
+DEFAULT_TOLERANCE = math.radians(1.0)
+
+class NormalsAnalysis:
+	'''
+	The result of analyze_normals.
+
+	sharp_edges      (E, 2) int32    vertex pairs of the edges to mark sharp,
+	                                 lowest index first.
+	computed_normals (L, 3) float64  the normal of every loop Blender will
+	                                 compute with those edges marked sharp.
+	errors           (L,)   float64  the angle in radians between those and
+	                                 the jms normals.
+	'''
+	__slots__ = ('sharp_edges', 'computed_normals', 'errors', 'tolerance')
+
+	def __init__(self, sharp_edges, computed_normals, errors, tolerance):
+		self.sharp_edges = sharp_edges
+		self.computed_normals = computed_normals
+		self.errors = errors
+		self.tolerance = tolerance
+
+	@property
+	def needs_custom_normals(self):
+		return bool(len(self.errors)) and bool(self.errors.max() > self.tolerance)
+
+	@property
+	def max_error(self):
+		return float(self.errors.max()) if len(self.errors) else 0.0
+
+
+def normalize(vectors):
+	'''Normalizes an array of vectors, leaving zero length ones at zero.'''
+	vectors = np.asarray(vectors, np.float64)
+	lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+	return np.divide(vectors, lengths,
+		out=np.zeros_like(vectors), where=lengths > 0.0)
+
+def triangle_normals(positions, triangles):
+	'''Returns the normalized normal of every triangle.'''
+	corners = np.asarray(positions, np.float64)[triangles]
+	return normalize(np.cross(
+		corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]))
+
+def corner_angles(positions, triangles):
+	'''Returns the (T, 3) angle of every triangle corner, in radians.'''
+	corners = np.asarray(positions, np.float64)[triangles]
+	to_next = normalize(np.roll(corners, -1, axis=1) - corners)
+	to_previous = normalize(np.roll(corners, 1, axis=1) - corners)
+	cosines = np.clip(np.sum(to_next * to_previous, axis=2), -1.0, 1.0)
+	return np.arccos(cosines)
+
+def edge_pairs(triangles):
+	'''
+	Finds the edges that are shared by exactly two triangles.
+
+	Returns three arrays:
+	the (E, 2) vertex pairs of those edges, lowest index first,
+	the (E, 2, 2) loops at both ends of the edge in both triangles, as
+	[[first at low, first at high], [second at low, second at high]],
+	and whether the two triangles run along the edge in opposite
+	directions, like they do when they face the same way.
+	'''
+	triangles = np.asarray(triangles, np.int64).reshape(-1, 3)
+	loops = np.arange(triangles.size, dtype=np.int64).reshape(-1, 3)
+
+	# Every triangle side as a half edge from one corner to the next.
+	starts = triangles.ravel()
+	ends = np.roll(triangles, -1, axis=1).ravel()
+	start_loops = loops.ravel()
+	end_loops = np.roll(loops, -1, axis=1).ravel()
+
+	low = np.minimum(starts, ends)
+	high = np.maximum(starts, ends)
+	keys = low * (int(triangles.max(initial=0)) + 1) + high
+
+	order = np.argsort(keys, kind='stable')
+	keys = keys[order]
+	unique, first, counts = np.unique(keys, return_index=True, return_counts=True)
+	shared = first[counts == 2]
+
+	a, b = order[shared], order[shared + 1]
+	# The loop at the low end of the edge in each of the two triangles.
+	a_low = np.where(starts[a] == low[a], start_loops[a], end_loops[a])
+	a_high = np.where(starts[a] == low[a], end_loops[a], start_loops[a])
+	b_low = np.where(starts[b] == low[b], start_loops[b], end_loops[b])
+	b_high = np.where(starts[b] == low[b], end_loops[b], start_loops[b])
+
+	pairs = np.stack((low[a], high[a]), axis=1).astype(np.int32)
+	edge_loops = np.stack((
+		np.stack((a_low, a_high), axis=1),
+		np.stack((b_low, b_high), axis=1),
+	), axis=1)
+	consistent = starts[a] != starts[b]
+	return pairs, edge_loops, consistent
+
+def smooth_fans(loop_count, connections):
+	'''
+	Groups loops that are connected through smooth edges.
+
+	connections is an (N, 2) array of loops that share a vertex across a
+	smooth edge. Returns a label for every loop, equal for loops in the
+	same fan.
+	'''
+	labels = np.arange(loop_count, dtype=np.int64)
+	if not len(connections):
+		return labels
+
+	a, b = connections[:, 0], connections[:, 1]
+	# Spread the lowest label through every fan. Fans are small, so this
+	# only takes a few rounds.
+	while True:
+		lowest = np.minimum(labels[a], labels[b])
+		changed = (labels[a] != lowest) | (labels[b] != lowest)
+		if not changed.any():
+			return labels
+		np.minimum.at(labels, a, lowest)
+		np.minimum.at(labels, b, lowest)
+		labels = labels[labels]
+
+def analyze_normals(positions, triangles, loop_normals, *,
+		tolerance=DEFAULT_TOLERANCE):
+	'''
+	Finds the sharp edges of a triangle mesh from its loop normals, and how
+	well Blender's own normals would match them with those edges marked.
+
+	An edge is smooth when both of its triangles have the same normals at
+	both of its ends, within tolerance. Blender weighs the normals of the
+	triangles around a vertex by their corner angle, so that is done here
+	too. Loops with a zero normal have no preference and always match.
+
+	Returns a NormalsAnalysis.
+	'''
+	triangles = np.asarray(triangles, np.int64).reshape(-1, 3)
+	loop_normals = normalize(np.asarray(loop_normals).reshape(-1, 3))
+	loop_count = len(loop_normals)
+	min_cosine = math.cos(tolerance)
+
+	pairs, edge_loops, consistent = edge_pairs(triangles)
+
+	# The normals at both ends of the edge have to agree between the two
+	# triangles. Blender splits flipped neighbours by itself.
+	first = loop_normals[edge_loops[:, 0]]
+	second = loop_normals[edge_loops[:, 1]]
+	agree = ((np.sum(first * second, axis=2) >= min_cosine)
+		| ~first.any(axis=2) | ~second.any(axis=2))
+	smooth = agree.all(axis=1) & consistent
+
+	smooth_loops = edge_loops[smooth]
+	connections = np.concatenate((
+		smooth_loops[:, :, 0], smooth_loops[:, :, 1])).reshape(-1, 2)
+	labels = smooth_fans(loop_count, connections)
+
+	weighted = (triangle_normals(positions, triangles)[:, None, :]
+		* corner_angles(positions, triangles)[:, :, None]).reshape(-1, 3)
+	fans = np.zeros((loop_count, 3), np.float64)
+	np.add.at(fans, labels, weighted)
+	computed = normalize(fans[labels])
+
+	cosines = np.clip(np.sum(computed * loop_normals, axis=1), -1.0, 1.0)
+	errors = np.where(np.any(loop_normals != 0.0, axis=1),
+		np.arccos(cosines), 0.0)
+
+	return NormalsAnalysis(
+		sharp_edges=pairs[~smooth & consistent],
+		computed_normals=computed,
+		errors=errors,
+		tolerance=tolerance)
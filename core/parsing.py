@@ -0,0 +1,184 @@
+'''
+Reading Halo 1 files into jms objects and arrays.
+
+Nothing in here may depend on Blender, so these functions can be run in
+worker processes.
+'''
+# Make sure reclaimer can be found, even in a fresh worker process.
+from .. import lib
+
+import os
+
+from ..constants import JMS_VERSION_HALO_1
+from .animation import animation_arrays_from_jma
+from .bsp import CHUNK_TRIANGLES, bsp_arrays_from_tag
+from .collision import collision_arrays_from_tag
+from .container import CONTAINER_EXTENSION, read_container_objects
+from .geometry import model_arrays_from_jms
+from .scenario import scenario_arrays_from_tag
+from .tags import find_tags_directory, get_loader
+
+# File extensions read_halo1model can read.
+MODEL_EXTENSIONS = ('.gbxmodel', '.model', '.jms')
+
+def read_halo1model(filepath, *, loader=None):
+	'''
+	Takes a halo1 model file and turns it into a jms object.
+
+	Model tags are built through loader, or the shared one of core.tags.
+	'''
+
+	# TODO: Use a tag handler to see if these files actually are what they
+	# say they are. We can get really nasty parsing problems if they aren't.
+
+	# These two model types can be imported the same way because of their
+	# nearly matching structures when built into a python object.
+	if (filepath.lower().endswith('.gbxmodel')
+	or filepath.lower().endswith('.model')):
+		# Load model
+		# Reclaimer is only imported when needed. Building its tag
+		# definitions is slow, and shouldn't happen on Blender startup.
+		from reclaimer.model.model_decompilation import extract_model
+
+		if loader is None:
+			loader = get_loader()
+		# The tag definition is picked by the extension.
+		tag = loader.load(filepath)
+		#TODO: Get all lod permutations.
+		#Only getting the superhigh perms for now
+		jms = extract_model(tag.data.tagdata, write_jms=False)
+		jms = list(filter(lambda m : m.lod_level == "superhigh",jms))
+		return jms
+
+	if filepath.lower().endswith('.jms'):
+		from reclaimer.model.jms import read_jms
+
+		# Read jms file into string.
+		jms_string = ""
+		with open(filepath, 'r') as jms_file:
+			jms_string = jms_file.read()
+		# Read Jms data from string.
+		jms = read_jms(jms_string)
+		# Make sure it's a Halo 1 jms
+		if jms.version != JMS_VERSION_HALO_1:
+			raise ValueError('Not a Halo 1 jms!')
+
+		return [jms]
+
+def read_halo1model_arrays(filepath, *, loader=None):
+	'''
+	Takes a halo1 model file and turns it into a list of ModelArrays, one for
+	each jms read_halo1model would return.
+
+	Containers of core.container are read as they are.
+	'''
+	if filepath.lower().endswith(CONTAINER_EXTENSION):
+		return read_container_objects(filepath, 'model')
+
+	jmss = read_halo1model(filepath, loader=loader)
+	models = []
+	# Convert one at a time and let go of each jms right after, the jms
+	# objects take far more memory than their arrays.
+	jmss.reverse()
+	while jmss:
+		models.append(model_arrays_from_jms(jmss.pop()))
+	return models
+
+def read_halo1bsp_arrays(filepath, *, chunk_triangles=CHUNK_TRIANGLES,
+		lazy=False, loader=None):
+	'''
+	Takes a scenario_structure_bsp tag and turns its render geometry into
+	BspArrays, see core.bsp. With lazy set the chunks are only built as
+	they are iterated over, see bsp_arrays_from_tag.
+	'''
+	# The fast definition leaves the collision, pathfinding and such as raw
+	# data instead of building a python object for every last leaf.
+	from reclaimer.hek.defs.sbsp import fast_sbsp_def
+
+	if loader is None:
+		loader = get_loader()
+	tag = loader.load(filepath, definition=fast_sbsp_def)
+	name = os.path.basename(os.path.splitext(filepath)[0])
+	return bsp_arrays_from_tag(tag.data.tagdata, name=name,
+		chunk_triangles=chunk_triangles, lazy=lazy)
+
+def read_halo1collision_arrays(filepath, *, loader=None):
+	'''
+	Takes a model_collision_geometry tag and turns its geometry into
+	CollisionArrays, see core.collision.
+	'''
+	# The fast definition keeps the bsps as raw data, which is read
+	# straight into arrays.
+	from reclaimer.hek.defs.coll import fast_coll_def
+
+	if loader is None:
+		loader = get_loader()
+	tag = loader.load(filepath, definition=fast_coll_def)
+	name = os.path.basename(os.path.splitext(filepath)[0])
+	return collision_arrays_from_tag(tag.data.tagdata, name=name)
+
+def read_halo1scenario_arrays(filepath, *, loader=None, tags_directory=None):
+	'''
+	Takes a scenario tag and turns its object placements into
+	ScenarioArrays, see core.scenario.
+
+	The object tags are loaded through loader, or the shared one of
+	core.tags. They are looked up in tags_directory, or else the tags
+	directory of the loader, or else the one the scenario is in.
+	'''
+	if loader is None:
+		loader = get_loader()
+	if not tags_directory:
+		tags_directory = (loader.tags_directory
+			or find_tags_directory(filepath))
+
+	tag = loader.load(filepath)
+	name = os.path.basename(os.path.splitext(filepath)[0])
+	return scenario_arrays_from_tag(tag.data.tagdata, loader, name=name,
+		tags_directory=tags_directory)
+
+def read_halo1anim(filepath, *, loader=None):
+	'''
+	Takes a model_animations tag and turns it into a list of jma objects.
+	The tag is built through loader, or the shared one of core.tags.
+	'''
+	# Imported here so the tag definitions aren't built on Blender startup.
+	from reclaimer.animation.animation_decompilation import extract_model_animations
+
+	if loader is None:
+		loader = get_loader()
+	tag = loader.load(filepath)
+
+	data = extract_model_animations(tag.data.tagdata, "", write_jma=False)
+	for anim in data:
+		anim.apply_root_node_info_to_states()
+	return data
+
+def read_halojma(filepath):
+	'''Takes a jma file of any animation type and turns it into a jma object.'''
+	from reclaimer.animation.jma import read_jma
+
+	with open(filepath, 'r') as jma_file:
+		jma_string = jma_file.read()
+
+	jma = read_jma(jma_string, "", os.path.basename(filepath))
+	jma.apply_root_node_info_to_states()
+	return [jma]
+
+def read_halo1anim_arrays(filepath, *, loader=None):
+	'''
+	Takes a model_animations tag or jma file and turns it into a list of
+	AnimationArrays. Containers of core.container are read as they are.
+	'''
+	if filepath.lower().endswith(CONTAINER_EXTENSION):
+		return read_container_objects(filepath, 'animations')
+	if filepath.lower().endswith('.model_animations'):
+		jmas = read_halo1anim(filepath, loader=loader)
+	else:
+		jmas = read_halojma(filepath)
+
+	animations = []
+	jmas.reverse()
+	while jmas:
+		animations.append(animation_arrays_from_jma(jmas.pop()))
+	return animations
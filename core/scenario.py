@@ -0,0 +1,141 @@
+'''
+Reads the object placements of a scenario into arrays.
+
+A scenario places objects by an index into a palette of object tags for
+every type of object. Every object tag refers to the model it looks like.
+The importer only needs every distinct model once, and where each
+placement goes, so that is what scenario_arrays_from_tag gathers. The tags
+are loaded through a TagLoader, which builds every one of them only once.
+'''
+import os
+
+import numpy as np
+
+from .arrays import ScenarioArrays
+from .bsp import WORLD_UNITS_TO_JMS
+
+# The placement blocks of a scenario. Each has a <block>_palette with the
+# object tags its placements refer to.
+OBJECT_BLOCKS = (
+	'sceneries',
+	'bipeds',
+	'vehicles',
+	'equipments',
+	'weapons',
+	'machines',
+	'controls',
+	'light_fixtures',
+)
+
+def tag_name(tag_path):
+	'''Returns the last part of a tag path.'''
+	return tag_path.replace('\\', '/').split('/')[-1]
+
+def object_model_path(loader, dependency, tags_directory=None):
+	'''
+	Returns the file path of the model of the object tag dependency refers
+	to, or None if it has none. Raises an OSError if the object tag is
+	missing.
+	'''
+	tag = loader.load_dependency(dependency, tags_directory=tags_directory)
+	if tag is None:
+		return None
+	model = tag.data.tagdata.obje_attrs.model
+	if not model.filepath or model.tag_class.enum_name == 'NONE':
+		return None
+	return loader.resolve(model.filepath, '.' + model.tag_class.enum_name,
+		tags_directory=tags_directory)
+
+def scenario_arrays_from_tag(tagdata, loader, *, name="",
+		tags_directory=None, blocks=OBJECT_BLOCKS):
+	'''
+	Gathers the placements of the object blocks of a scenario tag into
+	ScenarioArrays, and the models of the objects they place. The tags are
+	looked up in tags_directory, or the one of loader.
+
+	Placements of palette entries whose tags are missing, or have no
+	model, are left out. The missing tag paths are kept in missing.
+	'''
+	models = {}
+	objects = []
+	object_models = []
+	missing = []
+	object_indices = []
+	positions = []
+	rotations = []
+
+	for block in blocks:
+		# Maps the palette of this block to indices into objects.
+		palette = []
+		for entry in getattr(tagdata, block + '_palette').STEPTREE:
+			dependency = entry.name
+			try:
+				model_path = object_model_path(loader, dependency,
+					tags_directory)
+			except OSError:
+				missing.append(dependency.filepath)
+				model_path = None
+
+			if model_path is not None and not os.path.isfile(model_path):
+				missing.append(model_path)
+				model_path = None
+
+			model_index = -1
+			if model_path is not None:
+				model_index = models.setdefault(model_path, len(models))
+			palette.append(len(objects))
+			objects.append(tag_name(dependency.filepath))
+			object_models.append(model_index)
+
+		for placement in getattr(tagdata, block).STEPTREE:
+			if not 0 <= placement.type < len(palette):
+				continue
+			object_index = palette[placement.type]
+			if object_models[object_index] < 0:
+				continue
+			object_indices.append(object_index)
+			position = placement.position
+			positions.append((position.x, position.y, position.z))
+			rotation = placement.rotation
+			rotations.append((rotation.y, rotation.p, rotation.r))
+
+	return ScenarioArrays(
+		name=name,
+		models=list(models),
+		objects=objects,
+		object_models=np.array(object_models, np.int32),
+		missing=missing,
+		object_indices=np.array(object_indices, np.int32),
+		positions=np.array(positions, np.float64).reshape(-1, 3)
+			* WORLD_UNITS_TO_JMS,
+		rotations=np.array(rotations, np.float64).reshape(-1, 3))
+
+def placement_matrices(positions, rotations, scale=1.0):
+	'''
+	Returns the (N, 4, 4) world matrices of placements, from their positions
+	in jms units and their yaw, pitch and roll.
+
+	Yaw turns around z, then pitch lifts the x axis towards z, then roll
+	turns around x.
+	'''
+	positions = np.asarray(positions, np.float64).reshape(-1, 3)
+	rotations = np.asarray(rotations, np.float64).reshape(-1, 3)
+	cos = np.cos(rotations)
+	sin = np.sin(rotations)
+	cy, cp, cr = cos.T
+	sy, sp, sr = sin.T
+
+	matrices = np.zeros((len(positions), 4, 4), np.float64)
+	# Rz(yaw) @ Ry(-pitch) @ Rx(roll), written out.
+	matrices[:, 0, 0] = cy * cp
+	matrices[:, 0, 1] = -sy * cr - cy * sp * sr
+	matrices[:, 0, 2] = sy * sr - cy * sp * cr
+	matrices[:, 1, 0] = sy * cp
+	matrices[:, 1, 1] = cy * cr - sy * sp * sr
+	matrices[:, 1, 2] = -cy * sr - sy * sp * cr
+	matrices[:, 2, 0] = sp
+	matrices[:, 2, 1] = cp * sr
+	matrices[:, 2, 2] = cp * cr
+	matrices[:, :3, 3] = positions * scale
+	matrices[:, 3, 3] = 1.0
+	return matrices
@@ -0,0 +1,447 @@
+'''
+Converting whole tag trees in many background Blender processes.
+
+The files to convert are jobs in a JobQueue, a small SQLite database, so a
+run needs nothing but the file system and can be picked up again after it
+was stopped. run_scheduler starts up to a given amount of Blender workers,
+see scripts/convert_worker.py, which take jobs from the queue one at a time
+and import them with scripts/convert.py, until none are left.
+
+The scheduler itself only watches the workers. One that crashes, or takes
+longer than the timeout on a job, is killed and replaced, and only the job
+it was working on is affected. That job goes back into the queue until it
+has been tried max_attempts times. Jobs the importer raised an error on
+fail right away, trying them again wouldn't change anything. Workers that
+keep quitting without taking a job, like when Blender can't start at all,
+stop the run with a WorkerError instead of being replaced forever.
+
+Nothing in here may depend on Blender.
+'''
+import json
+import os
+import sqlite3
+import subprocess
+import time
+from contextlib import closing
+
+from .container import CONTAINER_EXTENSION, container_source_path, read_container
+from .thumbnails import MODEL_EXTENSIONS, blender_command, find_animation_model
+
+# What scripts/convert.py can import as a model, and as animations.
+CONVERT_MODEL_EXTENSIONS = MODEL_EXTENSIONS + ('.jms',)
+# The models animations can go onto, their containers last.
+ANIMATION_MODEL_EXTENSIONS = CONVERT_MODEL_EXTENSIONS + tuple(
+	extension + CONTAINER_EXTENSION for extension in CONVERT_MODEL_EXTENSIONS)
+ANIMATION_EXTENSIONS = ('.model_animations', '.jma', '.jmm', '.jmo', '.jmr',
+	'.jmt', '.jmw', '.jmz')
+
+DEFAULT_TIMEOUT_PER_JOB = 300.0
+DEFAULT_MAX_ATTEMPTS = 2
+
+# The script the Blender workers run.
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+	os.path.abspath(__file__))), 'scripts', 'convert_worker.py')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+	id INTEGER PRIMARY KEY,
+	filepath TEXT NOT NULL UNIQUE,
+	model TEXT,
+	output TEXT NOT NULL,
+	status TEXT NOT NULL DEFAULT 'pending',
+	attempts INTEGER NOT NULL DEFAULT 0,
+	worker INTEGER,
+	started REAL,
+	finished REAL,
+	error TEXT NOT NULL DEFAULT '',
+	report TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+'''
+
+# What a job can be up to.
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+# Animations without a model to go onto, which are never converted.
+SKIPPED = 'skipped'
+
+
+class WorkerError(RuntimeError):
+	'''Raised when the workers keep quitting without converting anything.'''
+
+class Job:
+	'''A row of the jobs table.'''
+	__slots__ = ('id', 'filepath', 'model', 'output', 'status', 'attempts',
+		'worker', 'started', 'finished', 'error', 'report')
+
+	def __init__(self, *values):
+		for name, value in zip(self.__slots__, values):
+			setattr(self, name, value)
+
+	@property
+	def files(self):
+		'''The files to import for this job, the model first.'''
+		if self.model and self.model != self.filepath:
+			return [self.model, self.filepath]
+		return [self.filepath]
+
+	@property
+	def wall_time(self):
+		if self.started is None or self.finished is None:
+			return None
+		return self.finished - self.started
+
+
+class JobQueue:
+	'''
+	The jobs of a conversion in an SQLite database, shared between the
+	scheduler and all of its workers.
+
+	Every method is its own transaction, so any amount of processes can use
+	the same queue at once.
+	'''
+	def __init__(self, database_path, *, timeout=30.0):
+		self.database_path = database_path
+		self.connection = sqlite3.connect(database_path, timeout=timeout,
+			isolation_level=None)
+		self.connection.execute('PRAGMA journal_mode=WAL')
+		self.connection.executescript(SCHEMA)
+
+	def close(self):
+		self.connection.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def _transaction(self):
+		'''
+		Starts a write transaction right away, so two workers can't claim
+		the same job.
+		'''
+		self.connection.execute('BEGIN IMMEDIATE')
+		return self.connection
+
+	def add(self, filepath, output, model=None):
+		'''
+		Adds a job, unless there is one for filepath already. A job that was
+		skipped for lack of a model is queued after all once it has one.
+		'''
+		self.connection.execute(
+			'INSERT OR IGNORE INTO jobs (filepath, model, output) '
+			'VALUES (?, ?, ?)', (filepath, model, output))
+		if model is not None:
+			self.connection.execute(
+				'UPDATE jobs SET model = ?, status = ?, error = \'\' '
+				'WHERE filepath = ? AND status = ?',
+				(model, PENDING, filepath, SKIPPED))
+
+	def skip(self, filepath, output, reason):
+		'''
+		Adds a job that isn't converted, only listed in the report with
+		reason, unless there is one for filepath already.
+		'''
+		self.connection.execute(
+			'INSERT OR IGNORE INTO jobs (filepath, output, status, error) '
+			'VALUES (?, ?, ?, ?)', (filepath, output, SKIPPED, reason))
+
+	def get(self, job_id):
+		return self._select('WHERE id = ?', (job_id,))[0]
+
+	def jobs(self, status=None):
+		'''Returns all jobs, or the ones with the given status.'''
+		if status is None:
+			return self._select('ORDER BY id')
+		return self._select('WHERE status = ? ORDER BY id', (status,))
+
+	def _select(self, where, parameters=()):
+		rows = self.connection.execute(
+			'SELECT %s FROM jobs %s' % (', '.join(Job.__slots__), where),
+			parameters)
+		return [Job(*row) for row in rows]
+
+	def counts(self):
+		'''Returns the amount of jobs of every status.'''
+		counts = dict.fromkeys((PENDING, RUNNING, DONE, FAILED, SKIPPED), 0)
+		counts.update(self.connection.execute(
+			'SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+		return counts
+
+	def claim(self, worker):
+		'''
+		Marks the oldest pending job as running on worker and returns it, or
+		returns None if there are no pending jobs.
+		'''
+		connection = self._transaction()
+		try:
+			row = connection.execute(
+				'SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT 1',
+				(PENDING,)).fetchone()
+			if row is not None:
+				connection.execute(
+					'UPDATE jobs SET status = ?, attempts = attempts + 1, '
+					'worker = ?, started = ?, finished = NULL WHERE id = ?',
+					(RUNNING, worker, time.time(), row[0]))
+			connection.execute('COMMIT')
+		except BaseException:
+			connection.execute('ROLLBACK')
+			raise
+		return None if row is None else self.get(row[0])
+
+	def finish(self, job_id, error="", report=None):
+		'''
+		Marks a running job as done, or as failed if there is an error.
+		report is the JSON-able report of scripts/convert.py.
+		'''
+		self.connection.execute(
+			'UPDATE jobs SET status = ?, finished = ?, error = ?, report = ? '
+			'WHERE id = ? AND status = ?',
+			(FAILED if error else DONE, time.time(), error,
+			None if report is None else json.dumps(report), job_id, RUNNING))
+
+	def abandon(self, worker, error, max_attempts=DEFAULT_MAX_ATTEMPTS):
+		'''
+		Gives up on the running job of a worker that died or was killed.
+		It goes back into the queue if it has attempts left, otherwise it
+		failed with error. Returns the abandoned jobs.
+		'''
+		connection = self._transaction()
+		try:
+			jobs = self._select('WHERE status = ? AND worker = ?',
+				(RUNNING, worker))
+			for job in jobs:
+				connection.execute(
+					'UPDATE jobs SET status = ?, finished = ?, error = ? '
+					'WHERE id = ?',
+					(PENDING if job.attempts < max_attempts else FAILED,
+					time.time(), error, job.id))
+			connection.execute('COMMIT')
+		except BaseException:
+			connection.execute('ROLLBACK')
+			raise
+		return jobs
+
+	def claimed_any(self, worker):
+		'''Returns whether worker ever claimed a job.'''
+		return self.connection.execute(
+			'SELECT 1 FROM jobs WHERE worker = ? LIMIT 1',
+			(worker,)).fetchone() is not None
+
+	def next_worker(self):
+		'''
+		Returns a worker number that none of the jobs were claimed by yet,
+		so workers of a new run aren't taken for ones of an earlier run.
+		'''
+		return self.connection.execute(
+			'SELECT COALESCE(MAX(worker), -1) + 1 FROM jobs').fetchone()[0]
+
+	def overdue(self, timeout):
+		'''Returns the running jobs that started more than timeout ago.'''
+		return self._select('WHERE status = ? AND started < ?',
+			(RUNNING, time.time() - timeout))
+
+	def reset(self, *, failed=False):
+		'''
+		Puts the jobs that were running when a previous run was stopped back
+		into the queue, and the failed ones too if failed is set.
+		'''
+		statuses = (RUNNING, FAILED) if failed else (RUNNING,)
+		self.connection.execute(
+			'UPDATE jobs SET status = ?, attempts = 0, worker = NULL, '
+			'error = \'\' WHERE status IN (%s)' % ', '.join('?' * len(statuses)),
+			(PENDING,) + statuses)
+
+
+def find_convert_files(paths):
+	'''
+	Returns (filepath, relative path) pairs of all models, animations and
+	their containers in paths, which are files or directories. The
+	relative paths are what the outputs are named after.
+	'''
+	extensions = (CONVERT_MODEL_EXTENSIONS + ANIMATION_EXTENSIONS
+		+ (CONTAINER_EXTENSION,))
+	files = []
+	for path in paths:
+		if not os.path.isdir(path):
+			files.append((path, os.path.basename(path)))
+			continue
+		for root, dirs, filenames in os.walk(path):
+			for filename in filenames:
+				if filename.lower().endswith(extensions):
+					filepath = os.path.join(root, filename)
+					files.append((filepath, os.path.relpath(filepath, path)))
+	return sorted(files)
+
+def queue_files(queue, paths, output_directory, *, model=None):
+	'''
+	Adds a job for every model and animation in paths to queue, which
+	writes a .blend to output_directory. Returns the amount of files.
+
+	Animations are imported onto the model next to them with the same name,
+	a .jms one or a container included, see
+	core.thumbnails.find_animation_model. Those without one go onto model,
+	or are skipped if that isn't given either.
+	'''
+	files = find_convert_files(paths)
+	for filepath, relative_path in files:
+		filepath = os.path.abspath(filepath)
+		output = os.path.join(os.path.abspath(output_directory),
+			relative_path + '.blend')
+		if not is_animation_file(filepath):
+			queue.add(filepath, output)
+			continue
+
+		animation_model = (find_animation_model(
+			container_source_path(filepath), ANIMATION_MODEL_EXTENSIONS)
+			or model)
+		if animation_model is None:
+			queue.skip(filepath, output, 'no model to put the animations on')
+		else:
+			queue.add(filepath, output, os.path.abspath(animation_model))
+	return len(files)
+
+def is_animation_file(filepath):
+	'''Returns whether filepath are animations, or a container of them.'''
+	if filepath.lower().endswith(CONTAINER_EXTENSION):
+		try:
+			return read_container(filepath)[0] == 'animations'
+		except (OSError, ValueError):
+			# Left to the worker to fail on.
+			return False
+	return filepath.lower().endswith(ANIMATION_EXTENSIONS)
+
+def run_scheduler(queue_path, *, blender, workers=None,
+		timeout_per_job=DEFAULT_TIMEOUT_PER_JOB,
+		max_attempts=DEFAULT_MAX_ATTEMPTS, convert_arguments=(),
+		log_directory=None, poll_interval=0.25):
+	'''
+	Works through all pending jobs of the queue at queue_path in up to
+	workers background Blender processes at once, and returns the report
+	of summarize.
+
+	convert_arguments are passed on to scripts/convert.py for every job,
+	like ('--scale', 'HALO'). The output of every worker goes to a log file
+	in log_directory, or is thrown away.
+
+	Raises a WorkerError once workers * max_attempts workers in a row quit
+	without claiming a job while there were jobs left.
+	'''
+	workers = workers or os.cpu_count() or 1
+	start = time.time()
+	processes = {}
+	logs = {}
+	# Workers in a row that quit without claiming anything.
+	idle_exits = 0
+
+	with closing(JobQueue(queue_path)) as queue:
+		queue.reset()
+		next_worker = queue.next_worker()
+		try:
+			while True:
+				for worker, process in list(processes.items()):
+					if process.poll() is not None:
+						del processes[worker]
+						abandoned = queue.abandon(worker,
+							'worker exited with code %d' % process.returncode,
+							max_attempts)
+						# Without jobs left, quitting is all a worker can do.
+						if abandoned or queue.claimed_any(worker):
+							idle_exits = 0
+						elif queue.counts()[PENDING]:
+							idle_exits += 1
+							idle_worker = worker, process.returncode
+
+				if idle_exits >= workers * max_attempts:
+					worker, returncode = idle_worker
+					raise WorkerError('%d workers in a row quit without '
+						'converting anything, the last one with code %d. %s'
+						% (idle_exits, returncode,
+						worker_log_hint(log_directory, worker)))
+
+				for job in queue.overdue(timeout_per_job):
+					process = processes.pop(job.worker, None)
+					if process is not None:
+						process.kill()
+						process.wait()
+					queue.abandon(job.worker, 'timed out after %gs'
+						% timeout_per_job, max_attempts)
+
+				counts = queue.counts()
+				wanted = min(workers, counts[PENDING] + counts[RUNNING])
+				if not wanted and not processes:
+					break
+
+				while len(processes) < wanted:
+					log = subprocess.DEVNULL
+					if log_directory:
+						os.makedirs(log_directory, exist_ok=True)
+						log = logs[next_worker] = open(os.path.join(
+							log_directory, 'worker%d.log' % next_worker), 'w')
+					processes[next_worker] = subprocess.Popen(
+						blender_command(blender, WORKER_SCRIPT,
+							'--queue', os.path.abspath(queue_path),
+							'--worker', str(next_worker),
+							*convert_arguments),
+						stdout=log, stderr=subprocess.STDOUT)
+					next_worker += 1
+
+				time.sleep(poll_interval)
+		finally:
+			for process in processes.values():
+				process.kill()
+				process.wait()
+			for log in logs.values():
+				log.close()
+
+		return summarize(queue, time.time() - start)
+
+def worker_log_hint(log_directory, worker):
+	'''Tells where to look for what went wrong with a worker.'''
+	if not log_directory:
+		return 'Give a log directory to see their output.'
+	return 'See %s for its output.' % os.path.join(log_directory,
+		'worker%d.log' % worker)
+
+def summarize(queue, wall_time):
+	'''
+	Returns the aggregate report of a run: how many jobs are done and
+	failed, how many attempts were retries, the throughput in jobs per
+	second, the time the jobs took, the counts of all imports added
+	together, and every failed and skipped job.
+	'''
+	jobs = queue.jobs()
+	done = [job for job in jobs if job.status == DONE]
+	times = [job.wall_time for job in done if job.wall_time is not None]
+
+	totals = {}
+	for job in done:
+		report = json.loads(job.report) if job.report else {}
+		for key, amount in report.get('totals', {}).items():
+			totals[key] = totals.get(key, 0) + amount
+
+	return {
+		'jobs': len(jobs),
+		'statuses': queue.counts(),
+		'retries': sum(max(0, job.attempts - 1) for job in jobs),
+		'wall_time': wall_time,
+		'throughput': len(done) / wall_time if wall_time > 0 else 0.0,
+		'job_time': {
+			'total': sum(times),
+			'mean': sum(times) / len(times) if times else 0.0,
+			'max': max(times, default=0.0),
+		},
+		'totals': totals,
+		'failures': [
+			{'filepath': job.filepath, 'attempts': job.attempts,
+			'error': job.error}
+			for job in jobs if job.status == FAILED
+		],
+		'skipped': [
+			{'filepath': job.filepath, 'reason': job.error}
+			for job in jobs if job.status == SKIPPED
+		],
+	}
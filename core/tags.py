@@ -0,0 +1,213 @@
+'''
+Loading tags by their tag path, following the references between them.
+
+Tags refer to each other by a tag path relative to the tags directory,
+without an extension, and a tag class that decides the extension. A
+TagLoader resolves those into files and builds every file only once, so a
+scenario that places the same scenery a thousand times parses its tags a
+single time.
+
+Every process has a shared TagLoader, see get_loader, that all parsing
+functions go through unless they are given another one. It keeps the
+tags it built between imports, up to a total size, and drops the ones
+used longest ago first. A tag whose file changed is built again.
+
+Loaded tags are shared, so nothing may change them.
+
+Nothing in here may depend on Blender.
+'''
+# Make sure reclaimer can be found, even in a fresh worker process.
+from .. import lib
+
+import importlib
+import os
+import threading
+from collections import OrderedDict
+
+# The default limit for the total size of the cached tags, in bytes of tag
+# files. The built tags take several times that in memory.
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+# The tag definitions of the tag types the importers follow, by extension.
+# Each is the <fourcc>_def in reclaimer.hek.defs.<fourcc>.
+TAG_FOURCCS = {
+	'.scenario': 'scnr',
+	'.scenario_structure_bsp': 'sbsp',
+	'.scenery': 'scen',
+	'.biped': 'bipd',
+	'.vehicle': 'vehi',
+	'.equipment': 'eqip',
+	'.weapon': 'weap',
+	'.device_machine': 'mach',
+	'.device_control': 'ctrl',
+	'.device_light_fixture': 'lifi',
+	'.gbxmodel': 'mod2',
+	'.model': 'mode',
+	'.model_animations': 'antr',
+	'.model_collision_geometry': 'coll',
+}
+
+def tag_definition(extension):
+	'''
+	Returns the reclaimer tag definition for files with extension.
+	Raises a ValueError for tag types the importers don't know.
+	'''
+	fourcc = TAG_FOURCCS.get(extension.lower())
+	if fourcc is None:
+		raise ValueError('Unsupported tag type %r.' % extension)
+	# Only imported when needed, building the definitions is slow.
+	module = importlib.import_module('reclaimer.hek.defs.' + fourcc)
+	return getattr(module, fourcc + '_def')
+
+def find_tags_directory(filepath):
+	'''
+	Returns the closest directory above filepath that is called tags, or
+	the directory of filepath itself if there is none.
+	'''
+	directory = os.path.dirname(os.path.abspath(filepath))
+	parent = directory
+	while True:
+		if os.path.basename(parent).lower() == 'tags':
+			return parent
+		above = os.path.dirname(parent)
+		if above == parent:
+			return directory
+		parent = above
+
+def dependency_extension(dependency):
+	'''Returns the file extension for the tag class of a tag reference.'''
+	return '.' + dependency.tag_class.enum_name
+
+
+class TagLoader:
+	'''
+	Builds tags from files and remembers them, so every file is only
+	parsed once while it doesn't change.
+
+	Relative tag paths are looked up in tags_directory. The cached tags are
+	kept to max_size bytes of tag files in total, dropping the least
+	recently used ones first. The newest tag is always kept, however big.
+	A max_size of 0 turns caching off.
+
+	hits, misses, invalidations and evictions count what the cache did
+	since the loader was made. This can be used from multiple threads.
+	'''
+	def __init__(self, tags_directory="", *, max_size=DEFAULT_CACHE_SIZE):
+		self.tags_directory = tags_directory
+		self.max_size = max_size
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.invalidations = 0
+		self.evictions = 0
+		# (file, definition id): (modification time, file size, tag),
+		# least recently used first.
+		self._tags = OrderedDict()
+		# Reclaimer holds the GIL while it parses, so parsing two tags at
+		# once wouldn't be faster anyway.
+		self._lock = threading.RLock()
+
+	def resolve(self, tag_path, extension="", *, tags_directory=None):
+		'''
+		Returns the file path of a tag path, with extension added to it.
+		Both Windows and Unix separators work. Relative tag paths are looked
+		up in tags_directory if it is given, or in the loader's own.
+		'''
+		path = tag_path.replace('\\', os.sep).replace('/', os.sep) + extension
+		if not os.path.isabs(path):
+			if tags_directory is None:
+				tags_directory = self.tags_directory
+			path = os.path.join(tags_directory, path)
+		return os.path.normpath(path)
+
+	def load(self, tag_path, extension="", *, definition=None,
+			tags_directory=None):
+		'''
+		Returns the built tag of a tag path, see resolve. The tag definition
+		is picked by the extension of the resolved file, unless one is
+		given, like one of reclaimer's fast definitions.
+		'''
+		filepath = self.resolve(tag_path, extension,
+			tags_directory=tags_directory)
+		if definition is None:
+			definition = tag_definition(os.path.splitext(filepath)[1])
+
+		with self._lock:
+			stat = os.stat(filepath)
+			key = (os.path.normcase(filepath), id(definition))
+			entry = self._tags.get(key)
+			if entry is not None:
+				if entry[0] == stat.st_mtime_ns:
+					self.hits += 1
+					self._tags.move_to_end(key)
+					return entry[2]
+				self.invalidations += 1
+				self._forget(key)
+
+			self.misses += 1
+			tag = definition.build(filepath=filepath)
+			if self.max_size > 0:
+				self._tags[key] = (stat.st_mtime_ns, stat.st_size, tag)
+				self.size += stat.st_size
+				self._shrink()
+			return tag
+
+	def load_dependency(self, dependency, *, tags_directory=None):
+		'''
+		Returns the built tag a tag reference refers to, or None if the
+		reference is empty.
+		'''
+		if not dependency.filepath or dependency.tag_class.enum_name == 'NONE':
+			return None
+		return self.load(dependency.filepath, dependency_extension(dependency),
+			tags_directory=tags_directory)
+
+	def statistics(self):
+		'''Returns what the cache did and holds as a dict.'''
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'invalidations': self.invalidations,
+			'evictions': self.evictions,
+			'tags': len(self._tags),
+			'size': self.size,
+		}
+
+	def clear(self):
+		'''Drops all cached tags.'''
+		with self._lock:
+			self._tags.clear()
+			self.size = 0
+
+	def _forget(self, key):
+		self.size -= self._tags.pop(key)[1]
+
+	def _shrink(self):
+		'''Drops the least recently used tags until they fit max_size.'''
+		keep = 1 if self.max_size > 0 else 0
+		while self.size > self.max_size and len(self._tags) > keep:
+			self._forget(next(iter(self._tags)))
+			self.evictions += 1
+
+	def __len__(self):
+		return len(self._tags)
+
+
+# The loader shared by everything in this process.
+_loader = None
+
+def get_loader(*, tags_directory=None, max_size=None):
+	'''
+	Returns the shared TagLoader, applying the given settings. Settings
+	that are None are left as they are.
+	'''
+	global _loader
+	if _loader is None:
+		_loader = TagLoader()
+	if tags_directory is not None:
+		_loader.tags_directory = tags_directory
+	if max_size is not None:
+		with _loader._lock:
+			_loader.max_size = max_size
+			_loader._shrink()
+	return _loader
@@ -0,0 +1,276 @@
+'''
+Generating preview thumbnails of models and animations in the background.
+
+Rendering previews inside of the interactive session would block it for
+ages, so generate_thumbnails hands them out to background Blender
+processes instead, see scripts/thumbnail_worker.py. Each worker imports
+its models and renders them with Workbench, halfway through the first
+animation for model_animations tags.
+
+The thumbnails are stored by a hash of the tag's contents, so they only
+have to be rendered again when a tag actually changes. A manifest of the
+modification times of the tags saves hashing unchanged files on every run.
+
+Nothing in here may depend on Blender.
+'''
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+# Bump this when thumbnails should look different, so all of them are
+# rendered again.
+THUMBNAIL_VERSION = 1
+THUMBNAIL_SIZE = 128
+
+MODEL_EXTENSIONS = ('.gbxmodel', '.model')
+ANIMATION_EXTENSIONS = ('.model_animations',)
+
+# Seconds a worker may take per thumbnail before it is killed.
+DEFAULT_TIMEOUT_PER_JOB = 60.0
+
+# The script the Blender workers run.
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+	os.path.abspath(__file__))), 'scripts', 'thumbnail_worker.py')
+
+def file_hash(filepath):
+	'''Returns the blake2b hex digest of the contents of a file.'''
+	digest = hashlib.blake2b(digest_size=16)
+	with open(filepath, 'rb') as tag_file:
+		for block in iter(lambda: tag_file.read(1 << 20), b''):
+			digest.update(block)
+	return digest.hexdigest()
+
+def thumbnail_key(*hashes, size=THUMBNAIL_SIZE):
+	'''
+	Returns the cache key of a thumbnail of the tags with the given content
+	hashes, at size pixels.
+	'''
+	digest = hashlib.blake2b(digest_size=16)
+	digest.update(repr((THUMBNAIL_VERSION, size, hashes)).encode())
+	return digest.hexdigest()
+
+def find_animation_model(filepath, extensions=MODEL_EXTENSIONS):
+	'''
+	Returns the model an animation tag goes with, which by convention is
+	next to it with the same name and one of extensions, or None if there
+	is none.
+	'''
+	base = os.path.splitext(filepath)[0]
+	for extension in extensions:
+		if os.path.isfile(base + extension):
+			return base + extension
+	return None
+
+
+class ThumbnailCache:
+	'''
+	A directory of thumbnails, stored as <key[:2]>/<key>.png.
+
+	manifest remembers the (modification time, size, content hash) of every
+	tag by its path, so only new and changed files get hashed.
+	'''
+	MANIFEST = 'manifest.json'
+
+	def __init__(self, directory):
+		self.directory = directory
+		self.manifest = {}
+		try:
+			with open(os.path.join(directory, self.MANIFEST)) as manifest:
+				self.manifest = json.load(manifest)
+		except (OSError, ValueError):
+			pass
+
+	def path(self, key):
+		'''Returns where the thumbnail with key is, or goes.'''
+		return os.path.join(self.directory, key[:2], key + '.png')
+
+	def __contains__(self, key):
+		return os.path.isfile(self.path(key))
+
+	def content_hash(self, filepath):
+		'''
+		Returns the content hash of a file, from the manifest if the file
+		didn't change since it was hashed.
+		'''
+		stat = os.stat(filepath)
+		known = self.manifest.get(filepath)
+		if known is not None and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+			return known[2]
+		content_hash = file_hash(filepath)
+		self.manifest[filepath] = [stat.st_mtime_ns, stat.st_size, content_hash]
+		return content_hash
+
+	def save(self):
+		'''Writes the manifest, leaving out files that are gone.'''
+		os.makedirs(self.directory, exist_ok=True)
+		self.manifest = {path: known for path, known in self.manifest.items()
+			if os.path.isfile(path)}
+		temp_path = os.path.join(self.directory, self.MANIFEST + '.tmp')
+		with open(temp_path, 'w') as manifest:
+			json.dump(self.manifest, manifest)
+		os.replace(temp_path, os.path.join(self.directory, self.MANIFEST))
+
+	def thumbnail(self, filepath, size=THUMBNAIL_SIZE):
+		'''
+		Returns the path of the thumbnail of a tag, or None if it hasn't been
+		rendered yet.
+		'''
+		job = make_job(self, filepath, size)
+		if job is None or job['key'] not in self:
+			return None
+		return job['output']
+
+
+def make_job(cache, filepath, size=THUMBNAIL_SIZE):
+	'''
+	Returns the job for rendering the thumbnail of a tag into cache, as a
+	dict, or None if the tag can't get one.
+	'''
+	extension = os.path.splitext(filepath)[1].lower()
+	if extension in MODEL_EXTENSIONS:
+		model = filepath
+		key = thumbnail_key(cache.content_hash(filepath), size=size)
+	elif extension in ANIMATION_EXTENSIONS:
+		model = find_animation_model(filepath)
+		if model is None:
+			return None
+		# The thumbnail changes with the model too.
+		key = thumbnail_key(cache.content_hash(filepath),
+			cache.content_hash(model), size=size)
+	else:
+		return None
+
+	return {
+		'filepath': filepath,
+		'model': model,
+		'key': key,
+		'output': cache.path(key),
+		'size': size,
+	}
+
+def find_pending_jobs(filepaths, cache, size=THUMBNAIL_SIZE):
+	'''
+	Returns the jobs for the tags in filepaths whose thumbnails aren't in
+	the cache yet. Tags with the same contents only get one job.
+	'''
+	jobs = {}
+	for filepath in filepaths:
+		job = make_job(cache, filepath, size)
+		if job is not None and job['key'] not in cache:
+			jobs.setdefault(job['key'], job)
+	return list(jobs.values())
+
+def find_thumbnail_tags(tags_directory):
+	'''Returns the sorted paths of all tags under tags_directory with thumbnails.'''
+	extensions = MODEL_EXTENSIONS + ANIMATION_EXTENSIONS
+	filepaths = []
+	for root, dirs, files in os.walk(tags_directory):
+		for filename in files:
+			if filename.lower().endswith(extensions):
+				filepaths.append(os.path.join(root, filename))
+	return sorted(filepaths)
+
+def split_jobs(jobs, count):
+	'''Splits jobs into at most count batches of about equal length.'''
+	count = max(1, min(count, len(jobs)))
+	return [jobs[i::count] for i in range(count) if jobs[i::count]]
+
+def blender_command(blender, script, *arguments):
+	'''Returns the command line that runs script in a background Blender.'''
+	return [blender, '--background', '--factory-startup',
+		'--python', script, '--'] + list(arguments)
+
+def run_workers(jobs, *, blender, workers=None,
+		timeout_per_job=DEFAULT_TIMEOUT_PER_JOB):
+	'''
+	Renders jobs in up to workers background Blender processes at once.
+
+	Every worker writes the outcome of each of its jobs to a results file.
+	A worker that crashes or runs out of time only loses the jobs it hadn't
+	finished. Returns a dict with the 'rendered' and 'failed' jobs, each a
+	list of (filepath, error) pairs for the failed ones.
+	'''
+	batches = split_jobs(jobs, workers or os.cpu_count() or 1)
+	rendered = []
+	failed = []
+	with tempfile.TemporaryDirectory() as workdir:
+		processes = []
+		for i, batch in enumerate(batches):
+			jobs_path = os.path.join(workdir, 'jobs%d.json' % i)
+			results_path = os.path.join(workdir, 'results%d.json' % i)
+			with open(jobs_path, 'w') as jobs_file:
+				json.dump(batch, jobs_file)
+			log = open(os.path.join(workdir, 'worker%d.log' % i), 'w+')
+			process = subprocess.Popen(
+				blender_command(blender, WORKER_SCRIPT,
+					'--jobs', jobs_path, '--results', results_path),
+				stdout=log, stderr=subprocess.STDOUT)
+			deadline = time.monotonic() + timeout_per_job * len(batch)
+			processes.append((batch, results_path, process, log, deadline))
+
+		for batch, results_path, process, log, deadline in processes:
+			try:
+				process.wait(max(0.0, deadline - time.monotonic()))
+			except subprocess.TimeoutExpired:
+				process.kill()
+				process.wait()
+
+			results = read_results(results_path)
+			for job in batch:
+				error = results.get(job['key'])
+				if error is None and job['key'] not in results:
+					error = 'worker exited with code %d' % process.returncode
+				if error:
+					failed.append((job['filepath'], error))
+				else:
+					rendered.append(job['filepath'])
+			log.close()
+
+	return {'rendered': rendered, 'failed': failed}
+
+def read_results(results_path):
+	'''
+	Reads the {key: error} results a worker wrote, with an empty error for
+	every job that worked. Returns what there is if the worker died while
+	writing them.
+	'''
+	results = {}
+	try:
+		with open(results_path) as results_file:
+			for line in results_file:
+				try:
+					key, error = json.loads(line)
+				except ValueError:
+					break
+				results[key] = error
+	except OSError:
+		pass
+	return results
+
+def generate_thumbnails(tags_directory, cache_directory, *, blender,
+		workers=None, size=THUMBNAIL_SIZE,
+		timeout_per_job=DEFAULT_TIMEOUT_PER_JOB):
+	'''
+	Renders thumbnails for all models and animations in tags_directory that
+	are new or changed since the last run.
+
+	Returns a dict with the 'rendered' and 'failed' tags like run_workers,
+	and the amount of tags that were 'skipped', because their thumbnail is
+	up to date or because there is nothing to render.
+	'''
+	cache = ThumbnailCache(cache_directory)
+	filepaths = find_thumbnail_tags(tags_directory)
+	jobs = find_pending_jobs(filepaths, cache, size)
+	cache.save()
+
+	if jobs:
+		outcome = run_workers(jobs, blender=blender, workers=workers,
+			timeout_per_job=timeout_per_job)
+	else:
+		outcome = {'rendered': [], 'failed': []}
+	outcome['skipped'] = (len(filepaths) - len(outcome['rendered'])
+		- len(outcome['failed']))
+	return outcome
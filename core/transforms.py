@@ -0,0 +1,140 @@
+'''
+Node and marker transformations as arrays.
+
+Quaternions in this module are (w, x, y, z) like Blender's, unless a
+function says it takes jms style (i, j, k, w) rotations. Matrices are 4x4
+and meant to be multiplied with column vectors, like Blender's.
+'''
+import numpy as np
+
+def jms_to_wxyz(rotations):
+	'''Reorders (i, j, k, w) jms rotations into (w, x, y, z) quaternions.'''
+	rotations = np.asarray(rotations, np.float64).reshape(-1, 4)
+	return rotations[:, (3, 0, 1, 2)]
+
+def quaternion_multiply(a, b):
+	'''Multiplies two arrays of (w, x, y, z) quaternions element wise.'''
+	a = np.asarray(a, np.float64)
+	b = np.asarray(b, np.float64)
+	aw, ax, ay, az = np.moveaxis(a, -1, 0)
+	bw, bx, by, bz = np.moveaxis(b, -1, 0)
+	return np.stack((
+		aw * bw - ax * bx - ay * by - az * bz,
+		aw * bx + ax * bw + ay * bz - az * by,
+		aw * by - ax * bz + ay * bw + az * bx,
+		aw * bz + ax * by - ay * bx + az * bw,
+	), axis=-1)
+
+def quaternion_invert(q):
+	'''Inverts an array of (w, x, y, z) quaternions.'''
+	q = np.asarray(q, np.float64)
+	conjugate = q * (1.0, -1.0, -1.0, -1.0)
+	return conjugate / np.sum(q * q, axis=-1, keepdims=True)
+
+def quaternion_normalize(q):
+	'''Normalizes an array of (w, x, y, z) quaternions.'''
+	q = np.asarray(q, np.float64)
+	return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+def quaternion_to_matrix(q):
+	'''
+	Converts an array of (w, x, y, z) quaternions to 3x3 rotation matrices.
+
+	Like Blender, this does not normalize the quaternions first.
+	'''
+	q = np.asarray(q, np.float64)
+	w, x, y, z = np.moveaxis(q, -1, 0)
+	matrices = np.empty(q.shape[:-1] + (3, 3), np.float64)
+	matrices[..., 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+	matrices[..., 0, 1] = 2.0 * (x * y - w * z)
+	matrices[..., 0, 2] = 2.0 * (x * z + w * y)
+	matrices[..., 1, 0] = 2.0 * (x * y + w * z)
+	matrices[..., 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+	matrices[..., 1, 2] = 2.0 * (y * z - w * x)
+	matrices[..., 2, 0] = 2.0 * (x * z - w * y)
+	matrices[..., 2, 1] = 2.0 * (y * z + w * x)
+	matrices[..., 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+	return matrices
+
+def quaternion_rotate(q, vectors):
+	'''Rotates an array of vectors by an array of (w, x, y, z) quaternions.'''
+	matrices = quaternion_to_matrix(quaternion_normalize(q))
+	return np.einsum('...ij,...j->...i', matrices, vectors)
+
+def local_matrices(rotations, translations, scale=1.0):
+	'''
+	Builds the 4x4 matrices of jms nodes or markers relative to their parent.
+
+	This is the array version of scene.util.generate_matrix. The jms
+	rotations are inverted because Halo stores them the other way around.
+	'''
+	rotations = np.asarray(rotations, np.float64).reshape(-1, 4)
+	translations = np.asarray(translations, np.float64).reshape(-1, 3)
+
+	matrices = np.zeros((len(rotations), 4, 4), np.float64)
+	matrices[:, :3, :3] = quaternion_to_matrix(
+		quaternion_invert(jms_to_wxyz(rotations)))
+	matrices[:, :3, 3] = translations * scale
+	matrices[:, 3, 3] = 1.0
+	return matrices
+
+def hierarchy_levels(parents):
+	'''
+	Groups node indices by their depth in the hierarchy.
+
+	A parent only counts when it comes before its child in the list, like in
+	every Halo model. Other nodes are treated as roots.
+
+	Returns a list of index arrays, roots first.
+	'''
+	parents = np.asarray(parents, np.int32)
+	count = len(parents)
+	depth = np.zeros(count, np.int32)
+	for i in range(count):
+		parent = parents[i]
+		if 0 <= parent < i:
+			depth[i] = depth[parent] + 1
+
+	if not count:
+		return []
+	return [np.flatnonzero(depth == d) for d in range(depth.max() + 1)]
+
+def world_matrices(matrices, parents):
+	'''
+	Multiplies relative matrices through their hierarchy to get the matrices
+	relative to the root of the hierarchy.
+	'''
+	parents = np.asarray(parents, np.int32)
+	world = np.array(matrices, np.float64)
+	levels = hierarchy_levels(parents)
+	for level in levels[1:]:
+		world[level] = world[parents[level]] @ world[level]
+	return world
+
+def node_world_matrices(nodes, scale=1.0):
+	'''Returns the armature space matrix of every node in a NodeArrays.'''
+	return world_matrices(
+		local_matrices(nodes.rotations, nodes.translations, scale),
+		nodes.parents)
+
+def absolute_node_transforms(nodes):
+	'''
+	Returns the absolute translations and (w, x, y, z) rotations of the nodes
+	in a NodeArrays.
+
+	This is the array version of
+	scene.jms_util.get_absolute_node_transforms_from_jms.
+	'''
+	parents = nodes.parents
+	translations = np.array(nodes.translations, np.float64)
+	# Negating w matches how the rest of the scene code reads jms rotations.
+	rotations = jms_to_wxyz(nodes.rotations) * (-1.0, 1.0, 1.0, 1.0)
+
+	for level in hierarchy_levels(parents)[1:]:
+		parent_rotations = rotations[parents[level]]
+		translations[level] = translations[parents[level]] + quaternion_rotate(
+			parent_rotations, translations[level])
+		rotations[level] = quaternion_multiply(
+			parent_rotations, rotations[level])
+
+	return translations, rotations
@@ -0,0 +1,159 @@
+'''
+Checks and fixes jms geometry as arrays, before any mesh gets made of it.
+
+mesh.validate() fixes the same problems, but it does so after the fact and
+on its own terms: it removes polygons from the middle of the mesh, which
+shifts everything after them. Fixing the arrays up front keeps the triangle
+order, material indices, loop normals and uvs in step, tells us exactly
+what was wrong, and lets the importer skip mesh.validate() altogether.
+'''
+import numpy as np
+
+# The sine of the angle between two edges below which a triangle counts as
+# having no area.
+ZERO_AREA_SINE = 1e-6
+
+# Every problem validate_geometry looks for, and what it does about it.
+FIXES = {
+	'out_of_range_triangles': 'removed',
+	'degenerate_triangles': 'removed',
+	'duplicate_triangles': 'removed',
+	'invalid_materials': 'set to the first material',
+	'invalid_skin_nodes': 'unskinned',
+	'non_finite_positions': 'set to zero',
+	'non_finite_normals': 'set to zero',
+	'non_finite_uvs': 'set to zero',
+	'zero_area_triangles': 'kept',
+	'missing_vertex_data': 'skipped',
+	'open_surfaces': 'removed',
+}
+
+# Problems Blender copes fine with. These are only reported.
+REPORT_ONLY = ('zero_area_triangles',)
+
+class GeometryReport:
+	'''
+	The problems validate_geometry found, as {problem: amount}.
+
+	Only problems that actually occurred are in counts. The report is clean
+	when nothing had to be fixed.
+	'''
+	__slots__ = ('counts',)
+
+	def __init__(self, counts=None):
+		self.counts = dict(counts or {})
+
+	def add(self, problem, amount):
+		amount = int(amount)
+		if amount:
+			self.counts[problem] = self.counts.get(problem, 0) + amount
+
+	@property
+	def is_clean(self):
+		return all(problem in REPORT_ONLY for problem in self.counts)
+
+	def summary(self):
+		'''Returns a human readable line listing every problem and its fix.'''
+		return ', '.join(
+			'%d %s %s' % (amount, problem.replace('_', ' '), FIXES[problem])
+			for problem, amount in self.counts.items()
+		)
+
+
+def validate_geometry(vertices, triangles, *, material_count=None,
+		node_count=None):
+	'''
+	Checks the vertices and triangles made by geometry.vertex_arrays and
+	geometry.triangle_arrays, and fixes what mesh.validate() would.
+
+	Material indices and skin nodes are only checked when the amount of
+	materials or nodes is given.
+
+	Returns fixed copies of vertices and triangles, and a GeometryReport.
+	The triangles that are left stay in their original order, so they still
+	line up with anything else that was indexed by triangle.
+	'''
+	report = GeometryReport()
+	vertices = dict(vertices)
+	triangles = dict(triangles)
+
+	for name in ('positions', 'normals', 'uvs'):
+		values = vertices[name]
+		bad = ~np.isfinite(values).all(axis=1)
+		if bad.any():
+			values = values.copy()
+			values[bad] = 0.0
+			vertices[name] = values
+			report.add('non_finite_' + name, np.count_nonzero(bad))
+
+	if node_count is not None:
+		skin_nodes = vertices['skin_nodes']
+		bad = (skin_nodes < -1) | (skin_nodes >= node_count)
+		if bad.any():
+			skin_nodes = skin_nodes.copy()
+			skin_weights = vertices['skin_weights'].copy()
+			skin_nodes[bad] = -1
+			skin_weights[bad] = 0.0
+			vertices['skin_nodes'] = skin_nodes
+			vertices['skin_weights'] = skin_weights
+			report.add('invalid_skin_nodes', np.count_nonzero(bad.any(axis=1)))
+
+	keep = find_valid_triangles(triangles['indices'], len(vertices['positions']),
+		report)
+	if not keep.all():
+		triangles = {name: values[keep] for name, values in triangles.items()}
+
+	report.add('zero_area_triangles', np.count_nonzero(
+		zero_area_triangles(vertices['positions'], triangles['indices'])))
+
+	if material_count is not None:
+		shaders = triangles['shaders']
+		bad = (shaders < 0) | (shaders >= material_count)
+		if bad.any():
+			triangles['shaders'] = np.where(bad, 0, shaders).astype(np.int32)
+			report.add('invalid_materials', np.count_nonzero(bad))
+
+	return vertices, triangles, report
+
+def find_valid_triangles(indices, vertex_count, report=None):
+	'''
+	Returns a mask of the triangles that reference existing vertices, have
+	three different corners, and aren't a copy of an earlier triangle.
+
+	Like in mesh.validate(), triangles with the same corners in a different
+	order count as copies. The amounts of each kind of invalid triangle are
+	added to report if one is given.
+	'''
+	indices = np.asarray(indices).reshape(-1, 3)
+
+	out_of_range = ((indices < 0) | (indices >= vertex_count)).any(axis=1)
+	keep = ~out_of_range
+
+	v0, v1, v2 = indices.T
+	degenerate = keep & ((v0 == v1) | (v1 == v2) | (v2 == v0))
+	keep &= ~degenerate
+
+	kept = np.flatnonzero(keep)
+	duplicate = np.zeros(len(indices), bool)
+	if len(kept):
+		corners = np.sort(indices[kept], axis=1)
+		# return_index gives the first of every set of copies.
+		first = np.unique(corners, axis=0, return_index=True)[1]
+		duplicate[kept] = True
+		duplicate[kept[first]] = False
+		keep &= ~duplicate
+
+	if report is not None:
+		report.add('out_of_range_triangles', np.count_nonzero(out_of_range))
+		report.add('degenerate_triangles', np.count_nonzero(degenerate))
+		report.add('duplicate_triangles', np.count_nonzero(duplicate))
+	return keep
+
+def zero_area_triangles(positions, indices):
+	'''Returns a mask of the triangles whose corners are on one line.'''
+	corners = np.asarray(positions, np.float64)[np.asarray(indices).reshape(-1, 3)]
+	edge_a = corners[:, 1] - corners[:, 0]
+	edge_b = corners[:, 2] - corners[:, 0]
+	cross = np.linalg.norm(np.cross(edge_a, edge_b), axis=1)
+	lengths = np.linalg.norm(edge_a, axis=1) * np.linalg.norm(edge_b, axis=1)
+	return cross <= ZERO_AREA_SINE * lengths
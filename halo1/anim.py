@@ -3,35 +3,39 @@ from os.path import basename
 from mathutils import Vector, Quaternion, Matrix, Euler
 from math import pi, radians
 
-from reclaimer.hek.defs.antr import antr_def
-from reclaimer.animation.animation_decompilation import extract_model_animations
-from reclaimer.animation.jma import JmaAnimationSet,read_jma
-
+from ..core.animation import animation_arrays_from_jma
+from ..core.arrays import AnimationArrays
+# The readers live in core so worker processes can use them without bpy.
+from ..core.parsing import read_halo1anim, read_halojma
+from ..instrumentation import count
+from ..scene.util import run_steps
 from ..constants import (JMS_VERSION_HALO_1, NODE_NAME_PREFIX,
 	MARKER_NAME_PREFIX, VERY_SMALL_NUMBER, FAKE_NODE_PREFIX)
 
-def read_halo1anim(filepath):
-    ''' Generates JmaAnimationSet'''
-
-
-    tag = antr_def.build(filepath=filepath)
+def import_animations(animations,scale = 0.03048, format_filter = {},
+        release = False, keep_debug = False):
+    return run_steps(iter_import_animations(animations, scale, format_filter,
+        release, keep_debug))
 
-    data = extract_model_animations(tag.data.tagdata,"",write_jma=False)
-    for anim in data:
-        anim.apply_root_node_info_to_states()
-    return data
+def iter_import_animations(animations,scale = 0.03048, format_filter = {},
+        release = False, keep_debug = False):
+    '''
+    Step by step version of import_animations.
 
-def read_halojma(filepath):
-    jma_string = open(filepath).read()
+    Yields a (done, total) tuple of frames after every imported frame.
+    The armature is put back into object mode even when the import is
+    stopped early.
 
-    jma = read_jma(jma_string,"",basename(filepath))
-    jma.apply_root_node_info_to_states()
-    return [jma]
-def import_animations(animations,scale = 0.03048, format_filter = {}):
+    With release set, the animations list is emptied right away and every
+    animation is let go of as soon as its action is done, so only one of
+    them is held in memory at a time. keep_debug stores the animations in
+    bpy.debug_anim for inspecting them from the Python console.
+    '''
     scene = bpy.context.scene
     target = bpy.context.object
-    # just random lazy inspection stuff
-    bpy.debug_anim = animations
+    if keep_debug:
+        # just random lazy inspection stuff
+        bpy.debug_anim = animations
     if target.type != "ARMATURE":
         raise "Not an armature"
     
@@ -39,40 +43,63 @@ def import_animations(animations,scale = 0.03048, format_filter = {}):
         target.animation_data_create()
     bpy.ops.object.mode_set(mode="POSE")
     
-    print(format_filter)
-    for anim in animations:
-        if len(format_filter) > 0 and len(animations) > 1 and anim.ext not in format_filter:
+    selected = [
+        anim for anim in animations
+        if not (len(format_filter) > 0 and len(animations) > 1 and anim.ext not in format_filter)
+    ]
+    if release:
+        animations.clear()
+    total = sum(anim.frame_count for anim in selected)
+    done = 0
+    # Popped from the end, so nothing keeps an imported animation alive.
+    selected.reverse()
+    try:
+        while selected:
+            anim = selected.pop()
+            if not isinstance(anim, AnimationArrays):
+                anim = animation_arrays_from_jma(anim)
+
+            action = bpy.data.actions.new(anim.name)
+            count('datablocks')
+            target.animation_data.action = action
+            action.use_fake_user = True
+            scene.frame_start = 0
+            scene.frame_end = anim.frame_count - 1
+            pose_bones = []
+            for node_name in anim.node_names:
+                pose_bones.append(target.pose.bones[NODE_NAME_PREFIX + node_name])
+      
+            for f in range(anim.frame_count):
+                bpy.context.scene.frame_set(f)
+                # Only one frame is turned into Python floats at a time.
+                # Jma quaternions are (i, j, k, w), Blender wants (w, x, y, z).
+                rotations = anim.rotations[f][:, (3, 0, 1, 2)].tolist()
+                translations = (anim.translations[f] * scale).tolist()
+                scales = anim.scales[f].tolist()
+                for n in range(len(pose_bones)):
+                    bone = pose_bones[n]
+                    
+                    T = Matrix.Translation(Vector(translations[n]))
+                    R = Quaternion(rotations[n]).inverted().to_matrix().to_4x4()
+                    S = Matrix.Scale(scales[n] ,4,(1,1,1))
+            
             
-            continue
-        action = bpy.data.actions.new(anim.name)
-        target.animation_data.action = action
-        action.use_fake_user = True
-        scene.frame_start = 0
-        scene.frame_end = len(anim.frames) - 1
-        pose_bones = []
-        for node in anim.nodes:
-            pose_bones.append(target.pose.bones[NODE_NAME_PREFIX + node.name])
-  
-        for f in range(len(anim.frames)):
-            bpy.context.scene.frame_set(f)
-            for n in range(len(anim.frames[f])):
-                frame = anim.frames[f][n]
-                bone = pose_bones[n]
-                
-                T = Matrix.Translation(Vector((frame.pos_x, frame.pos_y, frame.pos_z))* scale)
-                R = Quaternion((frame.rot_w, frame.rot_i, frame.rot_j, frame.rot_k)).inverted().to_matrix().to_4x4()
-                S = Matrix.Scale(frame.scale ,4,(1,1,1))
-        
-        
-                M =  T @ R @ S
-                if not bone.parent:
-                    bone.matrix = M
-                else:
-                    P = bone.parent.matrix
-                    bone.matrix = P @ M
-                bone.keyframe_insert(data_path="location", index=-1)
-                bone.keyframe_insert(data_path="rotation_quaternion", index=-1)
+                    M =  T @ R @ S
+                    if not bone.parent:
+                        bone.matrix = M
+                    else:
+                        P = bone.parent.matrix
+                        bone.matrix = P @ M
+                    bone.keyframe_insert(data_path="location", index=-1)
+                    bone.keyframe_insert(data_path="rotation_quaternion", index=-1)
+                    # One key for each location and quaternion channel.
+                    count('keyframes', 7)
+
+                done += 1
+                yield done, total
 
+            anim = None
 
-    scene.frame_set(0)
-    bpy.ops.object.mode_set(mode="OBJECT")
\ No newline at end of file
+    finally:
+        scene.frame_set(0)
+        bpy.ops.object.mode_set(mode="OBJECT")
@@ -0,0 +1,75 @@
+import bpy
+
+from ..instrumentation import count, stage
+from ..scene.shapes import create_empty
+from ..scene.util import run_steps
+from .model import count_problems, import_halo1_model_shader, import_halo1_region
+
+def import_halo1_bsp(bsp, *, scale=1.0, release=False, trust_validated=False,
+		normal_tolerance=None):
+	'''
+	Imports the render geometry of a bsp from BspArrays, like the ones
+	core.parsing.read_halo1bsp_arrays returns.
+
+	Every chunk becomes its own object, parented to an empty named after the
+	bsp. The lightmap uvs go into a second uv layer. The chunks of a bsp
+	that was read lazily are built one at a time, and each is let go of
+	once it is in the scene.
+
+	release, trust_validated and normal_tolerance work like they do in
+	halo1.model.import_halo1_model.
+
+	Returns the empty.
+	'''
+	return run_steps(iter_import_halo1_bsp(bsp, scale=scale, release=release,
+		trust_validated=trust_validated, normal_tolerance=normal_tolerance))
+
+def iter_import_halo1_bsp(bsp, *, scale=1.0, release=False,
+		trust_validated=False, normal_tolerance=None):
+	'''
+	Step by step version of import_halo1_bsp.
+
+	Yields a (done, total) tuple after every chunk. Returns the empty.
+	'''
+	total = 1 + bsp.chunk_count
+	done = 0
+
+	with stage('materials'):
+		for mat_name in bsp.materials:
+			import_halo1_model_shader(mat_name)
+
+	root = create_empty(name=bsp.name, display='PLAIN_AXES', size=scale)
+	bpy.context.collection.objects.link(root)
+	count('datablocks')
+	done += 1
+	yield done, total
+
+	chunks = iter(bsp.chunks)
+	i = 0
+	while True:
+		with stage('chunks'):
+			# The chunks of a lazy bsp are built right here.
+			chunk = next(chunks, None)
+			if chunk is None:
+				break
+			import_halo1_region(chunk,
+				name=chunk.name,
+				scale=scale,
+				materials=bsp.materials,
+				parent_rig=root,
+				skin_vertices=False,
+				trust_validated=trust_validated,
+				normal_tolerance=normal_tolerance)
+		chunk = None
+		if release and isinstance(bsp.chunks, list):
+			bsp.chunks[i] = None
+		i += 1
+		done += 1
+		# The chunk count of a lazy bsp is only an estimate.
+		yield done, max(total, done)
+
+	# A lazy bsp only knows its problems once all chunks are built.
+	with stage('validation'):
+		count_problems(bsp.problems)
+
+	return root
@@ -0,0 +1,100 @@
+import bpy
+import numpy as np
+
+from ..constants import (COLLISION_FLAGS_ATTRIBUTE, COLLISION_MATERIAL_PREFIX,
+	NODE_NAME_PREFIX)
+from ..instrumentation import count, stage
+from ..scene.util import new_face_int_layer
+from .model import count_problems, import_halo1_model_shader
+
+def import_halo1_collision(collision, *, armature=None, scale=1.0):
+	'''
+	Imports CollisionArrays, like the ones
+	core.parsing.read_halo1collision_arrays returns, into the scene.
+
+	Every permutation of every node becomes its own object. When an
+	armature is given, like the one import_halo1_nodes made for the render
+	model, every object gets parented to the bone of its node. Otherwise
+	the objects stay in the space of their node.
+
+	Returns the objects.
+	'''
+	materials = [COLLISION_MATERIAL_PREFIX + name for name in collision.materials]
+	with stage('materials'):
+		for mat_name in materials:
+			import_halo1_model_shader(mat_name)
+	with stage('validation'):
+		count_problems(collision.problems)
+
+	objects = []
+	for mesh in collision.meshes:
+		with stage('mesh_build'):
+			obj = build_collision_object(mesh, materials, scale=scale)
+		if armature is not None:
+			attach_to_node(obj, armature, collision.node_names[mesh.node])
+		objects.append(obj)
+
+	return objects
+
+def build_collision_mesh(name, collision_mesh, materials, *, scale=1.0):
+	'''
+	Builds a mesh datablock out of a CollisionMesh, with the collision
+	material and the surface flags of every polygon.
+	'''
+	mesh = bpy.data.meshes.new(name)
+
+	mesh.vertices.add(collision_mesh.vertex_count)
+	mesh.vertices.foreach_set('co',
+		(collision_mesh.positions * np.float32(scale)).ravel())
+
+	mesh.loops.add(len(collision_mesh.loop_vertices))
+	mesh.loops.foreach_set('vertex_index', collision_mesh.loop_vertices)
+
+	mesh.polygons.add(collision_mesh.polygon_count)
+	mesh.polygons.foreach_set('loop_start', collision_mesh.loop_starts)
+	mesh.polygons.foreach_set('loop_total', collision_mesh.loop_totals)
+
+	for mat_name in materials:
+		mesh.materials.append(bpy.data.materials[mat_name])
+	mesh.polygons.foreach_set('material_index', collision_mesh.materials)
+
+	new_face_int_layer(mesh, COLLISION_FLAGS_ATTRIBUTE
+		).data.foreach_set('value', collision_mesh.flags)
+
+	mesh.update(calc_edges=True)
+	# Collision surfaces can be any convex polygon, which the edge walk
+	# doesn't check for repeated corners.
+	mesh.validate()
+
+	return mesh
+
+def build_collision_object(collision_mesh, materials, *, scale=1.0):
+	'''
+	Builds a mesh from a CollisionMesh and links an object with it to the
+	scene.
+	'''
+	mesh = build_collision_mesh(collision_mesh.name, collision_mesh,
+		materials, scale=scale)
+
+	obj = bpy.data.objects.new(collision_mesh.name, mesh)
+	obj.display_type = 'WIRE'
+	bpy.context.collection.objects.link(obj)
+	count('datablocks', 2)
+
+	return obj
+
+def attach_to_node(obj, armature, node_name):
+	'''
+	Parents obj to the bone of the node named node_name, so that the origin
+	of obj is at the node. Parents to the armature itself if there is no
+	such bone.
+	'''
+	obj.parent = armature
+	bone = armature.data.bones.get(NODE_NAME_PREFIX + node_name)
+	if bone is None:
+		return
+
+	obj.parent_type = 'BONE'
+	obj.parent_bone = bone.name
+	# Bone children sit at the tail of the bone, move back to the head.
+	obj.location = (0.0, -bone.length, 0.0)
@@ -2,57 +2,26 @@ import bpy
 import itertools
 import math
 
-from mathutils import Euler
-
-from reclaimer.hek.defs.mode import mode_def
-from reclaimer.hek.defs.mod2 import mod2_def
-from reclaimer.model.jms import read_jms
-from reclaimer.model.model_decompilation import extract_model
-from reclaimer.util.geometry import point_distance_to_line
-
+import numpy as np
+from mathutils import Euler, Matrix
+
+from ..core.geometry import (combine_region_meshes, geometry_arrays_from_jms,
+	marker_arrays, node_arrays, region_mesh, weld_region_mesh)
+from ..core.hashing import region_hash
+from ..core.normals import analyze_normals
+# read_halo1model lives in core so worker processes can use it without bpy.
+from ..core.parsing import read_halo1model
+from ..core.transforms import local_matrices, node_world_matrices
+from ..instrumentation import count, stage
 from ..constants import (JMS_VERSION_HALO_1, NODE_NAME_PREFIX,
-	MARKER_NAME_PREFIX, VERY_SMALL_NUMBER, FAKE_NODE_PREFIX)
+	MARKER_NAME_PREFIX, VERY_SMALL_NUMBER, FAKE_NODE_PREFIX,
+	GEOMETRY_HASH_PROPERTY, GEOMETRY_COUNTS_PROPERTY, LIGHTMAP_UV_LAYER)
+from ..scene.regions import set_face_regions
 from ..scene.shapes import create_sphere, create_empty
-from ..scene.util import (set_uniform_scale, reduce_vertices, trace_into_direction, generate_matrix, get_horizontal_direction, centroid_3d)
+from ..scene.util import (set_uniform_scale, reduce_vertices, trace_into_direction, generate_matrix, get_horizontal_direction, centroid_3d, run_steps)
 from ..scene.jms_util import (set_rotation_from_jms,
 	set_translation_from_jms, get_absolute_node_transforms_from_jms)
 
-def read_halo1model(filepath):
-	'''Takes a halo1 model file and turns it into a jms object.'''
-
-	# TODO: Use a tag handler to see if these files actually are what they
-	# say they are. We can get really nasty parsing problems if they aren't.
-
-	# These two model types can be imported the same way because of their
-	# nearly matching structures when built into a python object.
-	if (filepath.lower().endswith('.gbxmodel')
-	or filepath.lower().endswith('.model')):
-		# Load model
-		tag = None
-		if filepath.lower().endswith('.gbxmodel'):
-			tag = mod2_def.build(filepath=filepath)
-		else:
-			tag = mode_def.build(filepath=filepath)
-		#TODO: Get all lod permutations.
-		#Only getting the superhigh perms for now
-		jms = extract_model(tag.data.tagdata, write_jms=False)
-		jms = list(filter(lambda m : m.lod_level == "superhigh",jms))
-		return jms
-
-	if filepath.lower().endswith('.jms'):
-		# Read jms file into string.
-		jms_string = ""
-		with open(filepath, 'r') as jms_file:
-			jms_string = jms_file.read()
-		# Read Jms data from string.
-		jms = read_jms(jms_string)
-		# Make sure it's a Halo 1 jms
-		if jms.version != JMS_VERSION_HALO_1:
-			raise ValueError('Not a Halo 1 jms!')
-
-		return [jms]
-
-
 from mathutils import Vector
 
 def import_halo1_nodes_from_jms(jms, *,
@@ -76,6 +45,25 @@ def import_halo1_nodes_from_jms(jms, *,
 
 	Returns the armature object and a dict of index - bone pairs.
 	'''
+	return import_halo1_nodes(node_arrays(jms.nodes),
+		scale=scale,
+		node_size=node_size,
+		max_attachment_distance=max_attachment_distance,
+		attach_bones=attach_bones,
+		build_skeleton=build_skeleton)
+
+def import_halo1_nodes(nodes, *,
+		scale=1.0,
+		node_size=0.02,
+		max_attachment_distance=0.00001,
+		attach_bones=('bip01',),
+		build_skeleton = False
+		):
+	'''
+	Import the nodes from a NodeArrays into the scene as an armature.
+
+	See import_halo1_nodes_from_jms.
+	'''
 	view_layer = bpy.context.view_layer
 
 	scene_nodes = {}
@@ -95,20 +83,18 @@ def import_halo1_nodes_from_jms(jms, *,
 	edit_bones = armature.edit_bones
 	bpy.ops.object.mode_set(mode='EDIT')
 
+	# All matrices get multiplied through the hierarchy at once, so we don't
+	# need to read the matrices of the parent bones back.
+	matrices = node_world_matrices(nodes, scale)
 
-
-	for i, node in enumerate(jms.nodes):
-		scene_node = edit_bones.new(name=NODE_NAME_PREFIX+node.name)
+	for i, node_name in enumerate(nodes.names):
+		scene_node = edit_bones.new(name=NODE_NAME_PREFIX+node_name)
 
 		# Assign parent if index is valid.
-		scene_node.parent = scene_nodes.get(node.parent_index, None)
+		scene_node.parent = scene_nodes.get(int(nodes.parents[i]), None)
 
-		M = generate_matrix(node,scale)
 		scene_node.tail.y += 0.01
-		if not scene_node.parent:
-			scene_node.matrix = M
-		else:
-			scene_node.matrix = scene_node.parent.matrix @ M
+		scene_node.matrix = Matrix(matrices[i].tolist())
 
 		scene_nodes[i] = scene_node
 
@@ -123,6 +109,8 @@ def import_halo1_nodes_from_jms(jms, *,
 			#	node.use_connect = True
 
 	node_custom_shape = create_empty(name="bone sphere",size=node_size)
+	# The armature, its object and the custom shape.
+	count('datablocks', 3)
 
 	bpy.ops.object.mode_set(mode="POSE")
 	if not build_skeleton:
@@ -154,51 +142,75 @@ def import_halo1_markers_from_jms(jms, *, armature=None, scale=1.0, node_size=0.
 	largely unused, and will just be a nuisance to people using the tool
 	otherwise.
 	'''
+	return import_halo1_markers(marker_arrays(jms.markers),
+		[node.name for node in jms.nodes], len(jms.regions),
+		armature=armature, scale=scale, node_size=node_size,
+		scene_nodes=scene_nodes, import_radius=import_radius,
+		permutation_filter=permutation_filter, region_filter=region_filter)
+
+def import_halo1_markers(markers, node_names, region_count, *, armature=None,
+		scale=1.0, node_size=0.01, scene_nodes={}, import_radius=False,
+		permutation_filter=(), region_filter=()
+		):
+	'''
+	Import the markers from a MarkerArrays into a scene.
+
+	node_names are the names of the nodes the markers are parented to, and
+	region_count the number of regions in the model.
+
+	See import_halo1_markers_from_jms.
+	'''
 	# The number of regions in a jms model is always known,
 	# so we can just create a default range.
 	if not len(permutation_filter):
 		# Do markers have a -1 no region state? Because this would not work if so.
-		region_filter = range(len(jms.regions))
-	markers = {}
+		region_filter = range(region_count)
+	scene_markers = {}
 
-	for i,marker in enumerate(jms.markers):
+	matrices = local_matrices(markers.rotations, markers.translations, scale)
+
+	for i, marker_name in enumerate(markers.names):
 		# Permutations cannot be known without seeking through the whole model.
 		# This is an easier way to deal with not being given a filter.
 		if len(permutation_filter) and not (
-				marker.permutation in permutation_filter):
+				markers.permutations[i] in permutation_filter):
 			# Skip if not in one of the requested permutations.
 			continue
 
-		if not (marker.region in region_filter):
+		if not (markers.regions[i] in region_filter):
 			# Skip if not in one of the requested regions.
 			continue
 
 		scene_marker = create_empty(
-			name = MARKER_NAME_PREFIX + marker.name,
+			name = MARKER_NAME_PREFIX + marker_name,
 			size = scale if import_radius else node_size,
 			display="SPHERE"
 		)
 		bpy.context.collection.objects.link(scene_marker)
-		scene_marker.matrix_world = generate_matrix(marker, scale)
+		count('datablocks')
+		scene_marker.matrix_world = Matrix(matrices[i].tolist())
 
 		# Assign parent if index is valid.
-		parent = scene_nodes.get(marker.parent, None)
+		parent_index = int(markers.parents[i])
+		parent = scene_nodes.get(parent_index, None)
 		if armature and parent:
 			scene_marker.parent = armature
 			scene_marker.parent_type = 'BONE'
-			scene_marker.parent_bone = NODE_NAME_PREFIX+jms.nodes[marker.parent].name
+			scene_marker.parent_bone = NODE_NAME_PREFIX+node_names[parent_index]
 			scene_marker.location.y -=  0.01 #parent.tail
-		markers[i] = scene_marker
+		scene_markers[i] = scene_marker
 
 	#TODO: Should this return something? marco says YES
-	return markers
+	return scene_markers
 
 def import_halo1_region_from_jms(jms, *,
 		name="unnamed",
 		scale=1.0,
 		region_filter=(),
 		parent_rig=None,
-		skin_vertices=True):
+		skin_vertices=True,
+		trust_validated=False,
+		normal_tolerance=None):
 	'''
 	Imports all the geometry into a Halo 1 JMS into the scene.
 
@@ -206,159 +218,483 @@ def import_halo1_region_from_jms(jms, *,
 
 	mesh object gets linked to parent_rig and skinned to the bones if
 	skin_vertices is True and the parent is an ARMATURE object.
+
+	The geometry is checked and fixed as arrays before the mesh is made.
+	With trust_validated set, mesh.validate() isn't run on top of that.
+
+	See import_halo1_region for normal_tolerance.
 	'''
 
 	if not region_filter:
 		region_filter = range(len(jms.regions))
 
-	### Geometry preprocessing.
-
-	# Ready the vertices.
-	vertices = tuple(map(
-			lambda v : (v.pos_x * scale, v.pos_y * scale, v.pos_z * scale),
-			jms.verts
-		)
-	)
-
-	# Ready the triangles.
+	with stage('preprocess'):
+		vertices, triangles, report = geometry_arrays_from_jms(jms)
+		count_problems(report.counts)
+		region = region_mesh(vertices, triangles,
+			region_filter=tuple(region_filter), name=name, validated=True)
+
+	return import_halo1_region(region,
+		name=name,
+		scale=scale,
+		materials=[mat.name for mat in jms.materials],
+		node_names=[node.name for node in jms.nodes],
+		parent_rig=parent_rig,
+		skin_vertices=skin_vertices,
+		trust_validated=trust_validated,
+		normal_tolerance=normal_tolerance)
+
+def import_halo1_region(region, *,
+		name="unnamed",
+		scale=1.0,
+		materials=(),
+		node_names=(),
+		parent_rig=None,
+		skin_vertices=True,
+		trust_validated=False,
+		normal_tolerance=None,
+		shared_meshes=None,
+		hash_options=()):
+	'''
+	Imports a RegionMesh into the scene.
 
-	# Filter the triangles so only the wished regions are retrieved.
-	triangles = tuple(filter(lambda t : t.region in region_filter, jms.tris))
+	materials are the names of the materials the material indices of the
+	triangles refer to, and node_names the names of the nodes the vertices
+	are skinned to.
 
-	# Get the material index of each triangle.
-	triangle_materials = tuple(map(lambda t : t.shader, triangles))
+	With a normal_tolerance (in radians) the vertices are welded, and the
+	hard edges get marked sharp. Custom normals are only written if
+	Blender's own normals are still further off than that from the jms
+	normals.
 
-	# Reduce the triangles to just their key components.
-	triangles = tuple(map(lambda t : (t.v0, t.v1, t.v2), triangles))
+	shared_meshes is a {hash: mesh} dict like find_shared_meshes returns.
+	With one, the object gets the mesh of the same geometry from it if
+	there is one, instead of a new mesh. New meshes are added to it.
+	hash_options are hashed along with the region, for anything else the
+	caller puts in the mesh.
 
-	# Unpack the vertex normals.
-	vertex_normals = tuple(
-		map(lambda v : (v.norm_i, v.norm_j, v.norm_k), jms.verts)
-	)
+	See import_halo1_region_from_jms.
+	'''
+	mesh = None
+	if shared_meshes is not None:
+		with stage('hashing'):
+			key = region_hash(region, scale=scale, materials=materials,
+				node_names=node_names if skin_vertices else (),
+				options=(trust_validated, normal_tolerance)
+					+ tuple(hash_options))
+		mesh = shared_meshes.get(key)
+
+	shared = mesh is not None
+	if shared:
+		count('shared_meshes')
+	else:
+		normals = None
+		if normal_tolerance is not None:
+			with stage('normals'):
+				region = weld_region_mesh(region)
+				normals = analyze_normals(region.positions, region.triangles,
+					region.loop_normals, tolerance=normal_tolerance)
+
+		with stage('mesh_build'):
+			mesh = build_region_mesh(name, region, materials, scale=scale,
+				trust_validated=trust_validated, normals=normals)
+		count('datablocks')
+
+		if shared_meshes is not None:
+			mesh[GEOMETRY_HASH_PROPERTY] = key
+			mesh[GEOMETRY_COUNTS_PROPERTY] = mesh_counts(mesh)
+			shared_meshes[key] = mesh
+
+	region_obj = link_region_object(name, mesh)
 
-	# Convert the vertex normals to triangle normals.
-	tri_normals = map(
-		lambda t : (
-			vertex_normals[t[0]],
-			vertex_normals[t[1]],
-			vertex_normals[t[2]]),
-		triangles
-	)
+	# If the function was supplied with a parent object attempt to skin to it
+	# if it is an ARMATURE.
 
-	# Collect UVs
+	region_obj.parent = parent_rig
 
-	vert_uvs = tuple(map(lambda v : (v.tex_u, v.tex_v), jms.verts))
+	if skin_vertices and region_obj.parent.type == 'ARMATURE':
+		with stage('skinning'):
+			# A shared mesh already has the weights.
+			skin_region_object(region_obj, region, node_names, parent_rig,
+				write_weights=not shared)
 
-	tri_uvs = tuple(map(
-		lambda t : (
-			vert_uvs[t[0]],
-			vert_uvs[t[1]],
-			vert_uvs[t[2]]),
-		triangles
-	))
+	return region_obj
 
-	# Remove unused vertices
-	vertices, triangles, translation_dict = reduce_vertices(vertices, triangles)
+def find_shared_meshes():
+	'''
+	Returns a {hash: mesh} dict of all meshes in the file that were imported
+	with mesh sharing on, for import_halo1_region to reuse.
 
-	# Chain all of the triangle normals together into loop normals.
-	# ((x, y, z), (x, y, z), (x, y, z)), ((x, y, z), (x, y, z), (x, y, z)),
-	#    |    |    |
-	#    V    V    V
-	# ((x, y, z), (x, y, z), (x, y, z), (x, y, z), (x, y, z), (x, y, z)),
-	# Loops are the points of triangles so to speak.
+	Meshes that were edited since, going by their amounts of vertices,
+	edges, loops and polygons, lose their hash and aren't shared anymore.
+	'''
+	shared_meshes = {}
+	for mesh in bpy.data.meshes:
+		if GEOMETRY_HASH_PROPERTY not in mesh:
+			continue
+		counts = mesh.get(GEOMETRY_COUNTS_PROPERTY)
+		if counts is None or list(counts) != mesh_counts(mesh):
+			del mesh[GEOMETRY_HASH_PROPERTY]
+			mesh.pop(GEOMETRY_COUNTS_PROPERTY, None)
+			continue
+		shared_meshes[mesh[GEOMETRY_HASH_PROPERTY]] = mesh
+	return shared_meshes
 
-	loop_normals = tuple(itertools.chain(*tri_normals))
+def mesh_counts(mesh):
+	return [len(mesh.vertices), len(mesh.edges), len(mesh.loops),
+		len(mesh.polygons)]
 
-	loop_uvs = tuple(itertools.chain(*tri_uvs))
+def build_region_mesh(name, region, materials, *, scale=1.0,
+		trust_validated=False, normals=None):
+	'''
+	Builds a mesh datablock out of a RegionMesh.
 
-	### Importing the data into a mesh
+	All of the data is written with foreach_set straight from the arrays.
+	mesh.validate() is skipped if trust_validated is set and the region
+	already went through core.validation.
 
+	Without a core.normals.NormalsAnalysis in normals, all loop normals are
+	written as custom normals. With one, its sharp edges are marked, and
+	custom normals are only written if it says they are needed.
+	'''
 	# Make a mesh to hold all relevant data.
 	mesh = bpy.data.meshes.new(name)
 
+	vertex_count = region.vertex_count
+	triangle_count = region.triangle_count
+	loop_count = triangle_count * 3
+
 	# Import the verts and tris into the mesh.
-	# verts, edges, tris. If () is given for edges Blender will infer them.
-	mesh.from_pydata(vertices, (), triangles)
+	mesh.vertices.add(vertex_count)
+	mesh.vertices.foreach_set('co',
+		(region.positions * np.float32(scale)).ravel())
+
+	mesh.loops.add(loop_count)
+	mesh.loops.foreach_set('vertex_index', region.triangles.ravel())
+
+	mesh.polygons.add(triangle_count)
+	mesh.polygons.foreach_set('loop_start',
+		np.arange(0, loop_count, 3, dtype=np.int32))
+	mesh.polygons.foreach_set('loop_total',
+		np.full(triangle_count, 3, dtype=np.int32))
 
 	# Add all materials from the jms to the mesh.
-	for mat in jms.materials:
-		mesh.materials.append(bpy.data.materials[mat.name])
+	for mat_name in materials:
+		mesh.materials.append(bpy.data.materials[mat_name])
 
 	# Assign each triangle their corresponding material id.
-	for i, poly in enumerate(mesh.polygons):
-		poly.material_index = triangle_materials[i]
+	mesh.polygons.foreach_set('material_index', region.materials)
+
+	# Let Blender infer the edges from the polygons.
+	mesh.update(calc_edges=True)
 
-	# Import loop normals into the mesh.
-	mesh.normals_split_custom_set(loop_normals)
+	if normals is not None:
+		# Only the marked edges split the normals.
+		mesh.polygons.foreach_set('use_smooth',
+			np.ones(triangle_count, dtype=bool))
+		mesh.auto_smooth_angle = math.pi
+		mark_sharp_edges(mesh, normals.sharp_edges)
+		count('sharp_edges', len(normals.sharp_edges))
+
+	if normals is None or normals.needs_custom_normals:
+		# Import loop normals into the mesh.
+		mesh.normals_split_custom_set(region.loop_normals)
+		count('custom_normals', loop_count)
 
 	# Setting this to true makes Blender display the custom normals.
 	# It feels really wrong. But it is right.
 	mesh.use_auto_smooth = True
 
 	# Apply the UVs
-
-	for loop, uvs in zip(mesh.uv_layers.new().data, loop_uvs):
-		loop.uv = uvs
+	mesh.uv_layers.new().data.foreach_set('uv', region.loop_uvs.ravel())
+	if region.loop_lightmap_uvs is not None:
+		mesh.uv_layers.new(name=LIGHTMAP_UV_LAYER).data.foreach_set('uv',
+			region.loop_lightmap_uvs.ravel())
 
 	# Validate the mesh and make sure it doesn't have any invalid indices.
-	mesh.validate()
+	# Validated arrays can't make an invalid mesh, so this would only cost
+	# time on those.
+	if not (trust_validated and region.validated):
+		mesh.validate()
+		count('mesh_validations')
+
+	return mesh
+
+def mark_sharp_edges(mesh, vertex_pairs):
+	'''Marks the edges between the given (E, 2) pairs of vertices sharp.'''
+	if not len(vertex_pairs):
+		return
+
+	edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+	mesh.edges.foreach_get('vertices', edges)
+	edges = np.sort(edges.reshape(-1, 2), axis=1).astype(np.int64)
+	pairs = np.sort(vertex_pairs, axis=1).astype(np.int64)
+
+	vertex_count = len(mesh.vertices)
+	sharp = np.isin(edges[:, 0] * vertex_count + edges[:, 1],
+		pairs[:, 0] * vertex_count + pairs[:, 1])
+	mesh.edges.foreach_set('use_edge_sharp', sharp)
+
+def build_region_object(name, region, materials, *, scale=1.0,
+		trust_validated=False, normals=None):
+	'''
+	Builds a mesh from a RegionMesh and links an object with it to the scene.
+	'''
+	mesh = build_region_mesh(name, region, materials, scale=scale,
+		trust_validated=trust_validated, normals=normals)
+	count('datablocks')
+
+	return link_region_object(name, mesh)
 
-	# Create the object, and link it to the scene.
+def link_region_object(name, mesh):
+	'''Creates an object with mesh, and links it to the scene.'''
 	region_obj = bpy.data.objects.new(name, mesh)
 	scene = bpy.context.collection
 	scene.objects.link(region_obj)
+	count('datablocks')
 
-	# If the function was supplied with a parent object attempt to skin to it
-	# if it is an ARMATURE.
+	return region_obj
 
-	region_obj.parent = parent_rig
+def skin_region_object(region_obj, region, node_names, parent_rig, *,
+		write_weights=True):
+	'''
+	Skins a region object to parent_rig using the skin arrays of its
+	RegionMesh.
 
-	if skin_vertices and region_obj.parent.type == 'ARMATURE':
-		mod = region_obj.modifiers.new('armature', 'ARMATURE')
-		mod.object = parent_rig
+	Vertices that share a node and weight get added to that node's vertex
+	group in one go. Blender keeps the weights in the mesh, so without
+	write_weights only the modifier and the vertex groups are added, for
+	objects that share a mesh that already has them.
+	'''
+	mod = region_obj.modifiers.new('armature', 'ARMATURE')
+	mod.object = parent_rig
+
+	# Create a vertex group for each bone. Since Blender 3.0 the names of
+	# the groups are kept in the mesh too, so an object with a shared mesh
+	# already has them.
+	groups = region_obj.vertex_groups
+	vertex_groups = [
+		groups.get(NODE_NAME_PREFIX+node_name)
+		or groups.new(name=NODE_NAME_PREFIX+node_name)
+		for node_name in node_names
+	]
+	if not write_weights:
+		return
+
+	# Add the vertices to all the correct vertex groups.
+	# The first node of a vertex gets added before its second node, like it
+	# would be in the jms.
+
+	vertex_indices = np.arange(region.vertex_count, dtype=np.int32)
+	for column in range(region.skin_nodes.shape[1]):
+		used = region.skin_nodes[:, column] != -1
+		nodes = region.skin_nodes[used, column]
+		weights = region.skin_weights[used, column]
+		indices = vertex_indices[used]
+
+		# Sort by node and then weight, so every run of equal pairs can be
+		# added with a single call.
+		order = np.lexsort((weights, nodes))
+		nodes, weights, indices = nodes[order], weights[order], indices[order]
+		run_starts = np.flatnonzero(
+			(nodes[1:] != nodes[:-1]) | (weights[1:] != weights[:-1])) + 1
+
+		for run in np.split(np.arange(len(nodes)), run_starts):
+			if not len(run):
+				continue
+			vertex_groups[nodes[run[0]]].add(
+				indices[run].tolist(), float(weights[run[0]]), 'ADD')
+			count('vertex_group_writes')
 
-		# Create a vertex group for each bone.
+def import_halo1_all_regions_from_jms(jms, *, name="", scale=1.0, parent_rig=None,
+		trust_validated=False, normal_tolerance=None, share_meshes=False):
+	'''
+	Import all regions from a given jms.
 
-		for node in jms.nodes:
-			region_obj.vertex_groups.new(name=NODE_NAME_PREFIX+node.name)
+	With share_meshes set, regions with the same geometry as a mesh that is
+	already in the file get that mesh, see import_halo1_region.
+	'''
+	shared_meshes = find_shared_meshes() if share_meshes else None
+	# Unpack the jms once instead of once for every region.
+	with stage('preprocess'):
+		vertices, triangles, report = geometry_arrays_from_jms(jms)
+		count_problems(report.counts)
+	materials = [mat.name for mat in jms.materials]
+	node_names = [node.name for node in jms.nodes]
 
-		# Add the vertices to all the correct vertex groups.
+	for i in range(len(jms.regions)):
+		region_name = name+":"+jms.regions[i]
+		with stage('preprocess'):
+			region = region_mesh(vertices, triangles,
+				region_filter=(i,), name=region_name, validated=True)
 
-		for jms_i in translation_dict:
-			v = jms.verts[jms_i]
-			mesh_i = translation_dict[jms_i]
+		import_halo1_region(region,
+			name=region_name,
+			scale=scale,
+			materials=materials,
+			node_names=node_names,
+			parent_rig=parent_rig,
+			trust_validated=trust_validated,
+			normal_tolerance=normal_tolerance,
+			shared_meshes=shared_meshes
+		)
 
-			if v.node_0 != -1:
-				# The first node has no skinning data in JMS files (oof)
-				if v.node_1 != -1:
-					region_obj.vertex_groups[v.node_0].add(
-						[mesh_i], 1.0 - v.node_1_weight, 'ADD')
-				else:
-					region_obj.vertex_groups[v.node_0].add(
-						[mesh_i], 1.0, 'ADD')
+def count_problems(problems):
+	'''Counts the {problem: amount} fixed by core.validation, if recording.'''
+	for problem, amount in problems.items():
+		count(problem, amount)
 
-			if v.node_1 != -1:
-				region_obj.vertex_groups[v.node_1].add(
-					[mesh_i], v.node_1_weight, 'ADD')
+def import_halo1_model(models, *, name="", scale=1.0, node_size=0.1,
+		marker_size=0.05, build_skeleton=False, release=False,
+		trust_validated=False, normal_tolerance=None, single_object=False,
+		share_meshes=False):
+	'''
+	Imports a whole model from a list of ModelArrays, like the ones
+	core.parsing.read_halo1model_arrays returns.
+
+	The nodes and markers come from the first ModelArrays. The regions of
+	all of them get skinned to the same armature. With single_object set,
+	every ModelArrays becomes one object instead of one object per region,
+	see import_halo1_model_object.
+
+	With release set, the arrays of every region are dropped from its
+	ModelArrays as soon as the region is in the scene, so they don't stay
+	in memory next to the finished meshes. With trust_validated set,
+	mesh.validate() is skipped for regions that were validated as arrays.
+	With share_meshes set, regions with the same geometry share one mesh,
+	between permutations and with meshes already in the file. See
+	import_halo1_region for that and normal_tolerance.
+
+	Returns the armature object.
+	'''
+	return run_steps(iter_import_halo1_model(models, name=name, scale=scale,
+		node_size=node_size, marker_size=marker_size,
+		build_skeleton=build_skeleton, release=release,
+		trust_validated=trust_validated, normal_tolerance=normal_tolerance,
+		single_object=single_object, share_meshes=share_meshes))
+
+def iter_import_halo1_model(models, *, name="", scale=1.0, node_size=0.1,
+		marker_size=0.05, build_skeleton=False, release=False,
+		trust_validated=False, normal_tolerance=None, single_object=False,
+		share_meshes=False):
+	'''
+	Step by step version of import_halo1_model.
 
-	return region_obj
+	Yields a (done, total) tuple after every step, so the caller can spread
+	the import out over time and show progress. Returns the armature object.
+	Raises a ValueError if there are no models, like for a file without a
+	superhigh lod.
+	'''
+	if not models:
+		raise ValueError('There are no models to import.')
+	first = models[0]
+	total = 3 + sum(len(model.meshes) for model in models)
+	done = 0
+
+	# Import nodes into the scene.
+	with stage('nodes'):
+		armature, nodes = import_halo1_nodes(first.nodes, scale=scale,
+			node_size=node_size, build_skeleton=build_skeleton)
+	done += 1
+	yield done, total
+
+	# Import markers.
+	with stage('markers'):
+		import_halo1_markers(first.markers, first.nodes.names,
+			len(first.regions), scale=scale, node_size=marker_size,
+			armature=armature, scene_nodes=nodes)
+	done += 1
+	yield done, total
+
+	with stage('materials'):
+		for model in models:
+			for mat_name in model.materials:
+				import_halo1_model_shader(mat_name)
+	with stage('validation'):
+		for model in models:
+			count_problems(model.problems)
+	shared_meshes = find_shared_meshes() if share_meshes else None
+	done += 1
+	yield done, total
+
+	for index, model in enumerate(models):
+		if single_object:
+			# Permutations and lods get an object each.
+			object_name = name
+			if len(models) > 1:
+				object_name += ":" + (model.perm_name or str(index))
+			with stage('regions'):
+				import_halo1_model_object(model,
+					name=object_name,
+					scale=scale,
+					parent_rig=armature,
+					trust_validated=trust_validated,
+					normal_tolerance=normal_tolerance,
+					shared_meshes=shared_meshes)
+			if release:
+				model.meshes[:] = [None] * len(model.meshes)
+			done += len(model.regions)
+			yield done, total
+			continue
 
-def import_halo1_all_regions_from_jms(jms, *, name="", scale=1.0, parent_rig=None):
+		for i, region_name in enumerate(model.regions):
+			with stage('regions'):
+				import_halo1_region(model.meshes[i],
+					name=name+":"+region_name,
+					scale=scale,
+					materials=model.materials,
+					node_names=model.nodes.names,
+					parent_rig=armature,
+					trust_validated=trust_validated,
+					normal_tolerance=normal_tolerance,
+					shared_meshes=shared_meshes)
+			if release:
+				model.meshes[i] = None
+			done += 1
+			yield done, total
+
+	return armature
+
+def import_halo1_model_object(model, *,
+		name="unnamed",
+		scale=1.0,
+		parent_rig=None,
+		skin_vertices=True,
+		trust_validated=False,
+		normal_tolerance=None,
+		shared_meshes=None):
 	'''
-	Import all regions from a given jms.
+	Imports all regions of a ModelArrays as a single object.
+
+	The region of every face is stored in the "region" face attribute, see
+	scene.regions. scene.regions.split_by_region turns it back into one
+	object per region.
+
+	See import_halo1_region for the rest of the arguments.
 	'''
-	for i in range(len(jms.regions)):
-		import_halo1_region_from_jms(
-			jms,
-			name=name+":"+jms.regions[i],
-			scale=scale,
-			region_filter=(i,),
-			parent_rig=parent_rig
-		)
+	with stage('preprocess'):
+		region, face_regions = combine_region_meshes(model.meshes, name=name)
+
+	region_obj = import_halo1_region(region,
+		name=name,
+		scale=scale,
+		materials=model.materials,
+		node_names=model.nodes.names,
+		parent_rig=parent_rig,
+		skin_vertices=skin_vertices,
+		trust_validated=trust_validated,
+		normal_tolerance=normal_tolerance,
+		shared_meshes=shared_meshes,
+		# Only share with meshes that have the same regions.
+		hash_options=(face_regions, tuple(model.regions)))
+
+	set_face_regions(region_obj.data, face_regions, model.regions)
+	return region_obj
 
 def import_halo1_model_shader(name=""):
 	if bpy.data.materials.get(name, None) is None:
 		bpy.data.materials.new(name=name)
+		count('datablocks')
 
 def build_skeleton(armature, markers = {}):
 	return
@@ -0,0 +1,104 @@
+import os
+
+import bpy
+from mathutils import Matrix
+
+from ..core.scenario import placement_matrices
+from ..instrumentation import count, stage
+from ..scene.util import active_collection, find_layer_collection, run_steps
+from .model import import_halo1_model
+
+def import_halo1_scenario(scenario, models, *, scale=1.0, **model_options):
+	'''
+	Imports the object placements of a scenario from ScenarioArrays, like
+	the ones core.parsing.read_halo1scenario_arrays returns.
+
+	models holds the list of ModelArrays of every model in scenario.models,
+	or None for models that couldn't be read. Every model is imported once,
+	with model_options passed on to import_halo1_model, into a collection
+	of its own. Those collections are excluded from the view layer, and
+	every placement becomes an empty that instances the collection of its
+	model. So thousands of placements only cost an object each, and all of
+	them share the same meshes.
+
+	Only the first permutation of every model is placed.
+
+	Returns the collection everything was imported into.
+	'''
+	return run_steps(iter_import_halo1_scenario(scenario, models,
+		scale=scale, **model_options))
+
+def iter_import_halo1_scenario(scenario, models, *, scale=1.0,
+		**model_options):
+	'''
+	Step by step version of import_halo1_scenario.
+
+	Yields a (done, total) tuple after every model and after placing the
+	objects. Returns the collection everything was imported into.
+	'''
+	total = len(scenario.models) + 1
+	done = 0
+
+	root = bpy.data.collections.new(scenario.name)
+	bpy.context.scene.collection.children.link(root)
+	library = bpy.data.collections.new(scenario.name + ":models")
+	root.children.link(library)
+	placed = bpy.data.collections.new(scenario.name + ":objects")
+	root.children.link(placed)
+	count('datablocks', 3)
+
+	collections = []
+	for path, arrays in zip(scenario.models, models):
+		if not arrays:
+			collections.append(None)
+			done += 1
+			yield done, total
+			continue
+
+		name = os.path.basename(os.path.splitext(path)[0])
+		collection = bpy.data.collections.new(name)
+		library.children.link(collection)
+		count('datablocks')
+		with active_collection(collection):
+			with stage('models'):
+				import_halo1_model(arrays[:1], name=name, scale=scale,
+					**model_options)
+		collections.append(collection)
+		done += 1
+		yield done, total
+
+	# The models themselves sit at the origin, only their instances show.
+	find_layer_collection(bpy.context.view_layer.layer_collection,
+		library).exclude = True
+
+	with stage('placements'):
+		place_instances(scenario, collections, placed, scale=scale)
+	done += 1
+	yield done, total
+
+	return root
+
+def place_instances(scenario, collections, placed, *, scale=1.0):
+	'''
+	Links an empty to placed for every placement of scenario, that
+	instances the collection of its model. collections holds the collection
+	of every model of scenario, or None for those that weren't imported.
+	'''
+	matrices = placement_matrices(scenario.positions, scenario.rotations,
+		scale)
+	instances = 0
+	for object_index, matrix in zip(scenario.object_indices, matrices):
+		collection = collections[scenario.object_models[object_index]]
+		if collection is None:
+			continue
+
+		obj = bpy.data.objects.new(scenario.objects[object_index], None)
+		obj.instance_type = 'COLLECTION'
+		obj.instance_collection = collection
+		obj.empty_display_size = scale
+		obj.matrix_world = Matrix(matrix.tolist())
+		placed.objects.link(obj)
+		instances += 1
+
+	count('datablocks', instances)
+	count('instances', instances)
@@ -0,0 +1,116 @@
+'''
+Renders the thumbnails core.thumbnails hands out to background Blender
+processes.
+'''
+import json
+import os
+
+import bpy
+from mathutils import Vector
+
+from ..constants import SCALE_MULTIPLIERS
+from ..core.parsing import read_halo1anim_arrays, read_halo1model
+from .anim import import_animations
+from .model import (import_halo1_all_regions_from_jms,
+	import_halo1_model_shader, import_halo1_nodes_from_jms)
+
+# The direction the camera looks at models from, front left and a bit from
+# above. Halo models face along x.
+VIEW_DIRECTION = Vector((1.0, 0.6, 0.5)).normalized()
+
+def render_jobs(jobs, results_path):
+	'''
+	Renders every job and appends a [key, error] line to results_path after
+	each one, with an empty error if it worked. That way a crash halfway
+	only loses the job it crashed on.
+	'''
+	with open(results_path, 'a') as results:
+		for job in jobs:
+			try:
+				render_thumbnail(job)
+				error = ""
+			except Exception as e:
+				error = '%s: %s' % (type(e).__name__, e)
+			results.write(json.dumps([job['key'], error]) + '\n')
+			results.flush()
+
+def render_thumbnail(job):
+	'''
+	Imports the model of a job into an empty scene, poses it halfway
+	through the first animation for animation tags, and renders it to the
+	output of the job.
+	'''
+	bpy.ops.wm.read_factory_settings(use_empty=True)
+	scale = SCALE_MULTIPLIERS['METRIC']
+
+	jms = read_halo1model(job['model'])[0]
+	# The empty scene has none of the materials the regions use.
+	for mat in jms.materials:
+		import_halo1_model_shader(mat.name)
+	armature, nodes = import_halo1_nodes_from_jms(jms, scale=scale)
+	name = os.path.basename(os.path.splitext(job['model'])[0])
+	import_halo1_all_regions_from_jms(jms, name=name, scale=scale,
+		parent_rig=armature, trust_validated=True)
+	jms = None
+
+	if job['filepath'] != job['model']:
+		pose_halfway(armature, job['filepath'], scale)
+
+	meshes = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
+	if not meshes:
+		raise ValueError('Nothing to render.')
+
+	scene = bpy.context.scene
+	frame_camera(scene, meshes)
+	setup_render(scene, job['size'])
+
+	os.makedirs(os.path.dirname(job['output']), exist_ok=True)
+	# Rendered next to it first, so the cache never has half a thumbnail.
+	temp_path = job['output'] + '.tmp.png'
+	scene.render.filepath = temp_path
+	bpy.ops.render.render(write_still=True)
+	os.replace(temp_path, job['output'])
+
+def pose_halfway(armature, filepath, scale):
+	'''Poses armature halfway through the first animation of filepath.'''
+	animations = [anim for anim in read_halo1anim_arrays(filepath)
+		if anim.frame_count]
+	if not animations:
+		return
+
+	animation = animations[0]
+	bpy.context.view_layer.objects.active = armature
+	import_animations([animation], scale)
+	bpy.context.scene.frame_set(animation.frame_count // 2)
+
+def frame_camera(scene, objects):
+	'''Adds an orthographic camera that looks at all of objects.'''
+	bpy.context.view_layer.update()
+	corners = [obj.matrix_world @ Vector(corner)
+		for obj in objects for corner in obj.bound_box]
+	low = Vector(map(min, *corners))
+	high = Vector(map(max, *corners))
+	center = (low + high) / 2
+	radius = max((high - low).length / 2, 0.001)
+
+	camera = bpy.data.objects.new('thumbnail', bpy.data.cameras.new('thumbnail'))
+	scene.collection.objects.link(camera)
+	camera.data.type = 'ORTHO'
+	camera.data.ortho_scale = radius * 2.2
+	camera.data.clip_end = radius * 10
+	camera.location = center + VIEW_DIRECTION * radius * 4
+	camera.rotation_euler = (-VIEW_DIRECTION).to_track_quat('-Z', 'Y').to_euler()
+	scene.camera = camera
+
+def setup_render(scene, size):
+	'''Small, transparent Workbench renders.'''
+	render = scene.render
+	render.engine = 'BLENDER_WORKBENCH'
+	render.resolution_x = size
+	render.resolution_y = size
+	render.resolution_percentage = 100
+	render.film_transparent = True
+	render.image_settings.file_format = 'PNG'
+	render.image_settings.color_mode = 'RGBA'
+	scene.display.shading.light = 'STUDIO'
+	scene.display.shading.color_type = 'MATERIAL'
@@ -0,0 +1,329 @@
+'''
+Lightweight instrumentation to find out which part of an import is slow.
+
+The import operators start a recording, and the functions they call mark
+stages and count what they create. When nothing is being recorded, stage()
+and count() do nothing, so the import functions can still be used as is from
+scripts and tests.
+
+This module doesn't depend on Blender.
+'''
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+def _proc_status_bytes(field):
+	'''Reads a memory field like VmRSS from /proc/self/status, in bytes.'''
+	try:
+		with open('/proc/self/status') as status:
+			for line in status:
+				if line.startswith(field + ':'):
+					return int(line.split()[1]) * 1024
+	except OSError:
+		pass
+	return None
+
+def _windows_memory_counters():
+	import ctypes
+	from ctypes import wintypes
+
+	class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+		_fields_ = [
+			('cb', wintypes.DWORD),
+			('PageFaultCount', wintypes.DWORD),
+			('PeakWorkingSetSize', ctypes.c_size_t),
+			('WorkingSetSize', ctypes.c_size_t),
+			('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+			('QuotaPagedPoolUsage', ctypes.c_size_t),
+			('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+			('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+			('PagefileUsage', ctypes.c_size_t),
+			('PeakPagefileUsage', ctypes.c_size_t),
+		]
+
+	counters = PROCESS_MEMORY_COUNTERS()
+	counters.cb = ctypes.sizeof(counters)
+	process = ctypes.windll.kernel32.GetCurrentProcess()
+	if not ctypes.windll.psapi.GetProcessMemoryInfo(
+			process, ctypes.byref(counters), counters.cb):
+		return None
+	return counters
+
+def current_rss():
+	'''Returns the resident memory of this process in bytes, or None.'''
+	if sys.platform == 'win32':
+		counters = _windows_memory_counters()
+		return counters.WorkingSetSize if counters else None
+	return _proc_status_bytes('VmRSS')
+
+def peak_rss():
+	'''
+	Returns the highest resident memory of this process in bytes, or None.
+
+	Unlike tracemalloc this includes everything Blender allocates itself,
+	like mesh data.
+	'''
+	if sys.platform == 'win32':
+		counters = _windows_memory_counters()
+		return counters.PeakWorkingSetSize if counters else None
+
+	peak = _proc_status_bytes('VmHWM')
+	if peak is not None:
+		return peak
+
+	try:
+		import resource
+	except ImportError:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# Linux reports kilobytes, macOS bytes.
+	return peak if sys.platform == 'darwin' else peak * 1024
+
+def reset_peak_rss():
+	'''
+	Resets the peak resident memory, where the OS allows it.
+
+	Only Linux does. Elsewhere the peak stays the peak of the whole session.
+	Returns whether it was reset.
+	'''
+	try:
+		with open('/proc/self/clear_refs', 'w') as clear_refs:
+			clear_refs.write('5')
+		return True
+	except OSError:
+		return False
+
+class StageStats:
+	'''The measurements of a single stage of an import.'''
+	__slots__ = ('name', 'wall_time', 'peak_memory', 'counts')
+
+	def __init__(self, name):
+		self.name = name
+		self.wall_time = 0.0
+		self.peak_memory = 0
+		self.counts = {}
+
+	def to_dict(self):
+		return {
+			'wall_time': self.wall_time,
+			'peak_memory': self.peak_memory,
+			'counts': dict(self.counts),
+		}
+
+
+class ImportStats:
+	'''
+	Records the wall time, peak traced memory and counts of created things
+	of every stage of an import.
+
+	Stages can be nested. Counts always go to the innermost running stage.
+	Entering a stage with a name that was already used adds onto the
+	existing measurements.
+	'''
+	def __init__(self, name, *, trace_memory=True):
+		self.name = name
+		self.trace_memory = trace_memory
+		self.stages = {}
+		self.wall_time = 0.0
+		self.peak_memory = 0
+		# Resident memory of the whole process, or None where unknown.
+		self.start_rss = None
+		self.peak_rss = None
+		self._stack = []
+		self._stack_peaks = []
+
+	def _traced_peak(self):
+		if not self.trace_memory or not tracemalloc.is_tracing():
+			return 0
+		return tracemalloc.get_traced_memory()[1]
+
+	def _reset_peak(self):
+		# reset_peak only exists since Python 3.9. Without it the peaks of
+		# stages include the peaks of the stages before them.
+		if self.trace_memory and hasattr(tracemalloc, 'reset_peak'):
+			tracemalloc.reset_peak()
+
+	@contextmanager
+	def stage(self, name):
+		'''Measures everything that happens inside of the with block.'''
+		stats = self.stages.get(name)
+		if stats is None:
+			stats = self.stages[name] = StageStats(name)
+
+		# Remember the peak of the outer stage before we reset it.
+		if self._stack_peaks:
+			self._stack_peaks[-1] = max(self._stack_peaks[-1], self._traced_peak())
+		self._reset_peak()
+
+		self._stack.append(stats)
+		self._stack_peaks.append(0)
+		start = time.perf_counter()
+		try:
+			yield stats
+		finally:
+			stats.wall_time += time.perf_counter() - start
+			peak = max(self._stack_peaks.pop(), self._traced_peak())
+			stats.peak_memory = max(stats.peak_memory, peak)
+			self._stack.pop()
+
+			# The outer stage's peak is at least as high as ours.
+			if self._stack_peaks:
+				self._stack_peaks[-1] = max(self._stack_peaks[-1], peak)
+
+	def count(self, key, amount=1):
+		'''Adds amount to the counter named key of the current stage.'''
+		if not self._stack:
+			return
+		counts = self._stack[-1].counts
+		counts[key] = counts.get(key, 0) + amount
+
+	def totals(self):
+		'''Returns the counts of all stages added together.'''
+		totals = {}
+		for stats in self.stages.values():
+			for key, amount in stats.counts.items():
+				totals[key] = totals.get(key, 0) + amount
+		return totals
+
+	def summary_lines(self):
+		'''
+		Returns a list of human readable lines describing every stage.
+		Traced peaks are left out when memory wasn't traced.
+		'''
+		lines = ['%s: %.3fs' % (self.name, self.wall_time)]
+		if self.trace_memory:
+			lines[0] += ', peak %.1f MiB' % (self.peak_memory / 1048576)
+		if self.peak_rss is not None:
+			lines[0] += ', peak RSS %.1f MiB' % (self.peak_rss / 1048576)
+			if self.start_rss is not None:
+				lines[0] += ' (+%.1f MiB)' % (
+					max(0, self.peak_rss - self.start_rss) / 1048576)
+		for stats in self.stages.values():
+			counts = ', '.join(
+				'%s %d' % (key, amount) for key, amount in stats.counts.items())
+			line = '  %s: %.3fs' % (stats.name, stats.wall_time)
+			if self.trace_memory:
+				line += ', peak %.1f MiB' % (stats.peak_memory / 1048576)
+			lines.append(line + (' (' + counts + ')' if counts else ''))
+		return lines
+
+	def to_dict(self):
+		return {
+			'name': self.name,
+			'wall_time': self.wall_time,
+			'trace_memory': self.trace_memory,
+			'peak_memory': self.peak_memory,
+			'start_rss': self.start_rss,
+			'peak_rss': self.peak_rss,
+			'totals': self.totals(),
+			'stages': {
+				name: stats.to_dict() for name, stats in self.stages.items()
+			},
+		}
+
+	def write_json(self, filepath):
+		with open(filepath, 'w') as json_file:
+			json.dump(self.to_dict(), json_file, indent='\t')
+
+
+# The recording that stage() and count() report to.
+_active_stats = None
+# The lists of the collecting() blocks that are running.
+_collectors = []
+
+def active_stats():
+	'''Returns the ImportStats currently being recorded to, or None.'''
+	return _active_stats
+
+@contextmanager
+def recording(name, *, trace_memory=True):
+	'''
+	Records all stages and counts inside of the with block into a new
+	ImportStats, which is what the with statement gives you.
+	'''
+	global _active_stats
+	previous_stats = _active_stats
+	stats = _active_stats = ImportStats(name, trace_memory=trace_memory)
+
+	# Only stop tracing memory if we were the ones who started it.
+	started_tracing = trace_memory and not tracemalloc.is_tracing()
+	if started_tracing:
+		tracemalloc.start()
+
+	reset_peak_rss()
+	stats.start_rss = current_rss()
+
+	start = time.perf_counter()
+	try:
+		yield stats
+	finally:
+		stats.wall_time = time.perf_counter() - start
+		stats.peak_rss = peak_rss()
+		if trace_memory and tracemalloc.is_tracing():
+			stats.peak_memory = max(
+				[stats.peak_memory, tracemalloc.get_traced_memory()[1]]
+				+ [s.peak_memory for s in stats.stages.values()])
+		if started_tracing:
+			tracemalloc.stop()
+		_active_stats = previous_stats
+		for collected in _collectors:
+			collected.append(stats)
+
+@contextmanager
+def collecting():
+	'''
+	Collects the ImportStats of every recording that finishes inside of the
+	with block into the list the with statement gives you.
+
+	This gets at the statistics of the import operators, which start their
+	own recordings, from scripts that run them.
+	'''
+	collected = []
+	_collectors.append(collected)
+	try:
+		yield collected
+	finally:
+		_collectors.remove(collected)
+
+@contextmanager
+def stage(name):
+	'''Marks the with block as a stage of the active recording, if any.'''
+	if _active_stats is None:
+		yield None
+	else:
+		with _active_stats.stage(name) as stats:
+			yield stats
+
+def count(key, amount=1):
+	'''
+	Counts amount things of type key in the current stage, if recording.
+
+	Keys used by the importers are 'datablocks', 'keyframes',
+	'vertex_group_writes', 'mesh_validations', 'sharp_edges',
+	'custom_normals' (in loops), 'instances', 'tag_cache_hits' and
+	'tag_cache_misses', plus the problems from core.validation.FIXES.
+	'''
+	if _active_stats is not None:
+		_active_stats.count(key, amount)
+
+@contextmanager
+def profiling(filepath):
+	'''
+	Runs the with block under cProfile and dumps the result to filepath.
+
+	Does nothing if filepath is empty, so the caller doesn't need to branch.
+	'''
+	if not filepath:
+		yield None
+		return
+
+	profile = cProfile.Profile()
+	profile.enable()
+	try:
+		yield profile
+	finally:
+		profile.disable()
+		profile.dump_stats(filepath)
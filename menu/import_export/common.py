@@ -0,0 +1,92 @@
+'''
+Functionality shared between the import operators.
+'''
+import os
+import sys
+from contextlib import contextmanager
+
+import bpy
+
+from ...instrumentation import count, recording, profiling, stage
+from ...preferences import get_preferences
+
+@contextmanager
+def recorded_import(operator, context, filepath):
+	'''
+	Records the statistics of everything imported inside of the with block.
+
+	The summary is reported through the operator so it shows up in the Info
+	editor. Depending on the addon preferences, the statistics are also
+	written as JSON, the whole block is run under cProfile, and the Python
+	allocations of every stage are traced with tracemalloc. Without the
+	tracing only the peak resident memory is measured, which is free. The
+	shared tag loader gets the preferences applied, and what it did during
+	the block is counted as 'tag_cache_hits' and 'tag_cache_misses' of the
+'tags' stage.
+	'''
+	prefs = get_preferences(context)
+	loader = get_tag_loader(context)
+	hits, misses = loader.hits, loader.misses
+	out_dir = prefs.stats_directory if prefs else ""
+	base_name = os.path.basename(os.path.normpath(filepath))
+
+	prof_path = ""
+	if prefs and prefs.profile_imports:
+		prof_path = os.path.join(
+			bpy.path.abspath(out_dir) or bpy.app.tempdir, base_name + '.prof')
+
+	trace_memory = bool(prefs and prefs.trace_memory)
+	with recording(operator.bl_label + ' ' + base_name,
+			trace_memory=trace_memory) as stats:
+		with profiling(prof_path):
+			yield stats
+		# Counts only go to stages, outside of them they are dropped.
+		with stage('tags'):
+			count('tag_cache_hits', loader.hits - hits)
+			count('tag_cache_misses', loader.misses - misses)
+
+	for line in stats.summary_lines():
+		operator.report({'INFO'}, line)
+
+	if out_dir:
+		json_path = os.path.join(
+			bpy.path.abspath(out_dir), base_name + '.stats.json')
+		stats.write_json(json_path)
+		operator.report({'INFO'}, 'Import statistics written to ' + json_path)
+
+	if prof_path:
+		operator.report({'INFO'}, 'Import profile written to ' + prof_path)
+
+def get_tag_loader(context):
+	'''
+	Returns the shared tag loader of core.tags, with the tags directory and
+	cache size from the preferences.
+	'''
+	from ...core.tags import DEFAULT_CACHE_SIZE, get_loader
+
+	prefs = get_preferences(context)
+	if not prefs:
+		return get_loader(max_size=DEFAULT_CACHE_SIZE)
+	return get_loader(tags_directory=bpy.path.abspath(prefs.tags_directory),
+		max_size=prefs.tag_cache_size * 1024 * 1024)
+
+def get_python_executable():
+	'''Returns the Python executable worker processes should run on.'''
+	# Before Blender 2.91 sys.executable points to Blender itself.
+	return getattr(bpy.app, 'binary_path_python', None) or sys.executable
+
+def get_parse_daemon(context):
+	'''
+	Returns the shared parse daemon if the preferences enable it, or None
+	to parse in this process.
+	'''
+	prefs = get_preferences(context)
+	if not prefs or not prefs.use_parse_daemon:
+		return None
+
+	from ...core.daemon import get_daemon, is_supported
+	if not is_supported():
+		return None
+
+	return get_daemon(python_executable=get_python_executable(),
+		idle_timeout=prefs.parse_daemon_idle_timeout)
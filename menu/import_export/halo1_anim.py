@@ -4,31 +4,32 @@ from bpy.utils import register_class, unregister_class
 from bpy.props import BoolProperty, FloatProperty, StringProperty, EnumProperty
 from bpy_extras.io_utils import ImportHelper, ExportHelper, orientation_helper, path_reference_mode, axis_conversion
 
-from ...halo1.anim import (
-	read_halo1anim,
-	read_halojma,
-  	import_animations
-)
+# The animation importer is imported by the methods that use it, so
+# registering the addon doesn't build the reclaimer tag definitions.
 from ...constants import SCALE_MULTIPLIERS
+from ...instrumentation import stage
+from .common import get_parse_daemon, recorded_import
+from ...preferences import get_preferences
+from .modal import ModalImportMixin
 
 # @orientation_helper(axis_forward='-Z') Find the right value for this.
 
 
-class MT_krieg_ImportHalo1Anim(bpy.types.Operator, ImportHelper):
-	"""
-	The import operator for gbxmodel/jms models.
-	This stores the properties when inside of the import dialog, and
-	it specifies what to show on the side panel when importing.
-	"""
-	bl_idname = "import_scene.halo1_anim"
-	bl_label = "Import Halo 1 Animations"
-	bl_options = {'PRESET', 'UNDO'}
+class Halo1AnimImportProperties:
+	'''
+	The properties of the animation import operators, and the methods the
+	blocking and the modal one share.
+
+	Blender only registers the properties of bases that aren't Blender
+	types themselves, so they live on this mixin instead of on the
+	blocking operator the modal one builds on.
+	'''
 
 	# Import-file-dialog settings:
 
 	#filename_ext = ".model_animations"
 	filter_glob: StringProperty( #".jma", ".jmm", ".jmo", ".jmr", ".jmt", ".jmw", ".jmz",
-		default="*;*.model_animations;*.jma;*.jmm;*.jmo;*.jmr;*.jmt;*.jmw;*.jmz",
+		default="*;*.model_animations;*.krieg;*.jma;*.jmm;*.jmo;*.jmr;*.jmt;*.jmw;*.jmz",
 		#options={'HIDDEN'},
 	)
 
@@ -57,6 +58,12 @@ class MT_krieg_ImportHalo1Anim(bpy.types.Operator, ImportHelper):
 		description= "Check this https://num0005.github.io/h2codez_docs/w/H2Tool/Animations/Animations.html"
 	)
 
+	low_memory: BoolProperty(
+		name="Low Memory",
+		description="Import animations one at a time and free the data of each one as soon as it is in the scene. Keeps the peak memory use down on very large files.",
+		default=False,
+	)
+
 	scale_enum: EnumProperty(
 		name="Scale",
 		items=(
@@ -73,25 +80,18 @@ class MT_krieg_ImportHalo1Anim(bpy.types.Operator, ImportHelper):
 		min=0.0,
 	)
 
-	def execute(self, context):
+	def get_scale(self):
 		# Set appropriate scaling
-		scale = 1.0
 		if self.scale_enum in SCALE_MULTIPLIERS:
-			scale = SCALE_MULTIPLIERS[self.scale_enum]
+			return SCALE_MULTIPLIERS[self.scale_enum]
 		elif self.scale_enum == 'CUSTOM':
-			scale = self.scale_float
+			return self.scale_float
 		else:
 			raise ValueError('Invalid scale_enum state.')
-		
-		jma = None
-		anim_name, ext = os.path.splitext(os.path.basename(self.filepath))
-		if ext == ".model_animations":
-			jma = read_halo1anim(self.filepath)
-		else:
-			jma = read_halojma(self.filepath)
-		format_filter = self.type_enum
-		import_animations(jma,scale,format_filter)
-		return {'FINISHED'}
+
+	def keep_debug_data(self, context):
+		prefs = get_preferences(context)
+		return bool(prefs and prefs.keep_debug_data)
 
 	def draw(self, context):
 		layout = self.layout
@@ -109,10 +109,84 @@ class MT_krieg_ImportHalo1Anim(bpy.types.Operator, ImportHelper):
 			row = box.row()
 			row.prop(self, "scale_float")
 
+		layout.prop(self, "low_memory")
+
+
+class MT_krieg_ImportHalo1Anim(Halo1AnimImportProperties,
+		bpy.types.Operator, ImportHelper):
+	"""
+	The import operator for gbxmodel/jms models.
+	This stores the properties when inside of the import dialog, and
+	it specifies what to show on the side panel when importing.
+	"""
+	bl_idname = "import_scene.halo1_anim"
+	bl_label = "Import Halo 1 Animations"
+	bl_options = {'PRESET', 'UNDO'}
+
+	def execute(self, context):
+		scale = self.get_scale()
+		
+		with recorded_import(self, context, self.filepath):
+			self.import_anim(context, scale)
+
+		return {'FINISHED'}
+
+	def import_anim(self, context, scale):
+		with stage('parse'):
+			jma = parse_anim(self.filepath, get_parse_daemon(context))
+		format_filter = self.type_enum
+		from ...halo1.anim import import_animations
+
+		with stage('animations'):
+			import_animations(jma,scale,format_filter,
+				release=self.low_memory, keep_debug=self.keep_debug_data(context))
+
+
+def parse_anim(filepath, daemon=None):
+	'''
+	Reads the animations from a model_animations tag or a jma file into a
+	list of AnimationArrays. Uses the parse daemon if one is given.
+	'''
+	if daemon:
+		return daemon.parse_animations(filepath)
+
+	from ...core.parsing import read_halo1anim_arrays
+	return read_halo1anim_arrays(filepath)
+
+
+class MT_krieg_ImportHalo1AnimModal(ModalImportMixin,
+		Halo1AnimImportProperties, bpy.types.Operator, ImportHelper):
+	"""
+	Imports Halo 1 animations without freezing the interface.
+	The import shows its progress and can be cancelled with Esc.
+	"""
+	bl_idname = "import_scene.halo1_anim_modal"
+	bl_label = "Import Halo 1 Animations (Background)"
+	bl_options = {'PRESET', 'UNDO'}
+
+	def get_parse_jobs(self, context):
+		filepath = self.filepath
+		daemon = get_parse_daemon(context)
+
+		def parse():
+			try:
+				yield filepath, parse_anim(filepath, daemon), None
+			except Exception as e:
+				yield filepath, None, e
+
+		return 1, parse
+
+	def iter_build(self, context, filepath, animations):
+		from ...halo1.anim import iter_import_animations
+		yield from iter_import_animations(animations,
+			self.get_scale(), self.type_enum,
+			release=self.low_memory, keep_debug=self.keep_debug_data(context))
+
 
 # Enumerate all classes for easy register/unregister.
 classes = (
 	MT_krieg_ImportHalo1Anim,
+	MT_krieg_ImportHalo1AnimModal,
 )
 
 def register():
@@ -0,0 +1,224 @@
+import bpy
+import math
+from bpy.utils import register_class, unregister_class
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
+from bpy_extras.io_utils import ImportHelper
+
+# The bsp importer is imported by the methods that use it, so registering
+# the addon doesn't build the reclaimer tag definitions.
+from ...constants import SCALE_MULTIPLIERS
+from ...instrumentation import stage
+from .common import get_parse_daemon, recorded_import
+from .modal import ModalImportMixin
+
+class Halo1BspImportProperties:
+	'''
+	The properties of the bsp import operators, and the methods the
+	blocking and the modal one share.
+
+	Blender only registers the properties of bases that aren't Blender
+	types themselves, so they live on this mixin instead of on the
+	blocking operator the modal one builds on.
+	'''
+
+	# Import-file-dialog settings:
+
+	filename_ext = ".scenario_structure_bsp"
+	filter_glob: StringProperty(
+		default="*.scenario_structure_bsp",
+		options={'HIDDEN'},
+	)
+
+	# Geometry settings:
+
+	chunk_triangles: IntProperty(
+		name="Triangles per Chunk",
+		description="The most triangles a single object gets. Materials are never split up, so bigger ones get an object of their own.",
+		default=100000,
+		min=1000,
+	)
+	low_memory: BoolProperty(
+		name="Low Memory",
+		description="Free the data of every chunk as soon as it is in the scene. Keeps the peak memory use down on very large levels.",
+		default=False,
+	)
+	trust_validated: BoolProperty(
+		name="Skip Mesh Validation",
+		description="Don't run Blender's mesh validation on chunks that passed the importer's own checks. Those already fix everything it would, so this only saves time.",
+		default=True,
+	)
+	derive_sharp_edges: BoolProperty(
+		name="Sharp Edges Instead of Custom Normals",
+		description="Weld split vertices and mark the hard edges sharp. Custom normals are only added to chunks where Blender's own normals would be off by more than the tolerance.",
+		default=False,
+	)
+	normal_tolerance: FloatProperty(
+		name="Normal Tolerance",
+		description="How far Blender's normals may be off from the bsp's before custom normals are added anyway.",
+		default=math.radians(1.0),
+		min=0.0,
+		max=math.radians(45.0),
+		subtype='ANGLE',
+	)
+
+	# Scale settings:
+
+	scale_enum: EnumProperty(
+		name="Scale",
+		items=(
+			('METRIC', "Blender",  "Use Blender's metric scaling."),
+			('MAX',    "3ds Max",  "Use 3dsmax's 100xHalo scale."),
+			('HALO',   "Internal", "Use Halo's internal 1.0 scale (small)."),
+			('CUSTOM', "Custom",   "Set your own scaling multiplier."),
+		)
+	)
+	scale_float: FloatProperty(
+		name="Custom Scale",
+		description="Set your own scale.",
+		default=1.0,
+		min=0.0,
+	)
+
+	def get_scale(self):
+		# Set appropriate scaling
+		if self.scale_enum in SCALE_MULTIPLIERS:
+			return SCALE_MULTIPLIERS[self.scale_enum]
+		elif self.scale_enum == 'CUSTOM':
+			return self.scale_float
+		else:
+			raise ValueError('Invalid scale_enum state.')
+
+	def report_problems(self, bsp):
+		'''Warns about everything that had to be fixed in the geometry.'''
+		from ...core.validation import GeometryReport
+		report = GeometryReport(bsp.problems)
+		if not report.is_clean:
+			self.report({'WARNING'}, 'Fixed %s: %s' % (
+				bsp.name, report.summary()))
+
+	def get_build_options(self, scale):
+		return dict(scale=scale, release=self.low_memory,
+			trust_validated=self.trust_validated,
+			normal_tolerance=(self.normal_tolerance
+				if self.derive_sharp_edges else None))
+
+	def draw(self, context):
+		layout = self.layout
+
+		# Scale settings elements:
+
+		box = layout.box()
+		box.label(text="Scale:")
+		row = box.row()
+		row.prop(self, "scale_enum", expand=True)
+
+		if self.scale_enum == 'CUSTOM':
+			row = box.row()
+			row.prop(self, "scale_float")
+
+		# Geometry settings elements:
+
+		box = layout.box()
+		box.label(text="Geometry:")
+		box.prop(self, "chunk_triangles")
+		box.prop(self, "trust_validated")
+		box.prop(self, "derive_sharp_edges")
+		if self.derive_sharp_edges:
+			box.prop(self, "normal_tolerance")
+		box.prop(self, "low_memory")
+
+
+class MT_krieg_ImportHalo1Bsp(Halo1BspImportProperties,
+		bpy.types.Operator, ImportHelper):
+	"""
+	The import operator for scenario_structure_bsp tags.
+	Imports the render geometry of a level in chunks, with the lightmap
+	uvs in a second uv layer.
+	"""
+	bl_idname = "import_scene.halo1_bsp"
+	bl_label = "Import Halo 1 BSP"
+	bl_options = {'PRESET', 'UNDO'}
+
+	def execute(self, context):
+		scale = self.get_scale()
+
+		with recorded_import(self, context, self.filepath):
+			with stage('parse'):
+				bsp = parse_bsp(self.filepath, self.chunk_triangles,
+					get_parse_daemon(context))
+
+			from ...halo1.bsp import import_halo1_bsp
+			import_halo1_bsp(bsp, **self.get_build_options(scale))
+			self.report_problems(bsp)
+
+		return {'FINISHED'}
+
+
+def parse_bsp(filepath, chunk_triangles, daemon=None):
+	'''
+	Reads the render geometry of a bsp tag into BspArrays. Uses the parse
+	daemon if one is given and the chunk size is the default.
+
+	Read here, the chunks are only built once the importer gets to them.
+	The daemon has to send them all over at once.
+	'''
+	from ...core.parsing import read_halo1bsp_arrays
+	from ...core.bsp import CHUNK_TRIANGLES
+
+	# The daemon only takes file paths.
+	if daemon and chunk_triangles == CHUNK_TRIANGLES:
+		return daemon.parse_bsp(filepath)
+
+	return read_halo1bsp_arrays(filepath, chunk_triangles=chunk_triangles,
+		lazy=True)
+
+
+class MT_krieg_ImportHalo1BspModal(ModalImportMixin,
+		Halo1BspImportProperties, bpy.types.Operator, ImportHelper):
+	"""
+	Imports a Halo 1 BSP without freezing the interface.
+	The import shows its progress and can be cancelled with Esc.
+	"""
+	bl_idname = "import_scene.halo1_bsp_modal"
+	bl_label = "Import Halo 1 BSP (Background)"
+	bl_options = {'PRESET', 'UNDO'}
+
+	def get_parse_jobs(self, context):
+		filepath = self.filepath
+		chunk_triangles = self.chunk_triangles
+		daemon = get_parse_daemon(context)
+
+		def parse():
+			try:
+				yield filepath, parse_bsp(filepath, chunk_triangles, daemon), None
+			except Exception as e:
+				yield filepath, None, e
+
+		return 1, parse
+
+	def iter_build(self, context, filepath, bsp):
+		from ...halo1.bsp import iter_import_halo1_bsp
+		yield from iter_import_halo1_bsp(bsp,
+			**self.get_build_options(self.get_scale()))
+		self.report_problems(bsp)
+
+
+# Enumerate all classes for easy register/unregister.
+classes = (
+	MT_krieg_ImportHalo1Bsp,
+	MT_krieg_ImportHalo1BspModal,
+)
+
+def register():
+	for cls in classes:
+		register_class(cls)
+
+
+def unregister():
+	# Unregister classes in reverse order to avoid any dependency problems.
+	for cls in reversed(classes):
+		unregister_class(cls)
+
+
+if __name__ == "__main__":
+	register()
@@ -0,0 +1,131 @@
+import bpy
+from bpy.utils import register_class, unregister_class
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, StringProperty
+from bpy_extras.io_utils import ImportHelper
+
+# The collision importer is imported by the methods that use it, so
+# registering the addon doesn't build the reclaimer tag definitions.
+from ...constants import SCALE_MULTIPLIERS
+from ...instrumentation import stage
+from .common import get_parse_daemon, recorded_import
+
+class MT_krieg_ImportHalo1Collision(bpy.types.Operator, ImportHelper):
+	"""
+	The import operator for model_collision_geometry tags.
+	Imports every permutation of every node as its own object, parented to
+	the bones of the active armature.
+	"""
+	bl_idname = "import_scene.halo1_collision"
+	bl_label = "Import Halo 1 Collision"
+	bl_options = {'PRESET', 'UNDO'}
+
+	# Import-file-dialog settings:
+
+	filename_ext = ".model_collision_geometry"
+	filter_glob: StringProperty(
+		default="*.model_collision_geometry",
+		options={'HIDDEN'},
+	)
+
+	use_armature: BoolProperty(
+		name="Attach to Active Armature",
+		description="Parent every piece to the bone of its node in the active armature, like the one the model import made.",
+		default=True,
+	)
+
+	scale_enum: EnumProperty(
+		name="Scale",
+		items=(
+			('METRIC', "Blender",  "Use Blender's metric scaling."),
+			('MAX',    "3ds Max",  "Use 3dsmax's 100xHalo scale."),
+			('HALO',   "Internal", "Use Halo's internal 1.0 scale (small)."),
+			('CUSTOM', "Custom",   "Set your own scaling multiplier."),
+		)
+	)
+	scale_float: FloatProperty(
+		name="Custom Scale",
+		description="Set your own scale.",
+		default=1.0,
+		min=0.0,
+	)
+
+	def get_scale(self):
+		# Set appropriate scaling
+		if self.scale_enum in SCALE_MULTIPLIERS:
+			return SCALE_MULTIPLIERS[self.scale_enum]
+		elif self.scale_enum == 'CUSTOM':
+			return self.scale_float
+		else:
+			raise ValueError('Invalid scale_enum state.')
+
+	def execute(self, context):
+		armature = None
+		if self.use_armature:
+			armature = context.active_object
+			if armature is None or armature.type != 'ARMATURE':
+				self.report({'WARNING'}, 'No active armature, '
+					'the collision stays in the space of its nodes.')
+				armature = None
+
+		with recorded_import(self, context, self.filepath):
+			with stage('parse'):
+				collision = parse_collision(self.filepath,
+					get_parse_daemon(context))
+
+			from ...core.validation import GeometryReport
+			report = GeometryReport(collision.problems)
+			if not report.is_clean:
+				self.report({'WARNING'}, 'Fixed %s: %s' % (
+					collision.name, report.summary()))
+
+			from ...halo1.collision import import_halo1_collision
+			import_halo1_collision(collision, armature=armature,
+				scale=self.get_scale())
+
+		return {'FINISHED'}
+
+	def draw(self, context):
+		layout = self.layout
+
+		layout.prop(self, "use_armature")
+
+		box = layout.box()
+		box.label(text="Scale:")
+		row = box.row()
+		row.prop(self, "scale_enum", expand=True)
+
+		if self.scale_enum == 'CUSTOM':
+			row = box.row()
+			row.prop(self, "scale_float")
+
+
+def parse_collision(filepath, daemon=None):
+	'''
+	Reads a model_collision_geometry tag into CollisionArrays. Uses the
+	parse daemon if one is given.
+	'''
+	if daemon:
+		return daemon.parse_collision(filepath)
+
+	from ...core.parsing import read_halo1collision_arrays
+	return read_halo1collision_arrays(filepath)
+
+
+# Enumerate all classes for easy register/unregister.
+classes = (
+	MT_krieg_ImportHalo1Collision,
+)
+
+def register():
+	for cls in classes:
+		register_class(cls)
+
+
+def unregister():
+	# Unregister classes in reverse order to avoid any dependency problems.
+	for cls in reversed(classes):
+		unregister_class(cls)
+
+
+if __name__ == "__main__":
+	register()
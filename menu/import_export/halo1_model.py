@@ -1,37 +1,100 @@
 import bpy
+import math
 import os
 from bpy.utils import register_class, unregister_class
-from bpy.props import BoolProperty, FloatProperty, StringProperty, EnumProperty
+from bpy.props import (BoolProperty, CollectionProperty, EnumProperty,
+	FloatProperty, IntProperty, StringProperty)
+from bpy.types import OperatorFileListElement
 from bpy_extras.io_utils import ImportHelper, ExportHelper, orientation_helper, path_reference_mode, axis_conversion
 
-from ...halo1.model import (
-	read_halo1model,
-	import_halo1_nodes_from_jms,
-	import_halo1_markers_from_jms,
-	import_halo1_all_regions_from_jms,
-	import_halo1_model_shader,
-	build_skeleton
-)
+# The parsers and importers are imported by the methods that use them.
+# Importing them here would build all reclaimer tag definitions on every
+# Blender startup.
 from ...constants import SCALE_MULTIPLIERS
+from ...instrumentation import stage
+from .common import get_parse_daemon, get_python_executable, recorded_import
+from .modal import ModalImportMixin
 
-#@orientation_helper(axis_forward='-Z') Find the right value for this.
-class MT_krieg_ImportHalo1Model(bpy.types.Operator, ImportHelper):
-	"""
-	The import operator for gbxmodel/jms models.
-	This stores the properties when inside of the import dialog, and
-	it specifies what to show on the side panel when importing.
-	"""
-	bl_idname = "import_scene.halo1_model"
-	bl_label = "Import Halo 1 Model"
-	bl_options = {'PRESET', 'UNDO'}
+class Halo1ModelImportProperties:
+	'''
+	The properties of the model import operators, and the methods the
+	blocking and the modal one share.
+
+	Blender only registers the properties of bases that aren't Blender
+	types themselves, so they live on this mixin instead of on the
+	blocking operator the modal one builds on.
+	'''
 
 	# Import-file-dialog settings:
 
 	filename_ext = ".gbxmodel"
 	filter_glob: StringProperty(
-		default="*.gbxmodel;*.model;*.jms",
+		default="*.gbxmodel;*.model;*.jms;*.krieg",
 		options={'HIDDEN'},
 	)
+	files: CollectionProperty(
+		type=OperatorFileListElement,
+		options={'HIDDEN', 'SKIP_SAVE'},
+	)
+	directory: StringProperty(
+		subtype='DIR_PATH',
+		options={'HIDDEN', 'SKIP_SAVE'},
+	)
+
+	# Batch settings:
+
+	import_directory: BoolProperty(
+		name="Whole Directory",
+		description="Import every model in the directory instead of just the selected files.",
+		default=False,
+	)
+	use_worker_processes: BoolProperty(
+		name="Use Worker Processes",
+		description="Parse multiple models in parallel in separate processes.",
+		default=True,
+	)
+	max_workers: IntProperty(
+		name="Max Workers",
+		description="The most worker processes to use. 0 uses one per CPU core.",
+		default=0,
+		min=0,
+	)
+	low_memory: BoolProperty(
+		name="Low Memory",
+		description="Import regions one at a time and free the data of each one as soon as it is in the scene. Keeps the peak memory use down on very large files.",
+		default=False,
+	)
+
+	# Geometry settings:
+
+	trust_validated: BoolProperty(
+		name="Skip Mesh Validation",
+		description="Don't run Blender's mesh validation on regions that passed the importer's own checks. Those already fix everything it would, so this only saves time.",
+		default=True,
+	)
+	single_object: BoolProperty(
+		name="Single Object",
+		description="Import every model (or permutation) as one object, with the region of every face in the \"region\" face attribute. Use Split by Region to get one object per region again.",
+		default=False,
+	)
+	share_meshes: BoolProperty(
+		name="Share Identical Meshes",
+		description="Give regions with the same geometry one shared mesh, between permutations and with meshes imported before. Editing one of them edits all of them.",
+		default=False,
+	)
+	derive_sharp_edges: BoolProperty(
+		name="Sharp Edges Instead of Custom Normals",
+		description="Weld split vertices and mark the hard edges sharp. Custom normals are only added to meshes where Blender's own normals would be off by more than the tolerance. Faster in the viewport and smaller .blend files.",
+		default=False,
+	)
+	normal_tolerance: FloatProperty(
+		name="Normal Tolerance",
+		description="How far Blender's normals may be off from the model's before custom normals are added anyway.",
+		default=math.radians(1.0),
+		min=0.0,
+		max=math.radians(45.0),
+		subtype='ANGLE',
+	)
 
 	# Node settings:
 
@@ -84,37 +147,53 @@ class MT_krieg_ImportHalo1Model(bpy.types.Operator, ImportHelper):
 		min=0.0,
 	)
 
-	def execute(self, context):
+	def get_scale(self):
 		# Set appropriate scaling
-		scale = 1.0
 		if self.scale_enum in SCALE_MULTIPLIERS:
-			scale = SCALE_MULTIPLIERS[self.scale_enum]
+			return SCALE_MULTIPLIERS[self.scale_enum]
 		elif self.scale_enum == 'CUSTOM':
-			scale = self.scale_float
+			return self.scale_float
 		else:
 			raise ValueError('Invalid scale_enum state.')
 
-		# Test if jms import function doesn't crash.
-		model = read_halo1model(self.filepath)
+	def get_filepaths(self):
+		'''Returns the paths of all model files this import should import.'''
+		directory = self.directory or os.path.dirname(self.filepath)
+		if self.import_directory:
+			from ...core.batch import find_model_files
+			return find_model_files(directory)
 
-		# Get name without path or file extension.
-		name = os.path.basename(os.path.splitext(self.filepath)[0])
+		names = [file.name for file in self.files if file.name]
+		if names:
+			return [os.path.join(directory, name) for name in names]
 
-		# Import nodes into the scene.
-		armature, nodes = import_halo1_nodes_from_jms(model[0], scale=scale, node_size=self.node_size,build_skeleton=self.build_skeleton)
-		# Import markers.
-		markers = import_halo1_markers_from_jms(model[0], scale=scale,
-			node_size=self.marker_size, armature=armature, scene_nodes=nodes)
+		return [self.filepath]
 
-		#for mat in [ mat for mat in ]:
-		#	import_halo1_model_shader(mat.name)
-		for jms in model:
-			for mat in jms.materials:
-				import_halo1_model_shader(mat.name)
-		for jms in model:
-			import_halo1_all_regions_from_jms(jms, name=name, scale=scale, parent_rig=armature)
+	def report_problems(self, filepath, models):
+		'''Warns about everything that had to be fixed in the geometry.'''
+		from ...core.validation import GeometryReport
+		for model in models:
+			report = GeometryReport(model.problems)
+			if not report.is_clean:
+				self.report({'WARNING'}, 'Fixed %s: %s' % (
+					os.path.basename(filepath), report.summary()))
 
-		return {'FINISHED'}
+	def get_build_options(self, filepath, scale):
+		from ...core.container import container_source_path
+
+		# Get name without path or file extension, containers are named
+		# after the file they were made from.
+		name = os.path.basename(os.path.splitext(
+			container_source_path(filepath))[0])
+
+		return dict(name=name, scale=scale,
+			node_size=self.node_size, marker_size=self.marker_size,
+			build_skeleton=self.build_skeleton, release=self.low_memory,
+			trust_validated=self.trust_validated,
+			single_object=self.single_object,
+			share_meshes=self.share_meshes,
+			normal_tolerance=(self.normal_tolerance
+				if self.derive_sharp_edges else None))
 
 	def draw(self, context):
 		layout = self.layout
@@ -149,10 +228,166 @@ class MT_krieg_ImportHalo1Model(bpy.types.Operator, ImportHelper):
 			row = box.row()
 			row.prop(self, "scale_float")
 
+		# Geometry settings elements:
+
+		box = layout.box()
+		box.label(text="Geometry:")
+		box.prop(self, "single_object")
+		box.prop(self, "share_meshes")
+		box.prop(self, "trust_validated")
+		box.prop(self, "derive_sharp_edges")
+		if self.derive_sharp_edges:
+			box.prop(self, "normal_tolerance")
+
+		# Batch settings elements:
+
+		box = layout.box()
+		box.label(text="Batch:")
+		box.prop(self, "import_directory")
+		box.prop(self, "use_worker_processes")
+		if self.use_worker_processes:
+			box.prop(self, "max_workers")
+		box.prop(self, "low_memory")
+
+
+#@orientation_helper(axis_forward='-Z') Find the right value for this.
+class MT_krieg_ImportHalo1Model(Halo1ModelImportProperties,
+		bpy.types.Operator, ImportHelper):
+	"""
+	The import operator for gbxmodel/jms models.
+	This stores the properties when inside of the import dialog, and
+	it specifies what to show on the side panel when importing.
+	"""
+	bl_idname = "import_scene.halo1_model"
+	bl_label = "Import Halo 1 Model"
+	bl_options = {'PRESET', 'UNDO'}
+
+	def execute(self, context):
+		scale = self.get_scale()
+
+		filepaths = self.get_filepaths()
+		if not filepaths:
+			self.report({'WARNING'}, 'No models to import.')
+			return {'CANCELLED'}
+
+		if len(filepaths) == 1:
+			with recorded_import(self, context, filepaths[0]):
+				self.import_model(context, filepaths[0], scale)
+		else:
+			with recorded_import(self, context, self.directory):
+				self.import_models(context, filepaths, scale)
+
+		return {'FINISHED'}
+
+	def import_model(self, context, filepath, scale):
+		# Test if jms import function doesn't crash.
+		from ...core.parsing import read_halo1model_arrays
+
+		daemon = get_parse_daemon(context)
+		with stage('parse'):
+			if daemon:
+				models = daemon.parse_model(filepath)
+			else:
+				models = read_halo1model_arrays(filepath)
+
+		self.build_model(filepath, models, scale)
+
+	def import_models(self, context, filepaths, scale):
+		'''
+		Parses all files in worker processes and builds every model in the
+		scene as soon as its arrays arrive.
+		'''
+		if self.use_worker_processes:
+			from ...core.batch import iter_parsed_models
+			results = iter_parsed_models(filepaths,
+				max_workers=self.max_workers,
+				python_executable=get_python_executable())
+		else:
+			daemon = get_parse_daemon(context)
+			results = (
+				parse_model_in_process(filepath, daemon)
+				for filepath in filepaths
+			)
+
+		failed = 0
+		for filepath, models, error in results:
+			if error is None:
+				# One model that can't be built doesn't stop the others.
+				try:
+					self.build_model(filepath, models, scale)
+				except Exception as e:
+					error = e
+
+			if error is not None:
+				self.report({'WARNING'},
+					'Could not import %s: %s' % (filepath, error))
+				failed += 1
+
+		self.report({'INFO'}, 'Imported %d of %d models.' % (
+			len(filepaths) - failed, len(filepaths)))
+
+	def build_model(self, filepath, models, scale):
+		from ...halo1.model import import_halo1_model
+		self.report_problems(filepath, models)
+		import_halo1_model(models, **self.get_build_options(filepath, scale))
+
+
+def parse_model_in_process(filepath, daemon=None):
+	'''
+	Parses a model file in this process, or in the parse daemon if one is
+	given, and returns the result the same way core.batch.iter_parsed_models
+	does.
+	'''
+	try:
+		if daemon:
+			return filepath, daemon.parse_model(filepath), None
+
+		from ...core.parsing import read_halo1model_arrays
+		return filepath, read_halo1model_arrays(filepath), None
+	except Exception as e:
+		return filepath, None, e
+
+
+class MT_krieg_ImportHalo1ModelModal(ModalImportMixin,
+		Halo1ModelImportProperties, bpy.types.Operator, ImportHelper):
+	"""
+	Imports Halo 1 models without freezing the interface.
+	The models are parsed in the background and can be cancelled with Esc.
+	"""
+	bl_idname = "import_scene.halo1_model_modal"
+	bl_label = "Import Halo 1 Model (Background)"
+	bl_options = {'PRESET', 'UNDO'}
+
+	def get_parse_jobs(self, context):
+		filepaths = self.get_filepaths()
+		if len(filepaths) > 1 and self.use_worker_processes:
+			from ...core.batch import iter_parsed_models
+			max_workers = self.max_workers
+			python_executable = get_python_executable()
+			return len(filepaths), lambda: iter_parsed_models(filepaths,
+				max_workers=max_workers, python_executable=python_executable)
+
+		daemon = get_parse_daemon(context)
+		return len(filepaths), lambda: (
+			parse_model_in_process(filepath, daemon) for filepath in filepaths
+		)
+
+	def get_stats_path(self):
+		if len(self.get_filepaths()) > 1:
+			return self.directory
+		return self.filepath
+
+	def iter_build(self, context, filepath, models):
+		from ...halo1.model import iter_import_halo1_model
+		self.report_problems(filepath, models)
+		options = self.get_build_options(filepath, self.get_scale())
+		yield from iter_import_halo1_model(models, **options)
+
 
 # Enumerate all classes for easy register/unregister.
 classes = (
 	MT_krieg_ImportHalo1Model,
+	MT_krieg_ImportHalo1ModelModal,
 )
 
 def register():
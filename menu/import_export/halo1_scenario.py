@@ -0,0 +1,190 @@
+import bpy
+import math
+import os
+from bpy.utils import register_class, unregister_class
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, StringProperty
+from bpy_extras.io_utils import ImportHelper
+
+# The scenario importer is imported by the methods that use it, so
+# registering the addon doesn't build the reclaimer tag definitions.
+from ...constants import SCALE_MULTIPLIERS
+from ...instrumentation import stage
+from .common import get_tag_loader, recorded_import
+
+class MT_krieg_ImportHalo1Scenario(bpy.types.Operator, ImportHelper):
+	"""
+	The import operator for the objects placed in scenario tags.
+	Imports the model of every scenery, biped, vehicle, equipment, weapon
+	and device once, and places collection instances of it.
+	"""
+	bl_idname = "import_scene.halo1_scenario"
+	bl_label = "Import Halo 1 Scenario Objects"
+	bl_options = {'PRESET', 'UNDO'}
+
+	# Import-file-dialog settings:
+
+	filename_ext = ".scenario"
+	filter_glob: StringProperty(
+		default="*.scenario",
+		options={'HIDDEN'},
+	)
+
+	tags_directory: StringProperty(
+		name="Tags Directory",
+		description="The tags directory the object and model tags are in. Leave empty to use the one from the preferences, or else the tags directory the scenario is in.",
+		subtype='DIR_PATH',
+		default="",
+	)
+
+	# Geometry settings:
+
+	trust_validated: BoolProperty(
+		name="Skip Mesh Validation",
+		description="Don't run Blender's mesh validation on regions that passed the importer's own checks. Those already fix everything it would, so this only saves time.",
+		default=True,
+	)
+	single_object: BoolProperty(
+		name="Single Object",
+		description="Import every model as one object, with the region of every face in the \"region\" face attribute.",
+		default=True,
+	)
+	share_meshes: BoolProperty(
+		name="Share Identical Meshes",
+		description="Give regions with the same geometry one shared mesh, between models and with meshes imported before.",
+		default=False,
+	)
+	derive_sharp_edges: BoolProperty(
+		name="Sharp Edges Instead of Custom Normals",
+		description="Weld split vertices and mark the hard edges sharp. Custom normals are only added to meshes where Blender's own normals would be off by more than the tolerance.",
+		default=False,
+	)
+	normal_tolerance: FloatProperty(
+		name="Normal Tolerance",
+		description="How far Blender's normals may be off from the model's before custom normals are added anyway.",
+		default=math.radians(1.0),
+		min=0.0,
+		max=math.radians(45.0),
+		subtype='ANGLE',
+	)
+
+	# Scale settings:
+
+	scale_enum: EnumProperty(
+		name="Scale",
+		items=(
+			('METRIC', "Blender",  "Use Blender's metric scaling."),
+			('MAX',    "3ds Max",  "Use 3dsmax's 100xHalo scale."),
+			('HALO',   "Internal", "Use Halo's internal 1.0 scale (small)."),
+			('CUSTOM', "Custom",   "Set your own scaling multiplier."),
+		)
+	)
+	scale_float: FloatProperty(
+		name="Custom Scale",
+		description="Set your own scale.",
+		default=1.0,
+		min=0.0,
+	)
+
+	def get_scale(self):
+		# Set appropriate scaling
+		if self.scale_enum in SCALE_MULTIPLIERS:
+			return SCALE_MULTIPLIERS[self.scale_enum]
+		elif self.scale_enum == 'CUSTOM':
+			return self.scale_float
+		else:
+			raise ValueError('Invalid scale_enum state.')
+
+	def execute(self, context):
+		from ...core.parsing import read_halo1scenario_arrays
+
+		# Shared by the scenario and all of its models, so every tag is
+		# only parsed once.
+		loader = get_tag_loader(context)
+
+		with recorded_import(self, context, self.filepath):
+			with stage('parse'):
+				scenario = read_halo1scenario_arrays(self.filepath,
+					loader=loader,
+					tags_directory=bpy.path.abspath(self.tags_directory))
+				models = [self.parse_model(filepath, loader)
+					for filepath in scenario.models]
+
+			for tag_path in scenario.missing:
+				self.report({'WARNING'}, 'Missing tag ' + tag_path)
+
+			from ...halo1.scenario import import_halo1_scenario
+			import_halo1_scenario(scenario, models,
+				**self.get_build_options())
+
+		self.report({'INFO'}, 'Placed %d objects using %d models.' % (
+			len(scenario), len(scenario.models)))
+		return {'FINISHED'}
+
+	def parse_model(self, filepath, loader):
+		'''
+		Reads a model through loader, or returns None with a warning if it
+		can't be read.
+		'''
+		from ...core.parsing import read_halo1model_arrays
+		try:
+			models = read_halo1model_arrays(filepath, loader=loader)
+		except Exception as error:
+			self.report({'WARNING'}, 'Could not read %s: %s' % (
+				os.path.basename(filepath), error))
+			return None
+		return models or None
+
+	def get_build_options(self):
+		return dict(scale=self.get_scale(),
+			trust_validated=self.trust_validated,
+			single_object=self.single_object,
+			share_meshes=self.share_meshes,
+			normal_tolerance=(self.normal_tolerance
+				if self.derive_sharp_edges else None))
+
+	def draw(self, context):
+		layout = self.layout
+
+		layout.prop(self, "tags_directory")
+
+		# Scale settings elements:
+
+		box = layout.box()
+		box.label(text="Scale:")
+		row = box.row()
+		row.prop(self, "scale_enum", expand=True)
+
+		if self.scale_enum == 'CUSTOM':
+			row = box.row()
+			row.prop(self, "scale_float")
+
+		# Geometry settings elements:
+
+		box = layout.box()
+		box.label(text="Geometry:")
+		box.prop(self, "trust_validated")
+		box.prop(self, "single_object")
+		box.prop(self, "share_meshes")
+		box.prop(self, "derive_sharp_edges")
+		if self.derive_sharp_edges:
+			box.prop(self, "normal_tolerance")
+
+
+# Enumerate all classes for easy register/unregister.
+classes = (
+	MT_krieg_ImportHalo1Scenario,
+)
+
+def register():
+	for cls in classes:
+		register_class(cls)
+
+
+def unregister():
+	# Unregister classes in reverse order to avoid any dependency problems.
+	for cls in reversed(classes):
+		unregister_class(cls)
+
+
+if __name__ == "__main__":
+	register()
@@ -0,0 +1,211 @@
+'''
+Running imports without freezing the user interface.
+
+The files are parsed on a background thread, and the scene is built a bit
+at a time from a timer, so Blender keeps redrawing and the import can be
+cancelled with Esc.
+'''
+import os
+import queue
+import threading
+from contextlib import ExitStack
+from time import perf_counter
+
+import bpy
+
+from ...scene.util import snapshot_datablocks, remove_datablocks_since
+from .common import recorded_import
+
+# Events that are let through while importing, so the user can still look
+# around. Everything else is blocked, so nothing can change the scene under
+# the import, or get removed along with it when it is cancelled.
+NAVIGATION_EVENTS = {
+	'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'MOUSEMOVE',
+	'INBETWEEN_MOUSEMOVE', 'TRACKPADPAN', 'TRACKPADZOOM', 'MOUSEROTATE',
+	'NDOF_MOTION', 'WINDOW_DEACTIVATE',
+}
+
+class ModalImportMixin:
+	'''
+	Turns an import operator into a modal one.
+
+	The operator it is mixed into needs to implement:
+
+	get_parse_jobs(context)
+		Returns the number of jobs and a function that yields a
+		(label, data, exception) tuple for every job. The function runs on
+		a background thread, so it can't touch bpy or the operator.
+
+	iter_build(context, label, data)
+		A generator that builds the parsed data in the scene and yields a
+		(done, total) tuple after every step.
+	'''
+	# Seconds spent building the scene every timer tick.
+	time_slice = 0.05
+	timer_interval = 0.02
+
+	def execute(self, context):
+		self._job_count, parse = self.get_parse_jobs(context)
+		if not self._job_count:
+			self.report({'WARNING'}, 'Nothing to import.')
+			return {'CANCELLED'}
+
+		self._snapshot = snapshot_datablocks()
+		self._results = queue.Queue()
+		self._stop = threading.Event()
+		self._thread = threading.Thread(
+			target=self.parse_in_background,
+			args=(parse, self._results, self._stop),
+			daemon=True)
+
+		self._steps = None
+		self._label = ''
+		self._jobs_done = 0
+		self._failed = 0
+		self._progress = 0.0
+
+		self._exit_stack = ExitStack()
+		self._exit_stack.enter_context(
+			recorded_import(self, context, self.get_stats_path()))
+
+		self._thread.start()
+
+		wm = context.window_manager
+		wm.progress_begin(0, 100)
+		self._timer = wm.event_timer_add(self.timer_interval, window=context.window)
+		wm.modal_handler_add(self)
+		self.update_status(context)
+		return {'RUNNING_MODAL'}
+
+	@staticmethod
+	def parse_in_background(parse, results, stop):
+		'''
+		Puts every parsed job into results, and None when done. When
+		stopped, the jobs are closed right away, so they can stop any work
+		they started, like the worker processes of core.batch.
+		'''
+		jobs = parse()
+		try:
+			for result in jobs:
+				if stop.is_set():
+					break
+				results.put(result)
+		except Exception as e:
+			results.put(('', None, e))
+		finally:
+			close = getattr(jobs, 'close', None)
+			if close is not None:
+				close()
+		results.put(None)
+
+	def get_stats_path(self):
+		'''Returns the path the import statistics are named after.'''
+		return self.filepath
+
+	def modal(self, context, event):
+		if event.type == 'ESC':
+			return self.cancel_import(context)
+
+		if event.type != 'TIMER' or event.timer is not self._timer:
+			if event.type in NAVIGATION_EVENTS:
+				return {'PASS_THROUGH'}
+			return {'RUNNING_MODAL'}
+
+		try:
+			finished = self.run_time_slice(context)
+		except Exception as e:
+			self.report({'ERROR'}, 'Import failed: %s' % e)
+			return self.cancel_import(context)
+
+		if finished:
+			self.finish_modal(context)
+			self.report({'INFO'}, 'Imported %d of %d.' % (
+				self._job_count - self._failed, self._job_count))
+			return {'FINISHED'}
+
+		self.update_status(context)
+		return {'RUNNING_MODAL'}
+
+	def run_time_slice(self, context):
+		'''
+		Builds as much as fits in one time slice.
+
+		Returns True when everything has been imported.
+		'''
+		deadline = perf_counter() + self.time_slice
+		while perf_counter() < deadline:
+			if self._steps is None:
+				try:
+					result = self._results.get_nowait()
+				except queue.Empty:
+					# Still parsing.
+					return False
+				if result is None:
+					return True
+
+				label, data, error = result
+				if error is not None:
+					self.report({'WARNING'},
+						'Could not import %s: %s' % (label, error))
+					self._failed += 1
+					self._jobs_done += 1
+					continue
+
+				self._label = label
+				self._steps = self.iter_build(context, label, data)
+
+			try:
+				done, total = next(self._steps)
+			except StopIteration:
+				self._steps = None
+				self._jobs_done += 1
+				self._progress = 0.0
+			except Exception as e:
+				# Like parse errors, only the file it happened on fails.
+				self.report({'WARNING'},
+					'Could not import %s: %s' % (self._label, e))
+				self._steps = None
+				self._failed += 1
+				self._jobs_done += 1
+				self._progress = 0.0
+			else:
+				self._progress = done / total if total else 1.0
+
+		return False
+
+	def update_status(self, context):
+		fraction = (self._jobs_done + self._progress) / self._job_count
+		context.window_manager.progress_update(100 * fraction)
+
+		if self._steps is None and not self._label:
+			text = 'Parsing'
+		else:
+			text = 'Importing %s' % os.path.basename(self._label)
+		context.workspace.status_text_set('%s (%d/%d, %d%%), Esc to cancel' % (
+			text, min(self._jobs_done + 1, self._job_count), self._job_count,
+			100 * fraction))
+
+	def cancel_import(self, context):
+		'''Stops the import and removes everything it created so far.'''
+		self._stop.set()
+		if self._steps is not None:
+			# Lets the build generator clean up, like leaving pose mode.
+			self._steps.close()
+			self._steps = None
+
+		obj = context.object
+		if obj is not None and obj.mode != 'OBJECT':
+			bpy.ops.object.mode_set(mode='OBJECT')
+
+		removed = remove_datablocks_since(self._snapshot)
+		self.finish_modal(context)
+		self.report({'WARNING'},
+			'Import cancelled, removed %d datablocks.' % removed)
+		return {'CANCELLED'}
+
+	def finish_modal(self, context):
+		wm = context.window_manager
+		wm.event_timer_remove(self._timer)
+		wm.progress_end()
+		context.workspace.status_text_set(None)
+		self._exit_stack.close()
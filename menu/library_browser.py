@@ -0,0 +1,311 @@
+'''
+A panel in the sidebar of the 3D view for searching the tag library index
+of core.library, and importing what was found with the import operators.
+'''
+import os
+from time import perf_counter
+
+import bpy
+from bpy.props import (CollectionProperty, EnumProperty, IntProperty,
+	PointerProperty, StringProperty)
+from bpy.types import Operator, Panel, PropertyGroup, UIList
+from bpy.utils import register_class, unregister_class
+
+from ..preferences import get_preferences
+
+# The import operator of every extension the browser can import.
+IMPORT_OPERATORS = {
+	'.gbxmodel': 'import_scene.halo1_model',
+	'.model': 'import_scene.halo1_model',
+	'.model_animations': 'import_scene.halo1_anim',
+	'.model_collision_geometry': 'import_scene.halo1_collision',
+	'.scenario_structure_bsp': 'import_scene.halo1_bsp',
+	'.scenario': 'import_scene.halo1_scenario',
+}
+
+class KriegLibraryEntry(PropertyGroup):
+	'''A single search result.'''
+	path: StringProperty()
+	fourcc: StringProperty()
+	details: StringProperty()
+
+
+class KriegLibraryState(PropertyGroup):
+	'''The search of the library browser and its results.'''
+	search: StringProperty(
+		name="Search",
+		description="Find tags whose path, regions, permutations, markers or animations contain this",
+		default="",
+	)
+	kind: EnumProperty(
+		name="Type",
+		items=(
+			('ALL',        "All",        "Tags of any type"),
+			('MODELS',     "Models",     "gbxmodel and model tags"),
+			('ANIMATIONS', "Animations", "model_animations tags"),
+			('COLLISION',  "Collision",  "model_collision_geometry tags"),
+		),
+		default='ALL',
+	)
+	results: CollectionProperty(type=KriegLibraryEntry)
+	active_index: IntProperty(default=0)
+
+
+class KRIEG_UL_library(UIList):
+	def draw_item(self, context, layout, data, item, icon, active_data,
+			active_property, index=0, flt_flag=0):
+		row = layout.row()
+		row.label(text=item.path, icon=KIND_ICONS.get(item.fourcc, 'FILE'))
+		row.label(text=item.details)
+
+
+class MT_krieg_LibraryScan(Operator):
+	"""
+	Brings the tag library index up to date with the tags directory from
+	the preferences. Only new and changed tags are read, a bit at a time
+	from a timer, so Blender keeps responding. Esc stops the scan and keeps
+	what was indexed so far.
+	"""
+	bl_idname = "krieg.library_scan"
+	bl_label = "Scan Tags Directory"
+
+	# Seconds spent scanning every timer tick.
+	time_slice = 0.05
+	timer_interval = 0.02
+	# Tags indexed between checks of the time slice.
+	batch_size = 10
+
+	def execute(self, context):
+		from ..core.library import TagLibrary
+
+		tags_directory = get_tags_directory(context)
+		if not tags_directory:
+			self.report({'ERROR'},
+				'Set a tags directory in the addon preferences first.')
+			return {'CANCELLED'}
+
+		self._library = TagLibrary(get_library_path(context), tags_directory)
+		self._steps = self._library.iter_scan(batch_size=self.batch_size)
+		self._done = 0
+		self._total = 0
+
+		wm = context.window_manager
+		wm.progress_begin(0, 100)
+		self._timer = wm.event_timer_add(self.timer_interval, window=context.window)
+		wm.modal_handler_add(self)
+		self.update_status(context)
+		return {'RUNNING_MODAL'}
+
+	def modal(self, context, event):
+		if event.type == 'ESC':
+			self._steps.close()
+			self.finish_modal(context)
+			self.report({'WARNING'}, 'Scan cancelled, indexed %d of %d '
+				'changed tags.' % (self._done, self._total))
+			bpy.ops.krieg.library_search()
+			return {'CANCELLED'}
+
+		if event.type != 'TIMER' or event.timer is not self._timer:
+			return {'PASS_THROUGH'}
+
+		deadline = perf_counter() + self.time_slice
+		try:
+			while perf_counter() < deadline:
+				self._done, self._total = next(self._steps)
+		except StopIteration as stop:
+			counts = stop.value
+		except Exception as e:
+			self.finish_modal(context)
+			self.report({'ERROR'}, 'Scan failed: %s' % e)
+			return {'CANCELLED'}
+		else:
+			self.update_status(context)
+			return {'RUNNING_MODAL'}
+
+		self.finish_modal(context)
+		self.report({'INFO'}, 'Indexed %(added)d new and %(updated)d changed '
+			'tags, removed %(removed)d, %(failed)d failed.' % counts)
+		bpy.ops.krieg.library_search()
+		return {'FINISHED'}
+
+	def update_status(self, context):
+		fraction = self._done / self._total if self._total else 0.0
+		context.window_manager.progress_update(100 * fraction)
+		context.workspace.status_text_set(
+			'Scanning tags (%d/%d, %d%%), Esc to cancel' % (
+				self._done, self._total, 100 * fraction))
+
+	def finish_modal(self, context):
+		wm = context.window_manager
+		wm.event_timer_remove(self._timer)
+		wm.progress_end()
+		context.workspace.status_text_set(None)
+		self._library.close()
+
+
+class MT_krieg_LibrarySearch(Operator):
+	"""
+	Searches the tag library index.
+	"""
+	bl_idname = "krieg.library_search"
+	bl_label = "Search Tag Library"
+
+	def execute(self, context):
+		from ..core import library as tag_library
+
+		path = get_library_path(context)
+		state = context.window_manager.krieg_library
+		state.results.clear()
+		if not os.path.isfile(path):
+			self.report({'WARNING'}, 'Scan the tags directory first.')
+			return {'CANCELLED'}
+
+		fourccs = {
+			'ALL': (),
+			'MODELS': tag_library.MODEL_FOURCCS,
+			'ANIMATIONS': tag_library.ANIMATION_FOURCCS,
+			'COLLISION': tag_library.COLLISION_FOURCCS,
+		}[state.kind]
+		with tag_library.TagLibrary(path, get_tags_directory(context)) as library:
+			summaries = library.search(state.search, fourccs=fourccs)
+
+		for summary in summaries:
+			entry = state.results.add()
+			entry.path = summary.path
+			entry.fourcc = summary.fourcc
+			entry.details = describe(summary)
+		state.active_index = 0
+		return {'FINISHED'}
+
+
+class MT_krieg_LibraryImport(Operator):
+	"""
+	Imports the selected tag of the library browser with its import
+	operator, using the settings that operator was last used with.
+	"""
+	bl_idname = "krieg.library_import"
+	bl_label = "Import Selected Tag"
+	bl_options = {'REGISTER', 'UNDO'}
+
+	@classmethod
+	def poll(cls, context):
+		entry = get_active_entry(context)
+		return (entry is not None
+			and os.path.splitext(entry.path)[1] in IMPORT_OPERATORS)
+
+	def execute(self, context):
+		entry = get_active_entry(context)
+		filepath = os.path.join(get_tags_directory(context),
+			entry.path.replace('/', os.sep))
+		if not os.path.isfile(filepath):
+			self.report({'ERROR'}, 'Tag is gone, scan again: ' + entry.path)
+			return {'CANCELLED'}
+
+		category, name = IMPORT_OPERATORS[
+			os.path.splitext(entry.path)[1]].split('.')
+		operator = getattr(getattr(bpy.ops, category), name)
+		return operator('EXEC_DEFAULT', filepath=filepath)
+
+
+class VIEW3D_PT_krieg_library(Panel):
+	bl_label = "Tag Library"
+	bl_space_type = 'VIEW_3D'
+	bl_region_type = 'UI'
+	bl_category = "Krieg"
+
+	def draw(self, context):
+		layout = self.layout
+		state = context.window_manager.krieg_library
+
+		layout.operator(MT_krieg_LibraryScan.bl_idname, icon='FILE_REFRESH')
+
+		row = layout.row(align=True)
+		row.prop(state, "search", text="", icon='VIEWZOOM')
+		row.operator(MT_krieg_LibrarySearch.bl_idname, text="", icon='VIEWZOOM')
+		layout.prop(state, "kind", expand=True)
+
+		layout.template_list("KRIEG_UL_library", "", state, "results",
+			state, "active_index")
+		layout.operator(MT_krieg_LibraryImport.bl_idname, icon='IMPORT')
+
+
+# The icons of the tag classes in the result list.
+KIND_ICONS = {
+	'mod2': 'MESH_DATA',
+	'mode': 'MESH_DATA',
+	'antr': 'ARMATURE_DATA',
+	'coll': 'MOD_PHYSICS',
+	'sbsp': 'WORLD',
+	'scnr': 'SCENE_DATA',
+}
+
+def describe(summary):
+	'''A short line about what is in a tag, for the result list.'''
+	if summary.error:
+		return summary.error
+	parts = []
+	if summary.node_count is not None:
+		parts.append('%d nodes' % summary.node_count)
+	if summary.regions:
+		parts.append('%d regions' % len(summary.regions))
+	if summary.permutations:
+		parts.append('%d permutations' % len(summary.permutations))
+	if summary.markers:
+		parts.append('%d markers' % len(summary.markers))
+	if summary.animations:
+		parts.append('%d animations, %d frames' % (len(summary.animations),
+			sum(frames for name, frames in summary.animations)))
+	return ', '.join(parts) or summary.fourcc
+
+def get_tags_directory(context):
+	prefs = get_preferences(context)
+	return bpy.path.abspath(prefs.tags_directory) if prefs else ""
+
+def get_library_path(context):
+	'''
+	Returns the path of the library database from the preferences, or the
+	default one in Blender's config directory.
+	'''
+	prefs = get_preferences(context)
+	if prefs and prefs.library_path:
+		return bpy.path.abspath(prefs.library_path)
+	directory = bpy.utils.user_resource('CONFIG')
+	os.makedirs(directory, exist_ok=True)
+	return os.path.join(directory, 'blendkrieg_library.sqlite')
+
+def get_active_entry(context):
+	state = context.window_manager.krieg_library
+	if 0 <= state.active_index < len(state.results):
+		return state.results[state.active_index]
+	return None
+
+
+# Enumerate all classes for easy register/unregister.
+classes = (
+	KriegLibraryEntry,
+	KriegLibraryState,
+	KRIEG_UL_library,
+	MT_krieg_LibraryScan,
+	MT_krieg_LibrarySearch,
+	MT_krieg_LibraryImport,
+	VIEW3D_PT_krieg_library,
+)
+
+def register():
+	for cls in classes:
+		register_class(cls)
+
+	bpy.types.WindowManager.krieg_library = PointerProperty(
+		type=KriegLibraryState)
+
+
+def unregister():
+	del bpy.types.WindowManager.krieg_library
+
+	# Unregister classes in reverse order to avoid any dependency problems.
+	for cls in reversed(classes):
+		unregister_class(cls)
+
+
+if __name__ == "__main__":
+	register()
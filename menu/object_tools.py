@@ -0,0 +1,73 @@
+import bpy
+from bpy.props import BoolProperty
+from bpy.utils import register_class, unregister_class
+
+from ..constants import REGION_ATTRIBUTE
+from ..scene.util import get_face_int_layer
+
+class MT_krieg_SplitByRegion(bpy.types.Operator):
+	"""
+	Splits models that were imported as a single object back into one
+	object per region.
+	"""
+	bl_idname = "object.krieg_split_by_region"
+	bl_label = "Split by Region"
+	bl_options = {'REGISTER', 'UNDO'}
+
+	keep_original: BoolProperty(
+		name="Keep Original",
+		description="Keep the single object next to the new region objects.",
+		default=False,
+	)
+
+	@classmethod
+	def poll(cls, context):
+		return any(map(has_regions, context.selected_objects))
+
+	def execute(self, context):
+		from ..scene.regions import split_by_region
+
+		if context.object is not None and context.object.mode != 'OBJECT':
+			bpy.ops.object.mode_set(mode='OBJECT')
+
+		split = 0
+		for obj in [obj for obj in context.selected_objects if has_regions(obj)]:
+			region_objs = split_by_region(obj)
+			if not region_objs:
+				continue
+			split += 1
+
+			for region_obj in region_objs:
+				region_obj.select_set(True)
+			context.view_layer.objects.active = region_objs[0]
+			if not self.keep_original:
+				bpy.data.objects.remove(obj, do_unlink=True)
+
+		self.report({'INFO'}, 'Split %d objects.' % split)
+		return {'FINISHED'}
+
+
+def has_regions(obj):
+	'''Returns whether obj is a mesh object with regions to split by.'''
+	return (obj.type == 'MESH'
+		and get_face_int_layer(obj.data, REGION_ATTRIBUTE) is not None)
+
+
+# Enumerate all classes for easy register/unregister.
+classes = (
+	MT_krieg_SplitByRegion,
+)
+
+def register():
+	for cls in classes:
+		register_class(cls)
+
+
+def unregister():
+	#Unregister classes in reverse order to avoid any dependency problems.
+	for cls in reversed(classes):
+		unregister_class(cls)
+
+
+if __name__ == "__main__":
+	register()
@@ -1,8 +1,12 @@
 from bpy.utils import register_class, unregister_class
 from bpy.types import Menu, TOPBAR_MT_editor_menus
 
+from . import object_tools
 from .import_export import halo1_model
 from .import_export import halo1_anim
+from .import_export import halo1_bsp
+from .import_export import halo1_collision
+from .import_export import halo1_scenario
 
 class TOPBAR_MT_krieg(Menu):
 	bl_idname = "TOPBAR_MT_krieg_ext"
@@ -16,6 +20,10 @@ class TOPBAR_MT_krieg(Menu):
 
 		layout.separator()
 
+		layout.operator(object_tools.MT_krieg_SplitByRegion.bl_idname)
+
+		layout.separator()
+
 		layout.operator(
 			"wm.url_open", text="Manual", icon='HELP'
 		).url = "https://github.com/gbMichelle/Blendkrieg/wiki"
@@ -36,6 +44,26 @@ class TOPBAR_MT_krieg_import(Menu):
 			halo1_model.MT_krieg_ImportHalo1Model.bl_idname,
 			text="Halo 1 Model (.gbxmodel, .model, .jms)"
 		)
+		layout.operator(
+			halo1_model.MT_krieg_ImportHalo1ModelModal.bl_idname,
+			text="Halo 1 Model in Background"
+		)
+		layout.operator(
+			halo1_collision.MT_krieg_ImportHalo1Collision.bl_idname,
+			text="Halo 1 Collision (.model_collision_geometry)"
+		)
+		layout.operator(
+			halo1_bsp.MT_krieg_ImportHalo1Bsp.bl_idname,
+			text="Halo 1 BSP (.scenario_structure_bsp)"
+		)
+		layout.operator(
+			halo1_bsp.MT_krieg_ImportHalo1BspModal.bl_idname,
+			text="Halo 1 BSP in Background"
+		)
+		layout.operator(
+			halo1_scenario.MT_krieg_ImportHalo1Scenario.bl_idname,
+			text="Halo 1 Scenario Objects (.scenario)"
+		)
 
 		layout.separator()
 
@@ -44,6 +72,10 @@ class TOPBAR_MT_krieg_import(Menu):
 			halo1_anim.MT_krieg_ImportHalo1Anim.bl_idname,
 			text="Halo 1 Animation (.model_animations)"
 		)
+		layout.operator(
+			halo1_anim.MT_krieg_ImportHalo1AnimModal.bl_idname,
+			text="Halo 1 Animation in Background"
+		)
 
 
 class TOPBAR_MT_krieg_export(Menu):
@@ -0,0 +1,142 @@
+import sys
+
+import bpy
+from bpy.props import BoolProperty, FloatProperty, IntProperty, StringProperty
+from bpy.types import AddonPreferences
+from bpy.utils import register_class, unregister_class
+
+class KriegPreferences(AddonPreferences):
+	'''
+	The settings of the addon as a whole. These show up under the addon in
+	Blender's preferences window.
+	'''
+	# This needs to match the name of the addon's package.
+	bl_idname = __package__
+
+	# Import statistics settings:
+
+	stats_directory: StringProperty(
+		name="Statistics Directory",
+		description="Write the statistics of every import as JSON to this directory. Leave empty to only show them in the Info editor.",
+		subtype='DIR_PATH',
+		default="",
+	)
+	profile_imports: BoolProperty(
+		name="Profile Imports",
+		description="Run every import under cProfile and dump a .prof file to the statistics directory (or Blender's temp directory).",
+		default=False,
+	)
+	trace_memory: BoolProperty(
+		name="Trace Memory",
+		description="Trace the Python allocations of every import stage with tracemalloc to find out where the memory goes. This makes imports several times slower. The peak resident memory of the whole import is always shown.",
+		default=False,
+	)
+
+	# Tag settings:
+
+	tags_directory: StringProperty(
+		name="Tags Directory",
+		description="The tags directory tag references are looked up in. Leave empty to use the tags directory the imported file is in.",
+		subtype='DIR_PATH',
+		default="",
+	)
+	tag_cache_size: IntProperty(
+		name="Tag Cache Size",
+		description="How many megabytes of tag files to keep loaded between imports, so importing the same tags again doesn't parse them again. 0 turns the cache off.",
+		default=64,
+		min=0,
+	)
+	library_path: StringProperty(
+		name="Tag Library Index",
+		description="The database the tag library browser indexes the tags directory into. Leave empty to keep it in Blender's config directory.",
+		subtype='FILE_PATH',
+		default="",
+	)
+
+	# Parse daemon settings:
+
+	use_parse_daemon: BoolProperty(
+		name="Use Parse Daemon",
+		description="Parse files in a helper process that keeps reclaimer's tag definitions loaded between imports.",
+		default=False,
+	)
+	parse_daemon_idle_timeout: FloatProperty(
+		name="Idle Timeout",
+		description="Seconds without imports after which the parse daemon quits. It starts again on the next import.",
+		default=300.0,
+		min=1.0,
+		subtype='TIME',
+		unit='TIME',
+	)
+
+	# Developer settings:
+
+	keep_debug_data: BoolProperty(
+		name="Keep Debug Data",
+		description="Keep the last imported animations in bpy.debug_anim for inspecting them from the Python console. This keeps them in memory for the rest of the session.",
+		default=False,
+	)
+
+	def draw(self, context):
+		layout = self.layout
+
+		box = layout.box()
+		box.label(text="Import Statistics:")
+		box.prop(self, "stats_directory")
+		box.prop(self, "profile_imports")
+		box.prop(self, "trace_memory")
+
+		box = layout.box()
+		box.label(text="Tags:")
+		box.prop(self, "tags_directory")
+		box.prop(self, "tag_cache_size")
+		box.prop(self, "library_path")
+
+		box = layout.box()
+		box.label(text="Parse Daemon:")
+		box.prop(self, "use_parse_daemon")
+		if self.use_parse_daemon:
+			box.prop(self, "parse_daemon_idle_timeout")
+
+		box = layout.box()
+		box.label(text="Developer:")
+		box.prop(self, "keep_debug_data")
+
+
+def get_preferences(context=None):
+	'''
+	Returns the KriegPreferences of the addon.
+
+	Returns None when the addon isn't registered, like when the import
+	functions are used from tests.
+	'''
+	context = context or bpy.context
+	addon = context.preferences.addons.get(__package__)
+	if addon is None:
+		return None
+	return addon.preferences
+
+
+# Enumerate all classes for easy register/unregister.
+classes = (
+	KriegPreferences,
+)
+
+def register():
+	for cls in classes:
+		register_class(cls)
+
+
+def unregister():
+	# Only stop the parse daemon if anything ever imported it.
+	daemon = sys.modules.get(__package__ + '.core.daemon')
+	if daemon is not None:
+		daemon.shutdown_daemon()
+
+	# Unregister classes in reverse order to avoid any dependency problems.
+	for cls in reversed(classes):
+		unregister_class(cls)
+
+
+if __name__ == "__main__":
+	register()
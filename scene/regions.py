@@ -0,0 +1,74 @@
+'''
+Regions of models that were imported as a single object.
+
+The region of every face is kept in an integer face attribute, and the
+names of the regions in a custom property of the mesh, in the order of
+their indices.
+'''
+import bmesh
+import bpy
+import numpy as np
+
+from ..constants import REGION_ATTRIBUTE, REGION_NAMES_PROPERTY
+from .util import get_face_int_layer, new_face_int_layer
+
+def set_face_regions(mesh, face_regions, region_names):
+	'''Stores the region index of every face and the region names in mesh.'''
+	attribute = get_face_int_layer(mesh, REGION_ATTRIBUTE)
+	if attribute is None:
+		attribute = new_face_int_layer(mesh, REGION_ATTRIBUTE)
+	attribute.data.foreach_set('value',
+		np.ascontiguousarray(face_regions, dtype=np.int32))
+	mesh[REGION_NAMES_PROPERTY] = list(region_names)
+
+def get_face_regions(mesh):
+	'''
+	Returns the region index of every face and the region names of mesh, or
+	None if it has no regions.
+	'''
+	attribute = get_face_int_layer(mesh, REGION_ATTRIBUTE)
+	if attribute is None:
+		return None
+
+	face_regions = np.empty(len(mesh.polygons), dtype=np.int32)
+	attribute.data.foreach_get('value', face_regions)
+	names = list(mesh.get(REGION_NAMES_PROPERTY, ()))
+	return face_regions, names
+
+def split_by_region(obj):
+	'''
+	Splits a single object import back into one object per region.
+
+	Every new object is a copy of obj, with its modifiers, vertex groups and
+	parent, that only keeps the faces of one region. obj itself is left
+	alone. Returns the new objects.
+	'''
+	regions = get_face_regions(obj.data)
+	if regions is None:
+		return []
+	face_regions, names = regions
+
+	region_objs = []
+	for region in np.unique(face_regions).tolist():
+		name = names[region] if region < len(names) else str(region)
+
+		mesh = obj.data.copy()
+		mesh.name = obj.data.name + ":" + name
+
+		bm = bmesh.new()
+		bm.from_mesh(mesh)
+		layer = bm.faces.layers.int.get(REGION_ATTRIBUTE)
+		bmesh.ops.delete(bm,
+			geom=[face for face in bm.faces if face[layer] != region],
+			context='FACES')
+		bm.to_mesh(mesh)
+		bm.free()
+
+		region_obj = obj.copy()
+		region_obj.data = mesh
+		region_obj.name = obj.name + ":" + name
+		for collection in obj.users_collection:
+			collection.objects.link(region_obj)
+		region_objs.append(region_obj)
+
+	return region_objs
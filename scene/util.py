@@ -2,6 +2,8 @@
 Functions for interfacing Halo stuff with the Blender scene.
 '''
 import itertools
+from contextlib import contextmanager
+
 import bpy
 from mathutils import Vector, Quaternion, Matrix
 
@@ -117,6 +119,109 @@ def trace_into_direction(direction, distance=10000.0):
 
 	return point
 
+def run_steps(steps):
+	'''
+	Runs a step by step import generator to its end and returns the value
+	it returned.
+	'''
+	while True:
+		try:
+			next(steps)
+		except StopIteration as stop:
+			return stop.value
+
+# The bpy.data collections our importers create datablocks in.
+IMPORTED_DATABLOCK_TYPES = (
+	'objects', 'meshes', 'armatures', 'materials', 'actions', 'collections',
+)
+
+def snapshot_datablocks(types=IMPORTED_DATABLOCK_TYPES):
+	'''
+	Takes note of all datablocks that currently exist, so the ones created
+	after can be found with remove_datablocks_since.
+	'''
+	return {
+		name: {block.as_pointer() for block in getattr(bpy.data, name)}
+		for name in types
+	}
+
+def remove_datablocks_since(snapshot):
+	'''
+	Removes every datablock that was created after the snapshot was taken.
+
+	Returns the number of removed datablocks.
+	'''
+	new_blocks = {
+		name: [
+			block for block in getattr(bpy.data, name)
+			if block.as_pointer() not in pointers
+		]
+		for name, pointers in snapshot.items()
+	}
+	removed = sum(len(blocks) for blocks in new_blocks.values())
+
+	if hasattr(bpy.data, 'batch_remove'):
+		bpy.data.batch_remove(
+			[block for blocks in new_blocks.values() for block in blocks])
+	else:
+		for name, blocks in new_blocks.items():
+			collection = getattr(bpy.data, name)
+			for block in blocks:
+				collection.remove(block)
+
+	return removed
+
+def find_layer_collection(layer_collection, collection):
+	'''
+	Returns the layer collection of collection under layer_collection, or
+	None if it isn't in there.
+	'''
+	if layer_collection.collection == collection:
+		return layer_collection
+	for child in layer_collection.children:
+		found = find_layer_collection(child, collection)
+		if found is not None:
+			return found
+	return None
+
+@contextmanager
+def active_collection(collection):
+	'''
+	Makes collection the active collection inside of the with block, so
+	everything the importers link to the scene ends up in it. collection
+	has to be in the scene already.
+	'''
+	view_layer = bpy.context.view_layer
+	previous = view_layer.active_layer_collection
+	view_layer.active_layer_collection = find_layer_collection(
+		view_layer.layer_collection, collection)
+	try:
+		yield collection
+	finally:
+		view_layer.active_layer_collection = previous
+
+# mesh.attributes can only make integer face attributes since Blender 2.93.
+# Before that they are polygon_layers_int, which newer versions dropped.
+HAS_MESH_ATTRIBUTES = bpy.app.version >= (2, 93, 0)
+
+def new_face_int_layer(mesh, name):
+	'''
+	Adds an integer face attribute to mesh and returns it. Its data has a
+	value for every face, either way.
+	'''
+	if HAS_MESH_ATTRIBUTES:
+		return mesh.attributes.new(name, 'INT', 'FACE')
+	return mesh.polygon_layers_int.new(name=name)
+
+def get_face_int_layer(mesh, name):
+	'''Returns the integer face attribute of mesh named name, or None.'''
+	if HAS_MESH_ATTRIBUTES:
+		attribute = mesh.attributes.get(name)
+		if attribute is None or attribute.domain != 'FACE':
+			return None
+		return attribute
+	return mesh.polygon_layers_int.get(name)
+
 def set_active_object(object):
 	bpy.context.view_layer.objects.active = object
 def get_active_object():
@@ -0,0 +1,30 @@
+'''Helpers for importing Blendkrieg itself from the scripts in here.
+
+The addon uses relative imports everywhere, so it has to be imported as a
+package by the name of its directory instead of module by module. Blender
+doesn't put the directory of a --python script on sys.path, so the scripts
+add it themselves before importing this.
+'''
+import importlib
+import os
+import sys
+
+# scripts/bootstrap.py -> project root
+ADDON_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_addon():
+	'''Import the addon package and return it.'''
+	parent = os.path.dirname(ADDON_ROOT)
+	if parent not in sys.path:
+		sys.path.insert(0, parent)
+
+	return importlib.import_module(os.path.basename(ADDON_ROOT))
+
+def import_addon_module(name):
+	'''Import a submodule of the addon, like "halo1.model", and return it.'''
+	addon = import_addon()
+	return importlib.import_module(addon.__name__ + '.' + name)
+
+def script_arguments():
+	'''Returns the arguments after the "--", which Blender leaves alone.'''
+	return sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
@@ -0,0 +1,77 @@
+'''Converts models and animations to containers that load without parsing.
+
+	python scripts/containers.py PATH... [-o OUTPUT_DIRECTORY] [-j WORKERS] [--force]
+
+PATH are model and animation files, or directories to search for them.
+Every one of them gets a .krieg container next to it, or in
+OUTPUT_DIRECTORY under the same relative path, see core/container.py. Files
+whose container is newer than them are left alone, unless --force is
+given. The importers, scripts/convert.py and scripts/schedule.py take the
+containers like any other model or animation.
+
+This runs in any Python 3 with NumPy and reclaimer, Blender isn't needed.
+Prints a JSON report of what was converted and what failed.
+'''
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import sys
+import time
+
+def convert(filepath, output):
+	'''Converts one file, returns its report entry.'''
+	from bootstrap import import_addon_module
+
+	container = import_addon_module('core.container')
+	start = time.perf_counter()
+	error = ""
+	try:
+		os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+		container.convert_to_container(filepath, output)
+	except Exception as e:
+		error = '%s: %s' % (type(e).__name__, e)
+	return {
+		'filepath': filepath,
+		'output': output,
+		'wall_time': time.perf_counter() - start,
+		'error': error,
+	}
+
+if __name__ == '__main__':
+	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+	from bootstrap import import_addon_module
+
+	container = import_addon_module('core.container')
+
+	parser = ArgumentParser(
+		description='Convert Halo 1 models and animations to containers.')
+	parser.add_argument('paths', nargs='+',
+		help='Files or directories to convert.')
+	parser.add_argument('-o', '--output', type=str, default=None,
+		help='Where the containers go. Defaults to next to the files.')
+	parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+		help='How many processes to convert in. Defaults to the CPU count.')
+	parser.add_argument('--force', action='store_true',
+		help='Convert files with an up to date container too.')
+	args = parser.parse_args()
+
+	start = time.perf_counter()
+	jobs = container.find_stale_containers(args.paths, args.output,
+		force=args.force)
+	if args.workers > 1 and len(jobs) > 1:
+		with ProcessPoolExecutor(args.workers) as pool:
+			entries = list(pool.map(convert, *zip(*jobs)))
+	else:
+		entries = [convert(filepath, output) for filepath, output in jobs]
+
+	failures = [entry for entry in entries if entry['error']]
+	json.dump({
+		'converted': len(entries) - len(failures),
+		'wall_time': time.perf_counter() - start,
+		'files': entries,
+		'failures': failures,
+	}, sys.stdout, indent='\t')
+	print()
+	sys.exit(1 if failures else 0)
@@ -0,0 +1,204 @@
+'''Imports Halo 1 models and animations without the interface.
+
+	blender --background --factory-startup --python scripts/convert.py -- [OPTIONS] FILE...
+
+Models (.gbxmodel, .model, .jms) go through import_scene.halo1_model and
+animations (.model_animations, .jma and friends) through
+import_scene.halo1_anim, with the options of those operators. Containers
+(.krieg) go through whichever of the two fits what they hold. Files are
+imported in the order they are given. Animations go onto the armature of
+the model imported last before them, so give a model first.
+
+The result can be saved as a .blend and exported with Blender's own FBX
+or glTF exporters. A JSON report with the statistics of every import, and
+the timings of saving and exporting, is written to --report, or printed.
+The exit code is 1 if anything failed.
+'''
+from argparse import ArgumentParser
+import json
+import os
+import sys
+import time
+
+import bpy
+
+MODEL_EXTENSIONS = ('.gbxmodel', '.model', '.jms')
+ANIMATION_EXTENSIONS = ('.model_animations', '.jma', '.jmm', '.jmo', '.jmr',
+	'.jmt', '.jmw', '.jmz')
+CONTAINER_EXTENSION = '.krieg'
+
+# The Blender exporters by the extension of the file they write.
+EXPORTERS = {
+	'.fbx': ('export_scene', 'fbx'),
+	'.glb': ('export_scene', 'gltf'),
+	'.gltf': ('export_scene', 'gltf'),
+}
+
+def parse_arguments(argv):
+	parser = ArgumentParser(
+		description='Import Halo 1 models and animations into Blender.')
+	parser.add_argument('files', nargs='+', help='''
+		Models and animations to import, in order.
+	''')
+	parser.add_argument('--scale', choices=('METRIC', 'MAX', 'HALO', 'CUSTOM'),
+		default='METRIC', help='The scale_enum of the import operators.')
+	parser.add_argument('--scale-float', type=float, default=1.0,
+		help='The scale to use with --scale CUSTOM.')
+	parser.add_argument('--node-size', type=float, default=0.1,
+		help='The size of the nodes in the Blender scene at 1.0 scale.')
+	parser.add_argument('--build-skeleton', action='store_true',
+		help="Attach biped's nodes.")
+	parser.add_argument('--types', type=str,
+		default=','.join(ANIMATION_EXTENSIONS[1:]), help='''
+		Comma separated animation types to import, like ".jma,.jmm". The
+		type_enum of the animation import operator.
+	''')
+	parser.add_argument('--single-object', action='store_true',
+		help='Import every model as one object.')
+	parser.add_argument('--low-memory', action='store_true',
+		help='Free the data of each region and animation once it is built.')
+	parser.add_argument('--save', type=str, default=None,
+		help='Save the result to this .blend file.')
+	parser.add_argument('--export', type=str, default=None,
+		help='Export the result to this .fbx, .glb or .gltf file.')
+	parser.add_argument('--report', type=str, default=None,
+		help='Write the JSON report to this file instead of printing it.')
+	return parser.parse_args(argv)
+
+def import_file(filepath, args, armature):
+	'''
+	Imports a single file with its operator. Returns the kind of file and
+	the armature animations should go onto from now on.
+	'''
+	extension = os.path.splitext(filepath)[1].lower()
+	if extension == CONTAINER_EXTENSION:
+		extension = container_kind_extension(filepath)
+
+	if extension in MODEL_EXTENSIONS:
+		before = set(bpy.data.objects)
+		check_result(bpy.ops.import_scene.halo1_model(filepath=filepath,
+			scale_enum=args.scale, scale_float=args.scale_float,
+			node_size=args.node_size, build_skeleton=args.build_skeleton,
+			single_object=args.single_object, low_memory=args.low_memory,
+			use_worker_processes=False))
+		armatures = [obj for obj in bpy.data.objects
+			if obj not in before and obj.type == 'ARMATURE']
+		return 'model', armatures[-1] if armatures else armature
+
+	if extension in ANIMATION_EXTENSIONS:
+		if armature is None:
+			raise ValueError('No model to put the animations on.')
+		bpy.context.view_layer.objects.active = armature
+		check_result(bpy.ops.import_scene.halo1_anim(filepath=filepath,
+			scale_enum=args.scale, scale_float=args.scale_float,
+			type_enum=set(args.types.split(',')), low_memory=args.low_memory))
+		return 'animations', armature
+
+	raise ValueError('Not a model or animation file.')
+
+def container_kind_extension(filepath):
+	'''
+	Returns an extension of the kind of file a core.container container
+	holds, so it can go through the same operator.
+	'''
+	from bootstrap import import_addon_module
+
+	container = import_addon_module('core.container')
+	kind = container.read_container(filepath)[0]
+	return MODEL_EXTENSIONS[0] if kind == 'model' else ANIMATION_EXTENSIONS[0]
+
+def check_result(result):
+	if 'FINISHED' not in result:
+		raise RuntimeError('The import was cancelled.')
+
+def write_output(kind, filepath):
+	'''Saves or exports the scene. Returns the report entry of it.'''
+	start = time.perf_counter()
+	error = ""
+	try:
+		directory = os.path.dirname(os.path.abspath(filepath))
+		os.makedirs(directory, exist_ok=True)
+		if kind == 'blend':
+			bpy.ops.wm.save_as_mainfile(filepath=filepath, check_existing=False)
+		else:
+			extension = os.path.splitext(filepath)[1].lower()
+			if extension not in EXPORTERS:
+				raise ValueError('Can only export ' + ', '.join(EXPORTERS))
+			category, name = EXPORTERS[extension]
+			getattr(getattr(bpy.ops, category), name)(filepath=filepath)
+	except Exception as e:
+		error = '%s: %s' % (type(e).__name__, e)
+	return {
+		'filepath': filepath,
+		'kind': kind,
+		'wall_time': time.perf_counter() - start,
+		'error': error,
+	}
+
+def scene_counts():
+	return {
+		'objects': len(bpy.data.objects),
+		'meshes': len(bpy.data.meshes),
+		'armatures': len(bpy.data.armatures),
+		'actions': len(bpy.data.actions),
+		'materials': len(bpy.data.materials),
+	}
+
+def convert(args, instrumentation):
+	'''Runs the whole conversion and returns the report as a dict.'''
+	start = time.perf_counter()
+	imports = []
+	totals = {}
+	armature = None
+	for filepath in args.files:
+		entry = {'filepath': filepath, 'kind': None, 'error': "", 'stats': None}
+		with instrumentation.collecting() as collected:
+			try:
+				entry['kind'], armature = import_file(filepath, args, armature)
+			except Exception as e:
+				entry['error'] = '%s: %s' % (type(e).__name__, e)
+		if collected:
+			stats = collected[-1]
+			entry['stats'] = stats.to_dict()
+			for key, amount in stats.totals().items():
+				totals[key] = totals.get(key, 0) + amount
+		imports.append(entry)
+
+	outputs = []
+	if args.save:
+		outputs.append(write_output('blend', args.save))
+	if args.export:
+		outputs.append(write_output('export', args.export))
+
+	return {
+		'blender': bpy.app.version_string,
+		'options': vars(args),
+		'wall_time': time.perf_counter() - start,
+		'imports': imports,
+		'outputs': outputs,
+		'totals': totals,
+		'scene': scene_counts(),
+		'failed': sum(1 for entry in imports + outputs if entry['error']),
+	}
+
+if __name__ == '__main__':
+	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+	from bootstrap import import_addon, import_addon_module, script_arguments
+
+	args = parse_arguments(script_arguments())
+
+	# Start from an empty scene, and only then register the operators, so
+	# reading the factory settings doesn't throw them out again.
+	bpy.ops.wm.read_factory_settings(use_empty=True)
+	import_addon().register()
+	instrumentation = import_addon_module('instrumentation')
+
+	report = convert(args, instrumentation)
+	if args.report:
+		with open(args.report, 'w') as report_file:
+			json.dump(report, report_file, indent='\t')
+	else:
+		json.dump(report, sys.stdout, indent='\t')
+		print()
+	sys.exit(1 if report['failed'] else 0)
@@ -0,0 +1,62 @@
+'''Converts jobs from a core.scheduler queue inside of a background Blender.
+
+core.scheduler starts as many of these as it wants workers:
+
+	blender --background --factory-startup --python scripts/convert_worker.py -- --queue QUEUE --worker N [CONVERT OPTIONS]
+
+Every worker takes one job after the other from the queue, imports it with
+scripts/convert.py and the given options, saves it as the .blend of the job
+and then clears the scene again. It quits once the queue is empty.
+'''
+from argparse import ArgumentParser
+import os
+import sys
+import traceback
+
+import bpy
+
+def run_jobs(queue, worker, convert_arguments, instrumentation, scene_util):
+	'''Converts jobs from queue until there are none left.'''
+	import convert
+
+	clean_state = scene_util.snapshot_datablocks()
+	while True:
+		job = queue.claim(worker)
+		if job is None:
+			return
+
+		report = None
+		try:
+			args = convert.parse_arguments(list(convert_arguments)
+				+ ['--save', job.output] + job.files)
+			report = convert.convert(args, instrumentation)
+			error = '; '.join('%s: %s' % (entry['filepath'], entry['error'])
+				for entry in report['imports'] + report['outputs']
+				if entry['error'])
+		except Exception:
+			error = traceback.format_exc()
+		finally:
+			scene_util.remove_datablocks_since(clean_state)
+
+		queue.finish(job.id, error, report)
+
+if __name__ == '__main__':
+	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+	from bootstrap import import_addon, import_addon_module, script_arguments
+
+	parser = ArgumentParser(description='Blendkrieg conversion worker.')
+	parser.add_argument('--queue', type=str, required=True)
+	parser.add_argument('--worker', type=int, required=True)
+	args, convert_arguments = parser.parse_known_args(script_arguments())
+
+	# Start from an empty scene, and only then register the operators, so
+	# reading the factory settings doesn't throw them out again.
+	bpy.ops.wm.read_factory_settings(use_empty=True)
+	import_addon().register()
+
+	scheduler = import_addon_module('core.scheduler')
+	with scheduler.JobQueue(args.queue) as queue:
+		run_jobs(queue, args.worker, convert_arguments,
+			import_addon_module('instrumentation'),
+			import_addon_module('scene.util'))
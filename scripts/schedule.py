@@ -0,0 +1,90 @@
+'''Converts models and animations in many background Blender processes.
+
+	python scripts/schedule.py PATH... -o OUTPUT_DIRECTORY [-b BLENDER] [-j WORKERS] [-m MODEL] [-- CONVERT OPTIONS]
+
+PATH are model and animation files, or directories to search for them.
+Every one of them becomes a job in the queue in OUTPUT_DIRECTORY, which is
+converted to a .blend next to it by a worker, see core/scheduler.py.
+Animations go onto the model next to them with the same name, or onto
+MODEL, and are skipped if there is neither.
+Options after a "--" are passed on to scripts/convert.py, like --scale.
+
+Running this again only does the jobs that didn't finish yet, and with
+--retry-failed the ones that failed too. Prints a JSON report of the run.
+'''
+from argparse import ArgumentParser
+import json
+import os
+from shutil import which
+import sys
+
+if __name__ == '__main__':
+	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+	from bootstrap import import_addon_module
+
+	scheduler = import_addon_module('core.scheduler')
+
+	argv = sys.argv[1:]
+	convert_arguments = []
+	if '--' in argv:
+		convert_arguments = argv[argv.index('--') + 1:]
+		argv = argv[:argv.index('--')]
+
+	parser = ArgumentParser(description='Convert Halo 1 models and animations.')
+	parser.add_argument('paths', nargs='*', help='''
+		Files or directories to convert. Can be left out to continue the
+		queue in the output directory.
+	''')
+	parser.add_argument('-o', '--output', type=str, required=True,
+		help='Where the .blend files, the queue and the logs go.')
+	parser.add_argument('-b', '--blender', type=str, default=None, help='''
+		Path to Blender executable. This can also be specified by setting the
+		environment variable BLENDER_PATH. If not specified, this script will
+		search for a blender executable on the system.
+	''')
+	parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+		help='How many Blender processes to convert in. Defaults to the CPU count.')
+	parser.add_argument('-m', '--model', type=str, default=None,
+		help='The model to put animations onto that have none of their own.')
+	parser.add_argument('--timeout', type=float,
+		default=scheduler.DEFAULT_TIMEOUT_PER_JOB,
+		help='Seconds a worker may take per job before it is killed.')
+	parser.add_argument('--attempts', type=int,
+		default=scheduler.DEFAULT_MAX_ATTEMPTS,
+		help='How often a job is tried when its worker crashes or times out.')
+	parser.add_argument('--retry-failed', action='store_true',
+		help='Try the jobs that failed in an earlier run again.')
+	parser.add_argument('--report', type=str, default=None,
+		help='Write the JSON report to this file instead of printing it.')
+	args = parser.parse_args(argv)
+
+	# Support reading Blender location in multiple ways
+	blender = args.blender                \
+		or os.environ.get('BLENDER_PATH') \
+		or which('blender')
+
+	if blender is None:
+		raise Exception('Cannot find Blender executable')
+
+	os.makedirs(args.output, exist_ok=True)
+	queue_path = os.path.join(args.output, 'queue.sqlite')
+	with scheduler.JobQueue(queue_path) as queue:
+		scheduler.queue_files(queue, args.paths, args.output, model=args.model)
+		queue.reset(failed=args.retry_failed)
+
+	try:
+		report = scheduler.run_scheduler(queue_path, blender=blender,
+			workers=args.workers, timeout_per_job=args.timeout,
+			max_attempts=args.attempts, convert_arguments=convert_arguments,
+			log_directory=os.path.join(args.output, 'logs'))
+	except scheduler.WorkerError as e:
+		sys.exit(str(e))
+
+	if args.report:
+		with open(args.report, 'w') as report_file:
+			json.dump(report, report_file, indent='\t')
+	else:
+		json.dump(report, sys.stdout, indent='\t')
+		print()
+	sys.exit(1 if report['failures'] else 0)
@@ -0,0 +1,29 @@
+'''Renders a batch of thumbnails inside of a background Blender.
+
+core.thumbnails starts this, one Blender per batch of jobs:
+
+	blender --background --factory-startup --python scripts/thumbnail_worker.py -- --jobs JOBS --results RESULTS
+
+JOBS is a JSON list of the jobs of core.thumbnails.make_job. A [key, error]
+line is appended to RESULTS after every job, with an empty error if it was
+rendered.
+'''
+from argparse import ArgumentParser
+import json
+import os
+import sys
+
+if __name__ == '__main__':
+	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+	from bootstrap import import_addon_module, script_arguments
+
+	parser = ArgumentParser(description='Blendkrieg thumbnail worker.')
+	parser.add_argument('--jobs', type=str, required=True)
+	parser.add_argument('--results', type=str, required=True)
+	args = parser.parse_args(script_arguments())
+
+	with open(args.jobs) as jobs_file:
+		jobs = json.load(jobs_file)
+
+	import_addon_module('halo1.thumbnails').render_jobs(jobs, args.results)
@@ -0,0 +1,63 @@
+'''Renders thumbnails of all new and changed models and animations.
+
+	python scripts/thumbnails.py TAGS_DIRECTORY CACHE_DIRECTORY [-b BLENDER] [-j WORKERS]
+
+This runs in any Python 3, the rendering itself happens in background
+Blender processes, see core/thumbnails.py. Prints a JSON summary of what
+was rendered, what failed and how many tags were skipped.
+'''
+from argparse import ArgumentParser
+import importlib.util
+import json
+import os
+from shutil import which
+import sys
+
+# scripts/thumbnails.py -> project root
+ADDON_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_thumbnails():
+	'''
+	Loads core/thumbnails.py on its own, so this doesn't need the rest of
+	the addon, or Blender.
+	'''
+	spec = importlib.util.spec_from_file_location('blendkrieg_thumbnails',
+		os.path.join(ADDON_ROOT, 'core', 'thumbnails.py'))
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+if __name__ == '__main__':
+	thumbnails = load_thumbnails()
+
+	parser = ArgumentParser(description='Render Blendkrieg tag thumbnails.')
+	parser.add_argument('tags_directory', type=str)
+	parser.add_argument('cache_directory', type=str)
+	parser.add_argument('-b', '--blender', type=str, default=None, help='''
+		Path to Blender executable. This can also be specified by setting the
+		environment variable BLENDER_PATH. If not specified, this script will
+		search for a blender executable on the system.
+	''')
+	parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+		help='How many Blender processes to render in. Defaults to the CPU count.')
+	parser.add_argument('--size', type=int, default=thumbnails.THUMBNAIL_SIZE,
+		help='Width and height of the thumbnails in pixels.')
+	parser.add_argument('--timeout', type=float,
+		default=thumbnails.DEFAULT_TIMEOUT_PER_JOB,
+		help='Seconds a worker may take per thumbnail before it is killed.')
+	args = parser.parse_args()
+
+	# Support reading Blender location in multiple ways
+	blender = args.blender                \
+		or os.environ.get('BLENDER_PATH') \
+		or which('blender')
+
+	if blender is None:
+		raise Exception('Cannot find Blender executable')
+
+	outcome = thumbnails.generate_thumbnails(args.tags_directory,
+		args.cache_directory, blender=blender, workers=args.workers,
+		size=args.size, timeout_per_job=args.timeout)
+	json.dump(outcome, sys.stdout, indent='\t')
+	print()
+	sys.exit(1 if outcome['failed'] else 0)
@@ -0,0 +1,49 @@
+'''Compares benchmark results against a stored baseline.
+
+This runs outside of Blender, so it must only depend on the standard library.
+'''
+import json
+
+# Allowed slowdown of a stage before it counts as a regression. 0.2 is 20%.
+DEFAULT_THRESHOLD = 0.2
+
+def load_results(path):
+	'''Reads a benchmark results JSON file.'''
+	with open(path, 'r') as results_file:
+		return json.load(results_file)
+
+def save_results(path, results):
+	'''Writes benchmark results to a JSON file.'''
+	with open(path, 'w') as results_file:
+		json.dump(results, results_file, indent='\t', sort_keys=True)
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+	'''
+	Compares the median time of every stage in results to the baseline.
+
+	Returns a list of (stage, baseline_time, new_time) tuples for every stage
+	that got slower by more than the threshold. Stages missing from either
+	side are not compared.
+	'''
+	regressions = []
+	for stage, timing in results['stages'].items():
+		base_timing = baseline['stages'].get(stage)
+		if base_timing is None:
+			continue
+
+		if timing['median'] > base_timing['median'] * (1.0 + threshold):
+			regressions.append((stage, base_timing['median'], timing['median']))
+
+	return regressions
+
+def format_report(results, baseline=None):
+	'''Returns a human readable table of the results.'''
+	lines = []
+	for stage, timing in results['stages'].items():
+		line = '%-16s %10.4fs' % (stage, timing['median'])
+		if baseline and stage in baseline['stages']:
+			base_time = baseline['stages'][stage]['median']
+			if base_time > 0:
+				line += '  (%+.1f%%)' % ((timing['median'] / base_time - 1.0) * 100)
+		lines.append(line)
+	return '\n'.join(lines)
@@ -0,0 +1,39 @@
+'''Runs the benchmark stages inside Blender and writes the results to JSON.
+
+Run this through test.py with --bench. Arguments meant for this script have
+to come after a "--" so Blender does not try to read them.
+'''
+from argparse import ArgumentParser
+import os
+import sys
+
+if __name__ == '__main__':
+	# Blender doesn't put the directory of a --python script on sys.path.
+	# Make this one importable for compare and stages, and the test
+	# directory above it for testutils.
+	bench_directory = os.path.dirname(os.path.abspath(__file__))
+	sys.path.insert(0, os.path.dirname(bench_directory))
+	sys.path.insert(0, bench_directory)
+
+	from compare import save_results
+	import stages
+
+	argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+	parser = ArgumentParser(description='Blendkrieg import benchmarks.')
+	parser.add_argument('--out', type=str, required=True)
+	parser.add_argument('--scale', choices=stages.SCALES, default='small')
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--seed', type=int, default=0)
+	for size in stages.SCALES['small']:
+		parser.add_argument('--' + size, type=int, default=None)
+	args = parser.parse_args(argv)
+
+	sizes = dict(stages.SCALES[args.scale])
+	for size in sizes:
+		if getattr(args, size) is not None:
+			sizes[size] = getattr(args, size)
+
+	results = stages.run(repeat=args.repeat, seed=args.seed, **sizes)
+	results['scale'] = args.scale
+	save_results(args.out, results)
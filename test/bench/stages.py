@@ -0,0 +1,185 @@
+'''The individual benchmark stages of a Halo 1 model and animation import.
+
+Each stage is timed on its own so a regression can be pinned on the part of
+the importer that caused it. The stages run in the same order the import
+operators run them, since later stages need the scene the earlier ones built.
+'''
+import os
+import statistics
+import tempfile
+from time import perf_counter
+
+import bpy
+
+from testutils.addon import import_addon_module
+from testutils.scene import clear_scene
+from testutils.synthetic import make_jma_set, make_jms
+
+model = import_addon_module('halo1.model')
+anim = import_addon_module('halo1.anim')
+util = import_addon_module('scene.util')
+geometry = import_addon_module('core.geometry')
+
+from reclaimer.animation.jma import write_jma
+from reclaimer.model.jms import write_jms
+
+# The order the stages get reported in.
+STAGES = (
+	'parse_jms',
+	'parse_jma',
+	'reduce_vertices',
+	'preprocess',
+	'nodes',
+	'markers',
+	'mesh_build',
+	'skinning',
+	'animations',
+)
+
+# Predefined sizes of synthetic data. Anything can be overridden separately.
+SCALES = {
+	'small': {
+		'verts': 2000, 'regions': 4, 'nodes': 20, 'markers': 10,
+		'materials': 4, 'frames': 30, 'animations': 5,
+	},
+	'medium': {
+		'verts': 20000, 'regions': 8, 'nodes': 50, 'markers': 40,
+		'materials': 8, 'frames': 60, 'animations': 20,
+	},
+	'large': {
+		'verts': 100000, 'regions': 16, 'nodes': 120, 'markers': 100,
+		'materials': 16, 'frames': 120, 'animations': 60,
+	},
+}
+
+class StageTimer:
+	'''Collects the times of every run of every stage.'''
+
+	def __init__(self):
+		self.runs = {name: [] for name in STAGES}
+
+	def time(self, name, function, *args, **kwargs):
+		'''Runs the function, records how long it took and returns its result.'''
+		start = perf_counter()
+		result = function(*args, **kwargs)
+		self.runs[name].append(perf_counter() - start)
+		return result
+
+	def summary(self):
+		'''Returns the min, median and all runs of each stage in a dict.'''
+		return {
+			name: {
+				'min': min(runs),
+				'median': statistics.median(runs),
+				'runs': runs,
+			}
+			for name, runs in self.runs.items() if runs
+		}
+
+
+def region_geometry(jms, region):
+	'''Prepares the vertices and triangles of a region like the importer does.'''
+	vertices = tuple((v.pos_x, v.pos_y, v.pos_z) for v in jms.verts)
+	triangles = tuple(
+		(t.v0, t.v1, t.v2) for t in jms.tris if t.region == region
+	)
+	return vertices, triangles
+
+def reduce_all_regions(jms):
+	'''Runs reduce_vertices on every region.'''
+	for region in range(len(jms.regions)):
+		vertices, triangles = region_geometry(jms, region)
+		util.reduce_vertices(vertices, triangles)
+
+def preprocess_all_regions(jms):
+	'''Turns every region into a RegionMesh.'''
+	return geometry.model_arrays_from_jms(jms).meshes
+
+def build_all_regions(jms, regions, *, scale):
+	'''Builds every region as an unskinned mesh object.'''
+	materials = [mat.name for mat in jms.materials]
+	return [
+		model.import_halo1_region(region,
+			name='bench:' + region.name,
+			scale=scale,
+			materials=materials,
+			skin_vertices=False)
+		for region in regions
+	]
+
+def skin_all_regions(jms, region_objs, regions, armature):
+	'''Skins every region object to the armature.'''
+	node_names = [node.name for node in jms.nodes]
+	for region_obj, region in zip(region_objs, regions):
+		region_obj.parent = armature
+		model.skin_region_object(region_obj, region, node_names, armature)
+
+def parse_files(read_function, filepaths):
+	'''Reads every file in filepaths with the given read function.'''
+	return [read_function(filepath) for filepath in filepaths]
+
+def run_once(timer, jms, animations, workdir, *, scale):
+	'''Runs every stage once on a clean scene.'''
+	clear_scene()
+
+	jms_path = os.path.join(workdir, 'bench.jms')
+	jma_paths = [
+		os.path.join(workdir, jma.name + jma.ext) for jma in animations
+	]
+
+	# Parsing is done on files written out from the synthetic data, so the
+	# stages after it work on exactly what the importer would get.
+	jms = timer.time('parse_jms', model.read_halo1model, jms_path)[0]
+	timer.time('parse_jma', parse_files, anim.read_halojma, jma_paths)
+
+	timer.time('reduce_vertices', reduce_all_regions, jms)
+	regions = timer.time('preprocess', preprocess_all_regions, jms)
+
+	armature, nodes = timer.time('nodes',
+		model.import_halo1_nodes_from_jms, jms, scale=scale)
+	timer.time('markers', model.import_halo1_markers_from_jms, jms,
+		scale=scale, armature=armature, scene_nodes=nodes)
+
+	for mat in jms.materials:
+		model.import_halo1_model_shader(mat.name)
+
+	region_objs = timer.time('mesh_build', build_all_regions,
+		jms, regions, scale=scale)
+	timer.time('skinning', skin_all_regions,
+		jms, region_objs, regions, armature)
+
+	bpy.context.view_layer.objects.active = armature
+	timer.time('animations', anim.import_animations, animations, scale)
+
+def run(*, repeat=3, scale=0.03048, seed=0, **sizes):
+	'''
+	Runs the whole benchmark and returns the results as a JSON-able dict.
+
+	sizes are the arguments for the synthetic data generators. Missing
+	ones are taken from the small scale.
+	'''
+	sizes = dict(SCALES['small'], **sizes)
+	jms = make_jms(verts=sizes['verts'], regions=sizes['regions'],
+		nodes=sizes['nodes'], markers=sizes['markers'],
+		materials=sizes['materials'], seed=seed)
+	animations = make_jma_set(jms.nodes, animations=sizes['animations'],
+		frames=sizes['frames'], seed=seed)
+
+	timer = StageTimer()
+	with tempfile.TemporaryDirectory() as workdir:
+		write_jms(os.path.join(workdir, 'bench.jms'), jms)
+		for jma in animations:
+			write_jma(os.path.join(workdir, jma.name + jma.ext), jma)
+
+		for i in range(repeat):
+			run_once(timer, jms, animations, workdir, scale=scale)
+
+	clear_scene()
+
+	return {
+		'blender': bpy.app.version_string,
+		'repeat': repeat,
+		'seed': seed,
+		'sizes': sizes,
+		'stages': timer.summary(),
+	}
@@ -0,0 +1,111 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import make_sbsp
+
+bsp = import_addon_module('core.bsp')
+parsing = import_addon_module('core.parsing')
+validation = import_addon_module('core.validation')
+
+def read_sbsp(tag, **options):
+	'''Writes tag to a temporary file and reads it back as BspArrays.'''
+	with tempfile.TemporaryDirectory() as directory:
+		filepath = os.path.join(directory, 'synthetic.scenario_structure_bsp')
+		tag.serialize(filepath=filepath, temp=False, backup=False)
+		return parsing.read_halo1bsp_arrays(filepath, **options)
+
+def first_material(tag):
+	return tag.data.tagdata.lightmaps.STEPTREE[0].materials.STEPTREE[0]
+
+# These tests don't need Blender.
+@describe('Bsp geometry')
+def bspTests():
+
+	@it('Materials are joined into chunks of a bounded size')
+	def chunks():
+		tag = make_sbsp(lightmaps=2, materials=3, verts=50, shaders=2)
+
+		arrays = read_sbsp(tag, chunk_triangles=250)
+
+		assert_that([chunk.triangle_count for chunk in arrays.chunks],
+			equal_to([200, 200, 200]), 'Triangles per chunk')
+		assert_that([chunk.name for chunk in arrays.chunks],
+			equal_to(['synthetic:0', 'synthetic:1', 'synthetic:2']),
+			'Chunk names')
+		assert_that(arrays.materials, contains_inanyorder('shader0', 'shader1'))
+		for chunk in arrays.chunks:
+			assert_that(chunk.vertex_count, equal_to(100), 'Vertices per chunk')
+			assert_that(chunk.loop_lightmap_uvs.shape,
+				equal_to(chunk.loop_uvs.shape), 'Lightmap uvs per loop')
+			assert_that(chunk.materials.max(), less_than(len(arrays.materials)),
+				'Material indices')
+
+	@it('Vertices are read from the raw data')
+	def vertices():
+		tag = make_sbsp(lightmaps=1, materials=1, verts=10)
+		raw = bytes(first_material(tag).uncompressed_vertices.STEPTREE)
+		values = np.array(struct.unpack('<140f', raw[:560]),
+			np.float32).reshape(10, 14)
+		lightmap = np.array(struct.unpack('<50f', raw[560:]),
+			np.float32).reshape(10, 5)
+		surfaces = np.array(struct.unpack('>60h',
+			bytes(tag.data.tagdata.surface.STEPTREE))).reshape(20, 3)
+
+		# Random triangles have the odd copy, which gets removed.
+		surfaces = surfaces[validation.find_valid_triangles(surfaces, 10)]
+
+		chunk = read_sbsp(tag).chunks[0]
+
+		assert_that(np.allclose(chunk.positions,
+			values[:, 0:3] * bsp.WORLD_UNITS_TO_JMS), equal_to(True),
+			'Positions are in jms units')
+		assert_that(chunk.triangles.tolist(),
+			equal_to(surfaces[:, ::-1].tolist()), 'Triangles are flipped')
+		corners = chunk.triangles.ravel()
+		assert_that(np.allclose(chunk.loop_normals, values[corners, 3:6]),
+			equal_to(True), 'Loop normals')
+		assert_that(np.allclose(chunk.loop_uvs[:, 1], 1.0 - values[corners, 13]),
+			equal_to(True), 'Uvs are flipped')
+		assert_that(np.allclose(chunk.loop_lightmap_uvs[:, 0],
+			lightmap[corners, 3]), equal_to(True), 'Lightmap uvs')
+
+	@it('Materials without vertex data are skipped')
+	def missingVertices():
+		tag = make_sbsp(lightmaps=1, materials=2, verts=10,
+			lightmap_vertices=False)
+		first_material(tag).uncompressed_vertices.STEPTREE = bytearray()
+
+		arrays = read_sbsp(tag)
+
+		assert_that(arrays.problems, equal_to({'missing_vertex_data': 1}))
+		assert_that(sum(chunk.triangle_count for chunk in arrays.chunks),
+			equal_to(20), 'Triangles left')
+		assert_that(arrays.chunks[0].loop_lightmap_uvs, none(),
+			'Lightmap uvs')
+
+	@it('Lazily read chunks are only built when they are iterated over')
+	def lazyChunks():
+		tag = make_sbsp(lightmaps=2, materials=3, verts=50, shaders=2)
+		first_material(tag).uncompressed_vertices.STEPTREE = bytearray()
+
+		eager = read_sbsp(tag, chunk_triangles=250)
+		lazy = read_sbsp(tag, chunk_triangles=250, lazy=True)
+
+		assert_that(lazy.problems, equal_to({}), 'Problems before building')
+		assert_that(lazy.chunk_count, greater_than_or_equal_to(
+			len(eager.chunks)), 'Estimated chunk count')
+		chunks = list(lazy.chunks)
+		assert_that([chunk.name for chunk in chunks],
+			equal_to([chunk.name for chunk in eager.chunks]), 'Chunk names')
+		for chunk, expected in zip(chunks, eager.chunks):
+			assert_that(chunk.triangles.tolist(),
+				equal_to(expected.triangles.tolist()), 'Triangles')
+		assert_that(lazy.problems, equal_to(eager.problems),
+			'Problems after building')
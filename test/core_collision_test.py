@@ -0,0 +1,86 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import tempfile
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import (CUBE_FACES, CUBE_POSITIONS, make_coll,
+	winged_edges)
+
+collision = import_addon_module('core.collision')
+parsing = import_addon_module('core.parsing')
+validation = import_addon_module('core.validation')
+
+def edge_array(edges):
+	return np.array([tuple(edge) for edge in edges], collision.EDGE)
+
+def surface_array(first_edges):
+	return np.array([(-1, edge, 0, -1, 0) for edge in first_edges],
+		collision.SURFACE)
+
+def read_coll(tag):
+	'''Writes tag to a temporary file and reads it back as CollisionArrays.'''
+	with tempfile.TemporaryDirectory() as directory:
+		filepath = os.path.join(directory, 'synthetic.model_collision_geometry')
+		tag.serialize(filepath=filepath, temp=False, backup=False)
+		return parsing.read_halo1collision_arrays(filepath)
+
+# These tests don't need Blender.
+@describe('Collision geometry')
+def collisionTests():
+
+	@it('Walking the edges gives back the polygons')
+	def walkEdges():
+		# And a loose triangle, which only borders the outside.
+		polygons = CUBE_FACES + ((8, 9, 10),)
+		edges, first_edges = winged_edges(polygons)
+
+		loop_vertices, loop_totals, keep = collision.surface_polygons(
+			surface_array(first_edges), edge_array(edges), 11)
+
+		assert_that(loop_totals.tolist(), equal_to([4] * 6 + [3]), 'Sides')
+		assert_that(loop_vertices.tolist(),
+			equal_to([vertex for polygon in polygons for vertex in polygon]),
+			'Corners')
+		assert_that(keep.all(), equal_to(True), 'All surfaces kept')
+
+	@it('Surfaces that do not close are removed')
+	def openSurfaces():
+		edges, first_edges = winged_edges(CUBE_FACES)
+		edges = edge_array(edges)
+		# Point the forward edge of the first edge back at itself, so the
+		# walk around its left surface never gets back to where it started.
+		edges['forward_edge'][first_edges[0]] = first_edges[0]
+		report = validation.GeometryReport()
+
+		loop_vertices, loop_totals, keep = collision.surface_polygons(
+			surface_array(first_edges), edges, 8, report)
+
+		assert_that(keep.tolist(), equal_to([False] + [True] * 5), 'Kept')
+		assert_that(report.counts, equal_to({'open_surfaces': 1}))
+
+	@it('Every permutation of every node becomes a mesh')
+	def readTag():
+		arrays = read_coll(make_coll(nodes=2, permutations=2, materials=3))
+
+		assert_that([mesh.name for mesh in arrays.meshes], equal_to([
+			'synthetic:node0:permutation0', 'synthetic:node0:permutation1',
+			'synthetic:node1:permutation0', 'synthetic:node1:permutation1',
+		]))
+		assert_that(arrays.node_names, equal_to(['node0', 'node1']))
+		assert_that(arrays.materials,
+			equal_to(['material0', 'material1', 'material2']))
+		assert_that(arrays.problems, equal_to({}), 'Problems')
+
+		mesh = arrays.meshes[0]
+		assert_that(mesh.vertex_count, equal_to(8), 'Vertices')
+		assert_that(mesh.loop_starts.tolist(), equal_to([0, 4, 8, 12, 16, 20]),
+			'Loop starts')
+		# The cube is scaled, but still a cube.
+		size = mesh.positions.max()
+		assert_that(np.allclose(mesh.positions / size, CUBE_POSITIONS),
+			equal_to(True), 'Positions')
+		assert_that(mesh.materials.max(), less_than(3), 'Materials')
@@ -0,0 +1,119 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import tempfile
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import make_jma, make_jms
+
+from reclaimer.animation.jma import write_jma
+from reclaimer.model.jms import write_jms
+
+arrays = import_addon_module('core.arrays')
+container = import_addon_module('core.container')
+parsing = import_addon_module('core.parsing')
+
+def assert_same_arrays(loaded, expected, description):
+	'''Compares the slots of two core.arrays objects, recursing into them.'''
+	for slot in type(expected).__slots__:
+		a, b = getattr(loaded, slot), getattr(expected, slot)
+		if isinstance(b, np.ndarray):
+			assert_that(a.dtype, equal_to(b.dtype), description + '.' + slot)
+			assert_that(np.array_equal(a, b), description + '.' + slot)
+		elif type(b).__name__ in container.ARRAY_CLASSES:
+			assert_same_arrays(a, b, description + '.' + slot)
+		elif isinstance(b, list) and b and hasattr(b[0], '__slots__'):
+			for i, (x, y) in enumerate(zip(a, b)):
+				assert_same_arrays(x, y, '%s.%s[%d]' % (description, slot, i))
+		else:
+			assert_that(a, equal_to(b), description + '.' + slot)
+
+# These tests don't need Blender.
+@describe('Array container')
+def containerTests():
+
+	@it('Models and animations survive a round trip')
+	def roundTrip():
+		jms = make_jms(verts=200, regions=2, nodes=5, markers=2, seed=4)
+		jma = make_jma(jms.nodes, frames=4, seed=4, name='walk')
+		with tempfile.TemporaryDirectory() as directory:
+			jms_path = os.path.join(directory, 'cyborg.jms')
+			jma_path = os.path.join(directory, 'walk.jmm')
+			write_jms(jms_path, jms)
+			write_jma(jma_path, jma)
+
+			for filepath, kind, read in (
+					(jms_path, 'model', parsing.read_halo1model_arrays),
+					(jma_path, 'animations', parsing.read_halo1anim_arrays)):
+				path = container.convert_to_container(filepath)
+				assert_that(path, equal_to(filepath + '.krieg'),
+					'Named after the whole file')
+				assert_that(container.read_container(path)[0], equal_to(kind))
+
+				loaded = read(path)
+				expected = read(filepath)
+				assert_that(loaded, has_length(len(expected)), kind)
+				for i, (a, b) in enumerate(zip(loaded, expected)):
+					assert_same_arrays(a, b, '%s[%d]' % (kind, i))
+				del loaded
+
+	@it('Arrays are aligned views of the file')
+	def zeroCopy():
+		positions = np.arange(30, dtype=np.float32).reshape(10, 3)
+		mesh = arrays.RegionMesh('body',
+			positions, np.zeros((1, 3), np.int32), np.zeros(0, np.int32),
+			None, None, None, None, None, loop_lightmap_uvs=None)
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'mesh.krieg')
+			container.write_container(path, 'model',
+				[arrays.ModelArrays(meshes=[mesh])])
+
+			models = container.read_container_objects(path, 'model')
+			loaded = models[0].meshes[0].positions
+			assert_that(loaded.tolist(), equal_to(positions.tolist()))
+			assert_that(loaded.flags.owndata, equal_to(False), 'No copy')
+			assert_that(loaded.ctypes.data % container.ALIGNMENT, equal_to(0),
+				'Aligned')
+			assert_that(models[0].meshes[0].materials, has_length(0))
+
+			# Writes go to a private copy, the file stays as it is.
+			loaded[0, 0] = 100.0
+			again = container.read_container_objects(path, 'model')
+			assert_that(again[0].meshes[0].positions[0, 0], equal_to(0.0))
+
+			assert_that(calling(container.read_container_objects).with_args(
+				path, 'animations'), raises(ValueError))
+			del loaded, models, again
+
+	@it('Only files without an up to date container are converted')
+	def staleContainers():
+		jms = make_jms(verts=20, regions=1, nodes=2, markers=0)
+		with tempfile.TemporaryDirectory() as directory:
+			tags = os.path.join(directory, 'tags')
+			os.makedirs(os.path.join(tags, 'rocks'))
+			rock = os.path.join(tags, 'rocks', 'rock.jms')
+			tree = os.path.join(tags, 'tree.jms')
+			write_jms(rock, jms)
+			write_jms(tree, jms)
+			out = os.path.join(directory, 'out')
+
+			stale = container.find_stale_containers([tags], out)
+			assert_that(stale, contains_inanyorder(
+				(rock, os.path.join(out, 'rocks', 'rock.jms.krieg')),
+				(tree, os.path.join(out, 'tree.jms.krieg'))), 'First run')
+
+			path = container.convert_to_container(tree)
+			assert_that(container.find_stale_containers([tags]),
+				contains_exactly((rock, rock + '.krieg')), 'Next to the files')
+
+			stat = os.stat(tree)
+			os.utime(tree, ns=(stat.st_atime_ns,
+				os.stat(path).st_mtime_ns + 10**9))
+			assert_that([filepath for filepath, output
+				in container.find_stale_containers([tags])],
+				contains_inanyorder(rock, tree), 'After a change')
+			assert_that(container.find_stale_containers([tags], force=True),
+				has_length(2), 'Forced')
@@ -0,0 +1,87 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import make_jma, make_jms
+
+from reclaimer.animation.jma import write_jma
+from reclaimer.model.jms import write_jms
+
+arrays = import_addon_module('core.arrays')
+daemon = import_addon_module('core.daemon')
+parsing = import_addon_module('core.parsing')
+
+@describe('Parse daemon')
+def parseDaemonTests():
+
+	workdir = tempfile.TemporaryDirectory()
+	jms = make_jms(verts=200, regions=2, nodes=5, markers=2, seed=3)
+	jms_path = os.path.join(workdir.name, 'daemon.jms')
+	jma = make_jma(jms.nodes, frames=4, seed=3, name='daemon')
+	jma_path = os.path.join(workdir.name, 'daemon.jmm')
+
+	parse_daemon = daemon.ParseDaemon(python_executable=sys.executable,
+		idle_timeout=30.0)
+
+	@before
+	def writeFiles():
+		write_jms(jms_path, jms)
+		write_jma(jma_path, jma)
+
+	@after
+	def stopDaemon():
+		parse_daemon.close()
+		workdir.cleanup()
+
+	@it('Objects survive the trip through shared memory')
+	def sharedMemoryRoundTrip():
+		nodes = arrays.NodeArrays(names=['a', 'b'],
+			translations=np.arange(6, dtype=np.float64).reshape(2, 3))
+
+		block, message = daemon.dump_to_shared_memory(nodes)
+		try:
+			loaded = daemon.load_from_shared_memory(message)
+		finally:
+			block.close()
+			block.unlink()
+
+		assert_that(loaded.names, equal_to(['a', 'b']), 'Names')
+		assert_that(loaded.translations.tolist(),
+			equal_to(nodes.translations.tolist()), 'Translations')
+
+	@it('Models parsed by the daemon match parsing in process')
+	def parseModel():
+		expected = parsing.read_halo1model_arrays(jms_path)
+		models = parse_daemon.parse_model(jms_path)
+
+		assert_that(models, has_length(len(expected)), 'Model count')
+		for mesh, expected_mesh in zip(models[0].meshes, expected[0].meshes):
+			assert_that(np.array_equal(mesh.positions, expected_mesh.positions),
+				equal_to(True), 'Positions of ' + mesh.name)
+			assert_that(np.array_equal(mesh.triangles, expected_mesh.triangles),
+				equal_to(True), 'Triangles of ' + mesh.name)
+
+	@it('Animations parsed by the daemon are arrays')
+	def parseAnimations():
+		animations = parse_daemon.parse_animations(jma_path)
+
+		assert_that(animations, has_length(1), 'Animation count')
+		assert_that(animations[0].rotations.shape, equal_to((4, 5, 4)),
+			'One rotation per frame and node')
+
+	@it('Parse errors are raised in the client')
+	def parseError():
+		bad_path = os.path.join(workdir.name, 'bad.jms')
+		with open(bad_path, 'w') as bad_file:
+			bad_file.write('garbage\n')
+
+		assert_that(calling(parse_daemon.parse_model).with_args(bad_path),
+			raises(Exception), 'Parsing a broken file')
+		assert_that(parse_daemon.is_alive, equal_to(True),
+			'The daemon keeps running')
@@ -0,0 +1,137 @@
+from pocha import *
+from hamcrest import *
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+
+geometry = import_addon_module('core.geometry')
+transforms = import_addon_module('core.transforms')
+arrays = import_addon_module('core.arrays')
+
+# These tests don't need Blender.
+@describe('Core geometry pipeline')
+def coreGeometryTests():
+
+	@it('Compacting vertices keeps their order and renumbers triangles')
+	def compactVertices():
+		used, triangles = geometry.compact_vertices([(7, 3, 5), (5, 3, 9)])
+
+		assert_that(used.tolist(), equal_to([3, 5, 7, 9]), 'Used vertices')
+		assert_that(triangles.tolist(),
+			equal_to([[2, 0, 1], [1, 0, 3]]),
+			'Triangles reference the compacted vertices')
+
+	@it('Region meshes only contain their own triangles')
+	def regionSplit():
+		vertices = {
+			'positions': np.arange(18, dtype=np.float32).reshape(6, 3),
+			'normals': np.tile(np.float32((0, 0, 1)), (6, 1)),
+			'uvs': np.arange(12, dtype=np.float32).reshape(6, 2),
+			'skin_nodes': np.zeros((6, 2), np.int32),
+			'skin_weights': np.zeros((6, 2), np.float32),
+		}
+		triangles = {
+			'indices': np.array([(0, 1, 2), (3, 4, 5), (2, 1, 0)], np.int32),
+			'regions': np.array([0, 1, 0], np.int32),
+			'shaders': np.array([4, 5, 6], np.int32),
+		}
+
+		region = geometry.region_mesh(vertices, triangles, region_filter=(1,))
+
+		assert_that(region.vertex_map.tolist(), equal_to([3, 4, 5]),
+			'Only the vertices of the region are used')
+		assert_that(region.triangles.tolist(), equal_to([[0, 1, 2]]),
+			'Triangles are renumbered')
+		assert_that(region.materials.tolist(), equal_to([5]),
+			'Materials follow their triangles')
+		assert_that(region.loop_uvs.tolist(),
+			equal_to([[6, 7], [8, 9], [10, 11]]),
+			'One uv per triangle corner')
+		assert_that(region.positions.tolist(),
+			equal_to(vertices['positions'][3:].tolist()),
+			'Positions of the region')
+
+	@it('Skin weights give the first node the remaining weight')
+	def skinWeights():
+		nodes, weights = geometry.skin_arrays(
+			np.array([0, 1, -1]), np.array([-1, 2, 3]),
+			np.array([0.0, 0.25, 0.5]))
+
+		assert_that(nodes.tolist(), equal_to([[0, -1], [1, 2], [-1, 3]]),
+			'Node pairs')
+		assert_that(weights.tolist(), equal_to([[1.0, 0.0], [0.75, 0.25], [0.0, 0.5]]),
+			'Weight pairs')
+
+	@it('Node matrices are multiplied through the hierarchy')
+	def nodeMatrices():
+		# A child rotated 90 degrees around z, offset along x from its parent.
+		half = np.sqrt(0.5)
+		nodes = arrays.NodeArrays(
+			names=['root', 'child'],
+			parents=np.array([-1, 0], np.int32),
+			rotations=np.array([(0, 0, 0, 1), (0, 0, half, half)]),
+			translations=np.array([(1, 2, 3), (10, 0, 0)]),
+		)
+
+		world = transforms.node_world_matrices(nodes, scale=0.5)
+
+		assert_that(np.allclose(world[0][:3, 3], (0.5, 1.0, 1.5)), equal_to(True),
+			'Root translation is scaled')
+		assert_that(np.allclose(world[1][:3, 3], (5.5, 1.0, 1.5)), equal_to(True),
+			'Child translation is relative to the root')
+		# Jms rotations are inverted, so this rotates the x axis onto -y.
+		assert_that(np.allclose(world[1][:3, :3] @ (1, 0, 0), (0, -1, 0)),
+			equal_to(True),
+			'Child rotation is inverted')
+
+	@it('Absolute node transforms accumulate rotations')
+	def absoluteTransforms():
+		half = np.sqrt(0.5)
+		nodes = arrays.NodeArrays(
+			names=['root', 'child'],
+			parents=np.array([-1, 0], np.int32),
+			rotations=np.array([(0, 0, half, -half), (0, 0, 0, -1)]),
+			translations=np.array([(0, 0, 0), (1, 0, 0)]),
+		)
+
+		translations, rotations = transforms.absolute_node_transforms(nodes)
+
+		assert_that(np.allclose(translations[1], (0, 1, 0)), equal_to(True),
+			'Child translation is rotated by its parent')
+		assert_that(np.allclose(rotations[1], rotations[0]), equal_to(True),
+			'Child rotation is its parent rotation')
+
+	@it('Combined regions share their vertices')
+	def combineRegions():
+		vertices = {
+			'positions': np.arange(15, dtype=np.float32).reshape(5, 3),
+			'normals': np.tile(np.float32((0, 0, 1)), (5, 1)),
+			'uvs': np.arange(10, dtype=np.float32).reshape(5, 2),
+			'skin_nodes': np.zeros((5, 2), np.int32),
+			'skin_weights': np.zeros((5, 2), np.float32),
+		}
+		triangles = {
+			'indices': np.array([(0, 1, 2), (2, 1, 3), (3, 1, 4), (2, 0, 1)], np.int32),
+			'regions': np.array([0, 1, 1, 2], np.int32),
+			'shaders': np.array([4, 5, 6, 7], np.int32),
+		}
+		regions = [
+			geometry.region_mesh(vertices, triangles, region_filter=(i,))
+			for i in range(3)
+		]
+
+		combined, face_regions = geometry.combine_region_meshes(regions)
+
+		assert_that(combined.vertex_map.tolist(), equal_to([0, 1, 2, 3, 4]),
+			'Shared vertices are only used once')
+		assert_that(combined.triangles.tolist(),
+			equal_to([[0, 1, 2], [2, 1, 3], [3, 1, 4]]),
+			'Triangles, without the copy in the last region')
+		assert_that(face_regions.tolist(), equal_to([0, 1, 1]),
+			'Region of every triangle')
+		assert_that(combined.materials.tolist(), equal_to([4, 5, 6]),
+			'Materials')
+		assert_that(combined.positions.tolist(),
+			equal_to(vertices['positions'].tolist()), 'Positions')
+		assert_that(len(combined.loop_uvs), equal_to(9), 'Loops')
@@ -0,0 +1,77 @@
+from pocha import *
+from hamcrest import *
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+
+arrays = import_addon_module('core.arrays')
+hashing = import_addon_module('core.hashing')
+
+def make_region(seed=0, count=8, triangle_count=6):
+	'''Makes a random skinned RegionMesh.'''
+	rng = np.random.default_rng(seed)
+	triangles = rng.integers(0, count, (triangle_count, 3)).astype(np.int32)
+	weights = rng.random(count).astype(np.float32)
+	return arrays.RegionMesh(
+		name='test',
+		positions=rng.normal(size=(count, 3)).astype(np.float32),
+		triangles=triangles,
+		materials=rng.integers(0, 2, triangle_count).astype(np.int32),
+		loop_normals=rng.normal(size=(triangles.size, 3)).astype(np.float32),
+		loop_uvs=rng.random((triangles.size, 2)).astype(np.float32),
+		vertex_map=np.arange(count, dtype=np.int32),
+		skin_nodes=rng.integers(-1, 3, (count, 2)).astype(np.int32),
+		skin_weights=np.stack((weights, 1 - weights), axis=1),
+	)
+
+# These tests don't need Blender.
+@describe('Region hashing')
+def hashingTests():
+
+	@it('Identical regions hash the same')
+	def identical():
+		assert_that(hashing.region_hash(make_region(), materials=('a', 'b')),
+			equal_to(hashing.region_hash(make_region(), materials=('a', 'b'))))
+
+	@it('Float noise below the quantization step is ignored')
+	def noise():
+		region = make_region()
+		# Away from the rounding boundaries, which any quantization has.
+		region.positions = np.round(region.positions, 2)
+		noisy = make_region()
+		noisy.positions = region.positions + np.float32(hashing.POSITION_STEP / 10)
+
+		assert_that(hashing.region_hash(noisy),
+			equal_to(hashing.region_hash(region)))
+
+	@it('Everything that ends up in the mesh changes the hash')
+	def differences():
+		expected = hashing.region_hash(make_region(), scale=1.0,
+			materials=('a', 'b'), node_names=('x', 'y', 'z'))
+
+		def changed(name, **options):
+			region = make_region()
+			if name is not None:
+				values = getattr(region, name).copy()
+				values.flat[0] += 1
+				setattr(region, name, values)
+			arguments = dict(scale=1.0, materials=('a', 'b'),
+				node_names=('x', 'y', 'z'))
+			arguments.update(options)
+			return hashing.region_hash(region, **arguments)
+
+		for name in ('positions', 'triangles', 'materials', 'loop_normals',
+				'loop_uvs', 'skin_nodes', 'skin_weights'):
+			assert_that(changed(name), is_not(equal_to(expected)), name)
+		assert_that(changed(None, scale=2.0), is_not(equal_to(expected)),
+			'scale')
+		assert_that(changed(None, materials=('b', 'a')),
+			is_not(equal_to(expected)), 'material names')
+		assert_that(changed(None, node_names=('x', 'y')),
+			is_not(equal_to(expected)), 'node names')
+		assert_that(changed(None, options=(0.1,)),
+			is_not(equal_to(expected)), 'options')
+		assert_that(changed(None, options=(np.arange(3),)),
+			is_not(equal_to(changed(None, options=(np.arange(1, 4),)))),
+			'array options')
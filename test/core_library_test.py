@@ -0,0 +1,120 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import tempfile
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import (make_antr, make_coll, make_mod2,
+	make_tags_directory)
+
+library = import_addon_module('core.library')
+
+def write_tags(directory):
+	'''
+	Writes a scenario with two sceneries, a gbxmodel and an animation tag
+	into directory. Returns the path of the gbxmodel.
+	'''
+	make_tags_directory(directory, objects=('rock', 'tree'))
+	model_path = os.path.join(directory, 'characters', 'cyborg.gbxmodel')
+	os.makedirs(os.path.dirname(model_path))
+	make_mod2(positions=((-1, 0, 0), (1, 2, 3))).serialize(
+		filepath=model_path, temp=False, backup=False)
+	make_antr().serialize(filepath=os.path.join(directory, 'characters',
+		'cyborg.model_animations'), temp=False, backup=False)
+	return model_path
+
+# These tests don't need Blender.
+@describe('Tag library')
+def libraryTests():
+
+	@it('Scanning records what is in every tag')
+	def summaries():
+		with tempfile.TemporaryDirectory() as directory:
+			write_tags(directory)
+			with library.TagLibrary(os.path.join(directory, 'index.sqlite'),
+					directory) as index:
+				counts = index.scan()
+
+				model = index.get('characters/cyborg.gbxmodel')
+				animations = index.get('characters/cyborg.model_animations')
+				scenery = index.get('scenery/rock.scenery')
+				matches = index.search('WALK')
+				models = index.search(fourccs=library.MODEL_FOURCCS)
+				users = index.users('scenery/rock.gbxmodel')
+
+		assert_that(counts, has_entries(added=7, failed=0),
+			'Scan, without the database itself')
+		assert_that(model.fourcc, equal_to('mod2'), 'Model tag class')
+		assert_that(model.node_count, equal_to(3), 'Nodes')
+		assert_that(model.regions, equal_to(['body', 'head']), 'Regions')
+		assert_that(model.permutations, equal_to(['base', 'damaged']),
+			'Permutations')
+		assert_that(model.markers, equal_to(['head', 'hand']), 'Markers')
+		assert_that(model.bounds, equal_to([[-100, 0, 0], [100, 200, 300]]),
+			'Bounds in jms units')
+		assert_that(animations.animations,
+			equal_to([('idle', 30), ('walk', 20)]), 'Animations')
+		assert_that(scenery.fourcc, equal_to('scen'), 'Scenery tag class')
+		assert_that([entry.path for entry in matches],
+			equal_to(['characters/cyborg.model_animations']), 'Search')
+		assert_that([entry.path for entry in models],
+			equal_to(['characters/cyborg.gbxmodel']),
+			'Search by tag class leaves out the empty gbxmodel files')
+		assert_that(users, equal_to(['scenery/rock.scenery']), 'Users')
+
+	@it('Scanning again only reads new and changed tags')
+	def incremental():
+		with tempfile.TemporaryDirectory() as directory:
+			model_path = write_tags(directory)
+			database = os.path.join(tempfile.gettempdir(),
+				os.path.basename(directory) + '.sqlite')
+			try:
+				with library.TagLibrary(database, directory) as index:
+					index.scan()
+				with library.TagLibrary(database, directory) as index:
+					unchanged = index.scan()
+
+					make_mod2(regions=('body',)).serialize(
+						filepath=model_path, temp=False, backup=False)
+					stat = os.stat(model_path)
+					os.utime(model_path,
+						ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+					os.remove(os.path.join(directory, 'scenery', 'tree.scenery'))
+					changed = index.scan()
+					regions = index.get('characters/cyborg.gbxmodel').regions
+			finally:
+				os.remove(database)
+
+		assert_that(unchanged, has_entries(added=0, updated=0, removed=0,
+			unchanged=7), 'Nothing changed')
+		assert_that(changed, has_entries(added=0, updated=1, removed=1,
+			unchanged=5), 'One changed and one removed')
+		assert_that(regions, equal_to(['body']), 'Updated summary')
+
+	@it('Summaries read animations and collision bsps raw')
+	def leanDefinitions():
+		with tempfile.TemporaryDirectory() as directory:
+			animations_path = os.path.join(directory, 'cyborg.model_animations')
+			collision_path = os.path.join(directory,
+				'cyborg.model_collision_geometry')
+			make_antr().serialize(filepath=animations_path, temp=False,
+				backup=False)
+			make_coll().serialize(filepath=collision_path, temp=False,
+				backup=False)
+
+			animations = library.summary_definition('antr').build(
+				filepath=animations_path).data.tagdata
+			collision = library.summary_definition('coll').build(
+				filepath=collision_path).data.tagdata
+			summary = library.collision_summary(collision)
+
+		assert_that(animations.animations.STEPTREE, instance_of(bytearray),
+			'Animations, frame data and all')
+		assert_that(library.animation_summary(animations)['animations'],
+			equal_to([('idle', 30), ('walk', 20)]), 'Animations read raw')
+		assert_that(collision.nodes.STEPTREE, instance_of(bytearray),
+			'Collision nodes and their bsps')
+		assert_that(summary['node_count'], equal_to(2), 'Collision nodes')
+		assert_that(summary['permutations'], has_length(2),
+			'Permutations read raw')
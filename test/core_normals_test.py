@@ -0,0 +1,104 @@
+from pocha import *
+from hamcrest import *
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+
+arrays = import_addon_module('core.arrays')
+geometry = import_addon_module('core.geometry')
+normals = import_addon_module('core.normals')
+
+def make_region(positions, triangles, loop_normals):
+	'''Makes an unskinned RegionMesh.'''
+	positions = np.array(positions, np.float32).reshape(-1, 3)
+	triangles = np.array(triangles, np.int32).reshape(-1, 3)
+	count = len(positions)
+	return arrays.RegionMesh(
+		name='test',
+		positions=positions,
+		triangles=triangles,
+		materials=np.zeros(len(triangles), np.int32),
+		loop_normals=np.array(loop_normals, np.float32).reshape(-1, 3),
+		loop_uvs=np.zeros((triangles.size, 2), np.float32),
+		vertex_map=np.arange(count, dtype=np.int32),
+		skin_nodes=np.zeros((count, 2), np.int32),
+		skin_weights=np.tile(np.float32((1, 0)), (count, 1)),
+	)
+
+# Two triangles folded 90 degrees along the x axis, with split vertices
+# along the fold like a jms would have them.
+FOLD_POSITIONS = (
+	(0, 0, 0), (1, 0, 0), (0, 1, 0),
+	(1, 0, 0), (0, 0, 0), (0, 0, 1),
+)
+FOLD_TRIANGLES = ((0, 1, 2), (3, 4, 5))
+UP = (0, 0, 1)
+SIDE = (0, 1, 0)
+
+# These tests don't need Blender.
+@describe('Normal analysis')
+def normalsTests():
+
+	@it('Welding joins split vertices')
+	def weld():
+		region = make_region(FOLD_POSITIONS, FOLD_TRIANGLES, [UP] * 3 + [SIDE] * 3)
+
+		welded = geometry.weld_region_mesh(region)
+
+		assert_that(welded.vertex_count, equal_to(4), 'Vertices left')
+		assert_that(welded.triangles.tolist(),
+			equal_to([[0, 1, 2], [1, 0, 3]]), 'Triangles')
+		assert_that(welded.vertex_map.tolist(), equal_to([0, 1, 2, 5]),
+			'The first copy of every vertex is kept')
+
+	@it('Welding leaves double sided faces alone')
+	def weldDoubleSided():
+		region = make_region(FOLD_POSITIONS[:3] * 2, ((0, 1, 2), (5, 4, 3)),
+			[UP] * 3 + [(0, 0, -1)] * 3)
+
+		assert_that(geometry.weld_region_mesh(region), same_instance(region))
+
+	@it('Hard edges are marked sharp and need no custom normals')
+	def hardEdges():
+		region = geometry.weld_region_mesh(make_region(
+			FOLD_POSITIONS, FOLD_TRIANGLES, [UP] * 3 + [SIDE] * 3))
+
+		analysis = normals.analyze_normals(region.positions, region.triangles,
+			region.loop_normals)
+
+		assert_that(analysis.sharp_edges.tolist(), equal_to([[0, 1]]),
+			'Sharp edges')
+		assert_that(analysis.needs_custom_normals, equal_to(False),
+			'Needs custom normals, off by %f' % analysis.max_error)
+
+	@it('Soft edges are left smooth')
+	def softEdges():
+		half = np.sqrt(0.5)
+		soft = (0, half, half)
+		# Only the vertices on the fold are averaged.
+		loop_normals = [UP] * 3 + [SIDE] * 3
+		for loop, vertex in enumerate(np.ravel(FOLD_TRIANGLES)):
+			if vertex in (0, 1, 3, 4):
+				loop_normals[loop] = soft
+		region = geometry.weld_region_mesh(make_region(
+			FOLD_POSITIONS, FOLD_TRIANGLES, loop_normals))
+
+		analysis = normals.analyze_normals(region.positions, region.triangles,
+			region.loop_normals)
+
+		assert_that(analysis.sharp_edges.tolist(), empty(), 'Sharp edges')
+		assert_that(analysis.needs_custom_normals, equal_to(False),
+			'Needs custom normals, off by %f' % analysis.max_error)
+
+	@it('Normals Blender would not compute need custom normals')
+	def customNormals():
+		rng = np.random.default_rng(0)
+		region = make_region(FOLD_POSITIONS, FOLD_TRIANGLES,
+			rng.normal(size=(6, 3)))
+
+		analysis = normals.analyze_normals(region.positions, region.triangles,
+			region.loop_normals)
+
+		assert_that(analysis.needs_custom_normals, equal_to(True),
+			'Needs custom normals')
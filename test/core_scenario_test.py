@@ -0,0 +1,90 @@
+from pocha import *
+from hamcrest import *
+
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import make_tags_directory
+
+parsing = import_addon_module('core.parsing')
+scenario = import_addon_module('core.scenario')
+tags = import_addon_module('core.tags')
+
+def rotation_matrix(axis, angle):
+	'''A right handed rotation around the x (0), y (1) or z (2) axis.'''
+	matrix = np.identity(3)
+	a, b = (axis + 1) % 3, (axis + 2) % 3
+	matrix[a, a] = matrix[b, b] = math.cos(angle)
+	matrix[a, b] = -math.sin(angle)
+	matrix[b, a] = math.sin(angle)
+	return matrix
+
+# These tests don't need Blender.
+@describe('Scenario placements')
+def scenarioTests():
+
+	@it('Every model is read once and every placement kept')
+	def placements():
+		with tempfile.TemporaryDirectory() as directory:
+			directory = os.path.join(directory, 'tags')
+			filepath, expected = make_tags_directory(directory,
+				objects=('rock', 'tree'), placements=4)
+			loader = tags.TagLoader(tags.find_tags_directory(filepath))
+
+			arrays = parsing.read_halo1scenario_arrays(filepath, loader=loader)
+
+			assert_that(loader.tags_directory, equal_to(directory),
+				'The tags directory is found')
+			assert_that(len(loader), equal_to(3),
+				'The scenario and both sceneries are built once')
+			assert_that([os.path.basename(path) for path in arrays.models],
+				equal_to(['rock.gbxmodel', 'tree.gbxmodel']), 'Models')
+			assert_that(arrays.objects, equal_to(['rock', 'tree']), 'Objects')
+			assert_that(arrays.object_indices.tolist(),
+				equal_to([0] * 4 + [1] * 4), 'Object of every placement')
+			assert_that(np.allclose(arrays.positions,
+				np.array([p for p, r in expected]) * 100, atol=1e-2),
+				equal_to(True), 'Positions are in jms units')
+			assert_that(np.allclose(arrays.rotations,
+				[r for p, r in expected], atol=1e-5),
+				equal_to(True), 'Rotations')
+			assert_that(arrays.missing, empty(), 'Missing tags')
+
+	@it('Placements of missing tags are left out')
+	def missingTags():
+		with tempfile.TemporaryDirectory() as directory:
+			filepath, expected = make_tags_directory(directory,
+				objects=('rock', 'tree'), placements=2)
+			os.remove(os.path.join(directory, 'scenery', 'rock.scenery'))
+			os.remove(os.path.join(directory, 'scenery', 'tree.gbxmodel'))
+
+			arrays = parsing.read_halo1scenario_arrays(filepath)
+
+			assert_that(len(arrays), equal_to(0), 'Placements')
+			assert_that(arrays.models, empty(), 'Models')
+			assert_that(len(arrays.missing), equal_to(2), 'Missing tags')
+
+	@it('Placement matrices turn by yaw, then pitch, then roll')
+	def matrices():
+		rng = np.random.default_rng(0)
+		positions = rng.normal(size=(5, 3))
+		rotations = rng.uniform(-math.pi, math.pi, (5, 3))
+
+		matrices = scenario.placement_matrices(positions, rotations, 0.5)
+
+		for matrix, position, (yaw, pitch, roll) in zip(
+				matrices, positions, rotations):
+			expected = (rotation_matrix(2, yaw) @ rotation_matrix(1, -pitch)
+				@ rotation_matrix(0, roll))
+			assert_that(np.allclose(matrix[:3, :3], expected), equal_to(True),
+				'Rotation')
+			assert_that(np.allclose(matrix[:3, 3], position * 0.5),
+				equal_to(True), 'Translation')
+		# Pitching up lifts the forward axis.
+		forward = scenario.placement_matrices([(0, 0, 0)],
+			[(0, math.pi / 4, 0)])[0, :3, 0]
+		assert_that(forward[2], greater_than(0.0), 'Pitch up')
@@ -0,0 +1,176 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import re
+import stat
+import sys
+import tempfile
+import time
+
+from testutils.addon import ADDON_ROOT, import_addon_module
+
+container = import_addon_module('core.container')
+scheduler = import_addon_module('core.scheduler')
+
+# Stands in for Blender. It works through the queue like
+# scripts/convert_worker.py does, but acts up on files named after it.
+FAKE_BLENDER = '''#!%(python)s
+import importlib, os, sys, time
+sys.path.insert(0, %(parent)r)
+scheduler = importlib.import_module(%(addon)r + '.core.scheduler')
+argv = sys.argv[sys.argv.index('--') + 1:]
+queue = scheduler.JobQueue(argv[argv.index('--queue') + 1])
+worker = int(argv[argv.index('--worker') + 1])
+if os.path.basename(sys.argv[0]).startswith('broken'):
+	print('Blender does not start')
+	sys.exit(1)
+while True:
+	job = queue.claim(worker)
+	if job is None:
+		break
+	name = os.path.basename(job.filepath)
+	if name.startswith('crash'):
+		os._exit(3)
+	if name.startswith('hang'):
+		time.sleep(60)
+	if name.startswith('broken'):
+		queue.finish(job.id, 'ValueError: broken')
+	else:
+		queue.finish(job.id, '', {'totals': {'datablocks': 2}})
+'''
+
+def make_fake_blender(directory, name='blender'):
+	filepath = os.path.join(directory, name)
+	with open(filepath, 'w') as script:
+		script.write(FAKE_BLENDER % dict(python=sys.executable,
+			parent=str(ADDON_ROOT.parent), addon=ADDON_ROOT.name))
+	os.chmod(filepath, os.stat(filepath).st_mode | stat.S_IEXEC)
+	return filepath
+
+def make_files(directory, names):
+	for name in names:
+		with open(os.path.join(directory, name), 'wb') as tag_file:
+			tag_file.write(b'tag')
+
+# These tests don't need Blender, the workers are faked.
+@describe('Conversion scheduler')
+def schedulerTests():
+
+	@it('Jobs of dead workers are retried until they run out of attempts')
+	def abandon():
+		with tempfile.TemporaryDirectory() as directory:
+			with scheduler.JobQueue(os.path.join(directory, 'queue.sqlite')) as queue:
+				queue.add('a.gbxmodel', 'a.blend')
+				queue.add('a.gbxmodel', 'a.blend')
+				queue.add('b.gbxmodel', 'b.blend')
+
+				job = queue.claim(worker=0)
+				assert_that(job.filepath, equal_to('a.gbxmodel'), 'Oldest job')
+				queue.abandon(0, 'crashed', max_attempts=2)
+				assert_that(queue.get(job.id).status, equal_to('pending'), 'Retried')
+
+				job = queue.claim(worker=1)
+				assert_that(job.attempts, equal_to(2), 'Second attempt')
+				queue.abandon(1, 'crashed', max_attempts=2)
+				assert_that(queue.counts(), has_entries(
+					pending=1, running=0, failed=1), 'Gave up')
+
+	@it('Crashes, timeouts and errors only fail their own jobs')
+	def crashIsolation():
+		with tempfile.TemporaryDirectory() as directory:
+			tags = os.path.join(directory, 'tags')
+			os.makedirs(tags)
+			make_files(tags, ('good1.gbxmodel', 'good2.gbxmodel',
+				'crash.gbxmodel', 'hang.gbxmodel', 'broken.gbxmodel',
+				'notes.txt'))
+			queue_path = os.path.join(directory, 'queue.sqlite')
+			with scheduler.JobQueue(queue_path) as queue:
+				added = scheduler.queue_files(queue, [tags],
+					os.path.join(directory, 'out'))
+			assert_that(added, equal_to(5), 'Only models are queued')
+
+			report = scheduler.run_scheduler(queue_path,
+				blender=make_fake_blender(directory), workers=2,
+				timeout_per_job=1.0, max_attempts=2, poll_interval=0.05)
+
+			assert_that(report['statuses'], has_entries(done=2, failed=3))
+			assert_that(report['retries'], equal_to(2), 'Crash and hang retried')
+			assert_that(report['totals'], equal_to({'datablocks': 4}))
+			assert_that({os.path.basename(failure['filepath']): failure['error']
+				for failure in report['failures']}, has_entries(
+					**{'crash.gbxmodel': starts_with('worker exited'),
+					'hang.gbxmodel': starts_with('timed out'),
+					'broken.gbxmodel': equal_to('ValueError: broken')}))
+
+	@it('Workers that quit right away stop the run')
+	def idleWorkers():
+		with tempfile.TemporaryDirectory() as directory:
+			tags = os.path.join(directory, 'tags')
+			os.makedirs(tags)
+			make_files(tags, ('good1.gbxmodel', 'good2.gbxmodel'))
+			queue_path = os.path.join(directory, 'queue.sqlite')
+			with scheduler.JobQueue(queue_path) as queue:
+				scheduler.queue_files(queue, [tags], os.path.join(directory, 'out'))
+
+			logs = os.path.join(directory, 'logs')
+			start = time.time()
+			assert_that(calling(scheduler.run_scheduler).with_args(queue_path,
+				blender=make_fake_blender(directory, 'broken_blender'),
+				workers=2, max_attempts=2, log_directory=logs,
+				poll_interval=0.05), raises(scheduler.WorkerError,
+				re.escape(os.path.join(logs, 'worker'))))
+			assert_that(time.time() - start, less_than(10), 'Gave up quickly')
+			assert_that(len(os.listdir(logs)), less_than(8), 'Workers started')
+
+			with scheduler.JobQueue(queue_path) as queue:
+				assert_that(queue.counts(), has_entries(pending=2),
+					'Jobs are left for the next run')
+
+	@it('Animations go onto a model next to them or the given one')
+	def animationModels():
+		with tempfile.TemporaryDirectory() as directory:
+			tags = os.path.join(directory, 'tags')
+			os.makedirs(tags)
+			make_files(tags, ('a.jms', 'a.jma', 'b.model_animations', 'c.jmm'))
+			make_files(directory, ('other.gbxmodel',))
+			out = os.path.join(directory, 'out')
+
+			with scheduler.JobQueue(os.path.join(directory, 'queue.sqlite')) as queue:
+				scheduler.queue_files(queue, [tags], out)
+				models = {os.path.basename(job.filepath): job.model
+					for job in queue.jobs()}
+				assert_that(models['a.jma'], equal_to(os.path.join(tags, 'a.jms')),
+					'Model next to it')
+				assert_that(queue.jobs('skipped'), has_length(2), 'Without model')
+				report = scheduler.summarize(queue, 1.0)
+				assert_that(sorted(os.path.basename(entry['filepath'])
+					for entry in report['skipped']),
+					equal_to(['b.model_animations', 'c.jmm']), 'Reported')
+
+				model = os.path.join(directory, 'other.gbxmodel')
+				scheduler.queue_files(queue, [tags], out, model=model)
+				assert_that(queue.counts(), has_entries(pending=4, skipped=0),
+					'Queued with the given model')
+				job = [job for job in queue.jobs()
+					if job.filepath.endswith('c.jmm')][0]
+				assert_that(job.files, equal_to([model, job.filepath]),
+					'Model is imported first')
+
+	@it('Containers are queued by what they hold')
+	def containers():
+		with tempfile.TemporaryDirectory() as directory:
+			for name, kind in (('a.gbxmodel.krieg', 'model'),
+					('a.model_animations.krieg', 'animations'),
+					('b.jma.krieg', 'animations')):
+				container.write_container(os.path.join(directory, name), kind, [])
+
+			with scheduler.JobQueue(os.path.join(directory, 'queue.sqlite')) as queue:
+				added = scheduler.queue_files(queue, [directory],
+					os.path.join(directory, 'out'))
+				assert_that(added, equal_to(3), 'Containers are found')
+				jobs = {os.path.basename(job.filepath): job for job in queue.jobs()}
+				assert_that(jobs['a.model_animations.krieg'].model, equal_to(
+					os.path.join(directory, 'a.gbxmodel.krieg')), 'Model container')
+				assert_that(jobs['a.gbxmodel.krieg'].status, equal_to('pending'))
+				assert_that(jobs['b.jma.krieg'].status, equal_to('skipped'))
@@ -0,0 +1,67 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import tempfile
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import make_tags_directory
+
+tags = import_addon_module('core.tags')
+
+def scenery_paths(directory, names):
+	return [os.path.join(directory, 'scenery', name + '.scenery')
+		for name in names]
+
+# These tests don't need Blender.
+@describe('Tag loader')
+def tagLoaderTests():
+
+	@it('Tags are built once and then come from the cache')
+	def hitsAndMisses():
+		with tempfile.TemporaryDirectory() as directory:
+			make_tags_directory(directory, objects=('rock',))
+			loader = tags.TagLoader(directory)
+
+			first = loader.load('scenery\\rock', '.scenery')
+			second = loader.load('scenery/rock.scenery')
+
+			assert_that(second, same_instance(first), 'Cached tag')
+			assert_that(loader.statistics(), has_entries(
+				hits=1, misses=1, tags=1,
+				size=os.path.getsize(scenery_paths(directory, ('rock',))[0])))
+
+	@it('Changed files are built again')
+	def invalidation():
+		with tempfile.TemporaryDirectory() as directory:
+			make_tags_directory(directory, objects=('rock',))
+			filepath, = scenery_paths(directory, ('rock',))
+			loader = tags.TagLoader(directory)
+
+			first = loader.load(filepath)
+			stat = os.stat(filepath)
+			os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+			second = loader.load(filepath)
+
+			assert_that(second, is_not(same_instance(first)), 'Rebuilt tag')
+			assert_that(loader.statistics(), has_entries(
+				hits=0, misses=2, invalidations=1, tags=1))
+
+	@it('The least recently used tags are dropped to fit the size')
+	def eviction():
+		with tempfile.TemporaryDirectory() as directory:
+			make_tags_directory(directory, objects=('a', 'b', 'c'))
+			a, b, c = scenery_paths(directory, ('a', 'b', 'c'))
+			# Room for two of them.
+			loader = tags.TagLoader(directory,
+				max_size=os.path.getsize(a) + os.path.getsize(b))
+
+			loader.load(a)
+			loader.load(b)
+			loader.load(a)
+			loader.load(c)
+			loader.load(a)
+			loader.load(b)
+
+			assert_that(loader.statistics(), has_entries(
+				hits=2, misses=4, evictions=2, tags=2))
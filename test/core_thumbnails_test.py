@@ -0,0 +1,79 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import tempfile
+
+from testutils.addon import import_addon_module
+
+thumbnails = import_addon_module('core.thumbnails')
+
+def write(filepath, data):
+	os.makedirs(os.path.dirname(filepath), exist_ok=True)
+	with open(filepath, 'wb') as tag_file:
+		tag_file.write(data)
+
+def render(jobs):
+	'''Pretends to be a worker by writing empty thumbnails.'''
+	for job in jobs:
+		write(job['output'], b'')
+
+# These tests don't need Blender, the rendering is left out.
+@describe('Thumbnail cache')
+def thumbnailCacheTests():
+
+	@it('Only new and changed tags get jobs')
+	def pendingJobs():
+		with tempfile.TemporaryDirectory() as directory:
+			tags_directory = os.path.join(directory, 'tags')
+			rock = os.path.join(tags_directory, 'rock.gbxmodel')
+			tree = os.path.join(tags_directory, 'tree.gbxmodel')
+			write(rock, b'rock')
+			write(tree, b'tree')
+			cache = thumbnails.ThumbnailCache(os.path.join(directory, 'cache'))
+
+			filepaths = thumbnails.find_thumbnail_tags(tags_directory)
+			jobs = thumbnails.find_pending_jobs(filepaths, cache)
+			assert_that([job['filepath'] for job in jobs],
+				contains_inanyorder(rock, tree), 'First run')
+			render(jobs)
+			assert_that(thumbnails.find_pending_jobs(filepaths, cache),
+				empty(), 'Second run')
+
+			write(tree, b'a different tree')
+			jobs = thumbnails.find_pending_jobs(filepaths, cache)
+			assert_that([job['filepath'] for job in jobs],
+				contains_exactly(tree), 'After a change')
+
+	@it('Unchanged files are not hashed again')
+	def manifest():
+		with tempfile.TemporaryDirectory() as directory:
+			rock = os.path.join(directory, 'rock.gbxmodel')
+			write(rock, b'rock')
+			cache = thumbnails.ThumbnailCache(directory)
+			content_hash = cache.content_hash(rock)
+			cache.save()
+
+			cache = thumbnails.ThumbnailCache(directory)
+			cache.manifest[rock][2] = 'remembered'
+			assert_that(cache.content_hash(rock), equal_to('remembered'))
+			assert_that(content_hash, equal_to(thumbnails.file_hash(rock)))
+
+	@it('Animation thumbnails change with their model')
+	def animationJobs():
+		with tempfile.TemporaryDirectory() as directory:
+			model = os.path.join(directory, 'cyborg.gbxmodel')
+			animation = os.path.join(directory, 'cyborg.model_animations')
+			lonely = os.path.join(directory, 'lonely.model_animations')
+			write(model, b'cyborg')
+			write(animation, b'walk')
+			write(lonely, b'walk')
+			cache = thumbnails.ThumbnailCache(directory)
+
+			job = thumbnails.make_job(cache, animation)
+			assert_that(job, has_entries(filepath=animation, model=model))
+			assert_that(thumbnails.make_job(cache, lonely), none(), 'No model')
+
+			write(model, b'a different cyborg')
+			assert_that(thumbnails.make_job(cache, animation)['key'],
+				is_not(equal_to(job['key'])), 'Key after changing the model')
@@ -0,0 +1,113 @@
+from pocha import *
+from hamcrest import *
+
+import numpy as np
+
+from testutils.addon import import_addon_module
+
+validation = import_addon_module('core.validation')
+
+def make_geometry(positions, indices, shaders=None):
+	'''Makes the vertex and triangle dicts validate_geometry takes.'''
+	positions = np.array(positions, np.float32).reshape(-1, 3)
+	indices = np.array(indices, np.int32).reshape(-1, 3)
+	count = len(positions)
+	vertices = {
+		'positions': positions,
+		'normals': np.tile(np.float32((0, 0, 1)), (count, 1)),
+		'uvs': np.zeros((count, 2), np.float32),
+		'skin_nodes': np.zeros((count, 2), np.int32),
+		'skin_weights': np.tile(np.float32((1, 0)), (count, 1)),
+	}
+	triangles = {
+		'indices': indices,
+		'regions': np.zeros(len(indices), np.int32),
+		'shaders': np.array(shaders if shaders is not None
+			else np.arange(len(indices)), np.int32),
+	}
+	return vertices, triangles
+
+# A unit square split into two triangles, and a fifth point off to the side.
+SQUARE = ((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (5, 5, 5))
+
+# These tests don't need Blender.
+@describe('Array geometry validation')
+def validationTests():
+
+	@it('Clean geometry is left alone')
+	def clean():
+		vertices, triangles = make_geometry(SQUARE, [(0, 1, 2), (0, 2, 3)])
+
+		fixed_vertices, fixed_triangles, report = validation.validate_geometry(
+			vertices, triangles, material_count=2, node_count=1)
+
+		assert_that(report.is_clean, equal_to(True), report.summary())
+		assert_that(fixed_triangles['indices'] is triangles['indices'],
+			equal_to(True), 'Nothing was copied')
+
+	@it('Invalid triangles are removed and the rest keep their order')
+	def invalidTriangles():
+		vertices, triangles = make_geometry(SQUARE, [
+			(0, 1, 2),
+			(0, 0, 3),  # degenerate
+			(2, 3, 9),  # out of range
+			(0, 2, 3),
+			(3, 0, 2),  # duplicate of the one above
+			(1, 2, 4),
+		])
+
+		fixed_vertices, fixed_triangles, report = validation.validate_geometry(
+			vertices, triangles)
+
+		assert_that(fixed_triangles['indices'].tolist(),
+			equal_to([[0, 1, 2], [0, 2, 3], [1, 2, 4]]), 'Remaining triangles')
+		assert_that(fixed_triangles['shaders'].tolist(), equal_to([0, 3, 5]),
+			'Materials stay with their triangles')
+		assert_that(report.counts, has_entries(
+			degenerate_triangles=1,
+			out_of_range_triangles=1,
+			duplicate_triangles=1,
+		))
+		assert_that(report.is_clean, equal_to(False), 'Report is clean')
+
+	@it('Non finite values and invalid indices are fixed')
+	def nonFinite():
+		vertices, triangles = make_geometry(SQUARE, [(0, 1, 2), (0, 2, 3)],
+			shaders=[0, 7])
+		vertices['positions'][1] = np.nan
+		vertices['normals'][2] = np.inf
+		vertices['skin_nodes'][3] = (0, 4)
+		vertices['skin_weights'][3] = (0.5, 0.5)
+
+		fixed_vertices, fixed_triangles, report = validation.validate_geometry(
+			vertices, triangles, material_count=2, node_count=2)
+
+		assert_that(np.isfinite(fixed_vertices['positions']).all(),
+			equal_to(True), 'Positions are finite')
+		assert_that(fixed_vertices['normals'][2].tolist(), equal_to([0, 0, 0]),
+			'Non finite normals are zeroed')
+		assert_that(fixed_vertices['skin_nodes'][3].tolist(), equal_to([0, -1]),
+			'Missing skin nodes are removed')
+		assert_that(fixed_triangles['shaders'].tolist(), equal_to([0, 0]),
+			'Missing materials are replaced')
+		assert_that(np.isnan(vertices['positions'][1]).all(), equal_to(True),
+			'The input is not modified')
+		assert_that(report.counts, has_entries(
+			non_finite_positions=1,
+			non_finite_normals=1,
+			invalid_skin_nodes=1,
+			invalid_materials=1,
+		))
+
+	@it('Zero area triangles are only reported')
+	def zeroArea():
+		vertices, triangles = make_geometry(
+			SQUARE + ((2, 0, 0),), [(0, 1, 5), (0, 1, 2)])
+
+		fixed_vertices, fixed_triangles, report = validation.validate_geometry(
+			vertices, triangles)
+
+		assert_that(len(fixed_triangles['indices']), equal_to(2),
+			'Triangles kept')
+		assert_that(report.counts, equal_to({'zero_area_triangles': 1}))
+		assert_that(report.is_clean, equal_to(True), 'Report is clean')
@@ -0,0 +1,222 @@
+'''Differential tests of the fast import paths against the old importers.
+
+Every test generates random jms and jma data for a handful of seeds, runs
+it through both the frozen reference implementations in
+testutils/reference.py and the addon's current code, and compares the
+results within a tolerance.
+
+Run only these as a gate for performance work with:
+
+	test/test.py test/differential_test.py
+
+Set DIFFERENTIAL_SEEDS to try more (or fewer) seeds than the default.
+'''
+from pocha import *
+from hamcrest import *
+
+import os
+from random import Random
+
+import bpy
+import numpy as np
+
+from testutils import reference
+from testutils.addon import import_addon_module
+from testutils.hamcrest_matchers import (MESH_ATTRIBUTES, mesh_arrays,
+	mesh_close_to, sort_mesh_vertices)
+from testutils.scene import clear_scene
+from testutils.synthetic import make_jma_set, make_jms, make_nodes
+
+anim = import_addon_module('halo1.anim')
+geometry = import_addon_module('core.geometry')
+model = import_addon_module('halo1.model')
+transforms = import_addon_module('core.transforms')
+
+SEEDS = range(int(os.environ.get('DIFFERENTIAL_SEEDS', 4)))
+
+# Mesh data is stored as 32 bit floats, animation keys go through matrix
+# decomposition. Both are off by a little more than float precision.
+MESH_DELTA = 1e-4
+ANIMATION_DELTA = 1e-4
+
+def random_jms(seed):
+	'''Returns a random jms with a random size, and some degenerate triangles.'''
+	rng = Random(seed)
+	return make_jms(
+		verts=rng.randrange(3, 400),
+		regions=rng.randrange(1, 6),
+		nodes=rng.randrange(1, 30),
+		markers=rng.randrange(0, 5),
+		materials=rng.randrange(1, 5),
+		degenerate=rng.choice((0.0, 0.05, 0.3)),
+		seed=seed,
+		name='differential%d' % seed)
+
+def random_region_filter(jms, seed):
+	'''Returns a random non empty subset of the regions, or () for all.'''
+	rng = Random(seed)
+	regions = range(len(jms.regions))
+	if rng.random() < 0.25:
+		return ()
+	return tuple(sorted(rng.sample(regions, rng.randrange(1, len(regions) + 1))))
+
+def sorted_mesh_arrays(obj):
+	return sort_mesh_vertices(
+		drop_loose_vertices(mesh_arrays(obj.data, MESH_ATTRIBUTES)))
+
+def drop_loose_vertices(arrays):
+	'''
+	Removes the vertices no loop uses from a dict from mesh_arrays.
+
+	mesh.validate() leaves the vertices of the triangles it removes behind,
+	the array validation of the fast path never adds them. Either way
+	nothing uses them.
+	'''
+	used = np.zeros(len(arrays['positions']), bool)
+	used[arrays['loop_vertices']] = True
+	renumber = np.cumsum(used) - 1
+
+	result = dict(arrays)
+	for name in ('positions', 'normals'):
+		result[name] = arrays[name][used]
+	result['loop_vertices'] = renumber[arrays['loop_vertices']]
+
+	# Groups that only had loose vertices in them are empty now.
+	weights = arrays['weights'][used]
+	group_count = np.flatnonzero(weights.any(axis=0))[-1:] + 1
+	result['weights'] = weights[:, :int(group_count[0]) if len(group_count) else 0]
+	return result
+
+def new_datablocks(collection, before):
+	return [block for block in collection if block.as_pointer() not in before]
+
+def action_keys(action):
+	'''Returns {(data_path, index): (keys, 2) array} of all fcurves of an action.'''
+	keys = {}
+	for fcurve in action.fcurves:
+		points = np.empty(len(fcurve.keyframe_points) * 2, np.float64)
+		fcurve.keyframe_points.foreach_get('co', points)
+		keys[fcurve.data_path, fcurve.array_index] = points.reshape(-1, 2)
+	return keys
+
+def import_actions(import_function, armature, animations):
+	'''Runs an animation importer and returns the actions it made.'''
+	before = {action.as_pointer() for action in bpy.data.actions}
+	bpy.context.view_layer.objects.active = armature
+	import_function(animations)
+	return new_datablocks(bpy.data.actions, before)
+
+@describe('Fast paths match the reference importers')
+def differentialTests():
+
+	@afterEach
+	def cleanup():
+		clear_scene()
+
+	for seed in SEEDS:
+
+		@it('Compacting vertices matches reduce_vertices, seed %d' % seed)
+		def compactVertices(seed=seed):
+			jms = random_jms(seed)
+			vertices = tuple((v.pos_x, v.pos_y, v.pos_z) for v in jms.verts)
+			fast_vertices = geometry.vertex_arrays(jms.verts)
+			fast_triangles = geometry.triangle_arrays(jms.tris)
+
+			for region in range(len(jms.regions)):
+				triangles = tuple(
+					(t.v0, t.v1, t.v2) for t in jms.tris if t.region == region)
+				new_verts, new_tris, translation = reference.reduce_vertices(
+					vertices, triangles)
+				fast = geometry.region_mesh(fast_vertices, fast_triangles,
+					region_filter=(region,))
+
+				# The reference orders vertices by however the set iterates,
+				# so compare through the source indices instead.
+				assert_that(sorted(translation), equal_to(fast.vertex_map.tolist()),
+					'Used vertices of region %d' % region)
+
+				source = {new: old for old, new in translation.items()}
+				expected = [[source[i] for i in tri] for tri in new_tris]
+				assert_that(fast.vertex_map[fast.triangles].tolist(),
+					equal_to(expected),
+					'Triangles of region %d by source index' % region)
+
+				expected_positions = np.array(
+					[new_verts[translation[old]] for old in fast.vertex_map]
+				).reshape(-1, 3)
+				assert_that(np.abs(fast.positions - expected_positions).max(
+					initial=0.0), less_than_or_equal_to(MESH_DELTA),
+					'Positions of region %d' % region)
+
+		@it('Absolute node transforms match the reference, seed %d' % seed)
+		def nodeTransforms(seed=seed):
+			rng = Random(seed)
+			jms_nodes = make_nodes(rng.randrange(1, 60), rng)
+
+			expected = reference.get_absolute_node_transforms_from_jms(jms_nodes)
+			translations, rotations = transforms.absolute_node_transforms(
+				geometry.node_arrays(jms_nodes))
+
+			for i in range(len(jms_nodes)):
+				assert_that(np.allclose(translations[i],
+					tuple(expected[i]['translation']), atol=1e-9),
+					equal_to(True), 'Translation of node %d' % i)
+				assert_that(np.allclose(rotations[i],
+					tuple(expected[i]['rotation']), atol=1e-9),
+					equal_to(True), 'Rotation of node %d' % i)
+
+		@it('Imported regions match the reference, seed %d' % seed)
+		def importRegion(seed=seed):
+			jms = random_jms(seed)
+			region_filter = random_region_filter(jms, seed)
+			scale = Random(seed).choice((1.0, 0.03048))
+
+			armature, nodes = model.import_halo1_nodes_from_jms(jms, scale=scale)
+			for mat in jms.materials:
+				model.import_halo1_model_shader(mat.name)
+
+			expected = reference.import_halo1_region_from_jms(jms,
+				name='reference', scale=scale, region_filter=region_filter,
+				parent_rig=armature)
+			actual = model.import_halo1_region_from_jms(jms,
+				name='fast', scale=scale, region_filter=region_filter,
+				parent_rig=armature, trust_validated=True)
+
+			assert_that(sorted_mesh_arrays(actual), mesh_close_to(
+				sorted_mesh_arrays(expected), MESH_ATTRIBUTES,
+				delta=MESH_DELTA))
+			assert_that([group.name for group in actual.vertex_groups],
+				equal_to([group.name for group in expected.vertex_groups]),
+				'Vertex group names')
+			assert_that(actual.parent, equal_to(expected.parent), 'Parent')
+
+		@it('Imported animations match the reference, seed %d' % seed)
+		def importAnimations(seed=seed):
+			rng = Random(seed)
+			jms = make_jms(verts=3, regions=1, markers=0,
+				nodes=rng.randrange(1, 25), seed=seed)
+			animations = make_jma_set(jms.nodes,
+				animations=rng.randrange(1, 4), frames=rng.randrange(1, 8),
+				seed=seed)
+
+			armature, nodes = model.import_halo1_nodes_from_jms(jms,
+				scale=0.03048)
+			expected = import_actions(reference.import_animations,
+				armature, animations)
+			actual = import_actions(anim.import_animations,
+				armature, animations)
+
+			assert_that(len(actual), equal_to(len(expected)), 'Action count')
+			for expected_action, actual_action in zip(expected, actual):
+				expected_keys = action_keys(expected_action)
+				actual_keys = action_keys(actual_action)
+				assert_that(sorted(actual_keys), equal_to(sorted(expected_keys)),
+					'Animated channels of %s' % expected_action.name)
+
+				for channel, keys in expected_keys.items():
+					description = '%s %s[%d]' % ((expected_action.name,) + channel)
+					assert_that(actual_keys[channel].shape, equal_to(keys.shape),
+						'Keyframes of ' + description)
+					error = np.abs(actual_keys[channel] - keys).max(initial=0.0)
+					assert_that(error, less_than_or_equal_to(ANIMATION_DELTA),
+						description)
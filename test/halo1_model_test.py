@@ -0,0 +1,75 @@
+from pocha import *
+from hamcrest import *
+
+import bpy
+
+from testutils.addon import import_addon_module
+from testutils.scene import clear_scene
+from testutils.synthetic import make_jms
+
+geometry = import_addon_module('core.geometry')
+model = import_addon_module('halo1.model')
+
+def identical_permutations(jms, names):
+	'''Returns ModelArrays of jms, once for every permutation name.'''
+	models = []
+	for name in names:
+		arrays = geometry.model_arrays_from_jms(jms)
+		arrays.perm_name = name
+		models.append(arrays)
+	return models
+
+def region_objects():
+	return [obj for obj in bpy.data.objects if obj.type == 'MESH']
+
+@describe('Model import')
+def modelImportTests():
+
+	@afterEach
+	def cleanup():
+		clear_scene()
+
+	@it('Identical permutations share their meshes')
+	def sharedMeshes():
+		jms = make_jms(verts=60, regions=2, nodes=3, markers=0, materials=2)
+
+		model.import_halo1_model(identical_permutations(jms, ('base', 'damaged')),
+			name='rock', share_meshes=True)
+
+		objects = region_objects()
+		assert_that(objects, has_length(4), 'Objects')
+		assert_that({obj.data.name for obj in objects}, has_length(2), 'Meshes')
+		for obj in objects:
+			assert_that(obj.vertex_groups.keys(), has_length(3),
+				'No duplicate vertex groups')
+
+	@it('Meshes are not shared without share_meshes')
+	def unsharedMeshes():
+		jms = make_jms(verts=60, regions=2, nodes=3, markers=0, materials=2)
+
+		model.import_halo1_model(identical_permutations(jms, ('base', 'damaged')),
+			name='rock')
+
+		assert_that({obj.data.name for obj in region_objects()}, has_length(4))
+
+	@it('Edited meshes are not shared anymore')
+	def editedMeshes():
+		jms = make_jms(verts=60, regions=1, nodes=3, markers=0, materials=2)
+		model.import_halo1_model(identical_permutations(jms, ('base',)),
+			name='rock', share_meshes=True)
+		edited = region_objects()[0].data
+		edited.vertices.add(1)
+
+		model.import_halo1_model(identical_permutations(jms, ('base',)),
+			name='rock', share_meshes=True)
+
+		assert_that({obj.data.name for obj in region_objects()}, has_length(2),
+			'A new mesh')
+		assert_that(edited.keys(), is_not(has_item('krieg_geometry_hash')),
+			'The edited mesh forgot its hash')
+
+	@it('A file without models raises a ValueError')
+	def noModels():
+		assert_that(calling(model.import_halo1_model).with_args([], name='empty'),
+			raises(ValueError))
+		assert_that(bpy.data.objects, empty())
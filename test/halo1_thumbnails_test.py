@@ -0,0 +1,44 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import tempfile
+
+import bpy
+
+from reclaimer.model.jms import write_jms
+
+from testutils.addon import import_addon_module
+from testutils.scene import clear_scene
+from testutils.synthetic import make_jms
+
+thumbnails = import_addon_module('halo1.thumbnails')
+
+@describe('Thumbnail rendering')
+def thumbnailRenderTests():
+
+	@afterEach
+	def cleanup():
+		# Rendering starts from the factory settings, which the snapshot of
+		# clear_scene doesn't know about.
+		clear_scene(factory_reset=True)
+
+	@it('A model renders to a png')
+	def renderModel():
+		with tempfile.TemporaryDirectory() as directory:
+			filepath = os.path.join(directory, 'rock.jms')
+			write_jms(filepath, make_jms(verts=60, regions=2, nodes=3,
+				markers=0, materials=2))
+			job = {
+				'filepath': filepath,
+				'model': filepath,
+				'key': 'rock',
+				'output': os.path.join(directory, 'rock.png'),
+				'size': 16,
+			}
+
+			thumbnails.render_thumbnail(job)
+
+			assert_that(os.path.isfile(job['output']), equal_to(True), 'Rendered')
+			assert_that(bpy.data.materials.keys(),
+				contains_inanyorder('material0', 'material1'), 'Materials')
@@ -0,0 +1,42 @@
+from pocha import *
+from hamcrest import *
+
+import os
+import tempfile
+
+import bpy
+
+from testutils.addon import import_addon_module
+from testutils.synthetic import make_tags_directory
+
+common = import_addon_module('menu.import_export.common')
+
+class FakeOperator:
+	'''Collects what recorded_import reports.'''
+	bl_label = 'Import'
+
+	def __init__(self):
+		self.reports = []
+
+	def report(self, kinds, message):
+		self.reports.append(message)
+
+@describe('Import statistics')
+def importStatsTests():
+
+	@it('Tag cache hits and misses are in the totals')
+	def tagCacheCounts():
+		with tempfile.TemporaryDirectory() as directory:
+			make_tags_directory(directory, objects=('rock',))
+			filepath = os.path.join(directory, 'scenery', 'rock.scenery')
+			loader = common.get_tag_loader(bpy.context)
+			operator = FakeOperator()
+
+			with common.recorded_import(operator, bpy.context, filepath) as stats:
+				loader.load(filepath)
+				loader.load(filepath)
+
+			assert_that(stats.to_dict()['totals'], has_entries(
+				tag_cache_hits=1, tag_cache_misses=1))
+			assert_that(operator.reports, has_item(
+				contains_string('tag_cache_hits 1')), 'Summary')
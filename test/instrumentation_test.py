@@ -0,0 +1,95 @@
+from pocha import *
+from hamcrest import *
+
+from testutils.addon import import_addon_module
+
+instrumentation = import_addon_module('instrumentation')
+
+@describe('Import instrumentation')
+def instrumentationTests():
+
+	@it('Stages and counts are recorded')
+	def stagesRecorded():
+		with instrumentation.recording('test') as stats:
+			with instrumentation.stage('first'):
+				instrumentation.count('datablocks', 2)
+			with instrumentation.stage('second'):
+				instrumentation.count('keyframes', 7)
+				instrumentation.count('keyframes', 7)
+
+		assert_that(stats.stages, has_length(2), 'Both stages recorded')
+		assert_that(stats.stages['first'].counts,
+			equal_to({'datablocks': 2}),
+			'First stage counts')
+		assert_that(stats.stages['second'].counts,
+			equal_to({'keyframes': 14}),
+			'Second stage counts add up')
+		assert_that(stats.totals(),
+			equal_to({'datablocks': 2, 'keyframes': 14}),
+			'Totals combine all stages')
+
+	@it('Counts go to the innermost stage')
+	def nestedStages():
+		with instrumentation.recording('test') as stats:
+			with instrumentation.stage('outer'):
+				instrumentation.count('datablocks')
+				with instrumentation.stage('inner'):
+					instrumentation.count('vertex_group_writes', 3)
+
+		assert_that(stats.stages['outer'].counts,
+			equal_to({'datablocks': 1}),
+			'Outer stage only has its own counts')
+		assert_that(stats.stages['inner'].counts,
+			equal_to({'vertex_group_writes': 3}),
+			'Inner stage has its counts')
+		assert_that(stats.stages['outer'].wall_time,
+			greater_than_or_equal_to(stats.stages['inner'].wall_time),
+			'Outer stage took at least as long as the inner stage')
+
+	@it('Nothing is recorded outside of a recording')
+	def noRecording():
+		assert_that(instrumentation.active_stats(), none(), 'Not recording')
+
+		with instrumentation.stage('stage') as stats:
+			instrumentation.count('datablocks')
+
+		assert_that(stats, none(), 'No stage stats outside of a recording')
+
+	@it('Peak resident memory covers the recording')
+	def peakRss():
+		if instrumentation.peak_rss() is None:
+			# Nothing to measure on this platform.
+			return
+
+		with instrumentation.recording('test', trace_memory=False) as stats:
+			block = bytearray(32 * 1048576)
+			del block
+
+		assert_that(stats.peak_rss, greater_than_or_equal_to(stats.start_rss),
+			'Peak is at least the starting memory')
+		assert_that(stats.to_dict(), has_key('peak_rss'),
+			'Peak is part of the JSON statistics')
+
+	@it('Finished recordings are collected')
+	def collected():
+		with instrumentation.collecting() as collected:
+			with instrumentation.recording('first', trace_memory=False) as first:
+				pass
+			with instrumentation.recording('second', trace_memory=False) as second:
+				pass
+		with instrumentation.recording('after', trace_memory=False):
+			pass
+
+		assert_that(collected, contains_exactly(
+			same_instance(first), same_instance(second)),
+			'Only the recordings inside the block')
+
+	@it('Traced peaks are only reported when memory is traced')
+	def untracedSummary():
+		with instrumentation.recording('test', trace_memory=False) as stats:
+			with instrumentation.stage('parse'):
+				instrumentation.count('datablocks')
+
+		assert_that(stats.summary_lines(), only_contains(
+			is_not(contains_string(', peak %.1f MiB' % 0))),
+			'No traced peaks')
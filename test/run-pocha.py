@@ -1,10 +1,77 @@
-'''This is a hack so we can run Pocha through Blender Python.'''
-import pocha
+'''This is a hack so we can run Pocha through Blender Python.
+
+Arguments for this script go after a "--", so Blender leaves them alone:
+
+	blender --background --python test/run-pocha.py -- [--results FILE] [PATH...]
+
+Without any paths the whole test directory is run. With --results, the
+outcome of every test is also written to FILE as JSON, which is how
+test.py collects the results of its shards.
+'''
+from argparse import ArgumentParser
+import json
 import sys
+import time
+
+from pocha import discover, runner
+from pocha.reporters.spec import SpecReporter
+
+class RecordingReporter(SpecReporter):
+	'''The spec reporter, but it also remembers every test result.'''
+
+	def __init__(self):
+		super().__init__()
+		self.results = []
+		self.suite_names = []
+		self.test_start = 0.0
+
+	def beforeSuite(self, stdout, suite):
+		super().beforeSuite(stdout, suite)
+		self.suite_names.append(suite.name)
+
+	def afterSuite(self, stdout, suite):
+		super().afterSuite(stdout, suite)
+		self.suite_names.pop()
+
+	def beforeTest(self, stdout, test):
+		super().beforeTest(stdout, test)
+		self.test_start = time.perf_counter()
+
+	def afterTest(self, stdout, test):
+		super().afterTest(stdout, test)
+		self.results.append({
+			'suite': ' '.join(self.suite_names),
+			'name': test.name,
+			'status': test.status,
+			'time': time.perf_counter() - self.test_start,
+		})
+
+
+def get_args():
+	# Remove Blender's own arguments. If we don't then we'd choke on them.
+	argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+	parser = ArgumentParser(prog='run-pocha.py')
+	parser.add_argument('--results', type=str, default=None,
+		help='Write the result of every test to this JSON file.')
+	parser.add_argument('paths', nargs='*', default=['test'],
+		help='Test files or directories to run.')
+	return parser.parse_args(argv)
+
+if __name__ == '__main__':
+	args = get_args()
+
+	# Every search adds to the same global test tree, so the last one
+	# returns the tests of all paths.
+	tests = None
+	for path in args.paths:
+		tests = discover.search(path, None)
+
+	reporter = RecordingReporter()
+	failed = runner.run_tests(tests, reporter)
 
-# Remove the arguments from argv. If we don't then Pocha will get upset at
-# the args we've just given Blender.
-sys.argv = sys.argv[ :1]
+	if args.results:
+		with open(args.results, 'w') as results_file:
+			json.dump({'tests': reporter.results}, results_file, indent='\t')
 
-# Run the entrypoint of pocha!
-pocha.cli.cli()
+	sys.exit(1 if failed else 0)
@@ -0,0 +1,90 @@
+from pocha import *
+from hamcrest import *
+
+import json
+import subprocess
+
+import bpy
+
+from testutils.addon import ADDON_ROOT
+
+# Registering should be close to free. This is generous, so slow machines
+# don't fail the test, but importing reclaimer's definitions goes over it.
+MAX_REGISTER_SECONDS = 0.5
+
+# Modules that are slow to import and only needed once something is imported.
+HEAVY_MODULES = (
+	'reclaimer.hek.defs.mode',
+	'reclaimer.hek.defs.mod2',
+	'reclaimer.hek.defs.antr',
+	'reclaimer.model.model_decompilation',
+	'reclaimer.animation.animation_decompilation',
+)
+
+# The import operators that have a modal version, which should take the
+# same properties.
+MODAL_OPERATORS = ('halo1_model', 'halo1_anim', 'halo1_bsp')
+
+# Runs in a fresh Blender, so modules the other tests imported don't count.
+PROBE = '''
+import bpy, importlib, json, sys, time
+sys.path.insert(0, {parent!r})
+start = time.perf_counter()
+addon = importlib.import_module({name!r})
+addon.register()
+seconds = time.perf_counter() - start
+properties = {{}}
+for name in {modal!r}:
+	for idname in (name, name + '_modal'):
+		operator = getattr(bpy.ops.import_scene, idname)
+		properties[idname] = sorted(operator.get_rna_type().properties.keys())
+print('STARTUP ' + json.dumps({{
+	'seconds': seconds,
+	'modules': [name for name in {heavy!r} if name in sys.modules],
+	'properties': properties,
+}}))
+addon.unregister()
+'''
+
+def probe_startup():
+	'''Registers the addon in a new Blender and returns what it measured.'''
+	probe = PROBE.format(parent=str(ADDON_ROOT.parent), name=ADDON_ROOT.name,
+		heavy=HEAVY_MODULES, modal=MODAL_OPERATORS)
+	result = subprocess.run(
+		[bpy.app.binary_path, '--background', '--factory-startup',
+		 '--python-exit-code', '1', '--python-expr', probe],
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+		universal_newlines=True)
+
+	for line in result.stdout.splitlines():
+		if line.startswith('STARTUP '):
+			return json.loads(line[len('STARTUP '):])
+	raise AssertionError('Startup probe failed:\n' + result.stderr)
+
+@describe('Addon startup')
+def startupTests():
+
+	startup = {}
+
+	@before
+	def probe():
+		startup.update(probe_startup())
+
+	@it('Registering does not import reclaimer definitions')
+	def noHeavyImports():
+		assert_that(startup['modules'], empty(),
+			'Modules imported while registering')
+
+	@it('Registering is fast')
+	def registerTime():
+		assert_that(startup['seconds'], less_than(MAX_REGISTER_SECONDS),
+			'Seconds spent importing and registering the addon')
+
+	@it('Modal import operators have the properties of the blocking ones')
+	def modalProperties():
+		properties = startup['properties']
+		for name in MODAL_OPERATORS:
+			assert_that(properties[name + '_modal'], equal_to(properties[name]),
+				'Properties of ' + name + '_modal')
+			assert_that(properties[name], has_items('filepath', 'scale_enum'),
+				'Properties of ' + name)
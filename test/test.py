@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 from argparse import ArgumentParser
+import json
 import os
 from pathlib import Path
 from shutil import which
 import subprocess
 import sys
+import tempfile
+import time
 
 DESC = '''
 	Runs all (or a subset of) the tests inside Blender.
@@ -12,7 +15,122 @@ DESC = '''
 	Blendkrieg depends on Blender's internal bpy module, and thus the tests do
 	too. This script makes it a little easier to run our tests inside Blender.
 	We assume this script and run-pocha.py are co-located in the test directory.
+
+	The test files are split into shards that each run in their own Blender
+	process, all at the same time.
+	'''
+
+def discover_test_files(test_dir, root):
+	'''
+	Finds every *_test.py file below test_dir, skipping directories with a
+	pocha.ignore file like pocha does. Returns paths relative to root.
+	'''
+	found = []
+	for directory, dirs, files in os.walk(str(test_dir)):
+		if 'pocha.ignore' in files:
+			dirs[:] = []
+			continue
+		dirs.sort()
+		for filename in sorted(files):
+			if filename.endswith('_test.py'):
+				path = Path(directory, filename)
+				found.append(path.relative_to(root).as_posix())
+	return found
+
+def split_into_shards(paths, count, root):
+	'''
+	Splits the test files into at most count shards of about equal size.
+
+	File size is a rough stand-in for how long a file takes. The biggest
+	files are handed out first, each to the shard with the least so far.
 	'''
+	count = max(1, min(count, len(paths)))
+	shards = [[] for i in range(count)]
+	loads = [0] * count
+	by_size = sorted(paths, key=lambda p: -Path(root, p).stat().st_size)
+	for path in by_size:
+		smallest = loads.index(min(loads))
+		shards[smallest].append(path)
+		loads[smallest] += Path(root, path).stat().st_size
+	return [sorted(shard) for shard in shards if shard]
+
+class Shard:
+	'''A Blender process running part of the tests.'''
+
+	def __init__(self, number, paths, blender, run_pocha, root, workdir):
+		self.number = number
+		self.paths = paths
+		base = Path(workdir, 'shard%d' % number)
+		self.results_path = base.with_suffix('.json')
+		self.stdout = open(str(base.with_suffix('.out')), 'w+')
+		self.stderr = open(str(base.with_suffix('.err')), 'w+')
+		self.start = time.perf_counter()
+		self.duration = 0.0
+		self.process = subprocess.Popen(
+			[blender, '--background', '--python', str(run_pocha), '--',
+			 '--results', str(self.results_path)] + paths,
+			cwd=str(root), stdout=self.stdout, stderr=self.stderr)
+
+	def wait(self):
+		self.process.wait()
+		self.duration = time.perf_counter() - self.start
+
+	def read(self, stream):
+		stream.seek(0)
+		return stream.read()
+
+	def results(self):
+		'''Returns the test results of the shard, or None if it crashed.'''
+		try:
+			with open(str(self.results_path)) as results_file:
+				return json.load(results_file)['tests']
+		except (OSError, ValueError, KeyError):
+			return None
+
+def run_shards(blender, run_pocha, root, paths, jobs):
+	'''Runs all test files in parallel shards. Returns whether all passed.'''
+	with tempfile.TemporaryDirectory() as workdir:
+		shards = [
+			Shard(i, shard_paths, blender, run_pocha, root, workdir)
+			for i, shard_paths in enumerate(split_into_shards(paths, jobs, root))
+		]
+		for shard in shards:
+			shard.wait()
+
+		passed = 0
+		failed = 0
+		ok = True
+		summary = []
+		for shard in shards:
+			sys.stdout.write(shard.read(shard.stdout))
+
+			results = shard.results()
+			if results is None:
+				shard_failed = True
+				status = 'crashed (exit code %d)' % shard.process.returncode
+			else:
+				failures = [r for r in results if r['status'] == 'fail']
+				passed += sum(r['status'] == 'pass' for r in results)
+				failed += len(failures)
+				shard_failed = bool(failures) or shard.process.returncode != 0
+				status = '%d passed, %d failed' % (
+					len(results) - len(failures), len(failures))
+
+			summary.append('  shard %d: %s in %.1fs (%s)' % (
+				shard.number, status, shard.duration, ', '.join(shard.paths)))
+
+			# Blender's console is noisy, so only show it when it might help.
+			if shard_failed:
+				ok = False
+				sys.stderr.write('--- stderr of shard %d ---\n' % shard.number)
+				sys.stderr.write(shard.read(shard.stderr))
+
+			shard.stdout.close()
+			shard.stderr.close()
+
+	print('Ran %d shards: %d passed, %d failed' % (len(shards), passed, failed))
+	print('\n'.join(summary))
+	return ok
 
 if __name__ == '__main__':
 	parser = ArgumentParser(description=DESC)
@@ -21,6 +139,28 @@ if __name__ == '__main__':
 		environment variable BLENDER_PATH. If not specified, this script will
 		search for a blender executable on the system.
 	''')
+	parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+		help='How many Blender processes to run the tests in. Defaults to the CPU count.')
+	parser.add_argument('paths', nargs='*', help='''
+		Test files or directories to run. Defaults to all of them.
+	''')
+	parser.add_argument('--bench', action='store_true', help='''
+		Run the import benchmarks instead of the tests.
+	''')
+	parser.add_argument('--bench-out', type=str, default='bench_output.json',
+		help='Where to write the benchmark results JSON.')
+	parser.add_argument('--baseline', type=str, default=None, help='''
+		Benchmark results JSON to compare against. Exits with a non-zero code
+		if any stage regressed beyond the threshold. If the file does not
+		exist yet, the results are stored there as the new baseline.
+	''')
+	parser.add_argument('--threshold', type=float, default=0.2, help='''
+		Allowed slowdown of a benchmark stage, 0.2 meaning 20%%.
+	''')
+	parser.add_argument('--scale', type=str, default='small',
+		help='Benchmark data size: small, medium or large.')
+	parser.add_argument('--repeat', type=int, default=3,
+		help='How many times to run each benchmark stage.')
 	args = parser.parse_args()
 
 	# Support reading Blender location in multiple ways
@@ -33,6 +173,7 @@ if __name__ == '__main__':
 
 	# Build a path to our test running script that Blender will run
 	cur_dir = Path(__file__).resolve().parent
+	test_dir = cur_dir
 	run_pocha = cur_dir.joinpath('run-pocha.py')
 
 	# Peel back directories until we find the project root
@@ -40,10 +181,53 @@ if __name__ == '__main__':
 	  and not cur_dir.joinpath('.git').exists():
 		cur_dir = cur_dir.parent
 
-	# Run Blender with the project root as the working directory so this script
-	# will work when run from anywhere.
-	subprocess.run(
-		[blender, '--background', '--python', str(run_pocha)],
+	if not args.bench:
+		paths = []
+		for path in args.paths or [str(test_dir)]:
+			path = Path(path).resolve()
+			if path.is_dir():
+				paths.extend(discover_test_files(path, cur_dir))
+			else:
+				paths.append(path.relative_to(cur_dir).as_posix())
+
+		if not paths:
+			sys.exit('No test files found.')
+
+		# Run Blender with the project root as the working directory so this
+		# script will work when run from anywhere.
+		sys.exit(0 if run_shards(blender, run_pocha, cur_dir, paths, args.jobs) else 1)
+
+	sys.path.insert(0, str(test_dir.joinpath('bench')))
+	from compare import (find_regressions, format_report, load_results,
+		save_results)
+
+	bench_out = Path(args.bench_out).resolve()
+	result = subprocess.run(
+		[blender, '--background', '--python-exit-code', '1',
+		 '--python', str(test_dir.joinpath('bench', 'run-bench.py')), '--',
+		 '--out', str(bench_out),
+		 '--scale', args.scale,
+		 '--repeat', str(args.repeat)],
 		cwd=str(cur_dir),
-		stderr=subprocess.PIPE # Suppress nonsense from Blender's console
+		stderr=subprocess.PIPE
 	)
+	if result.returncode != 0 or not bench_out.exists():
+		sys.stderr.write(result.stderr.decode(errors='replace'))
+		sys.exit('Benchmark run failed.')
+
+	results = load_results(bench_out)
+	baseline = None
+	if args.baseline and Path(args.baseline).exists():
+		baseline = load_results(args.baseline)
+	elif args.baseline:
+		save_results(args.baseline, results)
+		print('Stored new baseline at ' + args.baseline)
+
+	print(format_report(results, baseline))
+
+	if baseline:
+		regressions = find_regressions(results, baseline, args.threshold)
+		for stage, base_time, new_time in regressions:
+			print('REGRESSION %s: %.4fs -> %.4fs' % (stage, base_time, new_time))
+		if regressions:
+			sys.exit(1)
@@ -1,3 +1,3 @@
 '''Import the "public" testutils API'''
 from .scene import clear_scene, set_scene_data
-import hamcrest_matchers
+from . import hamcrest_matchers
@@ -0,0 +1,28 @@
+'''Helpers for importing Blendkrieg itself from inside the tests.
+
+The addon uses relative imports everywhere, so it has to be imported as a
+package by the name of its directory instead of module by module.
+'''
+import importlib
+import sys
+from pathlib import Path
+
+# test/testutils/addon.py -> project root
+ADDON_ROOT = Path(__file__).resolve().parents[2]
+
+def import_addon():
+	'''Import the addon package and return it.
+
+	This also makes the libraries in lib/ (reclaimer and friends) importable.
+	'''
+	parent = str(ADDON_ROOT.parent)
+	if parent not in sys.path:
+		sys.path.insert(0, parent)
+
+	return importlib.import_module(ADDON_ROOT.name)
+
+
+def import_addon_module(name):
+	'''Import a submodule of the addon, like "halo1.model", and return it.'''
+	addon = import_addon()
+	return importlib.import_module(addon.__name__ + '.' + name)
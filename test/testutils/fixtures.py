@@ -0,0 +1,194 @@
+'''Mesh fixtures stored as plain arrays.
+
+Running the Collada importer for every mesh in every test is slow. Instead
+each fixture file is imported once, turned into a MeshFixture, and cached
+as a .npz file next to the other cached fixtures. Building a mesh from a
+MeshFixture is a handful of foreach_set calls.
+
+The cache is thrown away whenever the source file is newer than it.
+'''
+import json
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+CACHE_DIR = Path(__file__).resolve().parent.joinpath('fixture_cache')
+
+# Bump this when MeshFixture changes, so old cache files get rebuilt.
+CACHE_VERSION = 1
+
+class MeshFixture:
+	'''Everything the tests care about of a mesh, as arrays.'''
+
+	def __init__(self, *, name, positions, loop_vertices, loop_starts,
+			loop_totals, material_indices, smooth, uv_layers, materials):
+		self.name = name
+		self.positions = positions
+		self.loop_vertices = loop_vertices
+		self.loop_starts = loop_starts
+		self.loop_totals = loop_totals
+		self.material_indices = material_indices
+		self.smooth = smooth
+		# {name: (loops, 2) array} in the order of the mesh's uv layers.
+		self.uv_layers = uv_layers
+		# [(name, diffuse_color)] for every material slot.
+		self.materials = materials
+
+	@classmethod
+	def from_mesh(cls, mesh):
+		'''Captures an existing Blender mesh.'''
+		def get(collection, attribute, dtype, width=1):
+			values = np.empty(len(collection) * width, dtype)
+			collection.foreach_get(attribute, values)
+			return values.reshape(-1, width) if width > 1 else values
+
+		return cls(
+			name=mesh.name,
+			positions=get(mesh.vertices, 'co', np.float32, 3),
+			loop_vertices=get(mesh.loops, 'vertex_index', np.int32),
+			loop_starts=get(mesh.polygons, 'loop_start', np.int32),
+			loop_totals=get(mesh.polygons, 'loop_total', np.int32),
+			material_indices=get(mesh.polygons, 'material_index', np.int32),
+			smooth=get(mesh.polygons, 'use_smooth', bool),
+			uv_layers={
+				layer.name: get(layer.data, 'uv', np.float32, 2)
+				for layer in mesh.uv_layers
+			},
+			materials=[
+				(mat.name, tuple(mat.diffuse_color)) if mat else None
+				for mat in mesh.materials
+			],
+		)
+
+	def to_mesh(self, name=None):
+		'''Builds a new Blender mesh (and its materials) from the fixture.'''
+		mesh = bpy.data.meshes.new(name or self.name)
+
+		mesh.vertices.add(len(self.positions))
+		mesh.vertices.foreach_set('co', self.positions.ravel())
+		mesh.loops.add(len(self.loop_vertices))
+		mesh.loops.foreach_set('vertex_index', self.loop_vertices)
+		mesh.polygons.add(len(self.loop_starts))
+		mesh.polygons.foreach_set('loop_start', self.loop_starts)
+		mesh.polygons.foreach_set('loop_total', self.loop_totals)
+		mesh.polygons.foreach_set('material_index', self.material_indices)
+		mesh.polygons.foreach_set('use_smooth', self.smooth)
+
+		for uv_name, uvs in self.uv_layers.items():
+			layer = mesh.uv_layers.new(name=uv_name)
+			layer.data.foreach_set('uv', uvs.ravel())
+
+		for slot in self.materials:
+			if slot is None:
+				mesh.materials.append(None)
+				continue
+			mat_name, diffuse_color = slot
+			mat = bpy.data.materials.new(mat_name)
+			mat.diffuse_color = diffuse_color
+			mesh.materials.append(mat)
+
+		mesh.update(calc_edges=True)
+		mesh.validate()
+		return mesh
+
+	def save(self, path):
+		meta = {
+			'version': CACHE_VERSION,
+			'name': self.name,
+			'uv_names': list(self.uv_layers),
+			'materials': self.materials,
+		}
+		arrays = {
+			'positions': self.positions,
+			'loop_vertices': self.loop_vertices,
+			'loop_starts': self.loop_starts,
+			'loop_totals': self.loop_totals,
+			'material_indices': self.material_indices,
+			'smooth': self.smooth,
+		}
+		for i, uvs in enumerate(self.uv_layers.values()):
+			arrays['uv_%d' % i] = uvs
+
+		path.parent.mkdir(parents=True, exist_ok=True)
+		with open(str(path), 'wb') as cache_file:
+			np.savez(cache_file, meta=np.array(json.dumps(meta)), **arrays)
+
+	@classmethod
+	def load(cls, path):
+		'''Loads a saved fixture, or returns None if it is outdated.'''
+		with np.load(str(path)) as data:
+			meta = json.loads(str(data['meta']))
+			if meta['version'] != CACHE_VERSION:
+				return None
+
+			return cls(
+				name=meta['name'],
+				positions=data['positions'],
+				loop_vertices=data['loop_vertices'],
+				loop_starts=data['loop_starts'],
+				loop_totals=data['loop_totals'],
+				material_indices=data['material_indices'],
+				smooth=data['smooth'],
+				uv_layers={
+					uv_name: data['uv_%d' % i]
+					for i, uv_name in enumerate(meta['uv_names'])
+				},
+				materials=[
+					(slot[0], tuple(slot[1])) if slot else None
+					for slot in meta['materials']
+				],
+			)
+
+
+# Fixtures already loaded in this session, by absolute source path.
+_fixtures = {}
+
+def cache_path(source):
+	'''Returns where the cached fixture of a source file is stored.'''
+	return CACHE_DIR.joinpath(source.name + '.npz')
+
+def get_mesh_fixture(path):
+	'''Returns the MeshFixture of a mesh file, importing it only if needed.'''
+	source = Path(path).resolve()
+	fixture = _fixtures.get(source)
+	if fixture is not None:
+		return fixture
+
+	cached = cache_path(source)
+	if cached.exists() and cached.stat().st_mtime >= source.stat().st_mtime:
+		fixture = MeshFixture.load(cached)
+
+	if fixture is None:
+		fixture = import_mesh_fixture(source)
+		fixture.save(cached)
+
+	_fixtures[source] = fixture
+	return fixture
+
+def import_mesh_fixture(source):
+	'''Runs the Collada importer once and captures the mesh it made.'''
+	def new_blocks(collection, before):
+		return [block for block in collection if block.as_pointer() not in before]
+
+	def pointers(collection):
+		return {block.as_pointer() for block in collection}
+
+	before_objs = pointers(bpy.data.objects)
+	before_meshes = pointers(bpy.data.meshes)
+	before_materials = pointers(bpy.data.materials)
+
+	bpy.ops.wm.collada_import(filepath=str(source))
+
+	mesh = new_blocks(bpy.data.meshes, before_meshes)[0]
+	fixture = MeshFixture.from_mesh(mesh)
+
+	# Leave nothing of the import behind.
+	for obj in new_blocks(bpy.data.objects, before_objs):
+		bpy.data.objects.remove(obj, do_unlink=True)
+	for mesh in new_blocks(bpy.data.meshes, before_meshes):
+		bpy.data.meshes.remove(mesh)
+	for mat in new_blocks(bpy.data.materials, before_materials):
+		bpy.data.materials.remove(mat)
+
+	return fixture
@@ -1,5 +1,7 @@
+import hashlib
 from math import fabs
 
+import numpy as np
 from bpy_types import Mesh
 from hamcrest.core.base_matcher import BaseMatcher
 from hamcrest.library.number.iscloseto import isnumeric
@@ -76,12 +78,9 @@ class MeshEquals(BaseMatcher):
 		if len(self.mesh.vertices) != len(item.vertices):
 			return False
 
-		# "co" compares vertex locations as Vectors
-		for v1, v2 in zip(self.mesh.vertices, item.vertices):
-			if v1.co != v2.co:
-				return False
-
-		return True
+		return np.array_equal(
+			mesh_arrays(self.mesh, ('positions',))['positions'],
+			mesh_arrays(item, ('positions',))['positions'])
 
 	def describe_to(self, description):
 		description.append_text(self.mesh)
@@ -95,8 +94,184 @@ class MeshEquals(BaseMatcher):
 			description.append_text('Mesh vertices did not match up')
 
 
+# Everything mesh_arrays can read, and what the matchers compare by default.
+MESH_ATTRIBUTES = (
+	'positions', 'normals', 'loop_normals', 'loop_vertices', 'loop_starts',
+	'loop_totals', 'material_indices', 'smooth', 'uvs', 'weights',
+)
+
+def _foreach_get(collection, attribute, dtype, width=1):
+	values = np.empty(len(collection) * width, dtype)
+	collection.foreach_get(attribute, values)
+	return values.reshape(-1, width) if width > 1 else values
+
+def mesh_arrays(mesh, attributes=MESH_ATTRIBUTES):
+	'''Reads the attributes of a mesh into a dict of NumPy arrays.
+
+	uvs are stacked into a (loops, layers, 2) array, and weights is a dense
+	(vertices, groups) array of vertex group weights by group index.
+	loop_normals are the split normals, including the custom ones the
+	importer writes with normals_split_custom_set.
+	'''
+	readers = {
+		'positions': lambda: _foreach_get(mesh.vertices, 'co', np.float64, 3),
+		'normals': lambda: _foreach_get(mesh.vertices, 'normal', np.float64, 3),
+		'loop_normals': lambda: _loop_normals(mesh),
+		'loop_vertices': lambda: _foreach_get(mesh.loops, 'vertex_index', np.int64),
+		'loop_starts': lambda: _foreach_get(mesh.polygons, 'loop_start', np.int64),
+		'loop_totals': lambda: _foreach_get(mesh.polygons, 'loop_total', np.int64),
+		'material_indices': lambda: _foreach_get(
+			mesh.polygons, 'material_index', np.int64),
+		'smooth': lambda: _foreach_get(mesh.polygons, 'use_smooth', bool),
+		'uvs': lambda: np.stack([
+			_foreach_get(layer.data, 'uv', np.float64, 2)
+			for layer in mesh.uv_layers
+		] or [np.empty((len(mesh.loops), 0))], axis=1).reshape(
+			len(mesh.loops), len(mesh.uv_layers), 2),
+		'weights': lambda: _vertex_weights(mesh),
+	}
+	return {name: readers[name]() for name in attributes}
+
+def _loop_normals(mesh):
+	# Blender 4.1 keeps them up to date by itself.
+	if hasattr(mesh, 'calc_normals_split'):
+		mesh.calc_normals_split()
+	return _foreach_get(mesh.loops, 'normal', np.float64, 3)
+
+def sort_mesh_vertices(arrays):
+	'''Reorders the vertices in a dict from mesh_arrays by their position.
+
+	Two importers can build the same mesh with its vertices in a different
+	order. Sorting both makes them comparable. Loops keep their order but
+	are renumbered to the sorted vertices. Vertices need unique positions
+	for this to be meaningful.
+	'''
+	positions = arrays['positions']
+	# lexsort sorts by the last key first, so this is by x, then y, then z.
+	order = np.lexsort(positions.T[::-1])
+	rank = np.empty_like(order)
+	rank[order] = np.arange(len(order))
+
+	result = dict(arrays)
+	for name in ('positions', 'normals', 'weights'):
+		if name in result:
+			result[name] = result[name][order]
+	if 'loop_vertices' in result:
+		result['loop_vertices'] = rank[result['loop_vertices']]
+	return result
+
+def _vertex_weights(mesh):
+	# There is no foreach_get for vertex groups, this is the one loop.
+	entries = [
+		(vert.index, group.group, group.weight)
+		for vert in mesh.vertices for group in vert.groups
+	]
+	group_count = max((entry[1] for entry in entries), default=-1) + 1
+	weights = np.zeros((len(mesh.vertices), group_count), np.float64)
+	for index, group, weight in entries:
+		weights[index, group] = weight
+	return weights
+
+
+class MeshArraysCloseTo(BaseMatcher):
+	'''Matches all (or some) attributes of Blender meshes within a tolerance.
+
+	Both the expected and the matched item can be a mesh, or a dict of
+	arrays like mesh_arrays returns.
+	The attributes are compared as whole arrays. On a mismatch it describes
+	the first differing indices of every attribute that is off, along with
+	how far off they are.
+	'''
+	def __init__(self, expected, attributes, delta, max_reported):
+		self.attributes = tuple(attributes)
+		self.delta = delta
+		self.max_reported = max_reported
+		if isinstance(expected, Mesh):
+			expected = mesh_arrays(expected, self.attributes)
+		self.expected = expected
+
+	def _diffs(self, item):
+		'''Returns {attribute: description} of every mismatching attribute.'''
+		actual = item if isinstance(item, dict) \
+			else mesh_arrays(item, self.attributes)
+		diffs = {}
+		for name in self.attributes:
+			expected = np.asarray(self.expected[name])
+			value = actual[name]
+			if expected.shape != value.shape:
+				diffs[name] = 'shape %s instead of %s' % (value.shape, expected.shape)
+				continue
+
+			if expected.dtype.kind == 'f':
+				error = np.abs(value - expected)
+				bad = error > self.delta
+			else:
+				error = (value != expected).astype(np.float64)
+				bad = error != 0
+			if not bad.any():
+				continue
+
+			# Report by the first index, so one vertex counts once.
+			bad_rows = np.flatnonzero(bad.reshape(len(bad), -1).any(axis=1)
+				if bad.ndim > 1 else bad)
+			shown = bad_rows[:self.max_reported]
+			lines = ['%d of %d differ, max error %g, mean error %g' % (
+				len(bad_rows), len(bad), error.max(), error.mean())]
+			for index in shown:
+				lines.append('\t[%d] %s, expected %s' % (
+					index, value[index].tolist(), expected[index].tolist()))
+			if len(bad_rows) > len(shown):
+				lines.append('\t...')
+			diffs[name] = '\n'.join(lines)
+		return diffs
+
+	def _matches(self, item):
+		if not isinstance(item, (Mesh, dict)):
+			return False
+		return not self._diffs(item)
+
+	def describe_to(self, description):
+		description \
+			.append_text('mesh with ')                         \
+			.append_text(', '.join(self.attributes))           \
+			.append_text(' within <')                          \
+			.append_text(self.delta)                           \
+			.append_text('>')
+
+	def describe_mismatch(self, item, description):
+		if not isinstance(item, (Mesh, dict)):
+			super(MeshArraysCloseTo, self).describe_mismatch(item, description)
+			return
+
+		for name, diff in self._diffs(item).items():
+			description.append_text(name).append_text(': ') \
+				.append_text(diff).append_text('\n')
+
+
+def mesh_fingerprint(mesh, attributes=MESH_ATTRIBUTES, decimals=5):
+	'''Hashes the attributes of a mesh, rounded to the given decimals.
+
+	Two meshes with the same fingerprint are the same for all the attributes
+	within the rounding. This makes for cheap golden values in tests.
+	'''
+	digest = hashlib.blake2b(digest_size=16)
+	for name, values in mesh_arrays(mesh, attributes).items():
+		if values.dtype.kind == 'f':
+			values = np.round(values * 10 ** decimals).astype(np.int64)
+		else:
+			values = values.astype(np.int64)
+		digest.update(name.encode())
+		digest.update(np.asarray(values.shape, np.int64).tobytes())
+		digest.update(np.ascontiguousarray(values).tobytes())
+	return digest.hexdigest()
+
+
 def vector_close_to(vector, delta=DEFAULT_VECTOR_DELTA):
 	return VectorCloseTo(vector, delta)
 
 def mesh_equal_to(mesh):
 	return MeshEquals(mesh)
+
+def mesh_close_to(mesh, attributes=MESH_ATTRIBUTES, delta=1e-6, max_reported=5):
+	'''Matches a mesh against another mesh or a dict from mesh_arrays.'''
+	return MeshArraysCloseTo(mesh, attributes, delta, max_reported)
@@ -0,0 +1,89 @@
+from pocha import *
+from hamcrest import *
+
+import bpy
+
+import testutils
+from testutils.hamcrest_matchers import (mesh_arrays, mesh_close_to,
+	mesh_fingerprint)
+
+@describe('Mesh matchers')
+def meshMatcherTests():
+
+	@beforeEach
+	def clear():
+		testutils.clear_scene()
+
+	def pyramids():
+		testutils.set_scene_data({
+			'obj1': { 'mesh': 'test/testutils/pyramid.dae' },
+			'obj2': { 'mesh': 'test/testutils/pyramid.dae' },
+		})
+		return (bpy.data.objects.get('obj1').data,
+			bpy.data.objects.get('obj2').data)
+
+	@it('Identical meshes match on every attribute')
+	def identicalMeshes():
+		mesh1, mesh2 = pyramids()
+
+		assert_that(mesh2, mesh_close_to(mesh1), 'Same pyramid')
+		assert_that(mesh_fingerprint(mesh2), equal_to(mesh_fingerprint(mesh1)),
+			'Same fingerprint')
+
+	@it('Moved vertices are reported')
+	def movedVertex():
+		mesh1, mesh2 = pyramids()
+		mesh2.vertices[4].co.z += 0.5
+
+		matcher = mesh_close_to(mesh1, attributes=('positions',))
+		assert_that(matcher.matches(mesh2), equal_to(False), 'Meshes differ')
+
+		description = StringDescription()
+		matcher.describe_mismatch(mesh2, description)
+		assert_that(str(description), contains_string('1 of 5 differ'),
+			'Mismatch counts the differing vertices')
+		assert_that(str(description), contains_string('[4]'),
+			'Mismatch names the differing vertex')
+
+	@it('Custom normals are compared by default')
+	def customNormals():
+		mesh1, mesh2 = pyramids()
+		# Custom normals need auto smooth before Blender 4.1.
+		if hasattr(mesh2, 'use_auto_smooth'):
+			mesh2.use_auto_smooth = True
+		mesh2.normals_split_custom_set_from_vertices(
+			[(0.0, 0.0, 1.0)] * len(mesh2.vertices))
+
+		matcher = mesh_close_to(mesh1)
+		assert_that(matcher.matches(mesh2), equal_to(False), 'Meshes differ')
+
+		description = StringDescription()
+		matcher.describe_mismatch(mesh2, description)
+		assert_that(str(description), contains_string('loop_normals'),
+			'Mismatch names the loop normals')
+
+	@it('Fingerprints ignore differences below the rounding')
+	def fingerprintRounding():
+		mesh1, mesh2 = pyramids()
+		mesh2.vertices[0].co.x += 1e-7
+
+		assert_that(mesh_fingerprint(mesh2, attributes=('positions',)),
+			equal_to(mesh_fingerprint(mesh1, attributes=('positions',))),
+			'Tiny offset is rounded away')
+
+		mesh2.vertices[0].co.x += 0.1
+		assert_that(mesh_fingerprint(mesh2, attributes=('positions',)),
+			is_not(equal_to(mesh_fingerprint(mesh1, attributes=('positions',)))),
+			'Real offset changes the fingerprint')
+
+	@it('Mesh arrays have one row per element')
+	def arrayShapes():
+		mesh1, mesh2 = pyramids()
+		arrays = mesh_arrays(mesh1)
+
+		assert_that(arrays['positions'].shape, equal_to((5, 3)), 'Positions')
+		assert_that(arrays['uvs'].shape, equal_to((16, 1, 2)), 'Uvs')
+		assert_that(arrays['loop_normals'].shape, equal_to((16, 3)),
+			'Loop normals')
+		assert_that(arrays['material_indices'].shape, equal_to((5,)),
+			'Material indices')
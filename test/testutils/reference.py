@@ -0,0 +1,279 @@
+'''Frozen copies of the importers from before they were vectorized.
+
+The differential tests run these next to the addon's fast paths on the same
+random inputs, and expect the same results. Don't "fix" or speed up
+anything in here: their whole point is to keep doing exactly what the
+addon used to do. A change in behavior belongs in the addon, and in the
+tests that pin it down.
+
+The only edits are the imports, tabs, and in import_animations dropping the
+debugging leftovers (a print and bpy.debug_anim) and raising a TypeError
+instead of a string.
+'''
+import itertools
+
+import bpy
+from mathutils import Matrix, Quaternion, Vector
+
+from .addon import import_addon_module
+
+NODE_NAME_PREFIX = import_addon_module('constants').NODE_NAME_PREFIX
+
+def reduce_vertices(verts, tris):
+	'''
+	Takes a set of preprocessed vertices and triangles and deletes unused
+	vertices.
+	'''
+
+	# Get a tuple of all unique vertex indices used by the tris
+	used_indices = tuple(set(itertools.chain(*tris)))
+
+	# Translation dict that will contain the used_indices as keys,
+	# and their new indices as values.
+	translation_dict = {}
+	# List of unique vertices.
+	new_verts = []
+
+	for old_i in used_indices:
+		# Get the next index in the new_verts list
+		next_i = len(new_verts)
+		# Get the translated id for this vertex. Use the next id if not.
+		new_i = translation_dict.setdefault(old_i, next_i)
+
+		# This shouldn't be possible. But better to be paranoid than sorry.
+		assert new_i <= next_i, "Reached an invalid id."
+
+		# If the new index is actually new we append its corresponding vertex
+		# to our new vertex list.
+		if not new_i < next_i:
+			new_verts.append(verts[old_i])
+
+	# Convert the vertex ids in the triangles to ids that properly reference
+	# the new list.
+	new_tris = map(
+		lambda t : (
+			translation_dict[t[0]],
+			translation_dict[t[1]],
+			translation_dict[t[2]],
+		), tris
+	)
+
+	# Return as tuples because they are nice and fast.
+	return tuple(new_verts), tuple(new_tris), translation_dict
+
+def get_absolute_node_transforms_from_jms(node_list):
+	'''
+	Takes a JmsNodes list and returns the absolute transformations in a dict.
+	'''
+	node_transforms = {}
+
+	for i, node in enumerate(node_list):
+		translation = Vector((node.pos_x, node.pos_y, node.pos_z))
+		rotation = Quaternion((-node.rot_w, node.rot_i, node.rot_j, node.rot_k))
+
+		if node.parent_index >= 0:
+			parent = node_transforms[node.parent_index]
+
+			abs_rotation    = parent['rotation'] @ rotation
+			# Rotating this way has the result end up in the instance
+			# we're calling this method from.
+			translation.rotate(parent['rotation'])
+			abs_translation = parent['translation'] + translation
+		else:
+			abs_translation = translation
+			abs_rotation    = rotation
+
+		node_transforms[i] = {
+			'translation': abs_translation,
+			'rotation': abs_rotation,
+		}
+
+	return node_transforms
+
+def import_halo1_region_from_jms(jms, *,
+		name="unnamed",
+		scale=1.0,
+		region_filter=(),
+		parent_rig=None,
+		skin_vertices=True):
+	'''
+	Imports all the geometry into a Halo 1 JMS into the scene.
+
+	Only imports the regions in the region filter.
+
+	mesh object gets linked to parent_rig and skinned to the bones if
+	skin_vertices is True and the parent is an ARMATURE object.
+	'''
+
+	if not region_filter:
+		region_filter = range(len(jms.regions))
+
+	### Geometry preprocessing.
+
+	# Ready the vertices.
+	vertices = tuple(map(
+			lambda v : (v.pos_x * scale, v.pos_y * scale, v.pos_z * scale),
+			jms.verts
+		)
+	)
+
+	# Ready the triangles.
+
+	# Filter the triangles so only the wished regions are retrieved.
+	triangles = tuple(filter(lambda t : t.region in region_filter, jms.tris))
+
+	# Get the material index of each triangle.
+	triangle_materials = tuple(map(lambda t : t.shader, triangles))
+
+	# Reduce the triangles to just their key components.
+	triangles = tuple(map(lambda t : (t.v0, t.v1, t.v2), triangles))
+
+	# Unpack the vertex normals.
+	vertex_normals = tuple(
+		map(lambda v : (v.norm_i, v.norm_j, v.norm_k), jms.verts)
+	)
+
+	# Convert the vertex normals to triangle normals.
+	tri_normals = map(
+		lambda t : (
+			vertex_normals[t[0]],
+			vertex_normals[t[1]],
+			vertex_normals[t[2]]),
+		triangles
+	)
+
+	# Collect UVs
+
+	vert_uvs = tuple(map(lambda v : (v.tex_u, v.tex_v), jms.verts))
+
+	tri_uvs = tuple(map(
+		lambda t : (
+			vert_uvs[t[0]],
+			vert_uvs[t[1]],
+			vert_uvs[t[2]]),
+		triangles
+	))
+
+	# Remove unused vertices
+	vertices, triangles, translation_dict = reduce_vertices(vertices, triangles)
+
+	# Chain all of the triangle normals together into loop normals.
+	loop_normals = tuple(itertools.chain(*tri_normals))
+
+	loop_uvs = tuple(itertools.chain(*tri_uvs))
+
+	### Importing the data into a mesh
+
+	# Make a mesh to hold all relevant data.
+	mesh = bpy.data.meshes.new(name)
+
+	# Import the verts and tris into the mesh.
+	# verts, edges, tris. If () is given for edges Blender will infer them.
+	mesh.from_pydata(vertices, (), triangles)
+
+	# Add all materials from the jms to the mesh.
+	for mat in jms.materials:
+		mesh.materials.append(bpy.data.materials[mat.name])
+
+	# Assign each triangle their corresponding material id.
+	for i, poly in enumerate(mesh.polygons):
+		poly.material_index = triangle_materials[i]
+
+	# Import loop normals into the mesh.
+	mesh.normals_split_custom_set(loop_normals)
+
+	# Setting this to true makes Blender display the custom normals.
+	mesh.use_auto_smooth = True
+
+	# Apply the UVs
+
+	for loop, uvs in zip(mesh.uv_layers.new().data, loop_uvs):
+		loop.uv = uvs
+
+	# Validate the mesh and make sure it doesn't have any invalid indices.
+	mesh.validate()
+
+	# Create the object, and link it to the scene.
+	region_obj = bpy.data.objects.new(name, mesh)
+	scene = bpy.context.collection
+	scene.objects.link(region_obj)
+
+	# If the function was supplied with a parent object attempt to skin to it
+	# if it is an ARMATURE.
+
+	region_obj.parent = parent_rig
+
+	if skin_vertices and region_obj.parent.type == 'ARMATURE':
+		mod = region_obj.modifiers.new('armature', 'ARMATURE')
+		mod.object = parent_rig
+
+		# Create a vertex group for each bone.
+
+		for node in jms.nodes:
+			region_obj.vertex_groups.new(name=NODE_NAME_PREFIX+node.name)
+
+		# Add the vertices to all the correct vertex groups.
+
+		for jms_i in translation_dict:
+			v = jms.verts[jms_i]
+			mesh_i = translation_dict[jms_i]
+
+			if v.node_0 != -1:
+				# The first node has no skinning data in JMS files (oof)
+				if v.node_1 != -1:
+					region_obj.vertex_groups[v.node_0].add(
+						[mesh_i], 1.0 - v.node_1_weight, 'ADD')
+				else:
+					region_obj.vertex_groups[v.node_0].add(
+						[mesh_i], 1.0, 'ADD')
+
+			if v.node_1 != -1:
+				region_obj.vertex_groups[v.node_1].add(
+					[mesh_i], v.node_1_weight, 'ADD')
+
+	return region_obj
+
+def import_animations(animations, scale=0.03048, format_filter={}):
+	'''Imports jma animations onto the active armature, one frame at a time.'''
+	scene = bpy.context.scene
+	target = bpy.context.object
+	if target.type != "ARMATURE":
+		raise TypeError("Not an armature")
+
+	if not target.animation_data:
+		target.animation_data_create()
+	bpy.ops.object.mode_set(mode="POSE")
+
+	for anim in animations:
+		if len(format_filter) > 0 and len(animations) > 1 and anim.ext not in format_filter:
+			continue
+		action = bpy.data.actions.new(anim.name)
+		target.animation_data.action = action
+		action.use_fake_user = True
+		scene.frame_start = 0
+		scene.frame_end = len(anim.frames) - 1
+		pose_bones = []
+		for node in anim.nodes:
+			pose_bones.append(target.pose.bones[NODE_NAME_PREFIX + node.name])
+
+		for f in range(len(anim.frames)):
+			bpy.context.scene.frame_set(f)
+			for n in range(len(anim.frames[f])):
+				frame = anim.frames[f][n]
+				bone = pose_bones[n]
+
+				T = Matrix.Translation(Vector((frame.pos_x, frame.pos_y, frame.pos_z))* scale)
+				R = Quaternion((frame.rot_w, frame.rot_i, frame.rot_j, frame.rot_k)).inverted().to_matrix().to_4x4()
+				S = Matrix.Scale(frame.scale ,4,(1,1,1))
+
+				M =  T @ R @ S
+				if not bone.parent:
+					bone.matrix = M
+				else:
+					P = bone.parent.matrix
+					bone.matrix = P @ M
+				bone.keyframe_insert(data_path="location", index=-1)
+				bone.keyframe_insert(data_path="rotation_quaternion", index=-1)
+
+	scene.frame_set(0)
+	bpy.ops.object.mode_set(mode="OBJECT")
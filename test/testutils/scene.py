@@ -7,11 +7,52 @@ from test import testdata
 import bpy
 from mathutils import Euler, Quaternion, Vector
 
-def clear_scene():
+from .addon import import_addon_module
+from .fixtures import get_mesh_fixture
+
+_util = import_addon_module('scene.util')
+snapshot_datablocks = _util.snapshot_datablocks
+remove_datablocks_since = _util.remove_datablocks_since
+
+# Every bpy.data collection clear_scene cleans up. Anything a test creates
+# outside of these survives until the next factory reset.
+CLEARED_DATABLOCK_TYPES = (
+	'actions', 'armatures', 'cameras', 'collections', 'curves', 'images',
+	'lights', 'materials', 'meshes', 'node_groups', 'objects', 'textures',
+	'worlds',
+)
+
+# What bpy.data looked like right after the first factory reset.
+_clean_state = None
+
+def clear_scene(factory_reset=False):
 	'''Nuke everything in the scene.
 	You should probably be calling this after each test.
+
+	Only the first call (or one with factory_reset) resets all of Blender.
+	After that, only the datablocks created since then are removed, which is
+	a lot faster.
 	'''
-	bpy.ops.wm.read_factory_settings(use_empty=True)
+	global _clean_state
+	if factory_reset or _clean_state is None:
+		bpy.ops.wm.read_factory_settings(use_empty=True)
+		scene = bpy.context.scene
+		_clean_state = (
+			snapshot_datablocks(CLEARED_DATABLOCK_TYPES),
+			(scene.frame_start, scene.frame_end, scene.frame_current),
+		)
+		return
+
+	obj = bpy.context.object
+	if obj is not None and obj.mode != 'OBJECT':
+		bpy.ops.object.mode_set(mode='OBJECT')
+
+	snapshot, frames = _clean_state
+	remove_datablocks_since(snapshot)
+
+	scene = bpy.context.scene
+	scene.frame_start, scene.frame_end, frame_current = frames
+	scene.frame_set(frame_current)
 
 
 def set_scene_data(testdata):
@@ -109,23 +150,5 @@ def maybe_link(parent, obj):
 
 
 def read_in_mesh(path, name_override=None):
-	# We need to do a diff of object names before and after import to find the
-	# name of the object we just imported. It's dumb but it works.
-	before_objs   = bpy.data.objects.keys()
-	before_meshes = bpy.data.meshes.keys()
-
-	bpy.ops.wm.collada_import(filepath=path)
-
-	obj_name  = list(set(bpy.data.objects.keys()).difference(before_objs))[0]
-	mesh_name = list(set(bpy.data.meshes.keys()).difference(before_meshes))[0]
-
-	# We only care about the mesh, so delete its containing object
-	obj = bpy.data.objects.get(obj_name)
-	bpy.data.objects.remove(obj, do_unlink=True)
-	mesh = bpy.data.meshes.get(mesh_name)
-
-	if name_override:
-		mesh.name = name_override
-
-	return mesh
-
+	'''Builds a new mesh from a mesh file, through the fixture cache.'''
+	return get_mesh_fixture(path).to_mesh(name_override)
@@ -3,9 +3,11 @@ from hamcrest import *
 
 import bpy
 from math import radians
+from pathlib import Path
 from mathutils import Euler, Quaternion, Vector
 
 import testutils
+from testutils import fixtures
 from testutils.hamcrest_matchers import mesh_equal_to, vector_close_to
 
 # NOTE The values used in these test assertions were manually retrieved from
@@ -431,6 +433,18 @@ def blenderMockTests():
 		assert_that(obj.to_mesh(), mesh_equal_to(mesh), 'Mesh set on object')
 		assert_that(mesh.name, equal_to('testmesh'), 'Mesh name is set')
 
+	@it('Mesh files are cached as arrays')
+	def meshFixtureCached():
+		path = 'test/testutils/pyramid.dae'
+		fixture = fixtures.get_mesh_fixture(path)
+
+		assert_that(fixtures.get_mesh_fixture(path), same_instance(fixture),
+			'Fixture is only loaded once')
+		assert_that(fixtures.cache_path(Path(path).resolve()).exists(),
+			equal_to(True), 'Fixture is cached on disk')
+		assert_that(bpy.data.meshes, empty(), 'Loading leaves no meshes behind')
+		assert_that(bpy.data.objects, empty(), 'Loading leaves no objects behind')
+
 	@it('Mesh names have unique defaults')
 	def meshUniqueDefaultNames():
 		testutils.set_scene_data({
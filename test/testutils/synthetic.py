@@ -0,0 +1,458 @@
+'''Generators for synthetic Halo 1 data at a configurable scale.
+
+Everything is generated from a seeded random number generator so the same
+arguments always produce the same models and animations. This makes them
+usable for both benchmarks and tests.
+'''
+import itertools
+import math
+import struct
+from random import Random
+
+from .addon import import_addon
+
+# The addon puts reclaimer on the path for us.
+import_addon()
+
+from reclaimer.animation.jma import JmaAnimation, JmaNodeState, get_anim_types
+from reclaimer.model.jms import (JmsMarker, JmsMaterial, JmsModel, JmsNode,
+	JmsTriangle, JmsVertex)
+
+def random_quaternion(rng):
+	'''Returns a random unit quaternion as an (i, j, k, w) tuple.'''
+	u1, u2, u3 = rng.random(), rng.random(), rng.random()
+	a = math.sqrt(1.0 - u1)
+	b = math.sqrt(u1)
+	return (
+		a * math.sin(2.0 * math.pi * u2),
+		a * math.cos(2.0 * math.pi * u2),
+		b * math.sin(2.0 * math.pi * u3),
+		b * math.cos(2.0 * math.pi * u3),
+	)
+
+def random_unit_vector(rng):
+	'''Returns a random normalized (x, y, z) tuple.'''
+	z = rng.uniform(-1.0, 1.0)
+	angle = rng.uniform(0.0, 2.0 * math.pi)
+	r = math.sqrt(1.0 - z * z)
+	return (r * math.cos(angle), r * math.sin(angle), z)
+
+def make_node_parents(node_count, rng, max_depth_step=4):
+	'''
+	Returns a list of parent indices for a random node hierarchy.
+
+	Parents always come before their children like they do in Halo models.
+	'''
+	parents = [-1]
+	for i in range(1, node_count):
+		parents.append(rng.randrange(max(0, i - max_depth_step), i))
+	return parents
+
+def make_nodes(node_count, rng, *, names=None):
+	'''Returns a list of JmsNodes with a valid random hierarchy.'''
+	parents = make_node_parents(node_count, rng)
+	children = [[] for i in range(node_count)]
+	for i, parent in enumerate(parents):
+		if parent >= 0:
+			children[parent].append(i)
+
+	nodes = []
+	for i in range(node_count):
+		siblings = children[parents[i]] if parents[i] >= 0 else [i]
+		sibling_pos = siblings.index(i)
+		rot_i, rot_j, rot_k, rot_w = random_quaternion(rng)
+		nodes.append(JmsNode(
+			name=names[i] if names else 'node%d' % i,
+			first_child=children[i][0] if children[i] else -1,
+			sibling_index=(siblings[sibling_pos + 1]
+				if sibling_pos + 1 < len(siblings) else -1),
+			rot_i=rot_i, rot_j=rot_j, rot_k=rot_k, rot_w=rot_w,
+			pos_x=rng.uniform(-10.0, 10.0),
+			pos_y=rng.uniform(-10.0, 10.0),
+			pos_z=rng.uniform(-10.0, 10.0),
+			parent_index=parents[i],
+		))
+	return nodes
+
+def make_jms(*, verts=1000, regions=4, nodes=20, markers=10, materials=4,
+		seed=0, name="synthetic", degenerate=0.0):
+	'''
+	Generates a JmsModel with the given amount of every piece of data.
+
+	Every region gets its own contiguous block of vertices and roughly two
+	triangles per vertex, like a closed mesh would have.
+
+	degenerate is the fraction of triangles that get made degenerate, either
+	by repeating a vertex index or by moving their last vertex onto the line
+	between the other two. Real models have both kinds.
+	'''
+	rng = Random(seed)
+
+	jms_nodes = make_nodes(nodes, rng)
+	jms_materials = [JmsMaterial('material%d' % i) for i in range(materials)]
+	jms_regions = ['region%d' % i for i in range(regions)]
+
+	jms_markers = []
+	for i in range(markers):
+		rot_i, rot_j, rot_k, rot_w = random_quaternion(rng)
+		jms_markers.append(JmsMarker(
+			name='marker%d' % i,
+			region=rng.randrange(regions),
+			parent=rng.randrange(nodes),
+			rot_i=rot_i, rot_j=rot_j, rot_k=rot_k, rot_w=rot_w,
+			pos_x=rng.uniform(-10.0, 10.0),
+			pos_y=rng.uniform(-10.0, 10.0),
+			pos_z=rng.uniform(-10.0, 10.0),
+			radius=rng.uniform(0.0, 2.0),
+		))
+
+	jms_verts = []
+	for i in range(verts):
+		norm_i, norm_j, norm_k = random_unit_vector(rng)
+		node_1 = rng.randrange(-1, nodes)
+		jms_verts.append(JmsVertex(
+			node_0=rng.randrange(nodes),
+			pos_x=rng.uniform(-100.0, 100.0),
+			pos_y=rng.uniform(-100.0, 100.0),
+			pos_z=rng.uniform(-100.0, 100.0),
+			norm_i=norm_i, norm_j=norm_j, norm_k=norm_k,
+			node_1=node_1,
+			node_1_weight=rng.uniform(0.01, 0.99) if node_1 >= 0 else 0.0,
+			tex_u=rng.random(), tex_v=rng.random(),
+		))
+
+	jms_tris = []
+	block_size = max(3, verts // max(1, regions))
+	for region in range(regions):
+		first = min(region * block_size, max(0, verts - 3))
+		last = min(first + block_size, verts)
+		for i in range((last - first) * 2):
+			v0, v1, v2 = rng.sample(range(first, last), 3)
+			# Only draw from the rng when asked to, so the models made for a
+			# seed stay the same without degenerate triangles.
+			if degenerate and rng.random() < degenerate:
+				v0, v1, v2 = make_degenerate(jms_verts, v0, v1, v2, rng)
+			jms_tris.append(JmsTriangle(
+				region=region, shader=rng.randrange(materials),
+				v0=v0, v1=v1, v2=v2))
+
+	return JmsModel(name, 0, jms_nodes, jms_materials, jms_markers,
+		jms_regions, jms_verts, jms_tris)
+
+def make_sbsp(*, lightmaps=2, materials=3, verts=100, shaders=2, seed=0,
+		lightmap_vertices=True):
+	'''
+	Generates a scenario_structure_bsp tag, built with fast_sbsp_def, with
+	render geometry only.
+
+	Every lightmap gets the given amount of materials, and every material
+	verts vertices and two triangles per vertex, with one of shaders
+	shaders. Positions are in world units, like in real bsps.
+	'''
+	from reclaimer.hek.defs.sbsp import fast_sbsp_def
+
+	rng = Random(seed)
+	tag = fast_sbsp_def.build()
+	tagdata = tag.data.tagdata
+
+	surfaces = []
+	for i in range(lightmaps):
+		tagdata.lightmaps.STEPTREE.append()
+		lightmap = tagdata.lightmaps.STEPTREE[-1]
+		for j in range(materials):
+			lightmap.materials.STEPTREE.append()
+			material = lightmap.materials.STEPTREE[-1]
+			material.shader.filepath = (
+				'levels\\synthetic\\shaders\\shader%d' % rng.randrange(shaders))
+
+			data = bytearray()
+			for k in range(verts):
+				data += struct.pack('<14f',
+					rng.uniform(-10.0, 10.0),
+					rng.uniform(-10.0, 10.0),
+					rng.uniform(-10.0, 10.0),
+					*random_unit_vector(rng),
+					*random_unit_vector(rng),
+					*random_unit_vector(rng),
+					rng.random(), rng.random())
+			if lightmap_vertices:
+				for k in range(verts):
+					data += struct.pack('<5f', *random_unit_vector(rng),
+						rng.random(), rng.random())
+
+			material.vertices_count = verts
+			material.lightmap_vertices_count = verts if lightmap_vertices else 0
+			material.uncompressed_vertices.STEPTREE = data
+			material.surfaces = len(surfaces)
+			material.surface_count = verts * 2
+			for k in range(verts * 2):
+				surfaces.append(rng.sample(range(verts), 3))
+
+	tagdata.surface.STEPTREE = bytearray(struct.pack('>%dh' % (len(surfaces) * 3),
+		*itertools.chain.from_iterable(surfaces)))
+	tagdata.surface.size = len(surfaces)
+	return tag
+
+# A unit cube, with its faces wound counterclockwise seen from outside.
+CUBE_POSITIONS = (
+	(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+	(0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1),
+)
+CUBE_FACES = (
+	(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4),
+	(1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7),
+)
+
+def winged_edges(polygons):
+	'''
+	Turns a list of closed polygons into the edges of a collision bsp.
+
+	Returns a list of (start, end, forward, reverse, left, right) edges and
+	the first edge of every polygon. The first edge of a polygon starts at
+	its first corner, so walking it gives back the polygon as it was.
+	'''
+	edges = []
+	by_corners = {}
+	# The edge that leaves every corner of every polygon.
+	sides = {}
+	for surface, polygon in enumerate(polygons):
+		for i, start in enumerate(polygon):
+			end = polygon[(i + 1) % len(polygon)]
+			edge = by_corners.get((end, start))
+			if edge is None:
+				edge = by_corners[start, end] = len(edges)
+				edges.append([start, end, -1, -1, surface, -1])
+			else:
+				edges[edge][5] = surface
+			sides[surface, i] = edge
+
+	for surface, polygon in enumerate(polygons):
+		for i in range(len(polygon)):
+			edge = edges[sides[surface, i]]
+			following = sides[surface, (i + 1) % len(polygon)]
+			if edge[4] == surface:
+				edge[2] = following
+			else:
+				edge[3] = following
+
+	first_edges = [sides[surface, 0] for surface in range(len(polygons))]
+	return edges, first_edges
+
+def make_coll(*, nodes=2, permutations=2, materials=3, seed=0):
+	'''
+	Generates a model_collision_geometry tag, built with fast_coll_def, with
+	a cube for every permutation of every node. Every node gets a region of
+	its own. Positions are in world units.
+	'''
+	from reclaimer.hek.defs.coll import fast_coll_def
+
+	rng = Random(seed)
+	tag = fast_coll_def.build()
+	tagdata = tag.data.tagdata
+
+	for i in range(materials):
+		tagdata.materials.STEPTREE.append()
+		tagdata.materials.STEPTREE[-1].name = 'material%d' % i
+
+	edges, first_edges = winged_edges(CUBE_FACES)
+	for i in range(nodes):
+		tagdata.regions.STEPTREE.append()
+		region = tagdata.regions.STEPTREE[-1]
+		region.name = 'region%d' % i
+
+		tagdata.nodes.STEPTREE.append()
+		node = tagdata.nodes.STEPTREE[-1]
+		node.name = 'node%d' % i
+		node.region = i
+		node.parent_node = i - 1
+
+		for j in range(permutations):
+			region.permutations.STEPTREE.append()
+			region.permutations.STEPTREE[-1].name = 'permutation%d' % j
+
+			size = rng.uniform(0.1, 1.0)
+			node.bsps.STEPTREE.append()
+			bsp = node.bsps.STEPTREE[-1]
+			set_raw_reflexive(bsp.vertices, '>3fi', [
+				(x * size, y * size, z * size, -1)
+				for x, y, z in CUBE_POSITIONS])
+			set_raw_reflexive(bsp.edges, '>6i', edges)
+			set_raw_reflexive(bsp.surfaces, '>2i2bh', [
+				(-1, first_edge, 0, -1, rng.randrange(materials))
+				for first_edge in first_edges])
+
+	return tag
+
+def set_raw_reflexive(reflexive, layout, items):
+	'''Packs items with the struct layout into a raw reflexive.'''
+	reflexive.STEPTREE = bytearray().join(
+		struct.pack(layout, *item) for item in items)
+	reflexive.size = len(items)
+
+def make_mod2(*, nodes=3, regions=('body', 'head'),
+		permutations=('base', 'damaged'), markers=('head', 'hand'),
+		shader='shaders\\metal', positions=((0, 0, 0), (1, 2, 3))):
+	'''
+	Generates a gbxmodel tag, built with fast_mod2_def. Every permutation of
+	every region gets the markers, and the one geometry has a single part
+	with positions for its vertices, in world units.
+	'''
+	from reclaimer.hek.defs.mod2 import fast_mod2_def
+
+	tag = fast_mod2_def.build()
+	tagdata = tag.data.tagdata
+
+	for i in range(nodes):
+		tagdata.nodes.STEPTREE.append()
+		tagdata.nodes.STEPTREE[-1].name = 'node%d' % i
+
+	for region_name in regions:
+		tagdata.regions.STEPTREE.append()
+		region = tagdata.regions.STEPTREE[-1]
+		region.name = region_name
+		for perm_name in permutations:
+			region.permutations.STEPTREE.append()
+			perm = region.permutations.STEPTREE[-1]
+			perm.name = perm_name
+			for marker_name in markers:
+				perm.local_markers.STEPTREE.append()
+				perm.local_markers.STEPTREE[-1].name = marker_name
+
+	tagdata.shaders.STEPTREE.append()
+	dependency = tagdata.shaders.STEPTREE[-1].shader
+	dependency.filepath = shader
+	dependency.tag_class.set_to('shader_model')
+
+	tagdata.geometries.STEPTREE.append()
+	parts = tagdata.geometries.STEPTREE[-1].parts.STEPTREE
+	parts.append()
+	set_raw_reflexive(parts[-1].uncompressed_vertices, '>14f2h2f', [
+		tuple(position) + (0.0,) * 11 + (0, -1, 1.0, 0.0)
+		for position in positions])
+
+	return tag
+
+def make_antr(*, nodes=3, animations=(('idle', 30), ('walk', 20))):
+	'''
+	Generates a model_animations tag with named animations of the given
+	frame counts, without any frame data.
+	'''
+	from reclaimer.hek.defs.antr import antr_def
+
+	tag = antr_def.build()
+	tagdata = tag.data.tagdata
+	for i in range(nodes):
+		tagdata.nodes.STEPTREE.append()
+		tagdata.nodes.STEPTREE[-1].name = 'node%d' % i
+	for name, frame_count in animations:
+		tagdata.animations.STEPTREE.append()
+		animation = tagdata.animations.STEPTREE[-1]
+		animation.name = name
+		animation.frame_count = frame_count
+	return tag
+
+def make_tags_directory(directory, *, objects=('rock', 'tree'),
+		placements=5, seed=0):
+	'''
+	Writes a scenario to directory/levels/test/test.scenario that places
+	every scenery in objects placements times. Every scenery tag is written
+	to directory/scenery/<name>.scenery and refers to a gbxmodel of the same
+	name, which is only an empty file.
+
+	Positions are in world units and rotations in radians, like in the tag.
+	Returns the path of the scenario and the (position, rotation) of every
+	placement, in order.
+	'''
+	import os
+	from reclaimer.hek.defs.scen import scen_def
+	from reclaimer.hek.defs.scnr import scnr_def
+
+	rng = Random(seed)
+	os.makedirs(os.path.join(directory, 'scenery'), exist_ok=True)
+	os.makedirs(os.path.join(directory, 'levels', 'test'), exist_ok=True)
+
+	scenario = scnr_def.build()
+	tagdata = scenario.data.tagdata
+	expected = []
+	for index, name in enumerate(objects):
+		tag_path = 'scenery\\' + name
+		scenery = scen_def.build()
+		model = scenery.data.tagdata.obje_attrs.model
+		model.filepath = tag_path
+		model.tag_class.set_to('gbxmodel')
+		scenery.serialize(filepath=os.path.join(directory, 'scenery',
+			name + '.scenery'), temp=False, backup=False)
+		open(os.path.join(directory, 'scenery', name + '.gbxmodel'), 'wb').close()
+
+		tagdata.sceneries_palette.STEPTREE.append()
+		dependency = tagdata.sceneries_palette.STEPTREE[-1].name
+		dependency.filepath = tag_path
+		dependency.tag_class.set_to('scenery')
+
+		for i in range(placements):
+			tagdata.sceneries.STEPTREE.append()
+			placement = tagdata.sceneries.STEPTREE[-1]
+			placement.type = index
+			position = tuple(rng.uniform(-100, 100) for i in range(3))
+			rotation = tuple(rng.uniform(-math.pi, math.pi) for i in range(3))
+			placement.position[:] = position
+			placement.rotation[:] = rotation
+			expected.append((position, rotation))
+
+	filepath = os.path.join(directory, 'levels', 'test', 'test.scenario')
+	scenario.serialize(filepath=filepath, temp=False, backup=False)
+	return filepath, expected
+
+def make_degenerate(jms_verts, v0, v1, v2, rng):
+	'''Returns the indices of a degenerate version of the triangle v0, v1, v2.'''
+	if rng.random() < 0.5:
+		return v0, v0, v2
+
+	# Somewhere on the line through v0 and v1, possibly past either end.
+	t = rng.uniform(-0.5, 1.5)
+	a, b, c = jms_verts[v0], jms_verts[v1], jms_verts[v2]
+	c.pos_x = a.pos_x + (b.pos_x - a.pos_x) * t
+	c.pos_y = a.pos_y + (b.pos_y - a.pos_y) * t
+	c.pos_z = a.pos_z + (b.pos_z - a.pos_z) * t
+	return v0, v1, v2
+
+def make_jma(jms_nodes, *, frames=30, seed=0, name="synthetic", ext=".jmm"):
+	'''
+	Generates a JmaAnimation that animates the given JmsNodes.
+
+	Uses the .jmm type by default because it has no root node movement
+	that would need to be applied to the frames.
+	'''
+	rng = Random(seed)
+	anim_type, frame_info_type, world_relative = get_anim_types(ext)
+
+	nodes = [
+		JmsNode(name=node.name, first_child=node.first_child,
+			sibling_index=node.sibling_index, parent_index=node.parent_index)
+		for node in jms_nodes
+	]
+
+	jma_frames = []
+	for f in range(frames):
+		frame = []
+		for n in range(len(nodes)):
+			rot_i, rot_j, rot_k, rot_w = random_quaternion(rng)
+			frame.append(JmaNodeState(
+				pos_x=rng.uniform(-10.0, 10.0),
+				pos_y=rng.uniform(-10.0, 10.0),
+				pos_z=rng.uniform(-10.0, 10.0),
+				rot_i=rot_i, rot_j=rot_j, rot_k=rot_k, rot_w=rot_w,
+				scale=1.0,
+			))
+		jma_frames.append(frame)
+
+	return JmaAnimation(name, 0, anim_type, frame_info_type, world_relative,
+		nodes=nodes, frames=jma_frames)
+
+def make_jma_set(jms_nodes, *, animations=10, frames=30, seed=0):
+	'''Generates a list of JmaAnimations like read_halo1anim returns.'''
+	return [
+		make_jma(jms_nodes, frames=frames, seed=seed + i,
+			name='animation%d' % i)
+		for i in range(animations)
+	]